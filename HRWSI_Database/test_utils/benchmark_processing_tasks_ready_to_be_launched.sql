@@ -0,0 +1,98 @@
+/*
+EXPLAIN ANALYZE benchmark of hrwsi.get_ids_of_processing_tasks_ready_to_be_launched, the request polled by the Launcher.
+
+Synthetic processing tasks are added as in the function tests (tests/functions), in a transaction rolled back at
+the end (see seed_synthetic_processing_tasks.sql).
+The set-based function is compared with the former per row implementation, kept in pg_temp: both must return
+the same ids.
+
+Usage, on a database created with init_database and update_database:
+    psql -U redacted -d hrwsi_db -v nb_task=100000 -f test_utils/benchmark_processing_tasks_ready_to_be_launched.sql
+*/
+\if :{?nb_task}
+\else
+\set nb_task 100000
+\endif
+\timing on
+
+BEGIN;
+
+-- #################################################
+-- 1. Former per row implementation
+-- #################################################
+
+CREATE FUNCTION pg_temp.get_ids_of_processing_tasks_ready_to_be_launched_per_row ()
+    RETURNS setof bigint AS $$
+    BEGIN RETURN query SELECT
+        pt.id 
+        FROM hrwsi.processing_tasks pt 
+        LEFT JOIN hrwsi.nomad_job_dispatch njd
+        ON pt.id=njd.processing_task_fk_id
+        WHERE pt.preceding_input_id is NULL AND njd.id is NULL
+        UNION
+        SELECT ptid 
+        FROM 
+        (
+            SELECT pt.id AS ptid, pt.preceding_input_id AS ptpid, pt.nomad_job_id AS ptjid
+            FROM hrwsi.processing_tasks pt
+            LEFT JOIN hrwsi.nomad_job_dispatch njd
+            ON pt.id=njd.processing_task_fk_id
+            WHERE njd.id is NULL
+        ) AS x, 
+        hrwsi.is_preceding_processing_task_processed(ptid)
+        WHERE is_preceding_processing_task_processed=true; 
+    END $$ LANGUAGE plpgsql stable;
+
+-- #################################################
+-- 2. Seed synthetic data
+-- #################################################
+
+\ir seed_synthetic_processing_tasks.sql
+
+-- #################################################
+-- 3. Benchmark
+-- #################################################
+
+\echo 'Former per row implementation'
+EXPLAIN (ANALYZE, BUFFERS) SELECT * FROM pg_temp.get_ids_of_processing_tasks_ready_to_be_launched_per_row();
+
+\echo 'Set-based implementation'
+EXPLAIN (ANALYZE, BUFFERS) SELECT * FROM hrwsi.get_ids_of_processing_tasks_ready_to_be_launched();
+
+\echo 'Set-based request plan'
+EXPLAIN (ANALYZE, BUFFERS)
+    WITH processing_tasks_without_nomad_job AS (
+        SELECT pt.id, pt.preceding_input_id
+        FROM hrwsi.processing_tasks pt
+        WHERE NOT EXISTS (
+            SELECT 1
+            FROM hrwsi.nomad_job_dispatch njd
+            WHERE njd.processing_task_fk_id = pt.id
+        )
+    )
+    SELECT ptwnj.id
+    FROM processing_tasks_without_nomad_job ptwnj
+    LEFT JOIN LATERAL (
+        SELECT true AS is_processed
+        FROM hrwsi.processing_tasks ppt
+        JOIN hrwsi.nomad_job_dispatch njd ON njd.processing_task_fk_id = ppt.id
+        JOIN hrwsi.processing_status_workflow psw ON psw.nomad_job_dispatch_fk_id = njd.id
+        WHERE ppt.input_fk_id = ptwnj.preceding_input_id
+        AND psw.processing_status_id = 2
+        LIMIT 1
+    ) AS preceding_processing_task ON true
+    WHERE ptwnj.preceding_input_id IS NULL
+    OR preceding_processing_task.is_processed;
+
+\echo 'Number of ready processing tasks, and of ids returned by only one implementation (must be 0)'
+SELECT
+    (SELECT count(*) FROM hrwsi.get_ids_of_processing_tasks_ready_to_be_launched()) AS nb_ready,
+    (SELECT count(*) FROM (
+        (SELECT * FROM pg_temp.get_ids_of_processing_tasks_ready_to_be_launched_per_row()
+         EXCEPT SELECT * FROM hrwsi.get_ids_of_processing_tasks_ready_to_be_launched())
+        UNION ALL
+        (SELECT * FROM hrwsi.get_ids_of_processing_tasks_ready_to_be_launched()
+         EXCEPT SELECT * FROM pg_temp.get_ids_of_processing_tasks_ready_to_be_launched_per_row())
+    ) AS x) AS nb_different;
+
+ROLLBACK;
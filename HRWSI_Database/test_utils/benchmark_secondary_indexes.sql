@@ -0,0 +1,58 @@
+/*
+EXPLAIN ANALYZE benchmark of the hot requests of the Orchestrator and the Launcher, with and without the
+secondary indexes of update_database (6_update_database_processing_tasks_ready_to_be_launched.sql and
+7_update_database_secondary_indexes.sql), and of the latest processing status lookup.
+
+Synthetic processing tasks are added as in the function tests (tests/functions), in a transaction rolled back at
+the end (see seed_synthetic_processing_tasks.sql). The indexes are dropped in the transaction for the second run:
+it locks the tables, the benchmark is meant for a development database.
+
+Usage, on a database created with init_database and update_database:
+    psql -U redacted -d hrwsi_db -v nb_task=1000000 -f test_utils/benchmark_secondary_indexes.sql
+*/
+\if :{?nb_task}
+\else
+\set nb_task 1000000
+\endif
+-- The inputs of the last two days, as seen by the Orchestrator
+\set furthest_date '2024-01-19'
+\timing on
+
+BEGIN;
+
+-- #################################################
+-- 1. Seed synthetic data
+-- #################################################
+
+\ir seed_synthetic_processing_tasks.sql
+ANALYZE hrwsi.processing_task_latest_status;
+
+\echo 'Number of processing tasks by latest status'
+SELECT processing_status_id, count(*) FROM hrwsi.processing_task_latest_status GROUP BY processing_status_id ORDER BY processing_status_id;
+
+-- #################################################
+-- 2. Benchmark with the secondary indexes
+-- #################################################
+
+\echo '########## With the secondary indexes ##########'
+\ir benchmark_secondary_indexes_requests.sql
+
+-- #################################################
+-- 3. Benchmark without the secondary indexes
+-- #################################################
+
+DROP INDEX hrwsi.processing_tasks_input_fk_id_idx,
+    hrwsi.nomad_job_dispatch_processing_task_fk_id_idx,
+    hrwsi.processing_status_workflow_nomad_job_dispatch_fk_id_processing_status_id_idx,
+    hrwsi.input_date_idx,
+    hrwsi.products_input_fk_id_idx,
+    hrwsi.input_input_path_processing_condition_name_tile_idx,
+    hrwsi.products_creation_date_idx,
+    hrwsi.processing_tasks_creation_date_idx,
+    hrwsi.processing_tasks_not_ended_input_fk_id_idx,
+    hrwsi.processing_status_workflow_nomad_job_dispatch_fk_id_date_idx;
+
+\echo '########## Without the secondary indexes ##########'
+\ir benchmark_secondary_indexes_requests.sql
+
+ROLLBACK;
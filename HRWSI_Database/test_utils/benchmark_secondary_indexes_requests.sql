@@ -0,0 +1,28 @@
+/*
+Requests of benchmark_secondary_indexes.sql, as sent by the Orchestrator and the Launcher.
+*/
+\echo 'Orchestrator UNPROCESSED_INPUT_REQUEST'
+EXPLAIN (ANALYZE, BUFFERS) SELECT i.id, i.processing_condition_name FROM hrwsi.input i LEFT OUTER JOIN hrwsi.products p ON i.id = p.input_fk_id WHERE i.date>:'furthest_date' AND p.id is NULL;
+
+\echo 'Orchestrator PT_ALREADY_IN_DATABASE_REQUEST'
+EXPLAIN (ANALYZE, BUFFERS) SELECT input_fk_id FROM hrwsi.processing_tasks;
+
+\echo 'Launcher PROCESSING_TASKS_READY_TO_LAUNCH_REQUEST'
+EXPLAIN (ANALYZE, BUFFERS) SELECT id, input_fk_id, virtual_machine_id, creation_date, preceding_input_id, nomad_job_id, has_ended, intermediate_files_path FROM hrwsi.processing_tasks pt, hrwsi.get_ids_of_processing_tasks_ready_to_be_launched() WHERE pt.id=get_ids_of_processing_tasks_ready_to_be_launched;
+
+\echo 'Launcher NB_OF_PROCESSING_TASKS_NOT_FINISHED_REQUEST'
+EXPLAIN (ANALYZE, BUFFERS) SELECT count(id) FROM hrwsi.get_processing_tasks_not_finished();
+
+\echo 'Launcher NOMAD_JOB_WITHOUT_PROCESSING_STATUS_REQUEST'
+EXPLAIN (ANALYZE, BUFFERS) SELECT njd.id FROM hrwsi.nomad_job_dispatch njd LEFT JOIN hrwsi.processing_status_workflow psw ON psw.nomad_job_dispatch_fk_id=njd.id WHERE psw.id is NULL;
+
+\echo 'Processing tasks whose latest status is started, from the whole processing status workflow history'
+EXPLAIN (ANALYZE, BUFFERS) SELECT count(*) FROM (
+    SELECT DISTINCT ON (njd.processing_task_fk_id) njd.processing_task_fk_id, psw.processing_status_id
+    FROM hrwsi.processing_status_workflow psw
+    JOIN hrwsi.nomad_job_dispatch njd ON njd.id = psw.nomad_job_dispatch_fk_id
+    ORDER BY njd.processing_task_fk_id, psw.date DESC, psw.id DESC
+) AS latest_status WHERE latest_status.processing_status_id = 1;
+
+\echo 'Processing tasks whose latest status is started, from processing_task_latest_status'
+EXPLAIN (ANALYZE, BUFFERS) SELECT count(*) FROM hrwsi.processing_task_latest_status WHERE processing_status_id = 1;
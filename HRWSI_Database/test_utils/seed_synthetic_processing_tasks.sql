@@ -0,0 +1,54 @@
+/*
+Synthetic rows for the benchmarks of the HRWSI database requests, added as in the function tests (tests/functions).
+To be included (\ir) in a transaction rolled back at the end, with the psql variable nb_task set:
+- nb_task inputs, the last tenth of them without processing task,
+- one processing task by input, chained by virtual machine (each task is preceded by the input of the
+  previous task of its virtual machine), the first 80 % of the tasks of the inputs being ended,
+- one Nomad job dispatch for the ended tasks, with a started status, then a processed status and a product
+  for 9 tasks out of 10.
+*/
+\if :{?nb_vm}
+\else
+\set nb_vm 100
+\endif
+
+INSERT INTO hrwsi.input
+(id, processing_condition_name, date, tile, measurement_day, input_path, mission)
+SELECT i, 'FSC_PC', '2024-01-09 12:15:11'::timestamp + i * interval '1 second', '33VUC', 20240109, '/eo_' || i, 'S2'
+FROM generate_series(1, :nb_task) AS i;
+
+INSERT INTO hrwsi.virtual_machine
+(id, name, flavour)
+SELECT md5('worker_' || i)::uuid, 'worker_' || i, 'flavour1'
+FROM generate_series(0, :nb_vm - 1) AS i;
+
+-- Task i processes input i on virtual machine i % nb_vm, after the task of input i - nb_vm
+INSERT INTO hrwsi.processing_tasks
+(id, input_fk_id, virtual_machine_id, creation_date, preceding_input_id, nomad_job_id, has_ended, intermediate_files_path)
+SELECT i, i, md5('worker_' || i % :nb_vm)::uuid, '2024-01-09 12:16:11'::timestamp + i * interval '1 second',
+    CASE WHEN i > :nb_vm THEN i - :nb_vm END, NULL, i <= :nb_task * 0.8, '/intermediate_file_path_' || i
+FROM generate_series(1, (:nb_task * 0.9)::bigint) AS i;
+
+INSERT INTO hrwsi.nomad_job_dispatch
+(id, processing_task_fk_id, nomad_job_dispatch, dispatch_date, log_path)
+SELECT i, i, 'dispatch-' || i, '2024-01-09 12:17:11', 'log_path_' || i
+FROM generate_series(1, (:nb_task * 0.8)::bigint) AS i;
+
+INSERT INTO hrwsi.processing_status_workflow
+(id, nomad_job_dispatch_fk_id, processing_status_id, date, message)
+SELECT i, i, 1, '2024-01-09 12:17:12', 'started'
+FROM generate_series(1, (:nb_task * 0.8)::bigint) AS i;
+
+INSERT INTO hrwsi.processing_status_workflow
+(id, nomad_job_dispatch_fk_id, processing_status_id, date, message)
+SELECT :nb_task + i, i, 2, '2024-01-09 12:27:12', 'processed'
+FROM generate_series(1, (:nb_task * 0.8)::bigint) AS i
+WHERE i % 10 != 0;
+
+INSERT INTO hrwsi.products
+(id, input_fk_id, product_path, creation_date, catalogued_date, kpi_file_path, product_type_id)
+SELECT i, i, '/product_' || i, '2024-01-09 12:27:12', '2024-01-09 12:28:12', NULL, 2
+FROM generate_series(1, (:nb_task * 0.8)::bigint) AS i
+WHERE i % 10 != 0;
+
+ANALYZE hrwsi.input, hrwsi.processing_tasks, hrwsi.nomad_job_dispatch, hrwsi.processing_status_workflow, hrwsi.products;
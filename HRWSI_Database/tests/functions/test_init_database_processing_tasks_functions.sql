@@ -1,6 +1,6 @@
 BEGIN;
 
-SELECT plan(42);
+SELECT plan(45);
 
 
 SELECT has_function(
@@ -87,6 +87,12 @@ SELECT has_function(
     ARRAY ['timestamp']
 );
 
+SELECT has_function(
+    'hrwsi',
+    'get_latest_status_by_processing_task_id',
+    ARRAY ['bigint']
+);
+
 
 SELECT function_returns(
     'hrwsi',
@@ -186,6 +192,13 @@ SELECT function_returns(
     'test ok'
 );
 
+SELECT function_returns(
+    'hrwsi',
+    'get_latest_status_by_processing_task_id',
+    'setof hrwsi.processing_status_history',
+    'test ok'
+);
+
 -- #################################################
 -- 2. Seed data for function tests
 -- #################################################
@@ -363,6 +376,10 @@ PREPARE get_id_of_unprocessed_inputs_with_all_pt_ended_have AS
     SELECT * 
     FROM hrwsi.get_id_of_unprocessed_inputs_with_all_pt_ended('2024-01-09');
 
+PREPARE get_latest_status_by_processing_task_id_have AS 
+    SELECT * 
+    FROM hrwsi.get_latest_status_by_processing_task_id(:pt_id_1);
+
 
 PREPARE get_processing_tasks_not_finished_want AS 
     SELECT 
@@ -433,6 +450,12 @@ PREPARE get_product_data_type_of_processing_tasks_not_ended_want AS
 PREPARE get_id_of_unprocessed_inputs_with_all_pt_ended_want AS
     SELECT :pt_id_1::bigint;
 
+PREPARE get_latest_status_by_processing_task_id_want AS 
+    SELECT psw.id, psw.date, ps.code, ps.name, psw.message 
+    FROM hrwsi.processing_status_workflow psw
+    JOIN hrwsi.processing_status ps ON ps.id = psw.processing_status_id
+    WHERE psw.id = :psw_id_4;
+
 
 SELECT results_eq(
     'get_number_of_error_statuses_by_processing_task_have',
@@ -518,6 +541,12 @@ SELECT results_eq(
     'test get_id_of_unprocessed_inputs_with_all_pt_ended'
 );
 
+SELECT results_eq(
+    'get_latest_status_by_processing_task_id_have',
+    'get_latest_status_by_processing_task_id_want',
+    'test get_latest_status_by_processing_task_id'
+);
+
 
 SELECT * FROM finish();
 
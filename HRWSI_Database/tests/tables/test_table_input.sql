@@ -1,6 +1,6 @@
 BEGIN;
 
-SELECT plan(2);
+SELECT plan(5);
 
 
 SELECT columns_are(
@@ -26,6 +26,27 @@ SELECT fk_ok(
     'name'
 );
 
+SELECT has_index(
+    'hrwsi',
+    'input',
+    'input_input_path_measurement_day_idx',
+    ARRAY ['input_path', 'measurement_day']
+);
+
+SELECT has_index(
+    'hrwsi',
+    'input',
+    'input_date_idx',
+    ARRAY ['date']
+);
+
+SELECT has_index(
+    'hrwsi',
+    'input',
+    'input_input_path_processing_condition_name_tile_idx',
+    ARRAY ['input_path', 'processing_condition_name', 'tile']
+);
+
 
 SELECT * FROM finish();
 
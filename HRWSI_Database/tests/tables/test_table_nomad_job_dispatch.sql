@@ -1,6 +1,6 @@
 BEGIN;
 
-SELECT plan(2);
+SELECT plan(3);
 
 
 SELECT columns_are(
@@ -24,6 +24,13 @@ SELECT fk_ok(
     'id'
 );
 
+SELECT has_index(
+    'hrwsi',
+    'nomad_job_dispatch',
+    'nomad_job_dispatch_processing_task_fk_id_idx',
+    ARRAY ['processing_task_fk_id']
+);
+
 
 SELECT * FROM finish();
 
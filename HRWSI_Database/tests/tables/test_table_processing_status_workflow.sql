@@ -1,6 +1,6 @@
 BEGIN;
 
-SELECT plan(3);
+SELECT plan(5);
 
 
 SELECT columns_are(
@@ -33,6 +33,20 @@ SELECT fk_ok(
     'id'
 );
 
+SELECT has_index(
+    'hrwsi',
+    'processing_status_workflow',
+    'processing_status_workflow_nomad_job_dispatch_fk_id_processing_status_id_idx',
+    ARRAY ['nomad_job_dispatch_fk_id', 'processing_status_id']
+);
+
+SELECT has_index(
+    'hrwsi',
+    'processing_status_workflow',
+    'processing_status_workflow_nomad_job_dispatch_fk_id_date_idx',
+    ARRAY ['nomad_job_dispatch_fk_id', 'date']
+);
+
 
 SELECT * FROM finish();
 
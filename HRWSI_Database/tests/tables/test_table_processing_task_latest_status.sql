@@ -0,0 +1,70 @@
+BEGIN;
+
+SELECT plan(7);
+
+
+SELECT columns_are(
+    'hrwsi',
+    'processing_task_latest_status',
+    ARRAY [
+        'processing_task_fk_id',
+        'nomad_job_dispatch_fk_id',
+        'processing_status_workflow_fk_id',
+        'processing_status_id',
+        'date'
+    ]
+);
+
+SELECT fk_ok(
+    'hrwsi',
+    'processing_task_latest_status',
+    'processing_task_fk_id',
+    'hrwsi',
+    'processing_tasks',
+    'id'
+);
+
+SELECT fk_ok(
+    'hrwsi',
+    'processing_task_latest_status',
+    'nomad_job_dispatch_fk_id',
+    'hrwsi',
+    'nomad_job_dispatch',
+    'id'
+);
+
+SELECT fk_ok(
+    'hrwsi',
+    'processing_task_latest_status',
+    'processing_status_workflow_fk_id',
+    'hrwsi',
+    'processing_status_workflow',
+    'id'
+);
+
+SELECT fk_ok(
+    'hrwsi',
+    'processing_task_latest_status',
+    'processing_status_id',
+    'hrwsi',
+    'processing_status',
+    'id'
+);
+
+SELECT has_index(
+    'hrwsi',
+    'processing_task_latest_status',
+    'processing_task_latest_status_processing_status_id_idx',
+    ARRAY ['processing_status_id']
+);
+
+SELECT has_trigger(
+    'hrwsi',
+    'processing_status_workflow',
+    'update_processing_task_latest_status_trigger'
+);
+
+
+SELECT * FROM finish();
+
+ROLLBACK
\ No newline at end of file
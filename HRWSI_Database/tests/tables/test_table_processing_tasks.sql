@@ -1,6 +1,6 @@
 BEGIN;
 
-SELECT plan(3);
+SELECT plan(6);
 
 
 SELECT columns_are(
@@ -36,6 +36,27 @@ SELECT fk_ok(
     'id'
 );
 
+SELECT has_index(
+    'hrwsi',
+    'processing_tasks',
+    'processing_tasks_input_fk_id_idx',
+    ARRAY ['input_fk_id']
+);
+
+SELECT has_index(
+    'hrwsi',
+    'processing_tasks',
+    'processing_tasks_creation_date_idx',
+    ARRAY ['creation_date']
+);
+
+SELECT has_index(
+    'hrwsi',
+    'processing_tasks',
+    'processing_tasks_not_ended_input_fk_id_idx',
+    ARRAY ['input_fk_id']
+);
+
 
 SELECT * FROM finish();
 
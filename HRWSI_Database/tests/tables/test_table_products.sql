@@ -1,6 +1,6 @@
 BEGIN;
 
-SELECT plan(3);
+SELECT plan(5);
 
 
 SELECT columns_are(
@@ -35,6 +35,20 @@ SELECT fk_ok(
     'id'
 );
 
+SELECT has_index(
+    'hrwsi',
+    'products',
+    'products_input_fk_id_idx',
+    ARRAY ['input_fk_id']
+);
+
+SELECT has_index(
+    'hrwsi',
+    'products',
+    'products_creation_date_idx',
+    ARRAY ['creation_date']
+);
+
 
 SELECT * FROM finish();
 
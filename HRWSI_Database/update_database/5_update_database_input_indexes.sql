@@ -0,0 +1,11 @@
+----------------------------------
+----- INPUT INDEXES --------------
+----------------------------------
+
+/*
+Index used by the Harvester to find which candidate inputs are not already in the input table
+(anti-join on input_path, restricted to the recent measurement days).
+It isn't unique: multiple inputs can refer to the same input_path if there processing condition
+or tile are different.
+*/
+CREATE INDEX IF NOT EXISTS input_input_path_measurement_day_idx ON hrwsi.input (input_path, measurement_day);
@@ -0,0 +1,49 @@
+----------------------------------
+----- PROCESSING TASKS READY -----
+----------------------------------
+
+--- INDEXES ---
+
+/*
+Indexes used to find the processing tasks ready to be launched:
+- the preceding processing tasks of a task are found by their input,
+- the Nomad job dispatches of a task and the processing status workflow of a Nomad job dispatch
+  are found by their foreign key (PostgreSQL doesn't index foreign keys).
+*/
+CREATE INDEX IF NOT EXISTS processing_tasks_input_fk_id_idx ON hrwsi.processing_tasks (input_fk_id);
+CREATE INDEX IF NOT EXISTS nomad_job_dispatch_processing_task_fk_id_idx ON hrwsi.nomad_job_dispatch (processing_task_fk_id);
+CREATE INDEX IF NOT EXISTS processing_status_workflow_nomad_job_dispatch_fk_id_processing_status_id_idx ON hrwsi.processing_status_workflow (nomad_job_dispatch_fk_id, processing_status_id);
+
+--- FUNCTIONS ---
+
+CREATE OR REPLACE FUNCTION hrwsi.get_ids_of_processing_tasks_ready_to_be_launched ()
+    RETURNS setof bigint AS $$
+-- To be used to get ids of processing tasks without Nomad job and with 
+-- preceding task processed or null
+-- The Launcher uses this function to know for which tasks he must create a nomad job
+-- A single set-based query: the tasks without Nomad job are found by an anti-join, then
+-- a lateral join looks for one processed preceding task of each of them (using the indexes above)
+    BEGIN RETURN query
+        WITH processing_tasks_without_nomad_job AS (
+            SELECT pt.id, pt.preceding_input_id
+            FROM hrwsi.processing_tasks pt
+            WHERE NOT EXISTS (
+                SELECT 1
+                FROM hrwsi.nomad_job_dispatch njd
+                WHERE njd.processing_task_fk_id = pt.id
+            )
+        )
+        SELECT ptwnj.id
+        FROM processing_tasks_without_nomad_job ptwnj
+        LEFT JOIN LATERAL (
+            SELECT true AS is_processed
+            FROM hrwsi.processing_tasks ppt
+            JOIN hrwsi.nomad_job_dispatch njd ON njd.processing_task_fk_id = ppt.id
+            JOIN hrwsi.processing_status_workflow psw ON psw.nomad_job_dispatch_fk_id = njd.id
+            WHERE ppt.input_fk_id = ptwnj.preceding_input_id
+            AND psw.processing_status_id = 2
+            LIMIT 1
+        ) AS preceding_processing_task ON true
+        WHERE ptwnj.preceding_input_id IS NULL
+        OR preceding_processing_task.is_processed;
+    END $$ LANGUAGE plpgsql stable;
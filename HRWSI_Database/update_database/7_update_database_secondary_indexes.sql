@@ -0,0 +1,134 @@
+----------------------------------
+----- SECONDARY INDEXES ----------
+----------------------------------
+
+--- INDEXES ---
+
+/*
+Indexes used by the Orchestrator to find the unprocessed inputs of the last days (UNPROCESSED_INPUT_REQUEST):
+the inputs are filtered on their date, and their products are found by their foreign key.
+*/
+CREATE INDEX IF NOT EXISTS input_date_idx ON hrwsi.input (date);
+CREATE INDEX IF NOT EXISTS products_input_fk_id_idx ON hrwsi.products (input_fk_id);
+
+/*
+An input is identified by its path, its processing condition and its tile: multiple inputs can refer
+to the same input_path only if their processing condition or tile are different.
+The inputs harvested twice before the unique index are merged in the one with the lowest id: the processing tasks
+and products of the duplicates, and the processing tasks preceded by them, are moved to it, then the duplicates are deleted.
+The inputs without input_path aren't merged, they aren't duplicates for the unique index.
+*/
+CREATE TEMPORARY TABLE duplicated_input AS
+SELECT id, kept_id FROM (
+  SELECT id, min(id) OVER (PARTITION BY input_path, processing_condition_name, tile) AS kept_id
+  FROM hrwsi.input WHERE input_path IS NOT NULL
+) AS i WHERE id <> kept_id;
+
+UPDATE hrwsi.processing_tasks pt SET input_fk_id = d.kept_id FROM duplicated_input d WHERE pt.input_fk_id = d.id;
+UPDATE hrwsi.processing_tasks pt SET preceding_input_id = d.kept_id FROM duplicated_input d WHERE pt.preceding_input_id = d.id;
+UPDATE hrwsi.products p SET input_fk_id = d.kept_id FROM duplicated_input d WHERE p.input_fk_id = d.id;
+DELETE FROM hrwsi.input i USING duplicated_input d WHERE i.id = d.id;
+DROP TABLE duplicated_input;
+
+CREATE UNIQUE INDEX IF NOT EXISTS input_input_path_processing_condition_name_tile_idx ON hrwsi.input (input_path, processing_condition_name, tile);
+
+/*
+Index used by the Harvester to collect the products created in the last days.
+*/
+CREATE INDEX IF NOT EXISTS products_creation_date_idx ON hrwsi.products (creation_date);
+
+/*
+Indexes on the processing tasks:
+- the processing tasks created in the last days (Harvester and Orchestrator),
+- the processing tasks not ended, counted by the Launcher at each poll and looked up by input
+  by the Orchestrator. The index is partial, the ended tasks being the large majority.
+The processing tasks of an input (PT_ALREADY_IN_DATABASE_REQUEST) use processing_tasks_input_fk_id_idx.
+*/
+CREATE INDEX IF NOT EXISTS processing_tasks_creation_date_idx ON hrwsi.processing_tasks (creation_date);
+CREATE INDEX IF NOT EXISTS processing_tasks_not_ended_input_fk_id_idx ON hrwsi.processing_tasks (input_fk_id) WHERE has_ended = false;
+
+/*
+Index giving the processing status workflow of a Nomad job dispatch by date, latest first.
+*/
+CREATE INDEX IF NOT EXISTS processing_status_workflow_nomad_job_dispatch_fk_id_date_idx ON hrwsi.processing_status_workflow (nomad_job_dispatch_fk_id, date DESC);
+
+--- TABLES ---
+
+/*
+Table for the latest processing status of the processing tasks.
+It is maintained by a trigger on the processing status workflow insertions, so that the current status of
+the processing tasks is read without sorting their whole processing status workflow history.
+The latest status is the one with the latest date (then the highest id) among the processing status workflow
+of all the Nomad job dispatches of the processing task.
+*/
+CREATE TABLE IF NOT EXISTS hrwsi.processing_task_latest_status (
+
+  processing_task_fk_id bigint PRIMARY KEY REFERENCES hrwsi.processing_tasks(id) ON DELETE CASCADE,
+  nomad_job_dispatch_fk_id bigint REFERENCES hrwsi.nomad_job_dispatch(id) ON DELETE CASCADE NOT null,
+  processing_status_workflow_fk_id bigint REFERENCES hrwsi.processing_status_workflow(id) ON DELETE CASCADE NOT null,
+  processing_status_id smallint REFERENCES hrwsi.processing_status(id) NOT null,
+  date timestamp NOT null
+);
+
+CREATE INDEX IF NOT EXISTS processing_task_latest_status_processing_status_id_idx ON hrwsi.processing_task_latest_status (processing_status_id);
+
+--- TRIGGERS ---
+
+/*
+Update the latest processing status of the processing tasks with the inserted processing status workflow.
+The trigger runs once per statement, the rows inserted by a batch are aggregated by processing task.
+*/
+CREATE OR REPLACE FUNCTION hrwsi.update_processing_task_latest_status_function()
+RETURNS trigger AS $$
+  BEGIN
+    INSERT INTO hrwsi.processing_task_latest_status AS ptls
+    (processing_task_fk_id, nomad_job_dispatch_fk_id, processing_status_workflow_fk_id, processing_status_id, date)
+    SELECT DISTINCT ON (njd.processing_task_fk_id)
+      njd.processing_task_fk_id, new_table.nomad_job_dispatch_fk_id, new_table.id, new_table.processing_status_id, new_table.date
+    FROM new_table
+    JOIN hrwsi.nomad_job_dispatch njd ON njd.id = new_table.nomad_job_dispatch_fk_id
+    ORDER BY njd.processing_task_fk_id, new_table.date DESC, new_table.id DESC
+    ON CONFLICT (processing_task_fk_id) DO UPDATE SET
+      nomad_job_dispatch_fk_id = EXCLUDED.nomad_job_dispatch_fk_id,
+      processing_status_workflow_fk_id = EXCLUDED.processing_status_workflow_fk_id,
+      processing_status_id = EXCLUDED.processing_status_id,
+      date = EXCLUDED.date
+    WHERE (ptls.date, ptls.processing_status_workflow_fk_id) <= (EXCLUDED.date, EXCLUDED.processing_status_workflow_fk_id);
+    RETURN NULL;
+  END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS update_processing_task_latest_status_trigger ON hrwsi.processing_status_workflow;
+CREATE TRIGGER update_processing_task_latest_status_trigger
+AFTER INSERT ON hrwsi.processing_status_workflow
+REFERENCING NEW TABLE AS new_table
+FOR EACH STATEMENT EXECUTE FUNCTION hrwsi.update_processing_task_latest_status_function();
+
+/*
+Fill the latest processing status with the existing processing status workflow
+*/
+INSERT INTO hrwsi.processing_task_latest_status AS ptls
+(processing_task_fk_id, nomad_job_dispatch_fk_id, processing_status_workflow_fk_id, processing_status_id, date)
+SELECT DISTINCT ON (njd.processing_task_fk_id)
+  njd.processing_task_fk_id, psw.nomad_job_dispatch_fk_id, psw.id, psw.processing_status_id, psw.date
+FROM hrwsi.processing_status_workflow psw
+JOIN hrwsi.nomad_job_dispatch njd ON njd.id = psw.nomad_job_dispatch_fk_id
+ORDER BY njd.processing_task_fk_id, psw.date DESC, psw.id DESC
+ON CONFLICT (processing_task_fk_id) DO NOTHING;
+
+--- FUNCTIONS ---
+
+CREATE OR REPLACE FUNCTION hrwsi.get_latest_status_by_processing_task_id (processing_task_id bigint)
+    RETURNS setof hrwsi.processing_status_history AS $$
+-- To be used to know the current status of a processing task thanks to it's id
+BEGIN RETURN query SELECT
+    psw.id,
+    psw.date,
+    ps.code,
+    ps.name,
+    psw.message
+FROM hrwsi.processing_task_latest_status ptls
+JOIN hrwsi.processing_status_workflow psw ON psw.id = ptls.processing_status_workflow_fk_id
+JOIN hrwsi.processing_status ps ON ps.id = ptls.processing_status_id
+WHERE ptls.processing_task_fk_id = processing_task_id;
+END $$ LANGUAGE plpgsql stable;
@@ -294,3 +294,16 @@ def get_vector_mask(feature,bbox, geomV,geoTrans):
 def get_percentage(int1,int2,round_factor):
     return round((float(int1)/float(int2))*100, round_factor)
 
+
+def count_classes_by_label(label, classes, nb_label, upsamp_rate=1, nb_class=256):
+    """
+    Counts in one pass the pixels of each class inside each label.
+    label is upsamp_rate times finer than classes: each classes pixel covers
+    upsamp_rate x upsamp_rate label pixels. Label 0 is outside of any polygon.
+    Returns an array of shape (nb_label + 1, nb_class), row 0 counting the pixels outside of the polygons.
+    """
+    rows, cols = classes.shape
+    label = label.reshape(rows, upsamp_rate, cols, upsamp_rate)
+    key = label.astype(np.int64) * nb_class + classes[:, None, :, None]
+    counts = np.bincount(key.ravel(), minlength=(nb_label + 1) * nb_class)
+    return counts.reshape(nb_label + 1, nb_class)
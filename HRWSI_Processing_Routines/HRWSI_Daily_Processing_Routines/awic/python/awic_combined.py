@@ -6,9 +6,8 @@ import numpy as np
 import sys
 import os
 from datetime import datetime
-from collections import Counter
 
-from array_operations import get_vector_mask,pixel2World,get_bbox_pixels,clip_with_mask_cond,get_percentage
+from zonal_statistics import compute_zonal_counts
 from shp_operations import source2memoryLayer,add_field,update_field,memoryLayer2shp,merge_memlyrs
 
 path_wic, path_shp, date_ ,out_path= sys.argv[1], sys.argv[2], sys.argv[3],sys.argv[4]
@@ -52,113 +51,39 @@ raster_bbox.ExportToWkt()
 
 
 
-raster_px_size=geoTrans[1]
-part_lyr.ResetReading()
-
-parts_stats=[]
+ti=datetime.now()
 """
-1) for each polygon in raster extent  rasterization is performed,
- and a  mask  based on the result is built
-2) from the whole raster subraster is clipped 
-3) mask and raster are upsampled to increase accuracy
-4) statistics for each polygon based on raster values are gathered
-
+1) all the polygons in raster extent are rasterized at once, by strips, in a label raster
+   upsampled to increase accuracy
+2) the pixels of each class of the raster and of the quality check are counted
+   for all the polygons in one pass
+3) percentages and quality check average of each polygon are computed from the counts
 """
-for e in range(0, part_lyr.GetFeatureCount()):
-    ti=datetime.now()
-    feat = part_lyr.GetFeature(e)
-    prop = feat.GetFID()
-    #geometry of feature
-    geomV = feat.GetGeometryRef()
-    geomV.FlattenTo2D()
-    bbox = geomV.GetEnvelope()
-    if geomV.Intersects(raster_bbox):
-        #  rastra subset with buffer
-        clip_val = clip_with_mask_cond(bbox, geoTrans, arr)
-        clip_qc = clip_with_mask_cond(bbox, geoTrans, arr_qc)
-        # upsampled mask
-        mask_dense = get_vector_mask(feat, bbox, geomV, geoTrans_upsamp)
-        # counting pixels of mask
-        mask_count_all=len(mask_dense[np.where(mask_dense<1)])
-        # upsampled raster
-        val_upsampl = clip_val.repeat(upsamp_rate, axis=0).repeat(upsamp_rate, axis=1)
-        qc_upsampl = clip_qc.repeat(upsamp_rate, axis=0).repeat(upsamp_rate, axis=1)
-        # getting  UL for cut, upsampled  rastra part
-        ulX, ulY, lrX, lrY = get_bbox_pixels(geoTrans, bbox)
-        ulx, uly = pixel2World(geoTrans, [ulX, ulY])
-        geoTrans_ = (ulx, geoTrans_upsamp[1], 0, uly, 0, geoTrans_upsamp[1])
-        mask_ulX, mask_ulY, mask_lrX, mask_lrY = get_bbox_pixels(geoTrans_, bbox)
-        subraster_size=[0,0,val_upsampl.shape[1], val_upsampl.shape[0]]
-        ## common area
-        common_area_ulx=max([subraster_size[0], mask_ulX])
-        common_area_uly=max([subraster_size[1], mask_ulY])
-        common_area_lrx = min([subraster_size[2], mask_lrX])
-        common_area_lry = min([subraster_size[3], mask_lrY])
-        common_area=[common_area_ulx,common_area_uly,common_area_lrx,common_area_lry]
-        submask=[common_area_ulx-mask_ulX,
-                 common_area_uly- mask_ulY,
-                 common_area_lrx-mask_ulX ,
-                 common_area_lry-mask_ulY]
-        mask_clipped= mask_dense[submask[1]:submask[3] ,submask[0]:submask[2]]
-        # clipping raster with mask bbox
-        clip_val_upsampl = val_upsampl[common_area[1]:common_area[3],common_area[0]:common_area[2]]
-        clip_qc_upsampl = qc_upsampl[common_area[1]:common_area[3],common_area[0]:common_area[2]]
-        # masking raster
-        val_upsampl_masked = np.ma.masked_array(clip_val_upsampl, mask=mask_clipped)
-        qc_upsampl_masked = np.ma.masked_array(clip_qc_upsampl, mask=mask_clipped)
-        # getting true values from masked array
-        val_data = val_upsampl_masked[val_upsampl_masked.mask == False]
-        qc_data = qc_upsampl_masked[qc_upsampl_masked.mask == False]
-        # counting unique values
-        cntr = Counter(val_data)
-        cntr_qc = Counter(qc_data)
-        parts_prop = [prop, cntr, cntr_qc,mask_count_all]
-        parts_stats.append(parts_prop)
-
-
-parts_ids = set([val[0] for val in parts_stats])
+fid_array, (val_counts, qc_counts), mask_count_all = compute_zonal_counts(part_lyr, [arr, arr_qc], geoTrans, raster_bbox, upsamp_rate)
+
+with np.errstate(divide='ignore', invalid='ignore'):
+    perc = np.round(val_counts / mask_count_all[:, None].astype(np.float64) * 100, 0)
+perc[mask_count_all == 0] = 0
+count_qc = {'high': qc_counts[:, 0] + qc_counts[:, 205], 'lower': qc_counts[:, 1],
+            'decreasing': qc_counts[:, 2], 'lowest': qc_counts[:, 3]}
+count_sum_qc = sum(count_qc.values())
 
 data = {}
 
-for part in list(parts_ids):
+for i, part in enumerate(fid_array.tolist()):
     data[part] = {
-        'percentage': {'water_perc': 0, 'ice_perc': 0, 'other_perc': 0, 'nd_perc':0, 'cloud_perc': 0},
-        'count_qc': {'high': 0, 'lower': 0, 'decreasing': 0, 'lowest': 0},
+        'percentage': {'water_perc': perc[i, 1], 'ice_perc': perc[i, 100], 'other_perc': perc[i, 254],
+                       'nd_perc': 0, 'cloud_perc': perc[i, 205]},
+        'count_qc': {key: int(count[i]) for key, count in count_qc.items()},
         'avg': None
     }
 
-for i in parts_stats:
-    for k,v in data.items():
-        if i[0] == k:
-            for j in i[1]:
-                if int(j)==1:
-                    data[k]['percentage']['water_perc'] = get_percentage(i[1][j],i[3],0)
-                elif int(j) == 100:
-                    data[k]['percentage']['ice_perc'] = get_percentage(i[1][j],i[3],0)
-                elif int(j) == 205:
-                    data[k]['percentage']['cloud_perc'] = get_percentage(i[1][j],i[3],0)
-                elif int(j) == 254:
-                    data[k]['percentage']['other_perc'] = get_percentage(i[1][j],i[3],0)
-            for qc in i[2]:
-                if int(qc) == 0 or int(qc) == 205:
-                    data[k]['count_qc']['high'] += i[2][qc]
-                elif int(qc) == 1:
-                    data[k]['count_qc']['lower'] = i[2][qc]
-                elif int(qc) == 2:
-                    data[k]['count_qc']['decreasing'] = i[2][qc]
-                elif int(qc) == 3:
-                    data[k]['count_qc']['lowest'] = i[2][qc]
-
-
-
-
-for part, v in data.items():
+for i, (part, v) in enumerate(data.items()):
     count_sum = sum(v['percentage'].values())
     v['percentage']['nd_perc'] = 100-count_sum
-    count_sum_qc = sum(v['count_qc'].values())
 
-    if count_sum_qc > 0:
-        qc_avg = ((0*v['count_qc']['high']) + (1*v['count_qc']['lower'])+ (2*v['count_qc']['decreasing'])+ (3*v['count_qc']['lowest']))/count_sum_qc
+    if count_sum_qc[i] > 0:
+        qc_avg = ((0*v['count_qc']['high']) + (1*v['count_qc']['lower'])+ (2*v['count_qc']['decreasing'])+ (3*v['count_qc']['lowest']))/count_sum_qc[i]
         v['avg'] =int(round(qc_avg))
 
     else:
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Zonal statistics of classified rasters over all the polygons of a layer in one pass.
+
+The polygons are burnt, by strips of rows, into a single integer label raster at the
+upsampled resolution with gdal.RasterizeLayer, and the pixels of each class are counted
+for every polygon at once with np.bincount over label * nb_class + class.
+Polygons are expected not to overlap (river parts, lakes): where they do, a pixel is
+counted for the last polygon only.
+"""
+
+from osgeo import gdal, ogr
+import numpy as np
+
+from array_operations import count_classes_by_label
+
+LABEL_FIELD = 'label'
+# Rows of the classified rasters rasterized and counted at once
+DEFAULT_STRIP_HEIGHT = 256
+
+
+def create_label_layer(part_lyr, raster_bbox):
+    """
+    Copies the polygons intersecting the raster in a memory layer, with their label (rank + 1).
+    Returns the memory datasource and layer, the FID of each label, the area of each polygon
+    and whether each polygon is within the raster.
+    """
+    driver_memory = ogr.GetDriverByName('Memory')
+    label_ds = driver_memory.CreateDataSource('zonal_labels_ds')
+    label_lyr = label_ds.CreateLayer('zonal_labels', part_lyr.GetSpatialRef(), geom_type=ogr.wkbMultiPolygon)
+    label_lyr.CreateField(ogr.FieldDefn(LABEL_FIELD, ogr.OFTInteger))
+    label_lyr_dfn = label_lyr.GetLayerDefn()
+
+    fid_list = []
+    area_list = []
+    within_list = []
+    part_lyr.ResetReading()
+    for feat in part_lyr:
+        geomV = feat.GetGeometryRef().Clone()
+        geomV.FlattenTo2D()
+        if not geomV.Intersects(raster_bbox):
+            continue
+        fid_list.append(feat.GetFID())
+        area_list.append(geomV.GetArea())
+        within_list.append(geomV.Within(raster_bbox))
+        label_feat = ogr.Feature(label_lyr_dfn)
+        label_feat.SetGeometry(geomV)
+        label_feat.SetField(LABEL_FIELD, len(fid_list))
+        label_lyr.CreateFeature(label_feat)
+        label_feat = None
+    part_lyr.ResetReading()
+    return label_ds, label_lyr, np.array(fid_list, dtype=np.int64), np.array(area_list), np.array(within_list, dtype=bool)
+
+
+def rasterize_labels(label_lyr, geoTrans, x_size, y_size):
+    """
+    Burns the label of every polygon into a raster of x_size * y_size pixels, 0 outside of the polygons.
+    """
+    label_raster = gdal.GetDriverByName('MEM').Create('', x_size, y_size, 1, gdal.GDT_UInt32)
+    label_raster.SetGeoTransform(geoTrans)
+    if label_lyr.GetSpatialRef() is not None:
+        label_raster.SetProjection(label_lyr.GetSpatialRef().ExportToWkt())
+    label_raster.GetRasterBand(1).Fill(0)
+    gdal.RasterizeLayer(label_raster, [1], label_lyr, options=['ATTRIBUTE=%s' % LABEL_FIELD])
+    label = label_raster.GetRasterBand(1).ReadAsArray()
+    label_raster = None
+    return label
+
+
+def compute_zonal_counts(part_lyr, arr_list, geoTrans, raster_bbox, upsamp_rate, strip_height=DEFAULT_STRIP_HEIGHT, nb_class=256):
+    """
+    Counts the pixels of each class of each raster of arr_list inside each polygon of part_lyr
+    intersecting the raster, the polygons being rasterized upsamp_rate times finer than the rasters.
+
+    Returns:
+    - the FID of the polygons intersecting the raster,
+    - for each raster of arr_list, the class counts of these polygons as an array (nb_polygon, nb_class),
+    - the number of upsampled pixels of each polygon, pixels outside of the raster included.
+    """
+    label_ds, label_lyr, fid_array, area_array, within_array = create_label_layer(part_lyr, raster_bbox)
+    nb_label = len(fid_array)
+    rows, cols = arr_list[0].shape
+    counts_list = [np.zeros((nb_label + 1, nb_class), dtype=np.int64) for _ in arr_list]
+
+    for row in range(0, rows, strip_height):
+        nb_row = min(strip_height, rows - row)
+        strip_geoTrans = (geoTrans[0], geoTrans[1] / upsamp_rate, geoTrans[2],
+                          geoTrans[3] + row * geoTrans[5], geoTrans[4], geoTrans[5] / upsamp_rate)
+        label = rasterize_labels(label_lyr, strip_geoTrans, cols * upsamp_rate, nb_row * upsamp_rate)
+        for arr, counts in zip(arr_list, counts_list):
+            counts += count_classes_by_label(label, arr[row:row + nb_row], nb_label, upsamp_rate, nb_class)
+
+    label_lyr = None
+    label_ds = None
+
+    # Pixels of the polygons outside of the raster aren't in the label raster, they are derived from the area
+    upsampled_pixel_area = abs(geoTrans[1] * geoTrans[5]) / upsamp_rate ** 2
+    nb_pixel = counts_list[0][1:].sum(axis=1)
+    nb_pixel = np.where(within_array, nb_pixel, np.maximum(nb_pixel, np.rint(area_array / upsampled_pixel_area).astype(np.int64)))
+    return fid_array, [counts[1:] for counts in counts_list], nb_pixel
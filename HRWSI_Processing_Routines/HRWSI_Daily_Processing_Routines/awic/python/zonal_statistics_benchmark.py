@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the AWIC zonal statistics on synthetic polygons: the former per polygon
+rasterization (get_vector_mask) against the one pass label raster of compute_zonal_counts.
+
+Usage (from the awic/python directory, in the AWIC docker image):
+    python3 zonal_statistics_benchmark.py --size 5490 --nb-polygons 5000
+"""
+
+import argparse
+import time
+from collections import Counter
+
+from osgeo import ogr
+import numpy as np
+
+from array_operations import get_vector_mask, pixel2World, get_bbox_pixels, clip_with_mask_cond
+from zonal_statistics import compute_zonal_counts
+
+UPSAMP_RATE = 2
+PIXEL_SIZE = 20
+CLASS_VALUES = np.array([1, 100, 205, 254, 255], dtype=np.uint8)
+
+
+def create_synthetic_layer(nb_polygons, size, rng):
+    """Creates a memory layer of non overlapping lake-like polygons (buffered points on a grid)"""
+    driver_memory = ogr.GetDriverByName('Memory')
+    part_ds = driver_memory.CreateDataSource('synthetic_parts_ds')
+    part_lyr = part_ds.CreateLayer('synthetic_parts', geom_type=ogr.wkbPolygon)
+    nb_cell = int(np.ceil(np.sqrt(nb_polygons)))
+    cell_size = size * PIXEL_SIZE / nb_cell
+    for i in range(nb_polygons):
+        center = ogr.Geometry(ogr.wkbPoint)
+        center.AddPoint((i % nb_cell + 0.5) * cell_size, -(i // nb_cell + 0.5) * cell_size)
+        feat = ogr.Feature(part_lyr.GetLayerDefn())
+        feat.SetGeometry(center.Buffer(rng.uniform(0.1, 0.45) * cell_size, 8))
+        part_lyr.CreateFeature(feat)
+    return part_ds, part_lyr
+
+
+def per_polygon_counts(part_lyr, arr, geoTrans, raster_bbox):
+    """Former per polygon rasterization and counting of awic_combined"""
+    geoTrans_upsamp = (geoTrans[0], geoTrans[1]/UPSAMP_RATE, geoTrans[2], geoTrans[3], geoTrans[4], geoTrans[5]/UPSAMP_RATE)
+    parts_stats = []
+    for e in range(0, part_lyr.GetFeatureCount()):
+        feat = part_lyr.GetFeature(e)
+        geomV = feat.GetGeometryRef()
+        geomV.FlattenTo2D()
+        bbox = geomV.GetEnvelope()
+        if geomV.Intersects(raster_bbox):
+            clip_val = clip_with_mask_cond(bbox, geoTrans, arr)
+            mask_dense = get_vector_mask(feat, bbox, geomV, geoTrans_upsamp)
+            mask_count_all = len(mask_dense[np.where(mask_dense < 1)])
+            val_upsampl = clip_val.repeat(UPSAMP_RATE, axis=0).repeat(UPSAMP_RATE, axis=1)
+            ulX, ulY, lrX, lrY = get_bbox_pixels(geoTrans, bbox)
+            ulx, uly = pixel2World(geoTrans, [ulX, ulY])
+            geoTrans_ = (ulx, geoTrans_upsamp[1], 0, uly, 0, geoTrans_upsamp[1])
+            mask_ulX, mask_ulY, mask_lrX, mask_lrY = get_bbox_pixels(geoTrans_, bbox)
+            common_area = [max(0, mask_ulX), max(0, mask_ulY),
+                           min(val_upsampl.shape[1], mask_lrX), min(val_upsampl.shape[0], mask_lrY)]
+            mask_clipped = mask_dense[common_area[1]-mask_ulY:common_area[3]-mask_ulY, common_area[0]-mask_ulX:common_area[2]-mask_ulX]
+            clip_val_upsampl = val_upsampl[common_area[1]:common_area[3], common_area[0]:common_area[2]]
+            val_upsampl_masked = np.ma.masked_array(clip_val_upsampl, mask=mask_clipped)
+            parts_stats.append([feat.GetFID(), Counter(val_upsampl_masked[val_upsampl_masked.mask == False]), mask_count_all])
+    return parts_stats
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Benchmark the AWIC zonal statistics")
+    parser.add_argument("--size", type=int, default=5490, help="Raster width and height in pixels")
+    parser.add_argument("--nb-polygons", type=int, default=5000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    arr = rng.choice(CLASS_VALUES, size=(args.size, args.size))
+    geoTrans = (0, PIXEL_SIZE, 0, 0, 0, -PIXEL_SIZE)
+    extent = args.size * PIXEL_SIZE
+    raster_bbox = ogr.CreateGeometryFromWkt(f"POLYGON((0 {-extent},0 0,{extent} 0,{extent} {-extent},0 {-extent}))")
+    part_ds, part_lyr = create_synthetic_layer(args.nb_polygons, args.size, rng)
+
+    start = time.perf_counter()
+    parts_stats = per_polygon_counts(part_lyr, arr, geoTrans, raster_bbox)
+    per_polygon_time = time.perf_counter() - start
+    print(f"per polygon : {len(parts_stats)} polygons in {per_polygon_time:.2f} s")
+
+    start = time.perf_counter()
+    fid_array, (counts,), nb_pixel = compute_zonal_counts(part_lyr, [arr], geoTrans, raster_bbox, UPSAMP_RATE)
+    one_pass_time = time.perf_counter() - start
+    print(f"one pass    : {len(fid_array)} polygons in {one_pass_time:.2f} s")
+
+    # Both rasterizations don't burn exactly the same border pixels
+    per_polygon_nb_pixel = np.array([stats[2] for stats in parts_stats])
+    print(f"mean relative difference of the polygon pixel counts : {np.mean(np.abs(nb_pixel - per_polygon_nb_pixel) / per_polygon_nb_pixel):.2%}")
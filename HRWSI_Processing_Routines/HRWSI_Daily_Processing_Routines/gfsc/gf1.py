@@ -1,4 +1,4 @@
-import os, uuid, datetime, shutil, argparse, gfio, xmltodict, json, traceback
+import os, uuid, datetime, shutil, argparse, functools, gfio, gffill, xmltodict, json, traceback
 import numpy as np
 import validate_cloud_optimized_geotiff
 
@@ -284,50 +284,44 @@ def main():
             gfio.log("Not the same product. Reprocessing.",level="INFO")
             shutil.rmtree(productDir)
 
-    gf = NODATA*np.ones(shape=gfShape,dtype=np.uint8)
-    qc_gf = NODATA*np.ones(shape=gfShape,dtype=np.uint8)
-    qf_gf = np.zeros(shape=gfShape,dtype=np.uint8)
-    ad_gf = np.zeros(shape=gfShape,dtype=np.uint32)
-    success_gf = False
-    wsc = NODATA*np.ones(shape=gfShape,dtype=np.uint8)
-    qc_wsc = NODATA*np.ones(shape=gfShape,dtype=np.uint8)
-    ad_wsc = np.zeros(shape=gfShape,dtype=np.uint32)
-    success_wsc = False
-    for p in productOrder:
+    fscOrder = [p for p in productOrder if productTypes[p] == 'FSC']
+    swsOrder = [p for p in productOrder if productTypes[p] == 'SWS']
+    datasets = {}
+    def openRasters(p):
+        """Open the rasters of product p at its first read"""
+        if p not in datasets:
+            fileIds = ['FSCOG.tif','QCOG.tif','QCFLAGS.tif'] if productTypes[p] == 'FSC' else ['WSM.tif','QCWSM.tif']
+            datasets[p] = [gfio.openRaster(gfio.getFilePath(productTitles[p],fileId)) for fileId in fileIds]
+        return datasets[p]
+    def readStrip(p, layer, rowStart, rowEnd):
+        """Read the rows of a layer of product p at its resolution, scale times the GF one for the FSC"""
         try:
-            if productTypes[p] == 'FSC':
-                gfSub, geoTransform, projectionRef = gfio.readRaster(gfio.getFilePath(productTitles[p],'FSCOG.tif'))
-                qcSub = gfio.readRaster(gfio.getFilePath(productTitles[p],'QCOG.tif'))[0]
-                qfSub = gfio.readRaster(gfio.getFilePath(productTitles[p],'QCFLAGS.tif'))[0]
-                gfSub = gfio.upscale(gfSub, scale, NODATA, fscMin, fscMax, fscClasses)
-                qcSub = gfio.upscale(qcSub, scale, NODATA, qcMin, qcMax, qcClasses)
-                qfSub = gfio.upscale(qfSub, scale, NODATA, qfMin, qfMax, qfClasses)
-                adSub = int(productStartDates[p].timestamp())*np.ones(shape=gfShape,dtype=np.uint32)
-                if success_gf:
-                    gap = detectGaps(gf,fscGapvalues)*~detectGaps(gfSub,fscGapvalues)
-                else:
-                    gap = np.ones(shape=gfShape,dtype=np.bool_)
-                np.copyto(gf,gfSub,where=gap)
-                np.copyto(qc_gf,qcSub,where=gap)
-                np.copyto(qf_gf,qfSub,where=gap)
-                np.copyto(ad_gf,adSub,where=gap)
-                success_gf = True
-            if productTypes[p] == 'SWS':
-                wscSub, geoTransform, projectionRef = gfio.readRaster(gfio.getFilePath(productTitles[p],'WSM.tif'))
-                qcSub = gfio.readRaster(gfio.getFilePath(productTitles[p],'QCWSM.tif'))[0]
-                adSub = int(productStartDates[p].timestamp())*np.ones(shape=gfShape,dtype=np.uint32)
-                if success_wsc:
-                    gap = detectGaps(wsc,wscGapvalues)*~detectGaps(wscSub,wscGapvalues)
-                else:
-                    gap = np.ones(shape=gfShape,dtype=np.bool_)
-                np.copyto(wsc,wscSub,where=gap)
-                np.copyto(qc_wsc,qcSub,where=gap)
-                np.copyto(ad_wsc,adSub,where=gap)
-                success_wsc = True
-        except Exception as e:
+            productScale = scale if productTypes[p] == 'FSC' else 1
+            return gfio.readRasterRows(openRasters(p)[layer],rowStart*productScale,(rowEnd-rowStart)*productScale)
+        except Exception:
             gfio.log("41: Problem in processing ", productTitles[p],level="ERROR")
-            gfio.log(traceback.format_exc(),level='ERROR')
-            return 41
+            raise
+
+    # Products are read by row strips, newest first, the FSC being upscaled on the gaps left by the newer products only
+    try:
+        fscBlockSize = None
+        if fscOrder != []:
+            fscDataset = openRasters(fscOrder[0])[0]
+            fscBlockSize = gffill.getBlockSize((fscDataset.RasterYSize,fscDataset.RasterXSize),scale)
+        gf, qc_gf, qf_gf, ad_gf = gffill.fillGapsByPriority(
+            [functools.partial(readStrip,p) for p in fscOrder], [int(productStartDates[p].timestamp()) for p in fscOrder], gfShape,
+            [(NODATA,NODATA,fscMin,fscMax,fscClasses),(NODATA,NODATA,qcMin,qcMax,qcClasses),(0,NODATA,qfMin,qfMax,qfClasses)],
+            fscGapvalues, scale, fscBlockSize)
+        wsc, qc_wsc, ad_wsc = gffill.fillGapsByPriority(
+            [functools.partial(readStrip,p) for p in swsOrder], [int(productStartDates[p].timestamp()) for p in swsOrder], gfShape,
+            [(NODATA,NODATA,None,None,[]),(NODATA,NODATA,None,None,[])], wscGapvalues)
+        geoTransform = datasets[productOrder[0]][0].GetGeoTransform()
+        projectionRef = datasets[productOrder[0]][0].GetProjectionRef()
+    except Exception:
+        gfio.log(traceback.format_exc(),level='ERROR')
+        return 41
+    finally:
+        datasets.clear()
 
     if np.sum(detectGaps(gf,fscGapvalues)) != 0 and np.sum(wsc==WETSNOW) != 0:
         # snow status derived
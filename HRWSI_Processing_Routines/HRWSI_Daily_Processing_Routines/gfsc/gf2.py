@@ -1,14 +1,7 @@
-import os, uuid, datetime, shutil, json, argparse, gfio, xmltodict, traceback
+import os, uuid, datetime, shutil, json, argparse, functools, gfio, gffill, xmltodict, traceback
 import numpy as np
 import validate_cloud_optimized_geotiff
 
-def detectGaps(data, gapvalues):
-    gfio.log("Detecting gaps")
-    gap = np.zeros(data.shape,dtype=np.bool_)
-    for value in gapvalues:
-        gap = gap + (data == value)
-    return gap
-
 def main():
     parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
     parser.add_argument('-f','--fsc',action='append',help='Fractional snow cover product(s)')
@@ -323,47 +316,41 @@ def main():
     os.makedirs(productTmpDir)
 
     if productUniqueInputTitles != []:
-        gf = NODATA*np.ones(shape=gfShape,dtype=np.uint8)
-        qc = NODATA*np.ones(shape=gfShape,dtype=np.uint8)
-        qf = np.zeros(shape=gfShape,dtype=np.uint8)
-        ad = np.zeros(shape=gfShape,dtype=np.uint32)
-        success = False
-        for p in productOrder:
+        minTimeStamp = (productTimeStamp-datetime.timedelta(days=int(sysargv['day_delta']))).timestamp()
+        datasets = {}
+        def readStrip(p, rowStart, rowEnd):
+            """Read the rows of product p at the GF resolution, its rasters are opened at the first read"""
             try:
-                productStartDate = productStartDates[p]
-                productEndDate = productEndDates[p]
                 if productTypes[p] == 'FSC':
-                    gfSub, geoTransform, projectionRef = gfio.readRaster(gfio.getFilePath(productTitles[p],'FSCOG.tif'))
-                    qcSub = gfio.readRaster(gfio.getFilePath(productTitles[p],'QCOG.tif'))[0]
-                    qfSub = gfio.readRaster(gfio.getFilePath(productTitles[p],'QCFLAGS.tif'))[0]
+                    if p not in datasets:
+                        datasets[p] = [gfio.openRaster(gfio.getFilePath(productTitles[p],fileId)) for fileId in ['FSCOG.tif','QCOG.tif','QCFLAGS.tif']]
+                    gfSub, qcSub, qfSub = [gfio.readRasterRows(dataset,rowStart*scale,(rowEnd-rowStart)*scale) for dataset in datasets[p]]
                     gfSub = gfio.upscale(gfSub, scale, NODATA, fscMin, fscMax, fscClasses)
                     qcSub = gfio.upscale(qcSub, scale, NODATA, qcMin, qcMax, qcClasses)
                     qfSub = gfio.upscale(qfSub, scale, NODATA, qfMin, qfMax, qfClasses)
-                    adSub = int(productStartDate.timestamp())*np.ones(shape=gfShape,dtype=np.uint32)
-                if productTypes[p] == 'GFSC':
-                    gfSub, geoTransform, projectionRef = gfio.readRaster(gfio.getFilePath(productTitles[p],'GF.tif'))
-                    qcSub = gfio.readRaster(gfio.getFilePath(productTitles[p],'QC.tif'))[0]
-                    qfSub = gfio.readRaster(gfio.getFilePath(productTitles[p],'QCFLAGS.tif'))[0]
-                    adSub = gfio.readRaster(gfio.getFilePath(productTitles[p],'AT.tif'))[0]
-                if productTypes[p] == 'GFSC1':
-                    gfSub, geoTransform, projectionRef = gfio.readRaster(gfio.getFilePath(productTitles[p],'GF.tif'))
-                    qcSub = gfio.readRaster(gfio.getFilePath(productTitles[p],'QC.tif'))[0]
-                    qfSub = gfio.readRaster(gfio.getFilePath(productTitles[p],'QCFLAGS.tif'))[0]
-                    adSub = gfio.readRaster(gfio.getFilePath(productTitles[p],'AT.tif'))[0]
-                if success:
-                    gap = detectGaps(gf,fscGapvalues)*~detectGaps(gfSub,[NODATA])*(adSub>(productTimeStamp-datetime.timedelta(days=int(sysargv['day_delta']))).timestamp())
+                    adSub = int(productStartDates[p].timestamp())*np.ones(shape=(rowEnd-rowStart,gfShape[1]),dtype=np.uint32)
                 else:
-                    gap = adSub>=(productTimeStamp-datetime.timedelta(days=int(sysargv['day_delta']))).timestamp()
-                np.copyto(gf,gfSub,where=gap)
-                np.copyto(qc,qcSub,where=gap)
-                np.copyto(qf,qfSub,where=gap)
-                np.copyto(ad,adSub,where=gap)
-                success = True
-            except Exception as e:
+                    if p not in datasets:
+                        datasets[p] = [gfio.openRaster(gfio.getFilePath(productTitles[p],fileId)) for fileId in ['GF.tif','QC.tif','QCFLAGS.tif','AT.tif']]
+                    gfSub, qcSub, qfSub, adSub = [gfio.readRasterRows(dataset,rowStart,rowEnd-rowStart) for dataset in datasets[p]]
+                return gfSub, qcSub, qfSub, adSub
+            except Exception:
                 gfio.log("41: Problem in processing ", productTitles[p],level="ERROR")
-                gfio.log(traceback.format_exc(),level='ERROR')
-                return 41
-            
+                raise
+
+        # Products are read by row strips, newest first, until the gaps of the strip are filled
+        try:
+            gf, qc, qf, ad, readStripCounts = gffill.fillTemporalGaps(
+                [functools.partial(readStrip,p) for p in productOrder], gfShape, minTimeStamp, NODATA, fscGapvalues)
+            geoTransform = datasets[productOrder[0]][0].GetGeoTransform()
+            projectionRef = datasets[productOrder[0]][0].GetProjectionRef()
+        except Exception:
+            gfio.log(traceback.format_exc(),level='ERROR')
+            return 41
+        finally:
+            datasets.clear()
+        gfio.log("Temporal gap filling read %s strips out of %s" % (sum(readStripCounts),len(readStripCounts)*-(-gfShape[0]//gffill.STRIP_HEIGHT)),level="INFO")
+
         # Fill water pixels in GF and QC
         gfio.log('Filling water pixels from the water layer.',level="INFO")
         wlFile = gfio.getFilePath('WL___'+gfio.getTile(productTitles[0]))
@@ -0,0 +1,250 @@
+"""
+Gap filling of the GFSC, streamed by row strips.
+
+The products are read strip by strip, newest first, and the older products are only read
+for the strips which still have gaps: the memory is bounded by the strip height and the
+reading stops as soon as every pixel of a strip is filled.
+- fillTemporalGaps fills the GFSC with the GFSC, GFSC1 and FSC of the previous days (gf2),
+- fillGapsByPriority fills the GFSC1 with the FSC or SWS of the day (gf1), the 20 m FSC being
+  upscaled on the pixels to fill only.
+The block reductions of gfio.upscale are done here, with numpy, or pixel by pixel with numba when it is installed.
+"""
+import numpy as np
+try:
+    import numba
+except ImportError:
+    numba = None
+
+STRIP_HEIGHT = 256
+
+def getBlockSamples(data,scale):
+    """
+    Return a (rows,cols,scale) view of the pixels sampled in each block of scale x scale pixels.
+    The samples are the block diagonal, (i,i) for i in range(scale): it is the sampling of the
+    index arrays formerly built by upscale, kept to leave the products unchanged.
+    Trailing rows/columns not filling a block are ignored.
+    """
+    newShape = tuple(map(int,(data.shape[0]/scale,data.shape[1]/scale)))
+    blocks = data[:newShape[0]*scale,:newShape[1]*scale].reshape(newShape[0],scale,newShape[1],scale)
+    return blocks.diagonal(axis1=1,axis2=3)
+
+def getBlockSize(shape,scale):
+    """Number of pixels of the raster by upscaled pixel, trailing rows/columns included"""
+    return float(np.prod(shape))/np.prod((int(shape[0]/scale),int(shape[1]/scale)))
+
+def upscaleSamples(samples,scale,blockSize,noData=None,valueMin=None,valueMax=None,classes=[]):
+    """
+    Reduce the samples of the blocks (last axis, see getBlockSamples) as gfio.upscale,
+    blockSize being the number of raster pixels by block (see getBlockSize).
+    """
+    newShape = samples.shape[:-1]
+    if noData is None and valueMin is None and valueMax is None and classes == []:
+        newData = samples.sum(axis=-1,dtype=np.float64)/scale
+        newData = newData.astype(samples.dtype)
+        return newData
+    else:
+        if valueMax is not None:
+            valueMask = (samples >= valueMin)*(samples <= valueMax)
+            validCount = np.count_nonzero(valueMask,axis=-1)
+            validSum = np.where(valueMask,samples,0).sum(axis=-1,dtype=np.float64)
+            with np.errstate(invalid='ignore',divide='ignore'):
+                newDataValue = validSum/validCount
+            np.place(newDataValue,validCount == 0,noData)
+            newDataValue = np.rint(newDataValue).astype(samples.dtype)
+
+        if classes != []:
+            newDataClass = noData*np.ones(shape=newShape,dtype=samples.dtype)
+            classCount = np.zeros(shape=newShape,dtype=np.int32)
+            if valueMax is not None:
+                # Values in range are counted as valueMax
+                count = validCount*scale >= scale*scale*0.5
+                np.place(newDataClass,count,valueMax)
+                np.place(classCount,count,scale*scale)
+            for classValue in classes:
+                if valueMax is not None and valueMin <= classValue <= valueMax:
+                    # Class values in range are counted as valueMax
+                    if classValue != valueMax:
+                        continue
+                    count = validCount*scale
+                else:
+                    count = np.count_nonzero(samples == classValue,axis=-1)*scale
+                np.place(newDataClass,count > classCount,classValue)
+                np.copyto(classCount, count, where= count > classCount)
+
+        if valueMax is not None and classes != []:
+            newValueMask = (newDataValue >= valueMin)*(newDataValue <= valueMax)
+            np.copyto(newDataValue,newDataClass,where=~newValueMask)
+            newData = newDataValue
+
+        if valueMax is not None and classes == []:
+            newData = newDataValue
+
+        if valueMax is None and classes != []:
+            newData = newDataClass
+
+        if valueMax is None and classes == []:  #bitwise
+            newData = np.zeros(shape=newShape,dtype=samples.dtype)
+            threshold = blockSize/2.
+            for b in range(samples.dtype.itemsize*8):
+                count = np.count_nonzero(np.bitwise_and(np.right_shift(samples,b),1),axis=-1)*scale
+                mask = count >= threshold
+                newData = np.bitwise_or(newData,np.left_shift(mask.astype(samples.dtype),b))
+    return newData
+
+def _upscaleBlock(data, r, c, scale, blockSize, noData, hasValueRange, valueMin, valueMax, classes, nbBits):
+    """Reduce the samples of block (r, c) of data as upscaleSamples, noData being set, compiled by numba"""
+    if not hasValueRange and len(classes) == 0:
+        # Bit flags
+        value = 0
+        for b in range(nbBits):
+            count = 0
+            for i in range(scale):
+                count += (data[r*scale+i,c*scale+i] >> b) & 1
+            if count*scale >= blockSize/2.:
+                value |= 1 << b
+        return value
+
+    validCount = 0
+    validSum = 0.
+    if hasValueRange:
+        for i in range(scale):
+            sample = data[r*scale+i,c*scale+i]
+            if valueMin <= sample <= valueMax:
+                validCount += 1
+                validSum += sample
+        # The mean of the values in range always wins over the classes
+        if validCount > 0:
+            return int(np.rint(validSum/validCount))
+        if len(classes) == 0:
+            return noData
+
+    classValue = noData
+    classCount = 0
+    for k in range(len(classes)):
+        if hasValueRange and valueMin <= classes[k] <= valueMax:
+            # Class values in range are counted as valueMax, and there is no value in range
+            continue
+        count = 0
+        for i in range(scale):
+            if data[r*scale+i,c*scale+i] == classes[k]:
+                count += 1
+        if count*scale > classCount:
+            classValue = classes[k]
+            classCount = count*scale
+    return classValue
+
+def _upscaleBlocks(values, data, rows, cols, scale, blockSize, noData, hasValueRange, valueMin, valueMax, classes, nbBits):
+    """Reduce the blocks (rows, cols) of data into values, compiled by numba"""
+    for k in range(len(rows)):
+        values[k] = _upscaleBlock(data, rows[k], cols[k], scale, blockSize, noData, hasValueRange, valueMin, valueMax, classes, nbBits)
+
+if numba is not None:
+    _upscaleBlock = numba.njit(cache=True)(_upscaleBlock)
+    _upscaleBlocksKernel = numba.njit(cache=True)(_upscaleBlocks)
+else:
+    _upscaleBlocksKernel = None
+
+def upscaleAt(data,rows,cols,scale,blockSize,noData=None,valueMin=None,valueMax=None,classes=[],kernel=None):
+    """
+    Return the upscaled values of the blocks (rows, cols) of data, as gfio.upscale on the whole data,
+    or all the upscaled blocks if rows and cols are None.
+    The blocks are reduced by kernel (_upscaleBlocksKernel by default) if there is one, with numpy otherwise.
+    """
+    if rows is None:
+        if scale == 1:
+            return data
+        return upscaleSamples(getBlockSamples(data,scale),scale,blockSize,noData,valueMin,valueMax,classes)
+    if scale == 1:
+        return data[rows,cols]
+    kernel = kernel if kernel is not None else _upscaleBlocksKernel
+    if kernel is not None and noData is not None:
+        values = np.empty(len(rows),dtype=data.dtype)
+        kernel(values, data, rows, cols, scale, float(blockSize), int(noData), valueMax is not None,
+               0 if valueMin is None else int(valueMin), 0 if valueMax is None else int(valueMax),
+               np.array(classes,dtype=np.int64), data.dtype.itemsize*8)
+        return values
+    return upscaleSamples(getBlockSamples(data,scale)[rows,cols],scale,blockSize,noData,valueMin,valueMax,classes)
+
+def fillGapsByPriority(readStripFunctions, timeStamps, shape, layerParameters, gapValues, scale=1, blockSize=None,
+                       stripHeight=STRIP_HEIGHT, kernel=None):
+    """
+    Fill layers with the products in priority order (newest first), by row strips.
+    readStripFunctions are the readers of the products: readStrip(layer,rowStart,rowEnd) returns the rows
+    of a layer at the input resolution, scale times the output one.
+    layerParameters are the (initial value, noData, valueMin, valueMax, classes) of each layer, the last four
+    being the gfio.upscale parameters; the gaps (gapValues) are detected on the first layer.
+    The first product fills every pixel, the next ones fill the gaps where they have no gap themselves.
+    In a single pass by product and strip, the layers are read, upscaled and compared on the pixels still to fill only.
+    Return the filled layers and the AT layer (timestamp of the product filling each pixel).
+    """
+    layers = [initialValue*np.ones(shape=shape,dtype=np.uint8) for initialValue, *_ in layerParameters]
+    ad = np.zeros(shape=shape,dtype=np.uint32)
+    blockSize = blockSize if blockSize is not None else scale*scale
+
+    for rowStart in range(0,shape[0],stripHeight):
+        rowEnd = min(rowStart+stripHeight,shape[0])
+        strips = [layer[rowStart:rowEnd] for layer in layers]
+        adStrip = ad[rowStart:rowEnd]
+        for p, readStrip in enumerate(readStripFunctions):
+            if p > 0:
+                rows, cols = np.nonzero(np.isin(strips[0],gapValues))
+                if len(rows) == 0:
+                    # The older products can't change a filled strip
+                    break
+            else:
+                # The first product fills the whole strip
+                rows, cols = None, None
+            for l, (_, *upscaleParameters) in enumerate(layerParameters):
+                values = upscaleAt(readStrip(l,rowStart,rowEnd),rows,cols,scale,blockSize,*upscaleParameters,kernel=kernel)
+                if rows is None:
+                    strips[l][:] = values
+                    continue
+                if l == 0:
+                    fill = ~np.isin(values,gapValues)
+                    rows, cols, values = rows[fill], cols[fill], values[fill]
+                    if len(rows) == 0:
+                        break
+                strips[l][rows,cols] = values
+            if rows is None:
+                adStrip[:] = timeStamps[p]
+            else:
+                adStrip[rows,cols] = timeStamps[p]
+
+    return tuple(layers) + (ad,)
+
+def fillTemporalGaps(readStripFunctions, shape, minTimeStamp, noData, gapValues, stripHeight=STRIP_HEIGHT):
+    """
+    Fill the GF, QC, QF and AT layers from the products, newest first.
+    readStripFunctions are the readers of the products: readStrip(rowStart,rowEnd) returns their
+    GF, QC, QF and AT rows at the output resolution.
+    The pixels of the newest product acquired from minTimeStamp are taken, then the gaps (gapValues)
+    are filled with the data of the older products acquired after minTimeStamp.
+    Return the 4 layers and the number of strips read from each product.
+    """
+    gf = noData*np.ones(shape=shape,dtype=np.uint8)
+    qc = noData*np.ones(shape=shape,dtype=np.uint8)
+    qf = np.zeros(shape=shape,dtype=np.uint8)
+    ad = np.zeros(shape=shape,dtype=np.uint32)
+    readStripCounts = [0]*len(readStripFunctions)
+
+    for rowStart in range(0,shape[0],stripHeight):
+        rowEnd = min(rowStart+stripHeight,shape[0])
+        gfStrip, qcStrip, qfStrip, adStrip = gf[rowStart:rowEnd], qc[rowStart:rowEnd], qf[rowStart:rowEnd], ad[rowStart:rowEnd]
+        for p, readStrip in enumerate(readStripFunctions):
+            if p > 0:
+                gapStrip = np.isin(gfStrip,gapValues)
+                if not gapStrip.any():
+                    # The older products can't change a filled strip
+                    break
+            gfSub, qcSub, qfSub, adSub = readStrip(rowStart,rowEnd)
+            readStripCounts[p] += 1
+            if p > 0:
+                gap = gapStrip*(gfSub != noData)*(adSub > minTimeStamp)
+            else:
+                gap = adSub >= minTimeStamp
+            np.copyto(gfStrip,gfSub,where=gap)
+            np.copyto(qcStrip,qcSub,where=gap)
+            np.copyto(qfStrip,qfSub,where=gap)
+            np.copyto(adStrip,adSub,where=gap)
+
+    return gf, qc, qf, ad, readStripCounts
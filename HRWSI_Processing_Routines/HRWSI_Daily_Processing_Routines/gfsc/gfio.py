@@ -3,6 +3,7 @@ from shapely.geometry import Polygon, LineString, Point
 import numpy as np
 import mahotas as mh
 from osgeo import gdal, osr
+import gffill
 gdal.UseExceptions()
 
 def log(*message,level="INFO"):
@@ -85,6 +86,15 @@ def readRaster(fname):
         log(traceback.format_exc(),level='ERROR')
         return None
 
+def openRaster(fname):
+    log("Opening ",fname,level="DEBUG")
+    return gdal.Open(fname)
+
+def readRasterRows(gtif,rowStart,rowCount):
+    """Read rowCount rows from rowStart of the first band of a raster opened by openRaster"""
+    band = gtif.GetRasterBand(1)
+    return np.array(band.ReadAsArray(0,rowStart,band.XSize,rowCount))
+
 def writeRaster(fname,rasterData, geoTransform, projectionRef, colorMap = None, noData=None):
     log("Writing into file",fname,level="DEBUG")
     rasterDataDtypes = [np.uint8, np.uint16, np.int16, np.uint32, np.int32]
@@ -135,83 +145,26 @@ def writeThumbnail(fname,rasterData,colorMap=None):
     mh.imsave(fname,imageData)
     return True
 
+def getBlockSamples(data,scale):
+    """Return a (rows,cols,scale) view of the pixels sampled in each block, see gffill.getBlockSamples"""
+    return gffill.getBlockSamples(data,scale)
+
 def upscale(data,scale,noData=None,valueMin=None,valueMax=None, classes = []):
+    """
+    Aggregate blocks of scale x scale pixels into one pixel.
+    - without noData, valueMin, valueMax and classes: block mean;
+    - with valueMin/valueMax: mean of the values in [valueMin, valueMax] (noData if there is none);
+    - with classes: most frequent class of the block, values in range count as valueMax and
+      win if they cover at least half of the block (noData if no class is found);
+    - with noData only (bit flags): each bit is set if it is set on at least half of the block.
+    Each statistic is a reduction of a reshaped view (see getBlockSamples), each sample
+    weighting scale pixels in the counts.
+    """
     if scale == 1:
         return data
-    if valueMin is None:
-        valueMax is None
     log("Upscaling raster",level="DEBUG")
-    newShape = tuple(map(int,(data.shape[0]/scale,data.shape[1]/scale)))
-    rind = np.indices(newShape)[0]*scale
-    cind = np.indices(newShape)[1]*scale
-
-    rowi = rind
-    coli = cind
-    for j in range(1,scale):
-        rowi = np.dstack((rowi,rind))
-        coli = np.dstack((coli,cind))
-    row = rowi
-    col = coli
-
-    for i in range(1,scale):
-        rowi = rind+i
-        coli = cind+i
-        for j in range(1,scale):
-            rowi = np.dstack((rowi,rind+i))
-            coli = np.dstack((coli,cind+i))
-        row = np.dstack((row,rowi))
-        col = np.dstack((col,coli))
-    if noData is None and valueMin is None and valueMax is None and classes == []:
-        dataValue = np.copy(data).astype(np.float64)
-        newData = np.mean(dataValue[row,col],axis=2)
-        newData = newData.astype(data.dtype)
-        return newData
-    else:
-        dataClass = np.copy(data)
-        if valueMax is not None:
-            dataValue = np.copy(data).astype(np.float64)
-            valueMask = (dataValue >= valueMin)*(dataValue <= valueMax)
-            np.place(dataValue,~valueMask,np.nan)
-            newDataValue = np.nanmean(dataValue[row,col],axis=2)
-            np.place(newDataValue,np.isnan(newDataValue),noData)
-            newDataValue = np.rint(newDataValue).astype(data.dtype)
-            np.place(dataClass,valueMask,valueMax)
-
-        if classes != []:
-            newDataClass = noData*np.ones(shape=newShape,dtype=data.dtype)
-            classCount = np.zeros(shape=newShape,dtype=np.int32)
-            classValues = classes
-            if valueMax is not None:
-                count = np.sum(dataClass[row,col]==valueMax,axis=2)
-                count = count >= scale*scale*0.5
-                np.place(newDataClass,count,valueMax)
-                np.place(classCount,count,scale*scale)
-            for classValue in classValues:
-                if np.sum(dataClass==classValue) == 0:
-                    continue
-                count = np.sum(dataClass[row,col]==classValue,axis=2)
-                np.place(newDataClass,count > classCount,classValue)
-                np.copyto(classCount, count, where= count > classCount)
-
-        if valueMax is not None and classes != []:
-            newValueMask = (newDataValue >= valueMin)*(newDataValue <= valueMax)
-            np.copyto(newDataValue,newDataClass,where=~newValueMask)
-            newData = newDataValue
-
-        if valueMax is not None and classes == []:
-            newData = newDataValue
-
-        if valueMax is None and classes != []:
-            newData = newDataClass
-
-        if valueMax is None and classes == []:  #bitwise
-            newData = np.zeros(shape=newShape,dtype=data.dtype)
-            for b in range(int(str(data.dtype).replace('uint','').replace('int',''))):
-                mask = np.bitwise_and(np.right_shift(data,b),1)
-                count = np.sum(mask[row,col],axis=2)
-                mask = count >= (float(np.prod(data.shape))/np.prod(newShape))/2.
-                newData = np.bitwise_or(newData,np.left_shift(mask.astype(data.dtype),b))
-    return newData
+    samples = getBlockSamples(data,scale)
+    return gffill.upscaleSamples(samples,scale,gffill.getBlockSize(data.shape,scale),noData,valueMin,valueMax,classes)
 
 def setBit(data,bit,value,where=None):
     if where is None:
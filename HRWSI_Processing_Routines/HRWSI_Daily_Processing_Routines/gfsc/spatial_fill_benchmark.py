@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Spatial_fill_benchmark module measures the time and the peak memory of the spatial gap filling of gf1
+on synthetic FSC products at 20 m (FSCOG, QCOG and QCFLAGS layers) upscaled to the 60 m GFSC1, with clouds on a fraction of each product:
+- the former fill, reading and upscaling every product in full before filling,
+- gffill.fillGapsByPriority with numpy, reading the products by row strips and upscaling the pixels to fill only,
+- gffill.fillGapsByPriority with the numba kernel, when numba is installed.
+The layers are stored as .npy files read through memory maps, so that the benchmark doesn't need GDAL.
+
+Usage (from the gfsc directory):
+    python3 spatial_fill_benchmark.py [--size 5490] [--nb-product 4] [--cloud-fraction 0.5] [--strip-height 256]
+"""
+import os
+import time
+import argparse
+import tempfile
+import tracemalloc
+import numpy as np
+
+import gffill
+
+NODATA, CLOUD, WATER = 255, 205, 210
+GAP_VALUES = [CLOUD, NODATA]
+SCALE = 3
+LAYERS = ["FSCOG", "QCOG", "QCFLAGS"]
+LAYER_PARAMETERS = [(NODATA, NODATA, 0, 100, [CLOUD, NODATA, WATER]),
+                    (NODATA, NODATA, 0, 3, [CLOUD, NODATA, WATER]),
+                    (0, NODATA, None, None, [])]
+
+def write_products(product_dir: str, size: int, nb_product: int, cloud_fraction: float) -> list[int]:
+    """
+    Write the layers of nb_product FSC products, the newest first, clouds being drawn on a grid of 183 pixels cells.
+    Return the timestamps of the products.
+    """
+    rng = np.random.default_rng(0)
+    cell_size = 183
+    nb_cell = -(-size // cell_size)
+    for p in range(nb_product):
+        cloud = np.kron(rng.random((nb_cell, nb_cell)) < cloud_fraction, np.ones((cell_size, cell_size), dtype=bool))[:size, :size]
+        fsc = rng.integers(0, 101, size=(size, size), dtype=np.uint8)
+        fsc[cloud] = CLOUD
+        layers = {
+            "FSCOG": fsc,
+            "QCOG": np.where(cloud, CLOUD, rng.integers(0, 4, size=(size, size), dtype=np.uint8)).astype(np.uint8),
+            "QCFLAGS": rng.integers(0, 256, size=(size, size), dtype=np.uint8),
+        }
+        for layer in LAYERS:
+            np.save(os.path.join(product_dir, f"{p}_{layer}.npy"), layers[layer])
+    return [1_700_000_000 - p * 86400 for p in range(nb_product)]
+
+def open_products(product_dir: str, nb_product: int) -> list[list[np.memmap]]:
+    """Return the memory maps of the layers of each product, the newest first"""
+
+    return [[np.load(os.path.join(product_dir, f"{p}_{layer}.npy"), mmap_mode="r") for layer in LAYERS] for p in range(nb_product)]
+
+def former_fill(products: list[list[np.memmap]], time_stamps: list[int], shape: tuple) -> tuple:
+    """Read and upscale every product in full, then fill the gaps with the older products, as previously done in gf1.main"""
+
+    block_size = gffill.getBlockSize(products[0][0].shape, SCALE)
+    layers = [initial_value*np.ones(shape=shape, dtype=np.uint8) for initial_value, *_ in LAYER_PARAMETERS]
+    ad = np.zeros(shape=shape, dtype=np.uint32)
+    for p, product in enumerate(products):
+        product_layers = [gffill.upscaleSamples(gffill.getBlockSamples(np.array(layer), SCALE), SCALE, block_size, *parameters[1:])
+                          for layer, parameters in zip(product, LAYER_PARAMETERS)]
+        if p > 0:
+            gap = np.isin(layers[0], GAP_VALUES)*~np.isin(product_layers[0], GAP_VALUES)
+        else:
+            gap = np.ones(shape=shape, dtype=np.bool_)
+        for layer, product_layer in zip(layers, product_layers):
+            np.copyto(layer, product_layer, where=gap)
+        np.copyto(ad, time_stamps[p]*np.ones(shape=shape, dtype=np.uint32), where=gap)
+    return tuple(layers) + (ad,)
+
+def strip_fill(products: list[list[np.memmap]], time_stamps: list[int], shape: tuple, strip_height: int, kernel) -> tuple:
+    """Fill the gaps by row strips with gffill.fillGapsByPriority, the blocks being reduced by kernel or with numpy"""
+
+    def create_read_strip(product):
+        return lambda layer, rowStart, rowEnd: np.array(product[layer][rowStart*SCALE:rowEnd*SCALE])
+
+    default_kernel = gffill._upscaleBlocksKernel
+    gffill._upscaleBlocksKernel = kernel
+    try:
+        return gffill.fillGapsByPriority([create_read_strip(product) for product in products], time_stamps, shape,
+                                         LAYER_PARAMETERS, GAP_VALUES, SCALE, gffill.getBlockSize(products[0][0].shape, SCALE),
+                                         strip_height)
+    finally:
+        gffill._upscaleBlocksKernel = default_kernel
+
+def measure(name: str, fill, *args) -> tuple:
+    """Run a fill, print its time and peak memory, return its layers"""
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fill(*args)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"{name:18}: {len(args[0])} products of {args[0][0][0].shape[0]}x{args[0][0][0].shape[1]} in {elapsed:.2f} s, "
+          f"peak memory {peak / 2**20:.0f} MiB")
+    return result
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Benchmark the spatial gap filling of gf1")
+    parser.add_argument("--size", type=int, default=5490)
+    parser.add_argument("--nb-product", type=int, default=4)
+    parser.add_argument("--cloud-fraction", type=float, default=0.5)
+    parser.add_argument("--strip-height", type=int, default=gffill.STRIP_HEIGHT)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as product_dir:
+        time_stamps = write_products(product_dir, args.size, args.nb_product, args.cloud_fraction)
+        products = open_products(product_dir, args.nb_product)
+        shape = (args.size // SCALE, args.size // SCALE)
+
+        former_result = measure("former fill", former_fill, products, time_stamps, shape)
+        numpy_result = measure("strip fill, numpy", strip_fill, products, time_stamps, shape, args.strip_height, None)
+        assert all(np.array_equal(layer, former_layer) for layer, former_layer in zip(numpy_result, former_result))
+
+        if gffill.numba is None:
+            print("strip fill, numba : numba isn't installed")
+        else:
+            # The first call compiles the kernel
+            strip_fill(products[:1], time_stamps[:1], (1, 1), 1, gffill._upscaleBlocksKernel)
+            numba_result = measure("strip fill, numba", strip_fill, products, time_stamps, shape, args.strip_height,
+                                   gffill._upscaleBlocksKernel)
+            assert all(np.array_equal(layer, former_layer) for layer, former_layer in zip(numba_result, former_result))
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Temporal_fill_benchmark module measures the time, the peak memory and the data read by the temporal gap filling of gf2
+on a synthetic stack of daily GFSC products at 60 m (GF, QC, QCFLAGS and AT layers), with clouds on a fraction of each day:
+- the former fill, reading every product in full before filling,
+- gffill.fillTemporalGaps, reading the products by row strips, newest first, until the strips are filled.
+The layers are stored as .npy files read through memory maps, so that the benchmark doesn't need GDAL.
+
+Usage (from the gfsc directory):
+    python3 temporal_fill_benchmark.py [--size 1830] [--nb-day 30] [--cloud-fraction 0.5] [--strip-height 256]
+"""
+import os
+import time
+import argparse
+import tempfile
+import tracemalloc
+import numpy as np
+
+import gffill
+
+NODATA, CLOUD = 255, 205
+GAP_VALUES = [CLOUD, NODATA]
+DAY = 86400
+LAYERS = ["GF", "QC", "QCFLAGS", "AT"]
+
+def write_stack(stack_dir: str, size: int, nb_day: int, cloud_fraction: float) -> float:
+    """
+    Write the layers of nb_day daily products, the newest first, clouds being drawn on a grid of 61 pixels cells.
+    Return the minimum timestamp of the temporal gap filling.
+    """
+    rng = np.random.default_rng(0)
+    min_time_stamp = 1_700_000_000
+    cell_size = 61
+    nb_cell = -(-size // cell_size)
+    for day in range(nb_day):
+        cloud = np.kron(rng.random((nb_cell, nb_cell)) < cloud_fraction, np.ones((cell_size, cell_size), dtype=bool))[:size, :size]
+        gf = rng.integers(0, 101, size=(size, size), dtype=np.uint8)
+        gf[cloud] = CLOUD
+        layers = {
+            "GF": gf,
+            "QC": rng.integers(0, 4, size=(size, size), dtype=np.uint8),
+            "QCFLAGS": rng.integers(0, 256, size=(size, size), dtype=np.uint8),
+            "AT": np.full((size, size), min_time_stamp + (nb_day - 1 - day) * DAY + 3600, dtype=np.uint32),
+        }
+        for layer in LAYERS:
+            np.save(os.path.join(stack_dir, f"{day}_{layer}.npy"), layers[layer])
+    return min_time_stamp
+
+def open_stack(stack_dir: str, nb_day: int) -> list[list[np.memmap]]:
+    """Return the memory maps of the layers of each product, the newest first"""
+
+    return [[np.load(os.path.join(stack_dir, f"{day}_{layer}.npy"), mmap_mode="r") for layer in LAYERS] for day in range(nb_day)]
+
+def former_fill(stack: list[list[np.memmap]], min_time_stamp: float) -> tuple:
+    """Read every product in full, then fill the gaps with the older products, as previously done in gf2.main"""
+
+    product_list = [[np.array(layer) for layer in product] for product in stack]
+    shape = product_list[0][0].shape
+    gf = NODATA*np.ones(shape=shape,dtype=np.uint8)
+    qc = NODATA*np.ones(shape=shape,dtype=np.uint8)
+    qf = np.zeros(shape=shape,dtype=np.uint8)
+    ad = np.zeros(shape=shape,dtype=np.uint32)
+    success = False
+    for gfSub, qcSub, qfSub, adSub in product_list:
+        if success:
+            gap = np.isin(gf,GAP_VALUES)*~(gfSub == NODATA)*(adSub>min_time_stamp)
+        else:
+            gap = adSub>=min_time_stamp
+        np.copyto(gf,gfSub,where=gap)
+        np.copyto(qc,qcSub,where=gap)
+        np.copyto(qf,qfSub,where=gap)
+        np.copyto(ad,adSub,where=gap)
+        success = True
+    return gf, qc, qf, ad
+
+def strip_fill(stack: list[list[np.memmap]], min_time_stamp: float, strip_height: int) -> tuple:
+    """Fill the gaps by row strips with gffill.fillTemporalGaps"""
+
+    def create_read_strip(product):
+        return lambda rowStart, rowEnd: [np.array(layer[rowStart:rowEnd]) for layer in product]
+
+    return gffill.fillTemporalGaps([create_read_strip(product) for product in stack], stack[0][0].shape,
+                                   min_time_stamp, NODATA, GAP_VALUES, strip_height)
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Benchmark the temporal gap filling of gf2")
+    parser.add_argument("--size", type=int, default=1830)
+    parser.add_argument("--nb-day", type=int, default=30)
+    parser.add_argument("--cloud-fraction", type=float, default=0.5)
+    parser.add_argument("--strip-height", type=int, default=gffill.STRIP_HEIGHT)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as stack_dir:
+        min_time_stamp = write_stack(stack_dir, args.size, args.nb_day, args.cloud_fraction)
+        stack = open_stack(stack_dir, args.nb_day)
+        product_bytes = sum(layer.nbytes for layer in stack[0])
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        former_result = former_fill(stack, min_time_stamp)
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"former fill : {args.nb_day} days of {args.size}x{args.size} in {elapsed:.2f} s, peak memory {peak / 2**20:.0f} MiB, "
+              f"{args.nb_day * product_bytes / 2**20:.0f} MiB read")
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        *strip_result, read_strip_counts = strip_fill(stack, min_time_stamp, args.strip_height)
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        nb_strip = -(-args.size // args.strip_height)
+        print(f"strip fill  : {args.nb_day} days of {args.size}x{args.size} in {elapsed:.2f} s, peak memory {peak / 2**20:.0f} MiB, "
+              f"{sum(read_strip_counts) * product_bytes / nb_strip / 2**20:.0f} MiB read, "
+              f"{sum(read_strip_counts)}/{args.nb_day * nb_strip} strips read, oldest day read {max(p for p, count in enumerate(read_strip_counts) if count)}")
+
+        assert all(np.array_equal(layer, former_layer) for layer, former_layer in zip(strip_result, former_result))
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Upscale_benchmark module measures the time and the peak memory of gfio.upscale
+on a tile at 20 m (5490x5490 pixels) reduced to 60 m (1830x1830 pixels),
+with the parameters used by gf1 and gf2 for the FSC, QC and QF layers.
+
+Usage (from the gfsc directory, in the GFSC docker image):
+    python3 upscale_benchmark.py [--size 5490] [--scale 3]
+"""
+import time
+import argparse
+import tracemalloc
+import numpy as np
+
+import gfio
+
+NODATA, CLOUD, WATER = 255, 205, 210
+
+LAYER_PARAMETERS = {
+    "FSC": (NODATA, 0, 100, [CLOUD, NODATA, WATER]),
+    "QC": (NODATA, 0, 3, [CLOUD, NODATA, WATER]),
+    "QF (bitwise)": (NODATA, None, None, []),
+}
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Benchmark gfio.upscale")
+    parser.add_argument("--size", type=int, default=5490)
+    parser.add_argument("--scale", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    data = rng.choice(np.array([0, 10, 50, 100, CLOUD, WATER, NODATA], dtype=np.uint8), size=(args.size, args.size))
+
+    for layer, parameters in LAYER_PARAMETERS.items():
+        tracemalloc.start()
+        start = time.perf_counter()
+        new_data = gfio.upscale(data, args.scale, *parameters)
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{layer:<13}: {data.shape} -> {new_data.shape} in {elapsed:.2f} s, peak memory {peak / 2**20:.0f} MiB")
@@ -4,7 +4,7 @@
 import os
 import numpy as np
 from common.basic_functions import logical_array_list_operation
-from common.exitcodes import RuntimeInputFileError
+from common.exitcodes import RuntimeInputFileError, InnerArgError
 from utils.compress_geotiff import compress_geotiff_file
 try:
     from osgeo import gdal
@@ -12,6 +12,9 @@ except:
     import gdal
 
 
+COG_CREATION_OPTIONS = ['COMPRESS=DEFLATE', 'PREDICTOR=1', 'ZLEVEL=4', 'TILED=YES', 'BLOCKXSIZE=1024', 'BLOCKYSIZE=1024', 'COPY_SRC_OVERVIEWS=YES']
+
+
 def unpackbits2d(ar):
     return np.unpackbits(np.expand_dims(ar, axis=2), axis=2, bitorder='little')
 
@@ -99,4 +102,172 @@ def bit_bandmath(
     del ds_out
     if compress or add_overviews:
         compress_geotiff_file(output_file, add_overviews=add_overviews, use_default_cosims_config=use_default_cosims_config)
-        
\ No newline at end of file
+
+def sort_layer_graph(layer_list):
+    """Sorts layers so that each layer comes after the layers it reads.
+
+    A layer depends on another one when one of its sources has the output_file of the other layer as filepath.
+
+    :param layer_list: list of layer dicts (see bit_bandmath_graph)
+    :return: the sorted list of layer dicts
+    :raises InnerArgError: if the layers dependencies contain a cycle
+    """
+    layer_by_file = {os.path.abspath(layer['output_file']): layer for layer in layer_list}
+    sorted_layers, visited, in_progress = [], set(), set()
+
+    def visit(layer):
+        output_file = os.path.abspath(layer['output_file'])
+        if output_file in visited:
+            return
+        if output_file in in_progress:
+            raise InnerArgError(f'cycle in bit_bandmath_graph layers on {output_file}')
+        in_progress.add(output_file)
+        for dico in layer['source_list']:
+            for src in dico['sources']:
+                src_file = os.path.abspath(src['filepath'])
+                if src_file in layer_by_file:
+                    visit(layer_by_file[src_file])
+        in_progress.remove(output_file)
+        visited.add(output_file)
+        sorted_layers.append(layer)
+
+    for layer in layer_list:
+        visit(layer)
+    return sorted_layers
+
+def bit_bandmath_graph(layer_list, raster_info_dict, block_ysize=1024, write_cog=True):
+    """Computes a graph of monoband layers in a single pass and writes them directly as COG.
+
+    Each layer is defined as for a bit_bandmath band, so that chained bit_bandmath calls followed by rewrite_cog
+    can be replaced by a single call:
+    - each distinct source file is opened once and read once per block of block_ysize lines,
+    - operations are compiled once,
+    - a source whose filepath is the output_file of another layer is taken from the computed layer instead of disk,
+    - layers are computed in memory and copied once to output_file with COG options (or plain GTiff),
+      temporary layers are only kept in memory for the layers reading them.
+
+    :param layer_list: list of layer dicts: {'output_file': path, 'source_list': source list (same as a bit_bandmath band),
+        'no_data_value' (optional): nodata value, 'data_type' (optional, default gdal.GDT_Byte): gdal data type,
+        'colortable' (optional): gdal.ColorTable, 'temporary' (optional, default False): the layer is not written}
+    :param raster_info_dict: dict containing some gdal.Info information on raster to create (['size'], ['geoTransform'] and ['coordinateSystem']['wkt']), common to all layers
+    :param block_ysize: number of lines read and computed at once
+    :param write_cog: write layers as COG (deflate, 1024 tiles, overviews), otherwise as plain GTiff
+    :return: returns nothing
+
+    WARNING: operations must be pixel-wise since they are evaluated block by block
+    """
+    layer_list = sort_layer_graph(layer_list)
+    xsize, ysize = raster_info_dict['size'][0], raster_info_dict['size'][1]
+    is_gcps = 'gcps' in raster_info_dict
+
+    #open each distinct source file once
+    source_datasets = {}
+    layer_files = {os.path.abspath(layer['output_file']) for layer in layer_list}
+    for layer in layer_list:
+        for dico in layer['source_list']:
+            for src in dico['sources']:
+                src_file = os.path.abspath(src['filepath'])
+                if src_file in layer_files or src_file in source_datasets:
+                    continue
+                assert os.path.exists(src['filepath']), f'file {src["filepath"]} missing'
+                ds_loc = gdal.Open(src['filepath'])
+                if ds_loc is None:
+                    raise RuntimeInputFileError(f'gdal could not open file {src["filepath"]}')
+                source_datasets[src_file] = ds_loc
+
+    #compile operations once
+    compiled_source_lists = []
+    for layer in layer_list:
+        compiled_source_list = []
+        for dico in layer['source_list']:
+            if isinstance(dico['operation'], dict):
+                operation = {id_bit: compile(op, '<bit_bandmath_graph>', 'eval') for id_bit, op in dico['operation'].items()}
+            else:
+                operation = compile(dico['operation'], '<bit_bandmath_graph>', 'eval')
+            compiled_source_list.append((dico['sources'], operation))
+        compiled_source_lists.append(compiled_source_list)
+
+    #in memory output layers
+    mem_datasets = {}
+    for layer in layer_list:
+        ds_mem = gdal.GetDriverByName('MEM').Create('', xsize, ysize, 1, layer.get('data_type', gdal.GDT_Byte))
+        if is_gcps:
+            assert 'geoTransform' not in raster_info_dict
+            ds_mem.SetGCPs([gdal.GCP(el['x'], el['y'], el['z'], el['pixel'], el['line']) for el in raster_info_dict['gcps']['gcpList']], raster_info_dict['gcps']['coordinateSystem']['wkt'])
+        else:
+            ds_mem.SetGeoTransform(tuple(raster_info_dict['geoTransform']))
+            ds_mem.SetProjection(raster_info_dict['coordinateSystem']['wkt'])
+        if layer.get('no_data_value') is not None:
+            ds_mem.GetRasterBand(1).SetNoDataValue(float(layer['no_data_value']))
+        mem_datasets[os.path.abspath(layer['output_file'])] = ds_mem
+
+    for yoff in range(0, ysize, block_ysize):
+        nlines = min(block_ysize, ysize - yoff)
+        block_cache = {}
+
+        def read_block(src):
+            src_file = os.path.abspath(src['filepath'])
+            key = (src_file, src['bandnumber'], src['unpack_bits'])
+            if key not in block_cache:
+                if src['unpack_bits']:
+                    block_cache[key] = unpackbits2d(read_block(dict(src, unpack_bits=False)))
+                elif src_file in layer_files:
+                    assert src['bandnumber'] == 1, f'layer {src_file} has only 1 band'
+                    block_cache[key] = mem_datasets[src_file].GetRasterBand(1).ReadAsArray(0, yoff, xsize, nlines)
+                else:
+                    block_cache[key] = source_datasets[src_file].GetRasterBand(src['bandnumber']).ReadAsArray(0, yoff, xsize, nlines)
+            return block_cache[key]
+
+        for layer, compiled_source_list in zip(layer_list, compiled_source_lists):
+            outband = mem_datasets[os.path.abspath(layer['output_file'])].GetRasterBand(1)
+            output_array = outband.ReadAsArray(0, yoff, xsize, nlines)
+            output_array[:,:] = 0
+
+            output_bits_unpacked = False
+            for sources, operation in compiled_source_list:
+                local_eval_dict = {'np': np, 'logical_array_list_operation': logical_array_list_operation}
+                for i_src, src in enumerate(sources):
+                    local_eval_dict[f'A{i_src}'] = read_block(src)
+
+                if isinstance(operation, dict):
+                    if not output_bits_unpacked:
+                        output_array = unpackbits2d(output_array)
+                        output_bits_unpacked = True
+                    local_eval_dict['B'] = output_array
+                    for id_bit, code in operation.items():
+                        output_array[:,:,id_bit] = eval(code, {}, local_eval_dict)
+                else:
+                    if output_bits_unpacked:
+                        output_array = packbits2d(output_array)
+                        output_bits_unpacked = False
+                    local_eval_dict['B'] = output_array
+                    output_array = eval(operation, {}, local_eval_dict)
+
+                if output_bits_unpacked:
+                    output_array = packbits2d(output_array)
+                    output_bits_unpacked = False
+
+            #written then read back by read_block so that downstream layers see the gdal casted values
+            outband.WriteArray(output_array, 0, yoff)
+
+    source_datasets = None
+
+    gdal.SetConfigOption('COMPRESS_OVERVIEW', 'DEFLATE')
+    gdal.SetConfigOption('GDAL_TIFF_OVR_BLOCKSIZE', '1024')
+    for layer in layer_list:
+        if layer.get('temporary', False):
+            continue
+        ds_mem = mem_datasets[os.path.abspath(layer['output_file'])]
+        if layer.get('colortable') is not None:
+            band = ds_mem.GetRasterBand(1)
+            band.SetRasterColorTable(layer['colortable'])
+            band.SetRasterColorInterpretation(gdal.GCI_PaletteIndex)
+            band = None
+        if write_cog:
+            ds_mem.BuildOverviews("NEAREST", [2,4,8,16,32])
+            ds_out = gdal.GetDriverByName('GTiff').CreateCopy(layer['output_file'], ds_mem, options=COG_CREATION_OPTIONS)
+        else:
+            ds_out = gdal.GetDriverByName('GTiff').CreateCopy(layer['output_file'], ds_mem)
+        assert ds_out is not None, f'gdal could not write file {layer["output_file"]}'
+        ds_out = None
+    mem_datasets = None
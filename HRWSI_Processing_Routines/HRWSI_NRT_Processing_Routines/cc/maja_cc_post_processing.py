@@ -3,14 +3,15 @@
 
 
 import os
+import shutil
 from typing import Tuple
 import numpy as np
 from osgeo import gdal
 gdal.DontUseExceptions()
 from common.exitcodes import MainInputFileError
 from common.file_util import FileUtil
-from utils import rewrite_cog, add_quicklook, add_colortable
-from geometry.combine_bits_geotiff import bit_bandmath
+from utils import add_quicklook, add_colortable
+from geometry.combine_bits_geotiff import bit_bandmath_graph
 
 class MajaCcPostProcessing:
     '''
@@ -148,6 +149,8 @@ class MajaCcPostProcessing:
         self.product_folder_name_final = f'{self.product_prefix_name}_{measurement_date}_S{sat_id}_T{tile_id}_{self.product_version_id}'
         self.product_folder_name = f'{self.product_folder_name_final}_tmp'
         self.workdir_path = workdir_path
+        # Layers of the product, computed together by compute_layer_graph
+        self.layer_graph = []
 
     def check_post_processing_input_files(self) -> None:
         '''
@@ -180,7 +183,7 @@ class MajaCcPostProcessing:
 
     def make_maja_cc_cc_layer(self):
         '''
-        Generates the main layer of the Cloud Classification, the Cloud Classification layer.
+        Add to the layer graph the main layer of the Cloud Classification, the Cloud Classification layer.
         '''
 
         # The complete path of the auxilliary files used to generated the CC layer.
@@ -225,21 +228,16 @@ class MajaCcPostProcessing:
             self.product_folder_name,
             f'{self.product_folder_name_final}_{self.postprocessing_to_make_files["CC"]["dst_suffix_name"]}'
         )
-        raster_gdal_info = gdal.Info(cloud_mask_complete_src_path, format='json')
-
-        bit_bandmath(
-            maja_cc_cc_complete_dst_path,
-            raster_gdal_info,
-            [source_list],
-            compress=False,
-            no_data_values_per_band=[np.uint8(255)],
-            add_overviews=False,
-            use_default_cosims_config=False
-        )
+        self.layer_graph.append({
+            'output_file': maja_cc_cc_complete_dst_path,
+            'source_list': source_list,
+            'no_data_value': np.uint8(255),
+            'colortable': add_colortable.get_cc_colortable()
+        })
 
     def make_maja_cc_qcflag_layer(self):
         '''
-        Generate the QCFLAGS mask of the CC product.
+        Add to the layer graph the QCFLAGS mask of the CC product.
         '''
 
         # The complete path of the auxilliary files used to generated the CC layer.
@@ -253,11 +251,6 @@ class MajaCcPostProcessing:
             self.postprocessing_auxilliary_files['CLOUD']['src_path'],
             self.postprocessing_auxilliary_files['CLOUD']['src_name']
         )
-        maja_cc_cc_complete_dst_path = os.path.join(
-            self.workdir_path,
-            self.product_folder_name,
-            f'{self.product_folder_name_final}_{self.postprocessing_to_make_files["CC"]["dst_suffix_name"]}'
-        )
 
         #expert flags
         source_list = []
@@ -298,17 +291,14 @@ class MajaCcPostProcessing:
             self.product_folder_name,
             f'{self.product_folder_name_final}_{self.postprocessing_to_make_files["QCFLAGS"]["dst_suffix_name"]}'
         )
-        raster_gdal_info = gdal.Info(maja_cc_cc_complete_dst_path, format='json')
-
-        bit_bandmath(
-            cc_qcflags_complete_dst_path, raster_gdal_info, 
-            [source_list], compress=False, add_overviews=False,
-            use_default_cosims_config=False
-        )
+        self.layer_graph.append({
+            'output_file': cc_qcflags_complete_dst_path,
+            'source_list': source_list
+        })
 
     def make_maja_cc_qc_layer(self):
         '''
-        Generate the QC layer of the CC product.
+        Add to the layer graph the QC layer of the CC product.
         '''
 
         # The complete path of the auxilliary files used to generated the CC layer.
@@ -317,11 +307,6 @@ class MajaCcPostProcessing:
             self.product_folder_name,
             f'{self.product_folder_name_final}_{self.postprocessing_to_make_files["QCFLAGS"]["dst_suffix_name"]}'
         )
-        maja_cc_cc_complete_dst_path = os.path.join(
-            self.workdir_path,
-            self.product_folder_name,
-            f'{self.product_folder_name_final}_{self.postprocessing_to_make_files["CC"]["dst_suffix_name"]}'
-        )
         no_data_layer_complete_src_path = os.path.join(
             self.workdir_path,
             self.postprocessing_auxilliary_files['NO_DATA']['src_path'],
@@ -357,16 +342,12 @@ class MajaCcPostProcessing:
             self.product_folder_name,
             f'{self.product_folder_name_final}_{self.postprocessing_to_make_files["QC"]["dst_suffix_name"]}'
         )
-        raster_gdal_info = gdal.Info(maja_cc_cc_complete_dst_path, format='json')
-
-        bit_bandmath(
-            cc_qc_complete_dst_path,
-            raster_gdal_info, [source_list],
-            no_data_values_per_band=[np.uint8(255)],
-            compress=False,
-            add_overviews=False,
-            use_default_cosims_config=False
-        )
+        self.layer_graph.append({
+            'output_file': cc_qc_complete_dst_path,
+            'source_list': source_list,
+            'no_data_value': np.uint8(255),
+            'colortable': add_colortable.get_qc_colortable()
+        })
 
     def retrieve_product_files(self):
         '''
@@ -404,6 +385,28 @@ class MajaCcPostProcessing:
         self.make_maja_cc_qcflag_layer()
         self.make_maja_cc_qc_layer()
 
+    def compute_layer_graph(self):
+        '''
+        Compute all the layers of the graph in a single pass over the input files.
+        The layers are written as COG in the temporary product folder, and then moved to
+        the final product folder.
+        '''
+        cloud_mask_complete_src_path = os.path.join(
+            self.workdir_path,
+            self.postprocessing_auxilliary_files['CLOUD']['src_path'],
+            self.postprocessing_auxilliary_files['CLOUD']['src_name']
+        )
+        raster_gdal_info = gdal.Info(cloud_mask_complete_src_path, format='json')
+
+        bit_bandmath_graph(self.layer_graph, raster_gdal_info)
+
+        product_folder_path = os.path.join(self.workdir_path, self.product_folder_name)
+        product_folder_final_path = os.path.join(self.workdir_path, self.product_folder_name_final)
+        FileUtil.make_dir(product_folder_final_path)
+        for file_name in os.listdir(product_folder_path):
+            shutil.move(os.path.join(product_folder_path, file_name), os.path.join(product_folder_final_path, file_name))
+        os.rmdir(product_folder_path)
+
     def make_metadata_and_xml_files(self):
         '''
         Generate XML and metadata files 
@@ -422,27 +425,14 @@ class MajaCcPostProcessing:
             )
         )
         self.check_post_processing_input_files()
-        # Fill the product folder with all the main layers files.
+        # Define all the main layers of the product.
+        self.layer_graph = []
         self.retrieve_product_files()
         self.edit_product_files()
         self.make_main_layer_files()
         self.make_quality_files()
-        # Implement colortable.
-        add_colortable.add_colortable_to_files(
-            os.path.join(
-                self.workdir_path, self.product_folder_name
-            ),
-            product_tag=self.product_folder_name_final
-        )
-        # Make the product folder a Cloud Optimized Geotiff (COG).
-        rewrite_cog.rewrite_cog(
-            os.path.join(
-                self.workdir_path, self.product_folder_name
-            ),
-            os.path.join(
-                self.workdir_path, self.product_folder_name_final
-            )
-        )
+        # Compute the layers with their colortable, as Cloud Optimized Geotiff (COG).
+        self.compute_layer_graph()
         # Generate a quicklook for easy visualization.
         add_quicklook.add_quicklook(
             os.path.join(
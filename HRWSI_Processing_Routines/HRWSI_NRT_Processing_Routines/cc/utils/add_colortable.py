@@ -16,6 +16,36 @@ def get_unit8_colors_all_nan_transparent():
         colors.SetColorEntry(ii, tuple([0,0,0,0]))
     return colors
 
+def get_cc_colortable() -> gdal.ColorTable:
+    '''
+    Colortable of the Cloud Classification layer.
+
+    :returns: the colortable.
+    '''
+    # Preset the NAN values color.
+    colors = get_unit8_colors_all_nan_transparent()
+    # Set the four color for the four CC values.
+    colors.SetColorEntry(0, tuple([0,0,0,0]))
+    colors.SetColorEntry(1, tuple([254,230,206,255]))
+    colors.SetColorEntry(2, tuple([253,174,107,255]))
+    colors.SetColorEntry(3, tuple([230,85,13,255]))
+    return colors
+
+def get_qc_colortable() -> gdal.ColorTable:
+    '''
+    Colortable of the QC layer.
+
+    :returns: the colortable.
+    '''
+    # Preset the NAN values color.
+    colors = get_unit8_colors_all_nan_transparent()
+    # Set the four color for the four QC values.
+    colors.SetColorEntry(0, tuple([93,164,0,255]))
+    colors.SetColorEntry(1, tuple([189,189,91,255]))
+    colors.SetColorEntry(2, tuple([255,194,87,255]))
+    colors.SetColorEntry(3, tuple([255,70,37,255]))
+    return colors
+
 def add_cc_colortable(product_path:str) -> None:
     '''
     Add colortable to the Cloud Classification file.
@@ -29,16 +59,7 @@ def add_cc_colortable(product_path:str) -> None:
 
     ds = gdal.Open(product_path, 1)
     band = ds.GetRasterBand(1)
-
-    # Preset the NAN values color.
-    colors = get_unit8_colors_all_nan_transparent()
-    # Set the four color for the four CC values.
-    colors.SetColorEntry(0, tuple([0,0,0,0]))
-    colors.SetColorEntry(1, tuple([254,230,206,255]))
-    colors.SetColorEntry(2, tuple([253,174,107,255]))
-    colors.SetColorEntry(3, tuple([230,85,13,255]))
-
-    band.SetRasterColorTable(colors)
+    band.SetRasterColorTable(get_cc_colortable())
     band.FlushCache()
     ds = None
     del ds
@@ -56,16 +77,7 @@ def add_qc_colortable(product_path:str) -> None:
 
     ds = gdal.Open(product_path, 1)
     band = ds.GetRasterBand(1)
-
-    # Preset the NAN values color.
-    colors = get_unit8_colors_all_nan_transparent()
-    # Set the four color for the four QC values.
-    colors.SetColorEntry(0, tuple([93,164,0,255]))
-    colors.SetColorEntry(1, tuple([189,189,91,255]))
-    colors.SetColorEntry(2, tuple([255,194,87,255]))
-    colors.SetColorEntry(3, tuple([255,70,37,255]))
-
-    band.SetRasterColorTable(colors)
+    band.SetRasterColorTable(get_qc_colortable())
     band.FlushCache()
     ds = None
     del ds
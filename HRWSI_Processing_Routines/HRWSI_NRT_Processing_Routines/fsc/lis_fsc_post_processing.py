@@ -8,8 +8,8 @@ import numpy as np
 from osgeo import gdal
 from common.exitcodes import MainInputFileError
 from common.file_util import FileUtil
-from utils import rewrite_cog, add_quicklook, add_colortable
-from geometry.combine_bits_geotiff import bit_bandmath
+from utils import add_quicklook, add_colortable
+from geometry.combine_bits_geotiff import bit_bandmath_graph
 
 class LisFscPostProcessing:
     '''
@@ -166,6 +166,7 @@ class LisFscPostProcessing:
         self.postprocessing_to_edit_files['OG']['src_name'] = f'{self.ALGO_STATIC_OUTPUT_PREFIX_NAME}{tile_id}_{measurement_date}_{self.ALGO_VERSION}_1.tif'
 
         self.workdir_path = workdir_path
+        self.layer_graph = []
 
 
     def check_post_processing_input_files(self)->None:
@@ -199,7 +200,7 @@ class LisFscPostProcessing:
 
     def retrieve_cloud_mask(self):
         '''
-        Method computing and writting the LIS cloud mask.
+        Method adding to the layer graph the LIS cloud mask.
         
         Returns:
         --------
@@ -227,18 +228,12 @@ class LisFscPostProcessing:
             'operation': '(A1!=-10000)*A0'}]
 
 
-        raster_gdal_info = gdal.Info(cloud_mask_complete_src_path, format='json')
-
-        bit_bandmath(cloud_mask_complete_dst_path,
-                     raster_gdal_info,
-                     [source_list],
-                     compress=False,
-                     add_overviews=False,
-                     use_default_cosims_config=False)
+        self.layer_graph.append({'output_file': cloud_mask_complete_dst_path,
+                                 'source_list': source_list})
 
     def retrieve_geoville_mask(self):
        '''
-        Method computing and writting the a boolean mask with 1 for every pixels where either:
+        Method adding to the layer graph a boolean mask with 1 for every pixels where either:
             - MAJA found a cloud
             - LIS found snow
             - L2A has no data (-10000)
@@ -280,18 +275,12 @@ class LisFscPostProcessing:
            'operation': '(A3!=255)*(A3!=253)*(A1!=-10000)*np.logical_or((A0>0),(A2>0)*(A2<=100)) + (A1==-10000)'}]
 
 
-       raster_gdal_info = gdal.Info(cloud_mask_complete_src_path, format='json')
-
-       bit_bandmath(geoville_mask_complete_dst_path,
-                    raster_gdal_info,
-                    [source_list],
-                    compress=False,
-                    add_overviews=False,
-                    use_default_cosims_config=False)
+       self.layer_graph.append({'output_file': geoville_mask_complete_dst_path,
+                                'source_list': source_list})
 
     def retrieve_lis_fsc_ndsi_layer(self):
         '''
-        Method computing and writting the LIS NDSI layer.
+        Method adding to the layer graph the LIS NDSI layer.
         
         Returns:
         --------
@@ -325,18 +314,13 @@ class LisFscPostProcessing:
                          'np.uint8(205)*(A1!=-10000)*(A2!=253)*(A2!=255)*(A0==205) + '+\
                          'np.uint8(255)*((A1==-10000)+(A2==255)+(A2==253)) + '+\
                          'np.uint8(210)*((A2==1)+(A2==2))*(A0<205)'}]
-        raster_gdal_info = gdal.Info(ndsi_layer_complete_src_path, format='json')
-
-        bit_bandmath(ndsi_layer_complete_dst_path,
-                     raster_gdal_info,
-                     [source_list],
-                     compress=False,
-                     add_overviews=False,
-                     use_default_cosims_config=False)
+        self.layer_graph.append({'output_file': ndsi_layer_complete_dst_path,
+                                 'source_list': source_list,
+                                 'colortable': add_colortable.get_fsc_colortable()})
 
     def make_lis_fsc_toc_layer(self):
         '''
-        Method computing and writting the LIS FSC TOC layer.
+        Method adding to the layer graph the LIS FSC TOC layer.
         
         Returns:
         --------
@@ -372,18 +356,14 @@ class LisFscPostProcessing:
             f'{self.product_folder_name_final}_{self.postprocessing_to_edit_files["TOC"]["dst_suffix_name"]}'
         )
 
-        raster_gdal_info = gdal.Info(lis_fsc_toc_complete_dst_path, format='json')
-        bit_bandmath(fsc_toc_complete_dst_path,
-                     raster_gdal_info,
-                     [source_list],
-                     no_data_values_per_band=[np.uint8(255)],
-                     compress=False,
-                     add_overviews=False,
-                     use_default_cosims_config=False)
+        self.layer_graph.append({'output_file': fsc_toc_complete_dst_path,
+                                 'source_list': source_list,
+                                 'no_data_value': np.uint8(255),
+                                 'colortable': add_colortable.get_fsc_colortable()})
 
     def make_lis_fsc_og_layer(self):
         '''
-        Method computing and writting the LIS FSC OG layer.
+        Method adding to the layer graph the LIS FSC OG layer.
         
         Returns:
         --------
@@ -419,19 +399,14 @@ class LisFscPostProcessing:
             f'{self.product_folder_name_final}_{self.postprocessing_to_edit_files["OG"]["dst_suffix_name"]}'
         )
 
-        raster_gdal_info = gdal.Info(lis_fsc_og_complete_dst_path, format='json')
-
-        bit_bandmath(fsc_og_complete_dst_path,
-                     raster_gdal_info,
-                     [source_list],
-                     no_data_values_per_band=[np.uint8(255)],
-                     compress=False,
-                     add_overviews=False,
-                     use_default_cosims_config=False)
+        self.layer_graph.append({'output_file': fsc_og_complete_dst_path,
+                                 'source_list': source_list,
+                                 'no_data_value': np.uint8(255),
+                                 'colortable': add_colortable.get_fsc_colortable()})
 
     def make_lis_fsc_qcflag_layer(self):
         '''
-        Method computing and writting the FSC QCFLAGS layer.
+        Method adding to the layer graph the FSC QCFLAGS layer.
         
         Returns:
         --------
@@ -523,18 +498,12 @@ class LisFscPostProcessing:
             f'{self.product_folder_name_final}_{self.postprocessing_to_make_files["QCFLAGS"]["dst_suffix_name"]}'
         )
 
-        raster_gdal_info = gdal.Info(fsc_toc_complete_dst_path, format='json')
-
-        bit_bandmath(fsc_qcflags_complete_dst_path,
-                     raster_gdal_info,
-                     [source_list],
-                     compress=False,
-                     add_overviews=False,
-                     use_default_cosims_config=False)
+        self.layer_graph.append({'output_file': fsc_qcflags_complete_dst_path,
+                                 'source_list': source_list})
 
     def make_lis_fsc_qctoc_layer(self):
         '''
-        Method computing and writting the FSC TOC QC layer.
+        Method adding to the layer graph the FSC TOC QC layer.
         
         Returns:
         --------
@@ -573,19 +542,14 @@ class LisFscPostProcessing:
             f'{self.product_folder_name_final}_{self.postprocessing_to_make_files["QCTOC"]["dst_suffix_name"]}'
         )
 
-        raster_gdal_info = gdal.Info(fsc_toc_complete_dst_path, format='json')
-
-        bit_bandmath(fsc_qctoc_complete_dst_path,
-                     raster_gdal_info,
-                     [source_list],
-                     no_data_values_per_band=[np.uint8(255)],
-                     compress=False,
-                     add_overviews=False,
-                     use_default_cosims_config=False)
+        self.layer_graph.append({'output_file': fsc_qctoc_complete_dst_path,
+                                 'source_list': source_list,
+                                 'no_data_value': np.uint8(255),
+                                 'colortable': add_colortable.get_qc_colortable(with_cloud=True)})
 
     def make_lis_fsc_qcog_layer(self):
         '''
-        Method computing and writting the FSC OG QC layer.
+        Method adding to the layer graph the FSC OG QC layer.
         
         Returns:
         --------
@@ -630,15 +594,10 @@ class LisFscPostProcessing:
             f'{self.product_folder_name_final}_{self.postprocessing_to_make_files["QCOG"]["dst_suffix_name"]}'
         )
 
-        raster_gdal_info = gdal.Info(fsc_og_complete_dst_path, format='json')
-
-        bit_bandmath(fsc_qcog_complete_dst_path,
-                     raster_gdal_info,
-                     [source_list],
-                     no_data_values_per_band=[np.uint8(255)],
-                     compress=False,
-                     add_overviews=False,
-                     use_default_cosims_config=False)
+        self.layer_graph.append({'output_file': fsc_qcog_complete_dst_path,
+                                 'source_list': source_list,
+                                 'no_data_value': np.uint8(255),
+                                 'colortable': add_colortable.get_qc_colortable(with_cloud=True)})
 
     def retrieve_product_files(self):
         '''
@@ -686,6 +645,32 @@ class LisFscPostProcessing:
         self.make_lis_fsc_qctoc_layer()
         self.make_lis_fsc_qcog_layer()
 
+    def compute_layer_graph(self):
+        '''
+        Method computing all the layers of the graph in a single pass over the input files.
+        The layers are written as COG in the temporary product folder, and then moved to
+        the final product folder.
+
+        Returns:
+        --------
+            Nothing
+        '''
+        lis_fsc_toc_complete_src_path = os.path.join(
+            self.workdir_path,
+            self.postprocessing_to_edit_files['TOC']['src_path'],
+            self.postprocessing_to_edit_files['TOC']['src_name']
+        )
+        raster_gdal_info = gdal.Info(lis_fsc_toc_complete_src_path, format='json')
+
+        bit_bandmath_graph(self.layer_graph, raster_gdal_info)
+
+        product_folder_path = os.path.join(self.workdir_path, self.product_folder_name)
+        product_folder_final_path = os.path.join(self.workdir_path, self.product_folder_name_final)
+        FileUtil.make_dir(product_folder_final_path)
+        for file_name in os.listdir(product_folder_path):
+            shutil.move(os.path.join(product_folder_path, file_name), os.path.join(product_folder_final_path, file_name))
+        os.rmdir(product_folder_path)
+
     def make_metadata_and_xml_files(self):
         '''
         TODO
@@ -695,7 +680,7 @@ class LisFscPostProcessing:
     def fsc_product_main_layers_creation(self):
         '''
         Method orchestrating the computation of the eventual FSC product layers.
-        It also compresses the output layers in COG format.
+        All the layers are computed together and written in COG format.
         Eventually, it launches the computation of JSON and XML files for indexation purposes.
         
         Returns:
@@ -709,23 +694,11 @@ class LisFscPostProcessing:
             )
         )
         self.check_post_processing_input_files()
+        self.layer_graph = []
         self.retrieve_product_files()
         self.edit_product_files()
         self.make_quality_files()
-        add_colortable.add_colortable_to_files(
-            os.path.join(
-                self.workdir_path, self.product_folder_name
-            ),
-            product_tag=self.product_folder_name_final
-        )
-        rewrite_cog.rewrite_cog(
-            os.path.join(
-                self.workdir_path, self.product_folder_name
-            ),
-            os.path.join(
-                self.workdir_path, self.product_folder_name_final
-            )
-        )
+        self.compute_layer_graph()
         add_quicklook.add_quicklook(
             os.path.join(self.workdir_path, self.product_folder_name_final),'_FSCTOC.tif'
         )
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Remove_snow_inside_cloud_benchmark module compares the ways to find the snow areas surrounded by clouds
+in let-it-snow remove_snow_inside_cloud:
+- the former loop dilating the mask of each snow area on the whole image,
+- the one pass compute_snow_labels_inside_cloud, counting the cloudy and clear contour pixels of all the areas at once.
+
+The synthetic masks are a grid of square snow areas of random sizes, some of them touching each other,
+the clouds covering random blocks of the grid.
+
+Usage (from the LIS container, in the fsc folder):
+    python3 remove_snow_inside_cloud_benchmark.py [--nb-area-per-side 60] [--radius 5]
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import scipy.ndimage as nd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "let-it-snow-1.11.0", "python"))
+from s2snow.snow_detector import compute_snow_labels_inside_cloud
+
+AREA_STEP = 40
+
+
+def create_masks(nb_area_per_side: int, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    """Return a synthetic snow mask with about nb_area_per_side**2 snow areas and its cloud mask"""
+
+    rng = np.random.default_rng(seed)
+    size = nb_area_per_side * AREA_STEP
+    snow_mask = np.zeros((size, size), dtype=np.uint8)
+    for row in range(0, size, AREA_STEP):
+        for col in range(0, size, AREA_STEP):
+            side = rng.integers(5, AREA_STEP + 3)
+            snow_mask[row:row + side, col:col + side] = 1
+    cloud_blocks = rng.random((nb_area_per_side, nb_area_per_side)) < 0.5
+    cloud_mask = np.kron(cloud_blocks, np.ones((AREA_STEP, AREA_STEP))).astype(np.uint8)
+    # Noise on the cloud borders
+    cloud_mask[rng.random((size, size)) < 0.1] = 0
+    cloud_mask[snow_mask == 1] = 0
+    return snow_mask, cloud_mask
+
+
+def create_struct(radius: int) -> np.ndarray:
+    """Disc structuring element, as built by remove_snow_inside_cloud"""
+
+    struct = np.zeros((2 * radius + 1, 2 * radius + 1))
+    y, x = np.ogrid[-radius:radius + 1, -radius:radius + 1]
+    struct[x ** 2 + y ** 2 <= radius ** 2] = 1
+    return struct
+
+
+def loop_snow_labels_inside_cloud(snow_mask, cloud_mask, snow_labels, nb_label, struct, cloud_threshold,
+                                  min_area_size, nb_max_label=None):
+    """Former remove_snow_inside_cloud loop, stopped after nb_max_label processed areas"""
+
+    discarded_labels = np.zeros(nb_label + 1, dtype=bool)
+    (labels, label_counts) = np.unique(snow_labels, return_counts=True)
+    labels_area = dict(list(zip(labels, label_counts)))
+    nb_processed_label = 0
+    for lab in range(1, nb_label + 1):
+        if labels_area[lab] > min_area_size:
+            if nb_processed_label == nb_max_label:
+                break
+            nb_processed_label += 1
+            current_mask = np.where(snow_labels == lab, 1, 0)
+            patch_neige_dilat = nd.binary_dilation(current_mask, struct)
+            contour = np.where((snow_mask == 0) & (patch_neige_dilat == 1))
+            result = np.bincount(cloud_mask[contour])
+            cloud_percent = 0
+            if len(result) > 1:
+                cloud_percent = float(result[1]) / (result[0] + result[1])
+            if cloud_percent > cloud_threshold:
+                discarded_labels[lab] = True
+                snow_mask = np.where(snow_labels == lab, 0, snow_mask)
+    return discarded_labels, nb_processed_label
+
+
+def benchmark(nb_area_per_side: int, radius: int, cloud_threshold: float, min_area_size: int,
+              nb_loop_label: int) -> None:
+    """Time both implementations, the loop being timed on nb_loop_label areas and extrapolated"""
+
+    snow_mask, cloud_mask = create_masks(nb_area_per_side)
+    (snow_labels, nb_label) = nd.measurements.label(snow_mask)
+    struct = create_struct(radius)
+    nb_processed_label = np.count_nonzero(np.bincount(snow_labels.ravel())[1:] > min_area_size)
+    print(f"{snow_mask.shape[0]} x {snow_mask.shape[1]} masks, {nb_label} snow areas, "
+          f"{nb_processed_label} larger than {min_area_size} pixels, radius {radius}")
+
+    start = time.perf_counter()
+    discarded_labels = compute_snow_labels_inside_cloud(snow_mask, cloud_mask, snow_labels, nb_label, struct,
+                                                        cloud_threshold, min_area_size)
+    one_pass_time = time.perf_counter() - start
+    print(f"one pass : {np.count_nonzero(discarded_labels)} discarded areas in {one_pass_time:.3f} s")
+
+    start = time.perf_counter()
+    _, nb_timed_label = loop_snow_labels_inside_cloud(snow_mask, cloud_mask, snow_labels, nb_label, struct,
+                                                      cloud_threshold, min_area_size, nb_loop_label)
+    loop_time = (time.perf_counter() - start) * nb_processed_label / max(nb_timed_label, 1)
+    print(f"loop     : {loop_time:.1f} s (extrapolated from {nb_timed_label} areas)")
+
+    # Both implementations are compared on a smaller mask
+    snow_mask, cloud_mask = create_masks(10)
+    (snow_labels, nb_label) = nd.measurements.label(snow_mask)
+    expected, _ = loop_snow_labels_inside_cloud(snow_mask, cloud_mask, snow_labels, nb_label, struct,
+                                                cloud_threshold, min_area_size)
+    actual = compute_snow_labels_inside_cloud(snow_mask, cloud_mask, snow_labels, nb_label, struct,
+                                              cloud_threshold, min_area_size)
+    assert np.array_equal(expected, actual)
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Benchmark the search of the snow areas surrounded by clouds")
+    parser.add_argument("--nb-area-per-side", type=int, default=60)
+    parser.add_argument("--radius", type=int, default=5)
+    parser.add_argument("--cloud-threshold", type=float, default=0.85)
+    parser.add_argument("--min-area-size", type=int, default=100)
+    parser.add_argument("--nb-loop-label", type=int, default=100)
+    args = parser.parse_args()
+
+    benchmark(args.nb_area_per_side, args.radius, args.cloud_threshold, args.min_area_size, args.nb_loop_label)
@@ -32,30 +32,21 @@ def add_linspace_colors(colors, values, color_start, color_end):
         colors.SetColorEntry(value, tuple([int(round(color_start[ii]+coeff*(color_end[ii]-color_start[ii]))) for ii in range(4)]))
     return colors
 
-def add_fsc_colortable(product_path):
+def get_fsc_colortable():
     '''
-    TODO
+    Colortable of FSC and NDSI layers
     '''
-    assert os.path.exists(product_path), f'product_path {product_path} does not exist'
-    ds = gdal.Open(product_path, 1)
-    band = ds.GetRasterBand(1)
     colors = get_unit8_colors_all_nan_transparent()
     colors.SetColorEntry(0, tuple([0,0,0,0]))
     colors = add_linspace_colors(colors, list(range(1,100+1)), [8,51,112], [255,255,255])
     colors.SetColorEntry(205, tuple([123,123,123,255]))
     colors.SetColorEntry(210, tuple([119,161,203,255]))
-    band.SetRasterColorTable(colors)
-    band.FlushCache()
-    ds = None
-    del ds
+    return colors
 
-def add_qc_colortable(product_path, with_cloud=True):
+def get_qc_colortable(with_cloud=True):
     '''
-    TODO
+    Colortable of QC layers
     '''
-    assert os.path.exists(product_path), f'product_path {product_path} does not exist'
-    ds = gdal.Open(product_path, 1)
-    band = ds.GetRasterBand(1)
     colors = get_unit8_colors_all_nan_transparent()
     colors.SetColorEntry(0, tuple([93,164,0,255]))
     colors.SetColorEntry(1, tuple([189,189,91,255]))
@@ -64,7 +55,28 @@ def add_qc_colortable(product_path, with_cloud=True):
     if with_cloud:
         colors.SetColorEntry(205, tuple([123,123,123,255]))
     colors.SetColorEntry(210, tuple([0,0,255,255]))
-    band.SetRasterColorTable(colors)
+    return colors
+
+def add_fsc_colortable(product_path):
+    '''
+    TODO
+    '''
+    assert os.path.exists(product_path), f'product_path {product_path} does not exist'
+    ds = gdal.Open(product_path, 1)
+    band = ds.GetRasterBand(1)
+    band.SetRasterColorTable(get_fsc_colortable())
+    band.FlushCache()
+    ds = None
+    del ds
+
+def add_qc_colortable(product_path, with_cloud=True):
+    '''
+    TODO
+    '''
+    assert os.path.exists(product_path), f'product_path {product_path} does not exist'
+    ds = gdal.Open(product_path, 1)
+    band = ds.GetRasterBand(1)
+    band.SetRasterColorTable(get_qc_colortable(with_cloud=with_cloud))
     band.FlushCache()
     ds = None
     del ds
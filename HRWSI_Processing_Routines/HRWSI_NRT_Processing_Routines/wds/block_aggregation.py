@@ -0,0 +1,94 @@
+#!/usr/bin/python3
+"""
+Block reduction of high resolution FSC rasters onto the WDS output grid.
+
+The FSC raster is cropped to a whole number of blocks and reshaped to
+(rows, scale_y, cols, scale_x) so that every per block statistic is a single
+numpy reduction over axes 1 and 3. Trailing FSC rows/columns that do not fill
+a complete block are ignored, as they always were by the per pixel loop.
+"""
+
+import numpy as np
+
+
+def block_view(array, out_shape):
+    """
+    Return a (rows, scale_y, cols, scale_x) view of array aligned on out_shape.
+
+    scale_y and scale_x are the integer ratios between the array shape and
+    out_shape. The view does not copy data. None is returned when the array is
+    smaller than out_shape on one axis (no complete block).
+    """
+    scale_y, scale_x = array.shape[0] // out_shape[0], array.shape[1] // out_shape[1]
+    if scale_y == 0 or scale_x == 0:
+        return None
+    cropped = array[:out_shape[0] * scale_y, :out_shape[1] * scale_x]
+    return cropped.reshape(out_shape[0], scale_y, out_shape[1], scale_x)
+
+
+def fsc_block_statistics(fsc, out_shape, code_cloud, code_water):
+    """
+    Compute the per block statistics needed by the WDS aggregation.
+
+    Returns a tuple (block_size, observed_count, observed_sum, cloud_count, water_count)
+    where the four arrays have out_shape, or None when fsc has no complete block.
+    Observed pixels are FSC values in [0, 100].
+    """
+    blocks = block_view(fsc, out_shape)
+    if blocks is None:
+        return None
+    block_size = blocks.shape[1] * blocks.shape[3]
+
+    observed = (blocks >= 0) & (blocks <= 100)
+    observed_count = np.count_nonzero(observed, axis=(1, 3))
+    observed_sum = np.where(observed, blocks, 0).sum(axis=(1, 3), dtype=np.int64)
+    del observed
+    cloud_count = np.count_nonzero(blocks == code_cloud, axis=(1, 3))
+    water_count = np.count_nonzero(blocks == code_water, axis=(1, 3))
+
+    return block_size, observed_count, observed_sum, cloud_count, water_count
+
+
+def aggregate_fsc_blocks(fsc, wsm, qcwsm, ssc, qcssc, ssc_valid, fsc_threshold,
+                         code_ssc_wet, code_ssc_dry, code_ssc_snowfree, code_cloud, code_water,
+                         code_masks, code_wsm_wet, code_wsm_notwet):
+    """
+    Update ssc, qcssc and ssc_valid in place with one FSC raster.
+
+    For every output pixel the matching FSC block is classified as:
+    - observed (more than half of the block observed): snow when the mean FSC of the
+      observed pixels reaches fsc_threshold (wet/dry from wsm), snow free otherwise;
+    - cloud or water when the block is not already observed and these pixels outnumber
+      the remaining ones.
+    Pixels marked observed by a previous FSC raster (ssc_valid == 1) are only
+    overwritten by a new observation.
+    """
+    stats = fsc_block_statistics(fsc, ssc.shape, code_cloud, code_water)
+    if stats is None:
+        return
+    block_size, observed_count, observed_sum, cloud_count, water_count = stats
+
+    observed = observed_count > block_size // 2
+    not_valid = ~observed & (ssc_valid != 1)
+    cloud = not_valid & (cloud_count > block_size - observed_count - cloud_count)
+    water = not_valid & ~cloud & (water_count > block_size - observed_count - water_count)
+
+    # Integer form of "mean of observed FSC >= threshold"
+    snow = observed & (observed_sum >= fsc_threshold * observed_count)
+    wet = snow & (wsm == code_wsm_wet)
+    dry = snow & (wsm == code_wsm_notwet)
+    snowfree = observed & ~snow
+
+    ssc_valid[observed] = 1
+    ssc[wet] = code_ssc_wet
+    qcssc[wet] = qcwsm[wet]
+    ssc[dry] = code_ssc_dry
+    qcssc[dry] = code_masks
+    ssc[snowfree] = code_ssc_snowfree
+    qcssc[snowfree] = code_masks
+
+    ssc_valid[cloud | water] = 2
+    ssc[cloud] = code_cloud
+    qcssc[cloud] = code_masks
+    ssc[water] = code_water
+    qcssc[water] = code_masks
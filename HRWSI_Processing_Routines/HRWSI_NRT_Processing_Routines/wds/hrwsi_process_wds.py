@@ -9,6 +9,7 @@ from datetime import datetime, timedelta, timezone
 from xml.etree import ElementTree as ET
 from subprocess import Popen as subprocess_Popen
 from yaml import safe_load as yaml_load
+from block_aggregation import aggregate_fsc_blocks
 
 gdal.UseExceptions()
 osr.UseExceptions()
@@ -201,47 +202,9 @@ def processing_routine(args):
             raise SystemExit(21)
         fsc = ds.GetRasterBand(1).ReadAsArray()
 
-        scale_y, scale_x = fsc.shape[0] // ssc.shape[0], fsc.shape[1] // ssc.shape[1]
-        observed_th = (scale_y * scale_x) // 2
-        for y in range(0, ssc.shape[0]):
-            fsc_y = y * scale_y
-            for x in range(0, ssc.shape[1]):
-                fsc_x = x * scale_x
-                d = fsc[fsc_y:fsc_y + scale_y, fsc_x:fsc_x + scale_x]
-                observed = ((d >= 0) & (d <= 100))
-                observed_count = np.count_nonzero(observed)
-                cloud = (d == CODE_CLOUD)
-                cloud_count = np.count_nonzero(cloud)
-                cloud_th = scale_y * scale_x - observed_count - cloud_count
-                water = (d == CODE_WATER)
-                water_count = np.count_nonzero(water)
-                water_th = scale_y * scale_x - observed_count - water_count
-                if observed_count > observed_th:
-                    ssc_valid[y, x] = 1
-                    # observed
-                    if d[observed].mean() >= FSC_THRESHOLD:
-                        # snow
-                        if wsm[y, x] == CODE_WSM_WET:
-                            # wet snow
-                            ssc[y, x] = CODE_SSC_WET
-                            qcssc[y, x] = qcwsm[y, x]
-                        elif wsm[y, x] == CODE_WSM_NOTWET:
-                            ssc[y, x] = CODE_SSC_DRY
-                            qcssc[y, x] = CODE_MASKS
-                    else:
-                        # no snow
-                        ssc[y, x] = CODE_SSC_SNOWFREE
-                        qcssc[y, x] = CODE_MASKS
-                elif ssc_valid[y, x] != 1 and cloud_count > cloud_th:
-                    ssc_valid[y, x] = 2
-                    # cloud
-                    ssc[y, x] = CODE_CLOUD
-                    qcssc[y, x] = CODE_MASKS
-                elif ssc_valid[y, x] != 1 and water_count > water_th:
-                    ssc_valid[y, x] = 2
-                    # water
-                    ssc[y, x] = CODE_WATER
-                    qcssc[y, x] = CODE_MASKS
+        aggregate_fsc_blocks(fsc, wsm, qcwsm, ssc, qcssc, ssc_valid, FSC_THRESHOLD,
+                             CODE_SSC_WET, CODE_SSC_DRY, CODE_SSC_SNOWFREE, CODE_CLOUD, CODE_WATER,
+                             CODE_MASKS, CODE_WSM_WET, CODE_WSM_NOTWET)
 
     m = (ssc_valid == 1) & (masks != 0)
     ssc[m] = masks[m]
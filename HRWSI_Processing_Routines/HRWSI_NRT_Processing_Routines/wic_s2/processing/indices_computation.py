@@ -3,6 +3,7 @@
 
 import os
 import sys
+import time
 import logging
 from osgeo import gdal
 import numpy as np
@@ -12,6 +13,7 @@ import numpy as np
 ROOT_FOLDER = '/'.join(os.getcwd().split('wic_s2')[:-1])
 sys.path.append(ROOT_FOLDER+'wic_s2')
 from utils.log_util import LogUtil
+from processing.windowed_indices import compute_indices_columns, DEFAULT_WINDOW_SIZE
 
 
 class IndicesComputation:
@@ -25,12 +27,14 @@ class IndicesComputation:
                  s2_image_path:str,
                  output_wic_path:str,
                  slope_file_path:str,
-                 list_training_indices:list['str'])->None:
+                 list_training_indices:list['str'],
+                 list_training_indices_types:dict)->None:
 
         self.s2_image_path = s2_image_path
         self.output_wic_path = output_wic_path
         self.slope_file_path = slope_file_path
         self.list_training_indices = list_training_indices
+        self.list_training_indices_types = list_training_indices_types
         self.logger = LogUtil.get_logger('IndicesComputation', self.LOGGER_LEVEL, "log_harvester/logs.log")
         self.image_name = os.path.split(self.s2_image_path.rstrip(os.sep))[1]
 
@@ -69,86 +73,6 @@ class IndicesComputation:
         except Exception as e:
             print(f"An error occurred: {e}")
     
-    def compute_index(self, gen1, gen2, threshold):
-        """
-        Compute an index based on two generators.
-
-        Args:
-            gen1 (iterable): First generator.
-            gen2 (iterable): Second generator.
-            threshold (float): Threshold value.
-
-        Returns:
-            generator: Generator yielding computed indices.
-        """
-        # Utiliser zip pour combiner les valeurs des deux générateurs
-        combined_values = zip(gen1, gen2)
-        
-        # Itérer sur les valeurs combinées et calculer les indices
-        for x, y in combined_values:
-            try:
-                # change data type to avoid RuntimeWarning
-                x = np.float64(x)
-                y = np.float64(y)
-
-                if x + y != 0:
-                    result = self.binarise_index((x - y) / (x + y), threshold)
-                else:
-                    result = -9999
-            except RuntimeWarning as e:
-                print("A RuntimeWarning occurred:", e)
-                result = None
-            yield result
-
-    def binarise_index(self, value, threshold):
-        """
-        Binarise the index based on a threshold value.
-
-        Args:
-            value (float): Index value.
-            threshold (float): Threshold value.
-
-        Returns:
-            float: Binarised index value.
-        """
-        return 1 if value >= threshold else 0
-    
-    def bounds(self, gen, mini, maxi):
-        """
-        Limit the value of 'elem' to be within the range [mini, maxi].
-
-        Args:
-            gen (generator): A generator yielding values to be constrained.
-            mini (int or float): The minimum value.
-            maxi (int or float): The maximum value.
-        
-        Returns:
-            int or float: The constrained value within the specified range.
-        """
-        for elem in gen:
-            yield max(mini, min(elem, maxi))
-
-    def read_band_generator(self, band_path):
-        """
-        Generator function to read the raster band data from the specified file.
-
-        Args:
-            band_path (str): Path to the raster file.
-        
-        Yields:
-            float: Each individual pixel value from the raster band.
-        """
-        try:
-            with gdal.Open(band_path) as src:
-                if src is None:
-                    raise ValueError("Unable to open raster file.")
-                    
-                band_data = src.GetRasterBand(1).ReadAsArray()
-                for value in band_data.flatten():
-                    yield value
-        except Exception as e:
-            raise RuntimeError(f"An error occurred while reading band data: {e}")
-    
     def compute_image_shape(self, band_path):
         """
         Computes the dimensions of the image from the specified raster file.
@@ -170,61 +94,46 @@ class IndicesComputation:
         except Exception as e:
             print(f"An error occurred: {e}")
             return None
-    
-    def compute_mask(self, gen1, gen2):
+
+    def open_band(self, band_path):
         """
-        Compute a mask based on two generators.
+        Open a raster file to read its first band window by window.
 
         Args:
-            gen1 (iterable): First generator.
-            gen2 (iterable): Second generator.
-            
+            band_path (str): Path to the raster file.
+
         Returns:
-            numpy.ndarray: Array containing the mask values.
+            gdal.Dataset: The opened raster.
         """
-        # Use zip to combine values from both generators
-        combined_values = zip(gen1, gen2)
-        # Generateur mask value one by one
-        for x, y in combined_values:
-            yield np.float64(x) + np.float64(y) == 0
-    
-    def combine_mask(self, gen1, gen2, gen3):
+        src = gdal.Open(band_path)
+        if src is None:
+            raise RuntimeError(f"Unable to open raster file {band_path}")
+        return src
+
+    def create_matrix_of_indices(self, window_size=DEFAULT_WINDOW_SIZE):
         """
-        Combine masks from three generators using bitwise OR operation.
+        Compute the classifier features, reading each band once window by window.
 
         Args:
-            gen1 (iterable): First generator.
-            gen2 (iterable): Second generator.
-            gen3 (iterable): Third generator.
-            
+            window_size (int): Width and height of the windows.
+
         Returns:
-            generator: Generator yielding combined mask values.
+            tuple: The list of feature columns in the list_training_indices order, the image shape [width, height]
+                   and the mask of the pixels where the reflectances of an index are null.
         """
-        combined_values = zip(gen1, gen2, gen3)
-        combined_mask = (x | y | z for x, y, z in combined_values)
-        return combined_mask
-
-    def create_matrix_of_indices(self):
-        index = {self.list_training_indices[i] : i for i in range(0,len(self.list_training_indices))}
-        matrix_of_indices = [None]*len(self.list_training_indices)
-
-        # Read slope tif file within a generator
+        # Verify slope file exists
         assert "slope" in self.list_training_indices
         assert os.path.isfile(self.slope_file_path)
-        self.logger.info(f"Reading slope file: {self.slope_file_path}")
-        ## TODO make sure the slope has the same dimension as the s2 image
-        matrix_of_indices[index["slope"]] = self.read_band_generator(self.slope_file_path)
+        band_paths = {"slope": self.slope_file_path}
 
-        # Read std_g_blue file within a generator
+        # Verify std_g_blue file exists
         assert "std_g_blue" in self.list_training_indices
         std_g_blue_path = os.path.join(self.output_wic_path, "tmp", "std_g_blue.tif")
         assert os.path.isfile(std_g_blue_path)
-        self.logger.info(f"Reading std of blue gradient file: {std_g_blue_path}")
-        matrix_of_indices[index["std_g_blue"]] = self.read_band_generator(std_g_blue_path)
+        band_paths["std_g_blue"] = std_g_blue_path
 
         # Resample bands if not already done, verify the new tif file exists
         bands_to_resample = ["B3","B8","B4"]
-        band_paths = {}
         for band_name in bands_to_resample:
             band_path = os.path.join(self.s2_image_path, f"20m_{self.image_name}_FRE_{band_name}.tif")
             if not os.path.exists(band_path):
@@ -238,30 +147,31 @@ class IndicesComputation:
         assert os.path.exists(b11_path)
         band_paths["B11"] = b11_path
 
-        indices_bands = [   ("NDSI", "B3", "B11",0.4),
-                            ("NDVI", "B8", "B4",0.1),
-                            ("NDWI", "B3", "B8",0.3)]
-        masks = []
-        for normalised_index, b1, b2,threshold in indices_bands:
-            self.logger.info(f"Compute {normalised_index}")
-            normalised_index_generator = self.compute_index(self.read_band_generator(band_paths[b1]), self.read_band_generator(band_paths[b2]),threshold)
-            matrix_of_indices[index[normalised_index]] = normalised_index_generator
-            
-            self.logger.info(f"Compute mask where reflectances of {b1} and {b2} are null")
-            mask = self.compute_mask(self.read_band_generator(band_paths[b1]), self.read_band_generator(band_paths[b2]))
-            masks.append(mask)
-
-        # Compute bounded B11
-        self.logger.info("Compute bounded B11")
-        # bounded_b11 = (self.bounds(x, 200, 600) for x in self.read_band_generator(b11_path))
-        bounded_b11_generator = self.bounds(self.read_band_generator(b11_path), 200, 600)
-        
-        matrix_of_indices[index['bounded_b11']] = bounded_b11_generator
-
         # Compute input image shape, because it is flatten and must be reshaped at the end of the classification
         input_image_shape = self.compute_image_shape(b11_path)
+        width, height = input_image_shape
 
-        combined_mask = self.combine_mask(masks[0],masks[1],masks[2])
+        rasters = {}
+        try:
+            for band_name, band_path in band_paths.items():
+                self.logger.info(f"Opening {band_name} file: {band_path}")
+                rasters[band_name] = self.open_band(band_path)
+                if [rasters[band_name].RasterXSize, rasters[band_name].RasterYSize] != input_image_shape:
+                    raise ValueError(f"{band_name} file {band_path} doesn't have the shape of the B11 band {input_image_shape}")
+
+            def read_window(band_name, x_off, y_off, x_size, y_size):
+                return rasters[band_name].GetRasterBand(1).ReadAsArray(x_off, y_off, x_size, y_size)
+
+            self.logger.info(f"Compute indices, bounded B11 and null reflectances mask by windows of {window_size} pixels")
+            start = time.perf_counter()
+            matrix_of_indices, combined_mask = compute_indices_columns(read_window, width, height,
+                                                                       self.list_training_indices,
+                                                                       self.list_training_indices_types,
+                                                                       window_size)
+            self.logger.info(f"Indices computed in {time.perf_counter() - start:.1f} s")
+        finally:
+            # Close the rasters
+            rasters = None
 
         return matrix_of_indices, input_image_shape, combined_mask
 
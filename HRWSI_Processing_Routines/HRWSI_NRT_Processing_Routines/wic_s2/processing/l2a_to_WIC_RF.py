@@ -15,9 +15,8 @@ ROOT_FOLDER = '/'.join(os.getcwd().split('wic_s2')[:-1])
 sys.path.append(ROOT_FOLDER+'wic_s2')
 from processing.indices_computation import IndicesComputation
 from utils.log_util import LogUtil
-from utils.add_colortable import add_wic_colortable, add_proba_colortable
-from geometry.combine_bits_geotiff import bit_bandmath
-from utils.rewrite_cog import rewrite_cog
+from utils.add_colortable import get_wic_colortable, get_proba_colortable, add_proba_colortable
+from geometry.combine_bits_geotiff import bit_bandmath, bit_bandmath_graph
 
 
 LIST_TRAINING_INDICES = ["NDVI", "NDSI", "NDWI", "std_g_blue", "slope", "bounded_b11"]
@@ -30,14 +29,13 @@ def load_configuration(config_json_file):
         return json.load(f)
 
 def create_dataframe(matrix_of_indices, list_training_indices, list_training_indices_types):
-    """Create a DataFrame from matrix of indices."""
-    dataframe_indices = pd.DataFrame()
-    for i, matrix_generator in enumerate(matrix_of_indices):
-        index_matrix = np.array(list(matrix_generator))
+    """Create a DataFrame from the flattened columns of indices, columns already of the right type aren't copied."""
+    columns = {}
+    for i, index_matrix in enumerate(matrix_of_indices):
         column_name = list_training_indices[i]
         column_dtype = list_training_indices_types.get(column_name)
-        dataframe_indices[column_name] = index_matrix.astype(column_dtype)
-    return dataframe_indices
+        columns[column_name] = np.asarray(index_matrix).astype(column_dtype, copy=False)
+    return pd.DataFrame(columns, copy=False)
 
 def classify_data(classifier, dataframe_indices, batch_size=10000):
     """Classify data using the classifier."""
@@ -62,14 +60,12 @@ def write_raster(raster, input_image_path, image_name, output_WIC_file):
                                     os.path.join(input_image_path, image_name + "_FRE_B11.tif"),
                                     output_WIC_file)
     
-def change_wic_values(new_WIC_file, WIC_file):
-    """Compute macro classes from WIC raster."""
+def change_wic_values_layer(new_WIC_file, WIC_file):
+    """Layer of bit_bandmath_graph changing the classifier values of the WIC raster into WIC values."""
     source_list = [{'sources': [{'filepath': WIC_file,'bandnumber': 1,'unpack_bits': False}], \
                     'operation': 'np.uint8(255)*(A0==255) + np.uint8(254)*(A0==0)+\
                                 np.uint8(100)*(A0==1) + np.uint8(1)*(A0==2)'}]
-    raster_gdal_info = gdal.Info(WIC_file, format='json')
-    bit_bandmath(new_WIC_file, raster_gdal_info, [source_list],
-                 no_data_values_per_band=[np.uint8(255)], compress=False, add_overviews=False, use_default_cosims_config=False)
+    return {'output_file': new_WIC_file, 'source_list': source_list, 'no_data_value': np.uint8(255)}
 
 def compute_macro_classes(input_file, output_file):
     """Compute macro classes from WIC raster."""
@@ -84,35 +80,29 @@ def compute_macro_classes(input_file, output_file):
     bit_bandmath(output_file, raster_gdal_info, [source_list],
                  no_data_values_per_band=[np.uint8(255)], compress=False, add_overviews=False, use_default_cosims_config=False)
 
-def add_cloud_mask(output_file, wic_file, cloud_mask):
-    """Add cloud mask to wic file."""
+def cloud_mask_layer(output_file, wic_file, cloud_mask):
+    """Layer of bit_bandmath_graph adding cloud mask to wic file."""
     source_list = [{'sources': [{'filepath': cloud_mask,'bandnumber': 1,'unpack_bits': False},
                                 {'filepath': wic_file,'bandnumber': 1,'unpack_bits': False}], \
                     'operation': 'np.uint8(205)*(A0!=0) + A1*(A0==0)'}]
-    raster_gdal_info = gdal.Info(wic_file, format='json')
-    bit_bandmath(output_file, raster_gdal_info, [source_list],
-                 no_data_values_per_band=[np.uint8(255)], compress=False, add_overviews=False, use_default_cosims_config=False)
+    return {'output_file': output_file, 'source_list': source_list, 'no_data_value': np.uint8(255)}
 
-def add_water_mask(output_file, wic_file, water_mask):
-    """Add cloud mask to wic file."""
+def water_mask_layer(output_file, wic_file, water_mask):
+    """Layer of bit_bandmath_graph adding water mask to wic file."""
     source_list = [{'sources': [{'filepath': water_mask,'bandnumber': 1,'unpack_bits': False},
                                 {'filepath': wic_file,'bandnumber': 1,'unpack_bits': False}], \
                     'operation': 'A1*(A1!=100)*(A0!=253)*(A0!=255) + np.uint8(254)*(A1==100)*(A0==0)+\
                                 np.uint8(100)*(A1==100)*(A0==1) + np.uint8(100)*(A1==100)*(A0==2)+\
                                 np.uint8(255)*(A0==253) + np.uint8(255)*(A0==255)+\
                                 np.uint8(254)*(A1==100)*(A0==254)'}]
-    raster_gdal_info = gdal.Info(wic_file, format='json')
-    bit_bandmath(output_file, raster_gdal_info, [source_list],
-                 no_data_values_per_band=[np.uint8(255)], compress=False, add_overviews=False, use_default_cosims_config=False)
+    return {'output_file': output_file, 'source_list': source_list, 'no_data_value': np.uint8(255)}
 
-def add_nodata_mask(output_file, wic_file, nodata_mask):
-    """Add no data mask to wic file."""
+def nodata_mask_layer(output_file, wic_file, nodata_mask):
+    """Layer of bit_bandmath_graph adding no data mask to wic file."""
     source_list = [{'sources': [{'filepath': nodata_mask,'bandnumber': 1,'unpack_bits': False},
                                 {'filepath': wic_file,'bandnumber': 1,'unpack_bits': False}], \
                     'operation': 'np.uint8(255)*(A0!=0) + A1*(A0==0)'}]
-    raster_gdal_info = gdal.Info(wic_file, format='json')
-    bit_bandmath(output_file, raster_gdal_info, [source_list],
-                 no_data_values_per_band=[np.uint8(255)], compress=False, add_overviews=False, use_default_cosims_config=False)
+    return {'output_file': output_file, 'source_list': source_list, 'no_data_value': np.uint8(255)}
     
 def define_output_folder(input_product):
     
@@ -160,7 +150,8 @@ if __name__ == "__main__":
     IndicesComputer = IndicesComputation(   input_image_path,
                                             output_WIC_dir,
                                             slope_file_path,
-                                            LIST_TRAINING_INDICES)
+                                            LIST_TRAINING_INDICES,
+                                            LIST_TRAINING_INDICES_TYPES)
     matrix_of_indices, input_image_shape, unvalid_mask = IndicesComputer.create_matrix_of_indices()
 
     logger.info(f"Create dataframe")
@@ -184,31 +175,9 @@ if __name__ == "__main__":
     # Define filename (following the naming convention from PUM ICE)
     wic_filename = output_folder_name + "_WIC.tif"
     output_WIC_file = os.path.join(output_WIC_dir, wic_filename)
+    tmp_WIC_raw_file = os.path.join(output_WIC_dir, "tmp", "tmp_WIC_raw.tif")
     logger.info(f"Write WIC raster to tif: {output_WIC_dir}")
-    write_raster(predictions, input_image_path, image_name, output_WIC_file)
-    
-    tmp_WIC_nomask_file = os.path.join(output_WIC_dir, "tmp", "tmp_WIC_nomask.tif")
-    change_wic_values(tmp_WIC_nomask_file, output_WIC_file)
-    # os.rename(tmp_WIC_file, output_WIC_file)
-    tmp_WIC_file = os.path.join(output_WIC_dir, "tmp", "tmp_WIC.tif")
-
-    #Define masks paths
-    cloud_mask_path = os.path.join(input_image_path, "MASKS", image_name + "_CLM_R2.tif")
-    nodata_mask_path = os.path.join(input_image_path, "MASKS", image_name + "_EDG_R2.tif")
-    # Add cloud mask
-    add_cloud_mask(tmp_WIC_file, tmp_WIC_nomask_file, cloud_mask_path)
-    os.rename(tmp_WIC_file, output_WIC_file)
-    # Add no data mask
-    add_nodata_mask(tmp_WIC_file, output_WIC_file, nodata_mask_path)
-    os.rename(tmp_WIC_file, output_WIC_file)
-    # Add water mask
-    add_water_mask(tmp_WIC_file, output_WIC_file, water_mask_path)
-    os.rename(tmp_WIC_file, output_WIC_file)
-
-    # Add final colortable
-    add_wic_colortable(output_WIC_file)
-    #Rewrite in COG format
-    rewrite_cog(output_WIC_file)
+    write_raster(predictions, input_image_path, image_name, tmp_WIC_raw_file)
 
     #Write probabilities raster of each class to tif
     probabilities_classes = ['other_features','snow_ice','water']
@@ -221,17 +190,26 @@ if __name__ == "__main__":
     proba_maximum = np.max(probabilities,axis=2)
     proba_filename = output_folder_name + "_PRB.tif"
     output_proba_max_file = os.path.join(output_WIC_dir, proba_filename)
-    write_raster(proba_maximum, input_image_path, image_name, output_proba_max_file)
-    tmp_proba_file = os.path.join(output_WIC_dir, "tmp", "tmp_proba")
-    #Add cloud mask
-    add_cloud_mask(tmp_proba_file, output_proba_max_file, cloud_mask_path)
-    os.rename(tmp_proba_file, output_proba_max_file)
-    #Add no data mask
-    add_nodata_mask(tmp_proba_file, output_proba_max_file, nodata_mask_path)
-    os.rename(tmp_proba_file, output_proba_max_file)
-    #Add colortable
-    add_proba_colortable(output_proba_max_file)
-    #Rewrite in COG format
-    rewrite_cog(output_proba_max_file)
+    tmp_proba_raw_file = os.path.join(output_WIC_dir, "tmp", "tmp_proba_raw.tif")
+    write_raster(proba_maximum, input_image_path, image_name, tmp_proba_raw_file)
+
+    #Define masks paths
+    cloud_mask_path = os.path.join(input_image_path, "MASKS", image_name + "_CLM_R2.tif")
+    nodata_mask_path = os.path.join(input_image_path, "MASKS", image_name + "_EDG_R2.tif")
+    tmp_WIC_nomask_file = os.path.join(output_WIC_dir, "tmp", "tmp_WIC_nomask.tif")
+    tmp_WIC_cloud_file = os.path.join(output_WIC_dir, "tmp", "tmp_WIC_cloud.tif")
+    tmp_WIC_file = os.path.join(output_WIC_dir, "tmp", "tmp_WIC.tif")
+    tmp_proba_file = os.path.join(output_WIC_dir, "tmp", "tmp_proba.tif")
+    #Add cloud, no data and water masks to WIC, and cloud and no data masks to maximum probabilities,
+    #intermediate layers are only kept in memory and final layers are written in COG format with their colortable
+    layer_graph = [
+        dict(change_wic_values_layer(tmp_WIC_nomask_file, tmp_WIC_raw_file), temporary=True),
+        dict(cloud_mask_layer(tmp_WIC_cloud_file, tmp_WIC_nomask_file, cloud_mask_path), temporary=True),
+        dict(nodata_mask_layer(tmp_WIC_file, tmp_WIC_cloud_file, nodata_mask_path), temporary=True),
+        dict(water_mask_layer(output_WIC_file, tmp_WIC_file, water_mask_path), colortable=get_wic_colortable()),
+        dict(cloud_mask_layer(tmp_proba_file, tmp_proba_raw_file, cloud_mask_path), temporary=True),
+        dict(nodata_mask_layer(output_proba_max_file, tmp_proba_file, nodata_mask_path), colortable=get_proba_colortable())
+    ]
+    bit_bandmath_graph(layer_graph, gdal.Info(tmp_WIC_raw_file, format='json'))
     
     logger.info("End of computation")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Window by window computation of the WIC S2 classifier features.
+
+Each band is read once, window by window, and the spectral indices, the bounded B11
+and the null reflectance mask are computed with numpy on the whole window. The features
+are written into preallocated columns, in the row major order of the image, which are
+given as is to the classifier dataframe: processing time and memory only depend on the
+image size.
+"""
+
+import numpy as np
+
+DEFAULT_WINDOW_SIZE = 1024
+# Value of the normalised indices where both reflectances are null
+NO_INDEX_VALUE = -9999
+# (index name, first band, second band, binarisation threshold)
+NORMALISED_INDICES_BANDS = [("NDSI", "B3", "B11", 0.4),
+                            ("NDVI", "B8", "B4", 0.1),
+                            ("NDWI", "B3", "B8", 0.3)]
+REFLECTANCE_BANDS = ["B3", "B4", "B8", "B11"]
+# Features read as is from their raster
+RASTER_FEATURES = ["slope", "std_g_blue"]
+B11_BOUNDS = (200, 600)
+
+
+def iter_windows(width, height, window_size=DEFAULT_WINDOW_SIZE):
+    """
+    Yield the windows covering an image, the last row and column of windows being cropped to the image.
+
+    Args:
+        width (int): Image width.
+        height (int): Image height.
+        window_size (int): Width and height of the windows.
+
+    Yields:
+        tuple: (x_off, y_off, x_size, y_size) of each window.
+    """
+    for y_off in range(0, height, window_size):
+        for x_off in range(0, width, window_size):
+            yield x_off, y_off, min(window_size, width - x_off), min(window_size, height - y_off)
+
+
+def compute_normalised_index(band1, band2, threshold):
+    """
+    Compute the binarised normalised difference of two bands and the mask of null reflectances.
+
+    Args:
+        band1 (numpy.ndarray): First band.
+        band2 (numpy.ndarray): Second band.
+        threshold (float): Threshold value.
+
+    Returns:
+        tuple: 1 where (band1 - band2) / (band1 + band2) >= threshold, 0 elsewhere and NO_INDEX_VALUE
+               where band1 + band2 is null, as int16 array, and the boolean mask where band1 + band2 is null.
+    """
+    band1 = band1.astype(np.float64)
+    band2 = band2.astype(np.float64)
+    band_sum = band1 + band2
+    null_mask = band_sum == 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        normalised_index = (band1 - band2) / band_sum
+    binarised_index = (normalised_index >= threshold).astype(np.int16)
+    binarised_index[null_mask] = NO_INDEX_VALUE
+    return binarised_index, null_mask
+
+
+def compute_indices_columns(read_window, width, height, list_training_indices, list_training_indices_types,
+                            window_size=DEFAULT_WINDOW_SIZE):
+    """
+    Compute the classifier features window by window.
+
+    Args:
+        read_window (callable): read_window(band_name, x_off, y_off, x_size, y_size) returns the window of a band
+                                as a 2D array, band_name being one of REFLECTANCE_BANDS or RASTER_FEATURES.
+        width (int): Image width.
+        height (int): Image height.
+        list_training_indices (list): Feature names, in the classifier order.
+        list_training_indices_types (dict): Dtype of each feature.
+        window_size (int): Width and height of the windows.
+
+    Returns:
+        tuple: The list of feature columns flattened in row major order, in the list_training_indices order,
+               and the flattened boolean mask of the pixels where the reflectances of an index are null.
+    """
+    columns = {name: np.empty(height * width, dtype=list_training_indices_types[name]) for name in list_training_indices}
+    unvalid_mask = np.zeros(height * width, dtype=bool)
+    column_images = {name: column.reshape(height, width) for name, column in columns.items()}
+    unvalid_mask_image = unvalid_mask.reshape(height, width)
+
+    for x_off, y_off, x_size, y_size in iter_windows(width, height, window_size):
+        window = (slice(y_off, y_off + y_size), slice(x_off, x_off + x_size))
+        bands = {band_name: read_window(band_name, x_off, y_off, x_size, y_size) for band_name in REFLECTANCE_BANDS}
+
+        for index_name, b1, b2, threshold in NORMALISED_INDICES_BANDS:
+            column_images[index_name][window], null_mask = compute_normalised_index(bands[b1], bands[b2], threshold)
+            unvalid_mask_image[window] |= null_mask
+
+        column_images["bounded_b11"][window] = np.clip(bands["B11"], *B11_BOUNDS)
+
+        for feature_name in RASTER_FEATURES:
+            column_images[feature_name][window] = read_window(feature_name, x_off, y_off, x_size, y_size)
+
+    return [columns[name] for name in list_training_indices], unvalid_mask
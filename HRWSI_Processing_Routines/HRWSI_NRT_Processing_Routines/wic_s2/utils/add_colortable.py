@@ -29,6 +29,27 @@ def add_linspace_colors(colors, values, color_start, color_end):
         colors.SetColorEntry(value, tuple([int(round(color_start[ii]+coeff*(color_end[ii]-color_start[ii]))) for ii in range(4)]))
     return colors
 
+def get_proba_colortable():
+    '''
+    Colortable of probability layers
+    '''
+    colors = get_unit8_colors_all_nan_transparent()
+    colors.SetColorEntry(0, tuple([0,0,0,0]))
+    colors = add_linspace_colors(colors, list(range(1,100+1)), [8,51,112], [255,255,255])
+    colors.SetColorEntry(205, tuple([123,123,123,255])) #clouds
+    return colors
+
+def get_wic_colortable():
+    '''
+    Colortable of WIC layers
+    '''
+    colors = get_unit8_colors_all_nan_transparent()
+    colors.SetColorEntry(1, tuple([0,0,255,255])) #open water
+    colors.SetColorEntry(100, tuple([0,255,255,255])) #ice
+    colors.SetColorEntry(205, tuple([123,123,123,255])) #clouds
+    colors.SetColorEntry(254, tuple([255,0,0,255])) # other features
+    return colors
+
 def add_proba_colortable(product_path):
     '''
     TODO
@@ -36,11 +57,7 @@ def add_proba_colortable(product_path):
     assert os.path.exists(product_path), f'product_path {product_path} does not exist'
     ds = gdal.Open(product_path, 1)
     band = ds.GetRasterBand(1)
-    colors = get_unit8_colors_all_nan_transparent()
-    colors.SetColorEntry(0, tuple([0,0,0,0]))
-    colors = add_linspace_colors(colors, list(range(1,100+1)), [8,51,112], [255,255,255])
-    colors.SetColorEntry(205, tuple([123,123,123,255])) #clouds
-    band.SetRasterColorTable(colors)
+    band.SetRasterColorTable(get_proba_colortable())
     band.FlushCache()
     ds = None
     del ds
@@ -50,12 +67,7 @@ def add_wic_colortable(product_path):
     assert os.path.exists(product_path), f'product_path {product_path} does not exist'
     ds = gdal.Open(product_path, 1)
     band = ds.GetRasterBand(1)
-    colors = get_unit8_colors_all_nan_transparent()
-    colors.SetColorEntry(1, tuple([0,0,255,255])) #open water
-    colors.SetColorEntry(100, tuple([0,255,255,255])) #ice
-    colors.SetColorEntry(205, tuple([123,123,123,255])) #clouds
-    colors.SetColorEntry(254, tuple([255,0,0,255])) # other features
-    band.SetRasterColorTable(colors)
+    band.SetRasterColorTable(get_wic_colortable())
     band.FlushCache()
     ds = None
     del ds
@@ -21,11 +21,43 @@
 #
 
 import rasterio
+from rasterio.windows import Window
 import numpy as np
-import itertools, operator, sys, os
+import sys, os
 import logging
 from importlib.metadata import version
 
+# Maximum number of values (dates x rows x columns) of the daily snow maps processed at once
+MAX_STRIP_SIZE = 2 ** 25
+
+
+def compute_longest_snow_run(W):
+    """
+    Computes the first and the last date of the longest snow run of each pixel of a stack of daily snow maps.
+    When several runs have the longest length, the first one is kept. Pixels whose sum over time is not
+    above 10 are set to 0.
+    The length of the snow run ending at each date is the distance to the last date without snow,
+    given by a running maximum over time: the last date of the longest run is its first argmax.
+    :param W: stack of daily snow maps (dates, rows, columns), 1 meaning snow
+    :return: sod, smod: first and last dates of the longest snow run (rows, columns) as uint16
+    """
+    nb_dates = W.shape[0]
+    date_dtype = np.int16 if nb_dates < np.iinfo(np.int16).max else np.int32
+    dates = np.arange(nb_dates, dtype=date_dtype).reshape(nb_dates, 1, 1)
+
+    # Last date without snow up to each date, -1 before the first date without snow
+    last_no_snow = np.where(W == 1, date_dtype(-1), dates)
+    np.maximum.accumulate(last_no_snow, axis=0, out=last_no_snow)
+    # Length of the snow run ending at each date, 0 at the dates without snow
+    run_length = np.subtract(dates, last_no_snow, out=last_no_snow)
+
+    smod = np.argmax(run_length, axis=0)
+    longest_run_length = np.take_along_axis(run_length, smod[np.newaxis], axis=0)[0]
+    sod = smod - longest_run_length + 1
+
+    valid = (np.sum(W, axis=0) > 10) & (longest_run_length > 0)
+    return np.where(valid, sod, 0).astype('uint16'), np.where(valid, smod, 0).astype('uint16')
+
 
 def compute_SOD_SMOD(input_file, synthesis_name=None, output_dir=None):
     """
@@ -60,19 +92,14 @@ def compute_SOD_SMOD(input_file, synthesis_name=None, output_dir=None):
     src = rasterio.open(input_file, 'r')
     n = src.meta["count"]
 
-    W = src.read(range(1, n + 1))
-    n = np.shape(W)[1]
-    m = np.shape(W)[2]
-    sod = np.zeros((n, m), dtype='uint16')
-    smod = np.zeros((n, m), dtype='uint16')
-    for i in range(0, n):
-        for j in range(0, m):
-            w = W[:, i, j]
-            if np.sum(w) > 10:
-                r = max((list(y) for (x, y) in itertools.groupby((enumerate(w)), operator.itemgetter(1)) if x == 1),
-                        key=len)
-                smod[i, j] = r[-1][0]
-                sod[i, j] = r[0][0]
+    # The stack is read and processed by strips of rows to bound memory
+    sod = np.zeros((src.height, src.width), dtype='uint16')
+    smod = np.zeros((src.height, src.width), dtype='uint16')
+    strip_height = max(1, MAX_STRIP_SIZE // (n * src.width))
+    for row in range(0, src.height, strip_height):
+        nb_rows = min(strip_height, src.height - row)
+        W = src.read(range(1, n + 1), window=Window(0, row, src.width, nb_rows))
+        sod[row:row + nb_rows], smod[row:row + nb_rows] = compute_longest_snow_run(W)
 
     with rasterio.Env():
         profile = src.profile
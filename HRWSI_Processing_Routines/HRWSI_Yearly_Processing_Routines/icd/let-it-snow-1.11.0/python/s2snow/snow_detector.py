@@ -627,6 +627,101 @@ def compute_snow_pass1(img_vrt, all_cloud_mask_file, tmp_dir, ndsi_formula, ndsi
     return pass1_file
 
 
+def compute_snow_labels_inside_cloud(snow_mask, cloud_mask, snow_labels, nb_label, struct, cloud_threshold=0.85,
+                                     min_area_size=25000):
+    """
+    Compute the snow areas to discard because they are surrounded by clouds.
+    A snow area larger than min_area_size is discarded when the part of cloudy pixels (cloud_mask == 1 against
+    cloud_mask == 0) of its contour is above cloud_threshold. The contour of an area is made of the pixels of its
+    dilation by struct which are not snow, or which belong to an area discarded before (lower label).
+    All the areas are processed at once: the contour pixels are the pixels of the dilation of the label image,
+    and their (pixel, label) pairs are gathered for every offset of struct, so that a pixel close to several
+    areas counts for each of them. Cloudy and clear pixels are then counted per label with np.bincount.
+    :param snow_mask: snow mask array
+    :param cloud_mask: cloud mask array
+    :param snow_labels: snow areas labels, from nd.measurements.label(snow_mask)
+    :param nb_label: number of snow areas
+    :param struct: structuring element of the dilation
+    :param cloud_threshold: cloud threshold
+    :param min_area_size: min area size
+    :return: boolean array indexed by label, True for the snow areas to discard
+    """
+    discarded_labels = np.zeros(nb_label + 1, dtype=bool)
+
+    # Only the areas larger than min_area_size can be discarded
+    labels_area = np.bincount(snow_labels.ravel(), minlength=nb_label + 1)
+    processed = labels_area > min_area_size
+    processed[0] = False
+    if not processed.any():
+        return discarded_labels
+    processed_labels = np.where(processed[snow_labels], snow_labels, 0)
+
+    # Contour pixels: not snow and close to a processed area, or inside a processed area and close to a higher
+    # label. Most of them are close to a single area, given by the dilation of the label image.
+    footprint = struct.astype(bool)
+    max_labels = nd.grey_dilation(processed_labels, footprint=footprint, mode='constant', cval=0)
+    contour = np.where(snow_mask == 0, max_labels > 0, (processed_labels > 0) & (max_labels > processed_labels))
+    no_label = np.iinfo(processed_labels.dtype).max
+    min_labels = nd.grey_erosion(np.where(processed_labels > 0, processed_labels, no_label), footprint=footprint,
+                                 mode='constant', cval=no_label)
+    is_single = contour & (min_labels == max_labels)
+    is_multiple = contour & ~is_single
+    single_pixels = np.flatnonzero(is_single)
+    single_labels = max_labels.ravel()[single_pixels]
+
+    # The areas close to the other contour pixels are gathered for every offset of struct
+    radius = struct.shape[0] // 2
+    padded_labels = np.pad(processed_labels, radius)
+    multiple_rows, multiple_cols = np.nonzero(is_multiple)
+    padded_pixels = (multiple_rows + radius) * padded_labels.shape[1] + multiple_cols + radius
+    offsets = np.argwhere(footprint) - radius
+    neighbour_labels = padded_labels.ravel()[padded_pixels + (offsets[:, 0] * padded_labels.shape[1] +
+                                                              offsets[:, 1])[:, np.newaxis]]
+    # A pixel isn't in the contour of its own area, and counts once for each area
+    neighbour_labels[neighbour_labels == processed_labels[multiple_rows, multiple_cols]] = 0
+    neighbour_labels.sort(axis=0)
+    neighbour_labels[1:][neighbour_labels[1:] == neighbour_labels[:-1]] = 0
+    pair_rank, pair_multiple = np.nonzero(neighbour_labels)
+
+    pair_pixel = np.concatenate((single_pixels, np.ravel_multi_index((multiple_rows[pair_multiple],
+                                                                      multiple_cols[pair_multiple]),
+                                                                     snow_mask.shape)))
+    pair_labels = np.concatenate((single_labels, neighbour_labels[pair_rank, pair_multiple])).astype(np.int64)
+    pair_cloud = cloud_mask.ravel()[pair_pixel]
+    pair_area = processed_labels.ravel()[pair_pixel].astype(np.int64)
+
+    # Counts of cloudy and clear contour pixels which aren't snow
+    is_not_snow = pair_area == 0
+    cloud_count = np.bincount(pair_labels[is_not_snow & (pair_cloud == 1)], minlength=nb_label + 1)
+    clear_count = np.bincount(pair_labels[is_not_snow & (pair_cloud == 0)], minlength=nb_label + 1)
+
+    def is_inside_cloud(cloud, clear):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cloud_percent = np.where(cloud + clear > 0, cloud / (cloud + clear), 0)
+        return cloud_percent > cloud_threshold
+
+    discarded_labels = processed & is_inside_cloud(cloud_count, clear_count)
+
+    # Pixels of an area discarded before belong to the contour: the areas close to a lower label
+    # are decided in the label order
+    is_after = ~is_not_snow & (pair_area < pair_labels)
+    if is_after.any():
+        pair_labels = pair_labels[is_after]
+        pair_area = pair_area[is_after]
+        pair_cloud = pair_cloud[is_after]
+        order = np.argsort(pair_labels, kind='stable')
+        pair_labels, pair_area, pair_cloud = pair_labels[order], pair_area[order], pair_cloud[order]
+        dependent_labels, first_pair = np.unique(pair_labels, return_index=True)
+        last_pair = np.append(first_pair[1:], len(pair_labels))
+        for lab, first, last in zip(dependent_labels, first_pair, last_pair):
+            is_discarded_area = discarded_labels[pair_area[first:last]]
+            cloud = cloud_count[lab] + np.count_nonzero(is_discarded_area & (pair_cloud[first:last] == 1))
+            clear = clear_count[lab] + np.count_nonzero(is_discarded_area & (pair_cloud[first:last] == 0))
+            discarded_labels[lab] = is_inside_cloud(cloud, clear)
+
+    return discarded_labels
+
+
 def remove_snow_inside_cloud(snow_mask_file, cloud_mask_file, radius=1, cloud_threshold=0.85, min_area_size=25000):
     """
     Remove snow inside cloud
@@ -644,8 +739,6 @@ def remove_snow_inside_cloud(snow_mask_file, cloud_mask_file, radius=1, cloud_th
 
     snow_mask_init = np.copy(snow_mask)
 
-    discarded_snow_area = 0
-
     (snow_labels, nb_label) = nd.measurements.label(snow_mask)
     logging.debug("There is " + str(nb_label) + " snow areas")
 
@@ -656,47 +749,15 @@ def remove_snow_inside_cloud(snow_mask_file, cloud_mask_file, radius=1, cloud_th
     mask = x ** 2 + y ** 2 <= radius ** 2
     struct[mask] = 1
 
-    # compute individual snow area size
-    logging.debug("Compute individual snow area size.")
-    (labels, label_counts) = np.unique(snow_labels, return_counts=True)
-    labels_area = dict(list(zip(labels, label_counts)))
-    logging.debug(labels_area)
-
-    logging.debug("Start loop on snow areas")
-
-    # For each snow area
-    for lab in range(1, nb_label + 1):
-        # Compute external contours
-        logging.debug("Processing area " + str(lab))
-        current_mask_area = labels_area[lab]
-        logging.debug("Current area size = " + str(current_mask_area))
-        if current_mask_area > min_area_size:
-            logging.debug("Processing snow area of size = " + str(current_mask_area))
-            current_mask = np.where(snow_labels == lab, 1, 0)
-            patch_neige_dilat = nd.binary_dilation(current_mask, struct)
-            logging.debug("Contour processing start")
-            contour = np.where((snow_mask == 0) & (patch_neige_dilat == 1))
-
-            # Compute percent of surrounding cloudy pixels
-            cloud_contour = cloud_mask[contour]
-            # print(cloud_contour)
-            logging.debug("Contour processing done.")
-
-            result = np.bincount(cloud_contour)
-            logging.debug(result)
-            cloud_percent = 0
-            if len(result) > 1:
-                cloud_percent = float(result[1]) / (result[0] + result[1])
-                logging.debug(result)
-                logging.debug(", " + str(cloud_percent * 100) + "% of surrounding cloud")
-
-            # Discard snow area where cloud_percent > threshold
-            if cloud_percent > cloud_threshold:
-                logging.debug("Updating snow mask...")
-                discarded_snow_area += 1
-                snow_mask = np.where(snow_labels == lab, 0, snow_mask)
-                logging.debug("Updating snow mask...Done")
-                logging.debug("End of processing area " + str(lab))
+    logging.debug("Compute the snow areas surrounded by clouds")
+    discarded_labels = compute_snow_labels_inside_cloud(snow_mask, cloud_mask, snow_labels, nb_label, struct,
+                                                        cloud_threshold, min_area_size)
+    discarded_snow_area = int(np.count_nonzero(discarded_labels))
+
+    # Discard snow areas where cloud_percent > threshold
+    logging.debug("Updating snow mask...")
+    snow_mask = np.where(discarded_labels[snow_labels], 0, snow_mask)
+    logging.debug("Updating snow mask...Done")
 
     logging.debug(str(discarded_snow_area) + ' labels entoures de nuages (sur ' + str(nb_label) + ' labels)')
 
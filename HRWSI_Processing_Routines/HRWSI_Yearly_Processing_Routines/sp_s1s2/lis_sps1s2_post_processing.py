@@ -28,6 +28,13 @@ class LisSpS2PostProcessing:
     ALGO_STATIC_OUTPUT_PREFIX_NAME = 'LIS_S2-SNOW'
     ALGO_OUTPUT_TMP_FOLDER_NAME = f'{ALGO_OUTPUT_FOLDER_NAME}/tmp'
 
+    # QC statistics are computed by windows of QC_STATS_WINDOW_SIZE x QC_STATS_WINDOW_SIZE pixels
+    QC_STATS_WINDOW_SIZE = 1024
+    QC_STATS_CREATION_OPTIONS = [
+        'TILED=YES', f'BLOCKXSIZE={QC_STATS_WINDOW_SIZE}', f'BLOCKYSIZE={QC_STATS_WINDOW_SIZE}',
+        'COMPRESS=DEFLATE', 'PREDICTOR=1', 'ZLEVEL=4'
+    ]
+
     BASE_WATER_MASK_FOLDER = 'water_mask'
     BASE_TCD_MASK_FOLDER = 'tcd'
     BASE_FUW_MASK_FOLDER = 'fuw'
@@ -318,99 +325,87 @@ class LisSpS2PostProcessing:
                 f'Missing files for LIS SP post processing. Missing files list: {name_list}'
             )
 
-    def calculate_qc_files_list_stats(self, qc_files_list):
+    @staticmethod
+    def accumulate_qc_counts(qc_counts, qc_block):
         '''
-        TODO
+        Add the occurrences of the QC values 0, 1, 2 and 3 of a block to qc_counts (4, block pixels)
+        in a single bincount, values above 3 being counted in a discarded fifth row.
         '''
-        qc_histo = np.array([])
-        qc_mean = np.array([])
-        valid_pixel_counter = np.array([])
-        for qc_file in qc_files_list:
-            ds = gdal.Open(qc_file)
-            band = ds.GetRasterBand(1)
-            if not qc_mean.any():
-                masked_band = band.ReadAsArray().astype(np.uint8)
-                valid_pixels = masked_band<=3
-                # In here we are storing the iterrations of 0, 1, 2, and 3.
-                qc_histo = np.zeros([masked_band.shape[0],
-                                      masked_band.shape[1],
-                                      4], dtype=np.uint8)
-                for value in range(4):
-                    qc_histo[:,:,value] += (masked_band==value).astype(np.uint8)
-                masked_band = masked_band*valid_pixels
-
-                valid_pixel_counter = valid_pixels.astype(np.uint8)
-                qc_mean = masked_band.astype(np.uint16)
-
-                del ds, band
-                continue
-            masked_band = band.ReadAsArray().astype(np.uint8)
-            for value in range(4):
-
-                qc_histo[:,:,value] = qc_histo[:,:,value] + (masked_band==value).astype(np.uint8)
-            valid_pixels = masked_band<=3
-            masked_band = masked_band*valid_pixels
-
-            valid_pixel_counter = valid_pixel_counter + valid_pixels.astype(np.uint8)
-            qc_mean = masked_band.astype(np.uint16) + qc_mean.astype(np.uint16)
-
-
-            del ds, band
-        qc_mean = qc_mean / valid_pixel_counter.astype(float)
-        qc_mean[valid_pixel_counter==0] = 255
-
-        input_raster = gdal.Open(qc_files_list[0])
-        (
-            input_col, input_row, _, input_driver,
-            input_geo_transform, input_projection
-        ) = LisSpS2PostProcessing.get_raster_info(input_raster)
-
-        print('calculate_qc_files_list_stats > write mean raster')
-        self.write_raster_from_ndarray(
-            raster_name = self.postprocessing_to_make_files['QCMEAN']['dst_suffix_name'],
-            data_array = qc_mean,
-            nb_col = input_col,
-            nb_row = input_row,
-            nb_band = 1,
-            driver = input_driver,
-            geo_transform = input_geo_transform,
-            projection = input_projection,
-            raster_data_type=gdal.GDT_Float32,
-            no_data_value=255
-        )
+        nb_pixel = qc_block.size
+        value_index = np.minimum(qc_block.ravel(), 4).astype(np.int64) * nb_pixel
+        value_index += np.arange(nb_pixel)
+        qc_counts += np.bincount(value_index, minlength=5*nb_pixel)[:4*nb_pixel].reshape(4, nb_pixel)
 
-        del input_raster, qc_mean
+    @staticmethod
+    def derive_qc_mean_median(qc_counts):
+        '''
+        Derive the mean and the median QC of each pixel from its QC counts (4, pixels),
+        255 where no QC value is valid.
+        '''
+        valid_pixel_counter = qc_counts.sum(axis=0)
+        no_valid_pixel = valid_pixel_counter == 0
 
-        qc_histo_sumed = np.zeros(qc_histo.shape)
-        for i in range(4):
-            qc_histo_sumed[:,:,i] = np.sum(qc_histo[:,:,:i+1], axis=2)
+        qc_sum = np.tensordot(np.arange(4), qc_counts, axes=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            qc_mean = qc_sum / valid_pixel_counter.astype(float)
+        qc_mean[no_valid_pixel] = 255
 
-        qc_histo_sumed = np.array([value * (qc_histo_sumed[:,:,value]>= valid_pixel_counter/2) +\
-                    255 * (qc_histo_sumed[:,:,value]<valid_pixel_counter/2) for value in range(4)])
-        qc_median = np.min(qc_histo_sumed, axis=0)
+        # The median is the first value whose cumulative count reaches half of the valid values
+        qc_cumulative_counts = np.cumsum(qc_counts, axis=0, out=qc_counts)
+        qc_median = np.argmax(2*qc_cumulative_counts >= valid_pixel_counter, axis=0).astype(np.float32)
+        qc_median[no_valid_pixel] = 255
+        return qc_mean, qc_median
 
-        # print('calculate_qc_files_list_stats > get input raster')
-        input_raster = gdal.Open(qc_files_list[0])
+    def calculate_qc_files_list_stats(self, qc_files_list):
+        '''
+        Write the mean and the median QC of the valid QC values (0 to 3) of the QC files.
+        The QC files are read once, window by window, so that memory is bounded by the window size.
+        '''
+        qc_raster_list = [gdal.Open(qc_file) for qc_file in qc_files_list]
         (
             input_col, input_row, _, input_driver,
             input_geo_transform, input_projection
-        ) = LisSpS2PostProcessing.get_raster_info(input_raster)
-
-        qc_median[valid_pixel_counter==0] = 255
+        ) = LisSpS2PostProcessing.get_raster_info(qc_raster_list[0])
 
-        print('calculate_qc_files_list_stats > write median raster')
-        self.write_raster_from_ndarray(
-            raster_name = self.postprocessing_to_make_files['QCMEDIAN']['dst_suffix_name'],
-            data_array = qc_median,
-            nb_col = input_col,
-            nb_row = input_row,
-            nb_band = 1,
-            driver = input_driver,
-            geo_transform = input_geo_transform,
-            projection = input_projection,
-            raster_data_type=gdal.GDT_Float32,
-            no_data_value=255
-        )
+        # Both layers are written as tiled and compressed GeoTIFF, with the window size as block size
+        output_raster_list = []
+        for file_key in ['QCMEAN', 'QCMEDIAN']:
+            output_raster = input_driver.Create(
+                os.path.join(
+                    self.workdir_path,
+                    self.product_folder_name,
+                    self.postprocessing_to_make_files[file_key]['dst_suffix_name']
+                ),
+                input_col,
+                input_row,
+                1,
+                gdal.GDT_Float32,
+                options=self.QC_STATS_CREATION_OPTIONS
+            )
+            output_raster.SetGeoTransform(input_geo_transform)
+            output_raster.SetProjection(input_projection)
+            output_raster.GetRasterBand(1).SetNoDataValue(255)
+            output_raster_list.append(output_raster)
+        qc_mean_band, qc_median_band = [output_raster.GetRasterBand(1) for output_raster in output_raster_list]
+
+        print('calculate_qc_files_list_stats > write mean and median rasters')
+        window_size = self.QC_STATS_WINDOW_SIZE
+        for y_off in range(0, input_row, window_size):
+            for x_off in range(0, input_col, window_size):
+                x_size = min(window_size, input_col - x_off)
+                y_size = min(window_size, input_row - y_off)
+                qc_counts = np.zeros((4, x_size*y_size), dtype=np.int64)
+                for qc_raster in qc_raster_list:
+                    qc_block = qc_raster.GetRasterBand(1).ReadAsArray(x_off, y_off, x_size, y_size).astype(np.uint8)
+                    LisSpS2PostProcessing.accumulate_qc_counts(qc_counts, qc_block)
+
+                qc_mean, qc_median = LisSpS2PostProcessing.derive_qc_mean_median(qc_counts)
+                qc_mean_band.WriteArray(qc_mean.reshape(y_size, x_size), x_off, y_off)
+                qc_median_band.WriteArray(qc_median.reshape(y_size, x_size), x_off, y_off)
+
+        qc_mean_band.FlushCache()
+        qc_median_band.FlushCache()
+        del qc_mean_band, qc_median_band, output_raster_list, qc_raster_list
 
     def make_lis_sps2_qcmean_qcmedian_layer(self):
         '''
@@ -686,6 +681,32 @@ class LisSpS2PostProcessing:
             raster.GetProjection()
         )
 
+    @staticmethod
+    def compute_qcod_qcmd(sco_ndarray, scm_ndarray, observation_iterator):
+        '''
+        Compute the QCOD (QCMD), the number of days between the SCO (SCM) and the closest input date
+        with an observation, from an iterator of (output date index, observed mask) read one date at a time.
+        65535 where the SCO (SCM) is not a valid date (>= 420) or has no observation.
+        '''
+        # Dates of snow onset and melt out, 65535 where they are not valid
+        sco_date = np.where(sco_ndarray < 420, sco_ndarray, 65535).astype(np.int32)
+        scm_date = np.where(scm_ndarray < 420, scm_ndarray, 65535).astype(np.int32)
+
+        qcod_ndarray = np.full(sco_date.shape, 65535, dtype=np.int32)
+        qcmd_ndarray = np.full(scm_date.shape, 65535, dtype=np.int32)
+        date_distance = np.empty(sco_date.shape, dtype=np.int32)
+
+        for date_index, observed in observation_iterator:
+            np.abs(np.subtract(sco_date, date_index, out=date_distance), out=date_distance)
+            np.minimum(qcod_ndarray, date_distance, out=qcod_ndarray, where=observed)
+
+            np.abs(np.subtract(scm_date, date_index, out=date_distance), out=date_distance)
+            np.minimum(qcmd_ndarray, date_distance, out=qcmd_ndarray, where=observed)
+
+        qcod_ndarray[sco_date>=420] = 65535
+        qcmd_ndarray[scm_date>=420] = 65535
+        return qcod_ndarray.astype(np.uint16), qcmd_ndarray.astype(np.uint16)
+
     def make_lis_sps2_qcod_qcmd_layer(self):
         '''
         TODO
@@ -719,39 +740,15 @@ class LisSpS2PostProcessing:
             scm_raster
         )
 
+        # The snow masks are read one band at a time
         with rasterio.open(sp_multitemp_snow_mask_src_complete_path, 'r') as multitemp_raster:
-            n = multitemp_raster.meta["count"]
-            multitemp_input_snow_mask_array = multitemp_raster.read(range(1,n+1))
-
-        sco_ndarray = np.array(sco_band.ReadAsArray())
-        qcod_ndarray = np.ones(sco_ndarray.shape, dtype=np.uint16)*65535
-
-        sco_date = np.array([sco_ndarray[i,j]
-                             if sco_ndarray[i,j]<420
-                             else 65535
-                             for i,j in np.ndindex(sco_ndarray.shape)]).reshape(sco_ndarray.shape)
-
-        scm_ndarray = np.array(scm_band.ReadAsArray())
-        qcmd_ndarray = np.ones(scm_ndarray.shape, dtype=np.uint16)*65535
-
-        scm_date = np.array([scm_ndarray[i,j]
-                             if scm_ndarray[i,j]<420
-                             else 65535
-                             for i,j in np.ndindex(scm_ndarray.shape)]).reshape(scm_ndarray.shape)
-
-        for i, date in enumerate(self.input_dates):
-            date_index = self.output_dates.index(date)
-            qcod_ndarray = np.min([qcod_ndarray,
-                                (multitemp_input_snow_mask_array[i,:,:] != 0)*abs(sco_date-date_index) +\
-                                65535*(multitemp_input_snow_mask_array[i,:,:] == 0)]
-                                ,axis=0)
-            qcmd_ndarray = np.min([qcmd_ndarray,
-                                   (multitemp_input_snow_mask_array[i,:,:] != 0)*abs(scm_date-date_index) +\
-                                   65535*(multitemp_input_snow_mask_array[i,:,:] == 0)]
-                                   ,axis=0)
-
-        qcod_ndarray[sco_date>=420] = 65535
-        qcmd_ndarray[scm_date>=420] = 65535
+            observation_iterator = (
+                (self.output_dates.index(date), multitemp_raster.read(i + 1) != 0)
+                for i, date in enumerate(self.input_dates)
+            )
+            qcod_ndarray, qcmd_ndarray = LisSpS2PostProcessing.compute_qcod_qcmd(
+                sco_band.ReadAsArray(), scm_band.ReadAsArray(), observation_iterator
+            )
 
         self.write_raster_from_ndarray(
             raster_name=f'{self.product_folder_name_final}_QCOD.tif',
@@ -93,20 +93,17 @@ def create_input(start_date: str,
     )
 
     # Connect to HRWSI database
-    conn, cur = HRWSIDatabaseApiManager.connect_to_database()
+    with HRWSIDatabaseApiManager.connection_to_database() as (_, cur):
 
-    # Identify new input
-    start_measurement_day = date_string_to_measurement_day(start_date)
-    end_measurement_day = date_string_to_measurement_day(end_date)
-    candidate_already_in_database_request = f"SELECT input_path FROM hrwsi.input i WHERE i.measurement_day >= {start_measurement_day} and i.measurement_day <= {end_measurement_day};"
-    new_input_tuple = Harvester.identify_new_candidate(cursor=cur, request=candidate_already_in_database_request, candidates_tuple=input_tuple, col_index_in_candidate=4)
+        # Identify new input
+        start_measurement_day = date_string_to_measurement_day(start_date)
+        end_measurement_day = date_string_to_measurement_day(end_date)
+        candidate_already_in_database_request = f"SELECT input_path FROM hrwsi.input i WHERE i.measurement_day >= {start_measurement_day} and i.measurement_day <= {end_measurement_day};"
+        new_input_tuple = Harvester.identify_new_candidate(cursor=cur, request=candidate_already_in_database_request, candidates_tuple=input_tuple, col_index_in_candidate=4)
 
-    # Add input
-    insert_input_request = "INSERT INTO hrwsi.input (processing_condition_name, date, tile, measurement_day, input_path, mission) VALUES ( %s, %s, %s, %s, %s, %s)"
-    cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, insert_input_request, new_input_tuple)
-
-    # Close connection
-    HRWSIDatabaseApiManager.commit_and_close_connection_to_database(conn, cur)
+        # Add input
+        insert_input_request = "INSERT INTO hrwsi.input (processing_condition_name, date, tile, measurement_day, input_path, mission) VALUES ( %s, %s, %s, %s, %s, %s)"
+        cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, insert_input_request, new_input_tuple)
 
 if __name__ == "__main__":
 
@@ -19,32 +19,26 @@ from HRWSI_System.harvester.apimanager.hrwsi_database_api_manager import HRWSIDa
 def create_product(product_type: list, process_time: str, start_day_input: int, end_day_input: int):
     """Create product associated to input and add in Database"""
 
-    # Connect to HRWSI database
-    conn, cur = HRWSIDatabaseApiManager.connect_to_database()
+    # Connect to HRWSI database, with a cursor converted in a dict
+    with HRWSIDatabaseApiManager.connection_to_database(psycopg2.extras.RealDictCursor) as (conn, cur):
 
-    # Convert cur in a dict
-    cur = conn.cursor(cursor_factory = psycopg2.extras.RealDictCursor)
+        # Collect inputs
+        collect_input_request = f"SELECT id, processing_condition_name, date, tile, measurement_day, input_path, mission, input_type FROM hrwsi.input i INNER JOIN hrwsi.processing_condition pc ON i.processing_condition_name = pc.name INNER JOIN hrwsi.processing_routine pr ON pr.name = pc.processing_routine_name WHERE i.measurement_day >= {start_day_input} AND i.measurement_day <= {end_day_input};"
+        cur = HRWSIDatabaseApiManager.execute_request_in_database(cur,collect_input_request)
 
-    # Collect inputs
-    collect_input_request = f"SELECT id, processing_condition_name, date, tile, measurement_day, input_path, mission, input_type FROM hrwsi.input i INNER JOIN hrwsi.processing_condition pc ON i.processing_condition_name = pc.name INNER JOIN hrwsi.processing_routine pr ON pr.name = pc.processing_routine_name WHERE i.measurement_day >= {start_day_input} AND i.measurement_day <= {end_day_input};"
-    cur = HRWSIDatabaseApiManager.execute_request_in_database(cur,collect_input_request)
+        # Construct product
+        product_tuple = construct_product(cur, product_type, process_time)
 
-    # Construct product
-    product_tuple = construct_product(cur, product_type, process_time)
+        # Convert cur in a tuple
+        cur = conn.cursor()
 
-    # Convert cur in a tuple
-    cur = conn.cursor()
+        # Identify new products
+        candidate_already_in_database_request = f"SELECT input_fk_id FROM hrwsi.products p INNER JOIN hrwsi.input i ON p.input_fk_id = i.id WHERE i.measurement_day >= {start_day_input} AND i.measurement_day <= {end_day_input}"
+        new_products_tuple = Harvester.identify_new_candidate(cursor=cur, request=candidate_already_in_database_request, candidates_tuple=product_tuple, col_index_in_candidate=0)
 
-    # Identify new products
-    candidate_already_in_database_request = f"SELECT input_fk_id FROM hrwsi.products p INNER JOIN hrwsi.input i ON p.input_fk_id = i.id WHERE i.measurement_day >= {start_day_input} AND i.measurement_day <= {end_day_input}"
-    new_products_tuple = Harvester.identify_new_candidate(cursor=cur, request=candidate_already_in_database_request, candidates_tuple=product_tuple, col_index_in_candidate=0)
-
-    # Add product
-    insert_product_request = "INSERT INTO hrwsi.products (input_fk_id, product_path, creation_date, catalogued_date, kpi_file_path, product_type_id) VALUES ( %s, %s, %s, %s, %s, %s)"
-    cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, insert_product_request, new_products_tuple)
-
-    # Close connection
-    HRWSIDatabaseApiManager.commit_and_close_connection_to_database(conn, cur)
+        # Add product
+        insert_product_request = "INSERT INTO hrwsi.products (input_fk_id, product_path, creation_date, catalogued_date, kpi_file_path, product_type_id) VALUES ( %s, %s, %s, %s, %s, %s)"
+        cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, insert_product_request, new_products_tuple)
 
 def construct_product_path(record: dict, procces_time_delta: datetime) -> str:
     """Construct the product path like that :
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Connection_pool module implements a thread safe pool of connections to HRWSI Database.
+The pool is shared by all the queries of a process (Harvester, Orchestrator and Launcher) through HRWSIDatabaseApiManager.
+"""
+import re
+import time
+import hashlib
+import threading
+import weakref
+import psycopg2
+import psycopg2.pool
+import psycopg2.extras
+
+class HRWSIConnectionPool():
+    """
+    Thread safe pool of connections to HRWSI Database.
+
+    Compared to psycopg2 ThreadedConnectionPool, getconn waits for a free connection instead of
+    raising PoolError when all the connections are used, checks the health of idle connections
+    before giving them and records the time spent waiting for a connection.
+    """
+
+    HEALTH_CHECK_REQUEST = "SELECT 1"
+
+    def __init__(self, minconn: int, maxconn: int, health_check_interval: float = 30, **connection_kwargs):
+
+        self.maxconn = maxconn
+        self.connection_kwargs = connection_kwargs
+        self.health_check_interval = health_check_interval
+        self.pool = psycopg2.pool.ThreadedConnectionPool(minconn, maxconn, **connection_kwargs)
+        self.slot_semaphore = threading.BoundedSemaphore(maxconn)
+        self.last_use_time_by_connection = weakref.WeakKeyDictionary()
+
+        # Metrics
+        self.metrics_lock = threading.Lock()
+        self.checkout_count = 0
+        self.total_wait_time = 0.
+        self.max_wait_time = 0.
+        self.broken_connection_count = 0
+
+    def getconn(self, timeout: float = None) -> psycopg2.extensions.connection:
+        """
+        Return a healthy connection, waiting at most timeout seconds (forever if None) for a free one.
+        Raise psycopg2.pool.PoolError if no connection is available in time.
+        """
+
+        start_time = time.perf_counter()
+        if not self.slot_semaphore.acquire(timeout=timeout):
+            raise psycopg2.pool.PoolError(f"No connection available in the pool after {timeout} s")
+        try:
+            conn = self._get_healthy_connection()
+        except BaseException:
+            self.slot_semaphore.release()
+            raise
+        wait_time = time.perf_counter() - start_time
+
+        with self.metrics_lock:
+            self.checkout_count += 1
+            self.total_wait_time += wait_time
+            self.max_wait_time = max(self.max_wait_time, wait_time)
+
+        return conn
+
+    def putconn(self, conn: psycopg2.extensions.connection, close: bool = False) -> None:
+        """Give back a connection to the pool, a broken connection is closed and will be replaced"""
+
+        self.last_use_time_by_connection[conn] = time.monotonic()
+        self.pool.putconn(conn, close=close or conn.closed != 0)
+        self.slot_semaphore.release()
+
+    def closeall(self) -> None:
+        """Close all the connections of the pool"""
+
+        self.pool.closeall()
+
+    def _get_healthy_connection(self) -> psycopg2.extensions.connection:
+        """Take connections in the pool until a healthy one is found, broken connections are discarded"""
+
+        # Each discarded connection is replaced by a new one, a new connection which is already broken means
+        # that the database is unreachable
+        for _ in range(self.maxconn + 1):
+            conn = self.pool.getconn()
+            if self._is_healthy(conn):
+                return conn
+            with self.metrics_lock:
+                self.broken_connection_count += 1
+            self.pool.putconn(conn, close=True)
+        raise psycopg2.OperationalError("Unable to get a healthy connection to HRWSI Database")
+
+    def _is_healthy(self, conn: psycopg2.extensions.connection) -> bool:
+        """
+        Check that a connection is still usable. Connections idle for more than health_check_interval seconds
+        (or never used) are checked with a light request.
+        """
+
+        if conn.closed:
+            return False
+        last_use_time = self.last_use_time_by_connection.get(conn)
+        if last_use_time is not None and time.monotonic() - last_use_time < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute(self.HEALTH_CHECK_REQUEST)
+            conn.rollback()
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            return False
+        return True
+
+    def get_metrics(self) -> dict:
+        """Return the pool wait time metrics"""
+
+        with self.metrics_lock:
+            return {
+                "checkout_count": self.checkout_count,
+                "total_wait_time": self.total_wait_time,
+                "mean_wait_time": self.total_wait_time / self.checkout_count if self.checkout_count else 0.,
+                "max_wait_time": self.max_wait_time,
+                "broken_connection_count": self.broken_connection_count
+            }
+
+
+class PreparedStatementRegistry():
+    """
+    Keep track of the server-side prepared statements of each connection.
+
+    A request is prepared the first time it is executed on a connection, the next executions only send
+    its name and its parameters. Prepared statements are dropped by the server with their session,
+    so they are forgotten when the connection is garbage collected.
+    """
+
+    def __init__(self):
+
+        self.statement_name_set_by_connection = weakref.WeakKeyDictionary()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def get_statement_name(request: str) -> str:
+        """Return a stable statement name for a request"""
+
+        return "hrwsi_" + hashlib.md5(request.encode("utf-8")).hexdigest()[:16]
+
+    @staticmethod
+    def to_prepared_request(request: str) -> tuple[str, int]:
+        """Replace %s placeholders by $1, $2, ... and return the request with its number of parameters"""
+
+        nb_parameter = 0
+        def _next_parameter(_) -> str:
+            nonlocal nb_parameter
+            nb_parameter += 1
+            return f"${nb_parameter}"
+        prepared_request = re.sub(r"%s", _next_parameter, request.strip().rstrip(";"))
+        return prepared_request, nb_parameter
+
+    def prepare(self, cur: psycopg2.extensions.cursor, request: str) -> tuple[str, int]:
+        """Prepare request on the cursor connection if needed and return its statement name and number of parameters"""
+
+        statement_name = self.get_statement_name(request)
+        prepared_request, nb_parameter = self.to_prepared_request(request)
+        with self.lock:
+            statement_name_set = self.statement_name_set_by_connection.setdefault(cur.connection, set())
+            is_prepared = statement_name in statement_name_set
+        if not is_prepared:
+            cur.execute(f"PREPARE {statement_name} AS {prepared_request}")
+            with self.lock:
+                statement_name_set.add(statement_name)
+        return statement_name, nb_parameter
+
+    def execute(self, cur: psycopg2.extensions.cursor, request: str, data_tuple: tuple[tuple] = None) -> psycopg2.extensions.cursor:
+        """Execute a request through its prepared statement, data_tuple rows are sent in batch"""
+
+        statement_name, nb_parameter = self.prepare(cur, request)
+        if data_tuple is not None:
+            parameters = ", ".join(["%s"] * nb_parameter)
+            psycopg2.extras.execute_batch(cur, f"EXECUTE {statement_name} ({parameters})", data_tuple)
+        else:
+            cur.execute(f"EXECUTE {statement_name}")
+        return cur
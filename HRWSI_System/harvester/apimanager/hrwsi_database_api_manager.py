@@ -5,6 +5,8 @@ HRWSI_database_api_manager module implements the method to interact with HRWSI D
 import sys
 import os
 import datetime
+import threading
+import contextlib
 import psycopg2
 import psycopg2.extras
 
@@ -13,6 +15,7 @@ ROOT_FOLDER = '/'.join(os.getcwd().split('nrt_production_system')[:-1])
 sys.path.append(ROOT_FOLDER+'nrt_production_system')
 
 from HRWSI_System.harvester.apimanager.api_manager import ApiManager
+from HRWSI_System.harvester.apimanager.connection_pool import HRWSIConnectionPool, PreparedStatementRegistry
 
 class HRWSIDatabaseApiManager(ApiManager):
     """Interact with HRWSI Database"""
@@ -20,13 +23,18 @@ class HRWSIDatabaseApiManager(ApiManager):
     PRODUCT_TYPE_ID_WHO_CAN_CREATE_INPUT_REQUEST = 'SELECT DISTINCT pt.id AS product_type_id FROM hrwsi.product_type pt LEFT JOIN hrwsi.processing_routine pr ON pr.input_type=pt.data_type WHERE pr.input_type is NOT NULL;'
     COLLECT_PRODUCTS_THAT_BECOME_INPUTS_REQUEST = "SELECT product_path, creation_date, tile, measurement_day, mission FROM hrwsi.products p INNER JOIN hrwsi.input i ON i.id = p.input_fk_id WHERE p.creation_date >= '%s' AND p.product_type_id IN %s;"
 
+    # Process-wide connection pool, created at the first connection
+    DEFAULT_MIN_CONNECTIONS = 1
+    DEFAULT_MAX_CONNECTIONS = 10
+    DEFAULT_HEALTH_CHECK_INTERVAL = 30
+    connection_pool = None
+    connection_pool_lock = threading.Lock()
+    prepared_statement_registry = PreparedStatementRegistry()
+
     def get_candidate_inputs(self) -> tuple[tuple]:
 
         self.logger.info("Begin get_candidate_inputs for HRWSI Database")
 
-        # Connect to Dtabase
-        conn, cur = HRWSIDatabaseApiManager.connect_to_database()
-
         # Today
         today = datetime.date.today()
 
@@ -34,25 +42,22 @@ class HRWSIDatabaseApiManager(ApiManager):
         limit_creation_date = datetime.timedelta(days=self.max_day_since_publication_date)
         begin_creation_date = today - limit_creation_date
 
-        # Convert cur in a dict
-        cur = conn.cursor(cursor_factory = psycopg2.extras.RealDictCursor)
-
-        # Collect code of product_type who can create input
-        cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, self.PRODUCT_TYPE_ID_WHO_CAN_CREATE_INPUT_REQUEST)
-        product_type_id = tuple(result["product_type_id"] for result in cur)
-        product_type_id = '(' + str(product_type_id[0]) + ')' if len(product_type_id)==1 else product_type_id
-        self.logger.debug("Product_type_id : %s", product_type_id)
+        # Connect to Dtabase, with a cursor converted in a dict
+        with HRWSIDatabaseApiManager.connection_to_database(psycopg2.extras.RealDictCursor) as (_, cur):
 
-        # Collects products created in the last 7 days and that can create inputs
-        collect_products_that_become_inputs_request = self.COLLECT_PRODUCTS_THAT_BECOME_INPUTS_REQUEST % (begin_creation_date, product_type_id)
-        cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, collect_products_that_become_inputs_request)
+            # Collect code of product_type who can create input
+            cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, self.PRODUCT_TYPE_ID_WHO_CAN_CREATE_INPUT_REQUEST, prepared=True)
+            product_type_id = tuple(result["product_type_id"] for result in cur)
+            product_type_id = '(' + str(product_type_id[0]) + ')' if len(product_type_id)==1 else product_type_id
+            self.logger.debug("Product_type_id : %s", product_type_id)
 
-        # Create input tuple
-        candidate_input_tuple = ()
-        candidate_input_tuple = self.create_input_tuple(cur, candidate_input_tuple)
+            # Collects products created in the last 7 days and that can create inputs
+            collect_products_that_become_inputs_request = self.COLLECT_PRODUCTS_THAT_BECOME_INPUTS_REQUEST % (begin_creation_date, product_type_id)
+            cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, collect_products_that_become_inputs_request)
 
-        # Close connection
-        HRWSIDatabaseApiManager.commit_and_close_connection_to_database(conn, cur)
+            # Create input tuple
+            candidate_input_tuple = ()
+            candidate_input_tuple = self.create_input_tuple(cur, candidate_input_tuple)
 
         self.logger.info("End get_candidate_inputs for HRWSI Database")
 
@@ -80,43 +85,147 @@ class HRWSIDatabaseApiManager(ApiManager):
         return candidate_input_tuple
 
     @staticmethod
-    def connect_to_database() -> tuple[psycopg2.extensions.connection, psycopg2.extensions.cursor]:
-        """ Function to enable connection to HRWSI Database"""
+    def create_connection_pool(dbname: str, user: str, password: str, host: str, port: int,
+                               min_connections: int = DEFAULT_MIN_CONNECTIONS,
+                               max_connections: int = DEFAULT_MAX_CONNECTIONS,
+                               health_check_interval: float = DEFAULT_HEALTH_CHECK_INTERVAL) -> HRWSIConnectionPool:
+        """Create the process-wide connection pool, the previous pool is closed"""
+
+        with HRWSIDatabaseApiManager.connection_pool_lock:
+            if HRWSIDatabaseApiManager.connection_pool is not None:
+                HRWSIDatabaseApiManager.connection_pool.closeall()
+            HRWSIDatabaseApiManager.connection_pool = HRWSIConnectionPool(
+                min_connections, max_connections, health_check_interval,
+                dbname=dbname, user=user, password=password, host=host, port=port)
+            return HRWSIDatabaseApiManager.connection_pool
+
+    @staticmethod
+    def get_connection_pool() -> HRWSIConnectionPool:
+        """Return the process-wide connection pool, it is created with the config file if it doesn't exist"""
+
+        if HRWSIDatabaseApiManager.connection_pool is None:
+            # Load config file
+            config_data = ApiManager.read_config_file()
+            database_config = config_data["database"]
+
+            with HRWSIDatabaseApiManager.connection_pool_lock:
+                if HRWSIDatabaseApiManager.connection_pool is None:
+                    HRWSIDatabaseApiManager.connection_pool = HRWSIConnectionPool(
+                        database_config.get("min_connections", HRWSIDatabaseApiManager.DEFAULT_MIN_CONNECTIONS),
+                        database_config.get("max_connections", HRWSIDatabaseApiManager.DEFAULT_MAX_CONNECTIONS),
+                        database_config.get("health_check_interval", HRWSIDatabaseApiManager.DEFAULT_HEALTH_CHECK_INTERVAL),
+                        dbname=database_config["dbname"],
+                        user=database_config["user"],
+                        password=database_config["password"],
+                        host=database_config["host"],
+                        port=database_config["port"])
+
+        return HRWSIDatabaseApiManager.connection_pool
+
+    @staticmethod
+    def close_connection_pool() -> None:
+        """Close all the connections of the process-wide connection pool"""
+
+        with HRWSIDatabaseApiManager.connection_pool_lock:
+            if HRWSIDatabaseApiManager.connection_pool is not None:
+                HRWSIDatabaseApiManager.connection_pool.closeall()
+                HRWSIDatabaseApiManager.connection_pool = None
+
+    @staticmethod
+    def get_connection_pool_metrics() -> dict:
+        """Return the wait time metrics of the process-wide connection pool"""
 
-        # Load config file
-        config_data = ApiManager.read_config_file()
+        return HRWSIDatabaseApiManager.get_connection_pool().get_metrics()
 
-        dbname = config_data["database"]["dbname"]
-        user = config_data["database"]["user"]
-        password = config_data["database"]["password"]
-        host = config_data["database"]["host"]
-        port = config_data["database"]["port"]
+    @staticmethod
+    def connect_to_database(cursor_factory: type = None) -> tuple[psycopg2.extensions.connection, psycopg2.extensions.cursor]:
+        """ Function to take a connection to HRWSI Database in the connection pool"""
 
-        conn = psycopg2.connect(dbname=dbname, user=user, password=password, host=host, port=port)
+        conn = HRWSIDatabaseApiManager.get_connection_pool().getconn()
 
         # Open a cursor to perform database operations
-        cur = conn.cursor()
+        try:
+            cur = conn.cursor(cursor_factory=cursor_factory)
+        except BaseException:
+            HRWSIDatabaseApiManager.get_connection_pool().putconn(conn, close=True)
+            raise
 
         return conn, cur
 
+    @staticmethod
+    @contextlib.contextmanager
+    def connection_to_database(cursor_factory: type = None):
+        """
+        Take a connection to HRWSI Database in the connection pool for a with block, yield (conn, cur).
+        The changes are committed at the end of the block, rolled back if it raises,
+        and the connection is given back to the connection pool in both cases.
+        """
+
+        conn, cur = HRWSIDatabaseApiManager.connect_to_database(cursor_factory)
+        try:
+            yield conn, cur
+        except BaseException:
+            HRWSIDatabaseApiManager.rollback_and_close_connection_to_database(conn, cur)
+            raise
+        HRWSIDatabaseApiManager.commit_and_close_connection_to_database(conn, cur)
+
+    @staticmethod
+    def connect_to_database_outside_pool() -> psycopg2.extensions.connection:
+        """Open a connection to HRWSI Database which isn't taken in the connection pool,
+        for a session kept open to listen to notifications"""
+
+        return psycopg2.connect(**HRWSIDatabaseApiManager.get_connection_pool().connection_kwargs)
+
     @staticmethod
     def commit_and_close_connection_to_database(conn: psycopg2.extensions.connection, cur: psycopg2.extensions.cursor) -> None:
-        """Commit the changes and close the connection with the database"""
+        """Commit the changes and give back the connection to the connection pool"""
+
+        try:
+            # Make the changes to the database persistent
+            conn.commit()
 
-        # Make the changes to the database persistent
-        conn.commit()
+            # Close communication with the database
+            cur.close()
+        finally:
+            HRWSIDatabaseApiManager.get_connection_pool().putconn(conn)
 
-        # Close communication with the database
-        cur.close()
-        conn.close()
+    @staticmethod
+    def rollback_and_close_connection_to_database(conn: psycopg2.extensions.connection, cur: psycopg2.extensions.cursor) -> None:
+        """Roll back the changes and give back the connection to the connection pool, it is closed if the rollback fails"""
+
+        is_broken = False
+        try:
+            conn.rollback()
+            cur.close()
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            is_broken = True
+        finally:
+            HRWSIDatabaseApiManager.get_connection_pool().putconn(conn, close=is_broken)
 
     @staticmethod
-    def execute_request_in_database(cur: psycopg2.extensions.cursor, request: str, data_tuple: tuple[tuple]=None) -> psycopg2.extensions.cursor:
-        """Execute a request in HRWSI Database"""
+    def execute_request_in_database(cur: psycopg2.extensions.cursor, request: str, data_tuple: tuple[tuple]=None, prepared: bool=False, parameters: tuple=None) -> psycopg2.extensions.cursor:
+        """
+        Execute a request in HRWSI Database.
+        parameters are the values of the %s placeholders of a single request.
+        With prepared=True the request must be a fixed SQL constant (with %s placeholders for data_tuple values),
+        it is then executed through a server-side prepared statement.
+        """
+        if prepared:
+            return HRWSIDatabaseApiManager.prepared_statement_registry.execute(cur, request, data_tuple)
         # If we want to insert (maybe many row) in database
         if data_tuple is not None :
             psycopg2.extras.execute_batch(cur, request, data_tuple)
         # Execute other request
         else:
-            cur.execute(request)
+            cur.execute(request, parameters)
+        return cur
+
+    @staticmethod
+    def insert_values_in_database(cur: psycopg2.extensions.cursor, request: str, data_tuple: tuple[tuple]) -> psycopg2.extensions.cursor:
+        """
+        Insert all the rows of data_tuple with a single "INSERT ... VALUES %s" request,
+        instead of one statement by row.
+        """
+        if data_tuple:
+            psycopg2.extras.execute_values(cur, request, data_tuple, page_size=len(data_tuple))
         return cur
@@ -5,8 +5,11 @@ Wekeo_api_manager module implements the method to interact with WEkEO API to ext
 import sys
 import os
 import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
 import yaml
 import requests
+from requests.adapters import HTTPAdapter
 
 # Authorizing other packages absolute import
 ROOT_FOLDER = '/'.join(os.getcwd().split('nrt_production_system')[:-1])
@@ -34,6 +37,13 @@ class WekeoApiManager(ApiManager):
         self.url = config_data["API"]["url"]
         self.nb_img_per_page = config_data["API"]["image_per_page"] # Limit max
         self.max_retries = config_data["API"]["max_retries"]
+        self.max_concurrent_pages = config_data["API"]["max_concurrent_pages"]
+        self.timeout = config_data["API"]["timeout"]
+
+        # Keep-alive connections shared by the page requests
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=self.max_concurrent_pages))
+        self.session.mount("http://", HTTPAdapter(pool_maxsize=self.max_concurrent_pages))
 
         if tile_list_file:
             try :
@@ -87,18 +97,40 @@ class WekeoApiManager(ApiManager):
     def get_candidate_inputs(self) -> tuple[tuple]:
         self.logger.info("Begin get_candidate_inputs for WEkEO API")
 
-        # Send request
+        # Send request and collect candidate of all the pages
         self.logger.debug("Request : %s", self.request)
-        content = self.send_request(self.request)
-
-        # Get candidate
-        candidate_input_tuple = ()
-        candidate_input_tuple = self.create_input_tuple(content, candidate_input_tuple)
+        candidate_input_list = []
+        for content in self.iter_pages():
+            candidate_input_list.extend(self.extract_candidate_inputs(content))
 
         self.logger.info("End get_candidate_inputs for WEkEO API")
-        return candidate_input_tuple
-
-    def send_request(self, request: str) -> bytes:
+        return tuple(candidate_input_list)
+
+    def iter_pages(self) -> Iterator[dict]:
+        """
+        Yield the content of each page of the request, in order.
+        The first page is requested with $count, the $skip offsets of the other pages are computed
+        from the total count and the pages are fetched concurrently by at most max_concurrent_pages threads.
+        If the API doesn't give the count, the @odata.nextLink of each page is followed.
+        """
+
+        content = self.send_request(self.request+"&$count=True")
+        yield content
+
+        if "@odata.count" not in content:
+            while '@odata.nextLink' in content:
+                nb = content['@odata.nextLink'].split("=")[-1]
+                content = self.send_request(self.request+f"&$skip={nb}")
+                yield content
+            return
+
+        nb_result = int(content["@odata.count"])
+        skip_list = range(self.nb_img_per_page, nb_result, self.nb_img_per_page)
+        self.logger.debug("%s results, %s pages to collect", nb_result, len(skip_list) + 1)
+        with ThreadPoolExecutor(max_workers=self.max_concurrent_pages) as executor:
+            yield from executor.map(lambda skip: self.send_request(self.request+f"&$skip={skip}"), skip_list)
+
+    def send_request(self, request: str) -> dict:
         """Send request to Wekeo API and keep the json of the result"""
 
         self.logger.info("Begin send_request to Wekeo API")
@@ -106,7 +138,8 @@ class WekeoApiManager(ApiManager):
         # Return exception if server fails to send response data
         for _ in range(self.max_retries):
             try:
-                r = requests.get(self.url, params=request, timeout=30)
+                r = self.session.get(self.url, params=request, timeout=self.timeout)
+                break
             except requests.exceptions.Timeout:
                 self.logger.error("Time out")
                 continue
@@ -119,35 +152,46 @@ class WekeoApiManager(ApiManager):
             except requests.exceptions.RequestException as e:
                 self.logger.critical("Something else went wrong with requests.get")
                 raise SystemExit(e) from e
+        else:
+            self.logger.critical("No response from Wekeo API after %s attempts.", self.max_retries)
+            raise SystemExit(f"No response from Wekeo API after {self.max_retries} attempts")
         content = r.json()
 
         self.logger.info("End send_request to Wekeo API")
 
         return content
 
-    def create_input_tuple(self, content: dict, candidate_input_tuple: tuple[tuple]) -> tuple[tuple]:
-        """Create tuple of input thanks to the request result"""
-
-        self.logger.info("Begin create tuple to Wekeo API")
+    def extract_candidate_inputs(self, content: dict) -> list[tuple]:
+        """Return the list of candidate inputs of one page of the request result"""
 
-        # Create tuple with candidate
-        for i in range (len(content['value'])):
-            data_name_split = content['value'][i]['Name'].split("_")
+        candidate_input_list = []
+        for value in content['value']:
+            data_name_split = value['Name'].split("_")
             mission = data_name_split[0][:2]
             measurement_day = int(data_name_split[2].split("T")[0])
             tile = data_name_split[5]
-            date = content['value'][i]['ContentDate']['Start']
-            path = content['value'][i]['S3Path']
+            date = value['ContentDate']['Start']
+            path = value['S3Path']
             if (self.tile_list and tile in self.tile_list) or not self.tile_list:
-                candidate_input_tuple = candidate_input_tuple + ((self.processing_condition_name, date, tile, measurement_day, path, mission),)
+                candidate_input_list.append((self.processing_condition_name, date, tile, measurement_day, path, mission))
+        return candidate_input_list
+
+    def create_input_tuple(self, content: dict, candidate_input_tuple: tuple[tuple]) -> tuple[tuple]:
+        """Create tuple of input thanks to the request result, following the @odata.nextLink of each page"""
+
+        self.logger.info("Begin create tuple to Wekeo API")
+
+        # Create list with candidate
+        candidate_input_list = list(candidate_input_tuple)
+        candidate_input_list.extend(self.extract_candidate_inputs(content))
 
         # Add candidate in the others pages of the request if there exist
-        if '@odata.nextLink' in content:
+        while '@odata.nextLink' in content:
             next_page = content['@odata.nextLink']
             nb = next_page.split("=")[-1]
             content = self.send_request(self.request+f"&$skip={nb}")
-            candidate_input_tuple = self.create_input_tuple(content, candidate_input_tuple)
+            candidate_input_list.extend(self.extract_candidate_inputs(content))
 
         self.logger.info("End create tuple to Wekeo API")
 
-        return candidate_input_tuple
+        return tuple(candidate_input_list)
@@ -24,11 +24,11 @@ class Harvester():
     """Define a harvester"""
 
     LOGGER_LEVEL = logging.DEBUG
-    INSERT_CANDIDATE_REQUEST = "INSERT INTO hrwsi.input (processing_condition_name, date, tile, measurement_day, input_path, mission) VALUES ( %s, %s, %s, %s, %s, %s)"
+    INSERT_CANDIDATE_REQUEST = "INSERT INTO hrwsi.input (processing_condition_name, date, tile, measurement_day, input_path, mission) VALUES ( %s, %s, %s, %s, %s, %s) ON CONFLICT DO NOTHING"
     LISTEN_REQUEST = "LISTEN processing_tasks_state_processed"
     PRODUCT_DATA_TYPE_OF_RUNNING_PROCESSING_TASKS_REQUEST = 'SELECT get_product_data_type_of_processing_tasks_not_ended FROM hrwsi.get_product_data_type_of_processing_tasks_not_ended();'
     INPUT_TYPE_LIST_REQUEST = 'SELECT DISTINCT input_type FROM hrwsi.processing_routine;'
-    CANDIDATE_ALREADY_IN_DATABASE_REQUEST = "SELECT input_path FROM hrwsi.input i WHERE i.measurement_day>=%s;"
+    NEW_CANDIDATE_PATH_REQUEST = "SELECT c.input_path FROM unnest(%s::text[]) AS c(input_path) WHERE NOT EXISTS (SELECT 1 FROM hrwsi.input i WHERE i.input_path=c.input_path AND i.measurement_day>=%s);"
     PROCESSING_TASK_UNPROCESSED_REQUEST = "SELECT count(task_id) FROM (SELECT pt.input_fk_id AS task_id FROM hrwsi.processing_tasks pt WHERE pt.creation_date>'%s') AS x, hrwsi.is_one_processing_task_processed_for_an_input(task_id) WHERE is_one_processing_task_processed_for_an_input=false;"
 
     def __init__(self, request_list:list[ApiManager] = None):
@@ -67,27 +67,23 @@ class Harvester():
         self.logger.debug("Deltaday furthest date : %s", deltaday_furthest_date)
 
         # Connect to HRWSI. database
-        conn, cur = HRWSIDatabaseApiManager.connect_to_database()
+        with HRWSIDatabaseApiManager.connection_to_database() as (_, cur):
 
-        # Identify new candidate
-        self.logger.info("Begin identify_new_candidate")
+            # Identify new candidate
+            self.logger.info("Begin identify_new_candidate")
 
-        deltaday_furthest_date = datetime.timedelta(days=deltaday_furthest_date)
-        today = datetime.date.today()
-        furthest_date = (today - deltaday_furthest_date).strftime("%Y%m%d")
-        self.logger.debug("Furthest_date : %s", furthest_date)
-
-        candidate_already_in_database_request = self.CANDIDATE_ALREADY_IN_DATABASE_REQUEST % (furthest_date)
-        new_input_tuple = Harvester.identify_new_candidate(cur, candidate_already_in_database_request, all_candidates_tuple, 4)
-        self.logger.info("End identify_new_candidate")
+            deltaday_furthest_date = datetime.timedelta(days=deltaday_furthest_date)
+            today = datetime.date.today()
+            furthest_date = (today - deltaday_furthest_date).strftime("%Y%m%d")
+            self.logger.debug("Furthest_date : %s", furthest_date)
 
-        self.logger.debug("New input tuple : %s", new_input_tuple)
+            new_input_tuple = Harvester.identify_new_candidate_with_anti_join(cur, self.NEW_CANDIDATE_PATH_REQUEST, all_candidates_tuple, 4, (int(furthest_date),))
+            self.logger.info("End identify_new_candidate")
 
-        # Add new input in database
-        cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, self.INSERT_CANDIDATE_REQUEST, new_input_tuple)
+            self.logger.debug("New input tuple : %s", new_input_tuple)
 
-        # Close connection
-        HRWSIDatabaseApiManager.commit_and_close_connection_to_database(conn, cur)
+            # Add new input in database
+            cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, self.INSERT_CANDIDATE_REQUEST, new_input_tuple, prepared=True)
 
         self.logger.info("End harvest input")
 
@@ -118,19 +114,13 @@ class Harvester():
                             max_day_since_publication_date=pc["max_day_since_publication_date"])
             for pc in config_data["hrwsi_database_api_manager"]]
 
-        # Connect to Database
-        conn, cur = HRWSIDatabaseApiManager.connect_to_database()
+        # Connect to Database, with a cursor converted in a dict
+        with HRWSIDatabaseApiManager.connection_to_database(psycopg2.extras.RealDictCursor) as (_, cur):
 
-        # Convert cur in a dict
-        cur = conn.cursor(cursor_factory = psycopg2.extras.RealDictCursor)
-
-        # Collect list of input type in Database
-        cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, self.INPUT_TYPE_LIST_REQUEST)
-        self.input_type_list = [result["input_type"] for result in cur]
-        self.logger.debug("Input type list %s", self.input_type_list)
-
-        # Close connection
-        HRWSIDatabaseApiManager.commit_and_close_connection_to_database(conn, cur)
+            # Collect list of input type in Database
+            cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, self.INPUT_TYPE_LIST_REQUEST, prepared=True)
+            self.input_type_list = [result["input_type"] for result in cur]
+            self.logger.debug("Input type list %s", self.input_type_list)
 
         # Initialize last_notification_time
         self.last_notification_time = datetime.datetime.now()
@@ -143,8 +133,8 @@ class Harvester():
 
         nest_asyncio.apply() # Correct that : by design asyncio does not allow its event loop to be nested
 
-        # Connect to Database
-        conn, cur = HRWSIDatabaseApiManager.connect_to_database()
+        # Dedicated connection, kept open to listen to the channel
+        conn = HRWSIDatabaseApiManager.connect_to_database_outside_pool()
 
         # Convert cur in a dict
         cur = conn.cursor(cursor_factory = psycopg2.extras.RealDictCursor)
@@ -173,6 +163,7 @@ class Harvester():
             loop.run_until_complete(loop.shutdown_asyncgens())
             # Ended the loop
             loop.close()
+            conn.close()
             self.logger.info("End create_loop")
 
     async def verify_notification_time(self, conn: psycopg2.extensions.connection, cur: psycopg2.extensions.cursor, loop: asyncio.AbstractEventLoop) -> None:
@@ -233,7 +224,7 @@ class Harvester():
 
         self.logger.info("Begin check_running_processing_tasks_product_can_create_input")
 
-        cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, self.PRODUCT_DATA_TYPE_OF_RUNNING_PROCESSING_TASKS_REQUEST)
+        cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, self.PRODUCT_DATA_TYPE_OF_RUNNING_PROCESSING_TASKS_REQUEST, prepared=True)
         product_data_type_list = [result["get_product_data_type_of_processing_tasks_not_ended"] for result in cur]
         self.logger.debug("List of product data type of running processing tasks : %s", product_data_type_list)
 
@@ -252,11 +243,28 @@ class Harvester():
         """Verify that tuple are not already in input table and return only new input tuple"""
 
         cur = HRWSIDatabaseApiManager.execute_request_in_database(cursor, request)
-        candidate_in_database = [result[0] for result in cur]
+        candidate_in_database = {result[0] for result in cur}
         new_tuple = tuple(tuples for tuples in candidates_tuple if tuples[col_index_in_candidate] not in candidate_in_database)
 
         return new_tuple
 
+    @staticmethod
+    def identify_new_candidate_with_anti_join(cursor: psycopg2.extensions.cursor, request: str, candidates_tuple: tuple[tuple], col_index_in_candidate: int, parameters: tuple = ()) -> tuple[tuple]:
+        """
+        Verify that tuple are not already in database and return only new tuple.
+        The candidate keys are sent as an array to request (first %s placeholder, followed by parameters)
+        which must return the keys not found in database: only these keys come back from the database.
+        """
+
+        candidate_key_list = list({tuples[col_index_in_candidate] for tuples in candidates_tuple})
+        if not candidate_key_list:
+            return ()
+        cur = HRWSIDatabaseApiManager.execute_request_in_database(cursor, request, parameters=(candidate_key_list,) + tuple(parameters))
+        new_candidate_key_set = {result[0] for result in cur}
+        new_tuple = tuple(tuples for tuples in candidates_tuple if tuples[col_index_in_candidate] in new_candidate_key_set)
+
+        return new_tuple
+
 
 if __name__ == "__main__":
 
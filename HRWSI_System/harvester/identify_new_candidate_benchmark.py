@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Identify_new_candidate_benchmark module compares the ways to find the candidate inputs not already in the input table:
+- the former list lookup (candidate not in list of all the input paths),
+- the hashed set lookup of Harvester.identify_new_candidate,
+- the server-side anti-join of Harvester.identify_new_candidate_with_anti_join, when a PostgreSQL server is given.
+
+Usage (from the project root):
+    python3 HRWSI_System/harvester/identify_new_candidate_benchmark.py [--dsn "host=localhost port=5432 dbname=postgres user=postgres"]
+"""
+import os
+import sys
+import time
+import argparse
+import psycopg2
+# Authorizing other packages absolute import
+ROOT_FOLDER = '/'.join(os.getcwd().split('nrt_production_system')[:-1])
+sys.path.append(ROOT_FOLDER+'nrt_production_system')
+
+from HRWSI_System.harvester.harvester import Harvester
+
+MEASUREMENT_DAY = 20240101
+
+def create_input_path(i: int) -> str:
+    """Return a realistic input path"""
+
+    return f"/eodata/Sentinel-2/MSI/L1C/2024/01/01/S2A_MSIL1C_20240101T105621_N0510_R094_T31U{i:07d}_20240101T130002.SAFE"
+
+def create_candidates_tuple(nb_existing: int, nb_candidate: int) -> tuple[tuple]:
+    """Half of the candidates are already in the input table"""
+
+    return tuple(
+        ("GRS_PC", "2024-01-01T10:56:21.024Z", "T31UDQ", MEASUREMENT_DAY,
+         create_input_path(i * 2 if i % 2 else nb_existing + i), "S2")
+        for i in range(nb_candidate))
+
+def benchmark_python_lookup(nb_existing: int, nb_candidate: int) -> None:
+    """Time the list and the set lookups, the request result being already in memory"""
+
+    existing_path_list = [(create_input_path(i),) for i in range(nb_existing)]
+    candidates_tuple = create_candidates_tuple(nb_existing, nb_candidate)
+
+    start = time.perf_counter()
+    candidate_in_database = {result[0] for result in existing_path_list}
+    set_result = tuple(c for c in candidates_tuple if c[4] not in candidate_in_database)
+    set_time = time.perf_counter() - start
+    print(f"set lookup    : {nb_existing} existing, {nb_candidate} candidates in {set_time:.3f} s")
+
+    # The list lookup is quadratic, it is timed on a subset of the candidates and extrapolated
+    nb_candidate_subset = min(nb_candidate, 200)
+    start = time.perf_counter()
+    candidate_in_database = [result[0] for result in existing_path_list]
+    list_result = tuple(c for c in candidates_tuple[:nb_candidate_subset] if c[4] not in candidate_in_database)
+    list_time = (time.perf_counter() - start) * nb_candidate / nb_candidate_subset
+    print(f"list lookup   : {nb_existing} existing, {nb_candidate} candidates in {list_time:.1f} s (extrapolated from {nb_candidate_subset} candidates)")
+
+    assert list_result == set_result[:len(list_result)]
+
+def benchmark_anti_join(dsn: str, nb_existing: int, nb_candidate: int) -> None:
+    """Time the former full fetch of the input paths and the anti-join on a temporary input table"""
+
+    conn = psycopg2.connect(dsn)
+    cur = conn.cursor()
+    cur.execute("CREATE TEMPORARY TABLE input (id bigserial, measurement_day bigint NOT null, input_path text)")
+    cur.execute("INSERT INTO input (measurement_day, input_path) SELECT %s, '/eodata/Sentinel-2/MSI/L1C/2024/01/01/S2A_MSIL1C_20240101T105621_N0510_R094_T31U' || lpad(i::text, 7, '0') || '_20240101T130002.SAFE' FROM generate_series(0, %s) AS i",
+                (MEASUREMENT_DAY, nb_existing - 1))
+    cur.execute("CREATE INDEX ON input (input_path, measurement_day)")
+    cur.execute("ANALYZE input")
+    candidates_tuple = create_candidates_tuple(nb_existing, nb_candidate)
+
+    # Temporary table hides hrwsi.input in the requests
+    full_fetch_request = "SELECT input_path FROM input i WHERE i.measurement_day>=%s;" % MEASUREMENT_DAY
+    anti_join_request = Harvester.NEW_CANDIDATE_PATH_REQUEST.replace("hrwsi.input", "input")
+
+    start = time.perf_counter()
+    full_fetch_result = Harvester.identify_new_candidate(cur, full_fetch_request, candidates_tuple, 4)
+    full_fetch_time = time.perf_counter() - start
+    print(f"full fetch    : {nb_existing} existing, {nb_candidate} candidates in {full_fetch_time:.3f} s")
+
+    start = time.perf_counter()
+    anti_join_result = Harvester.identify_new_candidate_with_anti_join(cur, anti_join_request, candidates_tuple, 4, (MEASUREMENT_DAY,))
+    anti_join_time = time.perf_counter() - start
+    print(f"anti-join     : {nb_existing} existing, {nb_candidate} candidates in {anti_join_time:.3f} s")
+
+    assert full_fetch_result == anti_join_result
+    conn.rollback()
+    conn.close()
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Benchmark the identification of new candidate inputs")
+    parser.add_argument("--nb-existing", type=int, default=1_000_000)
+    parser.add_argument("--nb-candidate", type=int, default=10_000)
+    parser.add_argument("--dsn", help="PostgreSQL connection string, the anti-join isn't benchmarked without it")
+    args = parser.parse_args()
+
+    benchmark_python_lookup(args.nb_existing, args.nb_candidate)
+    if args.dsn:
+        benchmark_anti_join(args.dsn, args.nb_existing, args.nb_candidate)
@@ -6,9 +6,7 @@ import os
 import sys
 import logging
 import datetime
-import subprocess
 import asyncio
-import nest_asyncio
 import psycopg2
 import psycopg2.extras
 # Authorizing other packages absolute import
@@ -18,6 +16,7 @@ sys.path.append(ROOT_FOLDER+'nrt_production_system')
 from utils.logger import LogUtil
 from HRWSI_System.harvester.apimanager.api_manager import ApiManager
 from HRWSI_System.harvester.apimanager.hrwsi_database_api_manager import HRWSIDatabaseApiManager
+from HRWSI_System.launcher.nomad_dispatcher import NomadJobDispatcher, NomadJobSubmissionError
 
 class Launcher():
     """Launch processing task execution"""
@@ -26,6 +25,7 @@ class Launcher():
     PROCESSING_TASKS_READY_TO_LAUNCH_REQUEST = 'SELECT id, input_fk_id, virtual_machine_id, creation_date, preceding_input_id, nomad_job_id, has_ended, intermediate_files_path FROM hrwsi.processing_tasks pt, hrwsi.get_ids_of_processing_tasks_ready_to_be_launched() WHERE pt.id=get_ids_of_processing_tasks_ready_to_be_launched;'
     NB_OF_PROCESSING_TASKS_NOT_FINISHED_REQUEST = 'SELECT count(id) FROM hrwsi.get_processing_tasks_not_finished();'
     INSERT_NOMAD_JOB_REQUEST = "INSERT INTO hrwsi.nomad_job_dispatch (processing_task_fk_id, nomad_job_dispatch, dispatch_date, log_path) VALUES (%s, %s, %s, %s)"
+    DELETE_NOMAD_JOB_REQUEST = "DELETE FROM hrwsi.nomad_job_dispatch WHERE id = ANY(%s);"
     INSERT_PROCESSING_STATUS_REQUEST = "INSERT INTO hrwsi.processing_status_workflow (nomad_job_dispatch_fk_id, processing_status_id, date) VALUES (%s, %s, %s)"
     NOMAD_JOB_WITHOUT_PROCESSING_STATUS_REQUEST = "SELECT njd.id FROM hrwsi.nomad_job_dispatch njd LEFT JOIN hrwsi.processing_status_workflow psw ON psw.nomad_job_dispatch_fk_id=njd.id WHERE psw.id is NULL;"
     HCL_INFO_REQUEST = "SELECT pr.docker_image, subquery.name, subquery.pt_id, subquery.nomad_id FROM hrwsi.processing_routine pr INNER JOIN hrwsi.processing_condition pc ON pr.name = pc.processing_routine_name INNER JOIN hrwsi.input i ON i.processing_condition_name = pc.name INNER JOIN ( SELECT pt.input_fk_id, vm.name, pt.id AS pt_id, njd.id AS nomad_id FROM hrwsi.processing_tasks pt INNER JOIN hrwsi.virtual_machine vm ON pt.virtual_machine_id = vm.id INNER JOIN hrwsi.nomad_job_dispatch njd ON njd.processing_task_fk_id = pt.id WHERE pt.id IN (%s) ) subquery ON subquery.input_fk_id = i.id;"
@@ -39,6 +39,13 @@ class Launcher():
         self.waiting_seconds = config_data["launcher_waiting_time"]["waiting_seconds"]
         self.logger = LogUtil.get_logger('Log_launcher', self.LOGGER_LEVEL, "log_launcher/logs.log")
         self.new_input = False
+        self.nomad_dispatcher = NomadJobDispatcher(address=config_data["nomad"]["address"],
+                                                   max_concurrency=config_data["nomad"]["max_concurrency"],
+                                                   max_retries=config_data["nomad"]["max_retries"],
+                                                   retry_backoff_seconds=config_data["nomad"]["retry_backoff_seconds"],
+                                                   timeout=config_data["nomad"]["timeout"],
+                                                   token=config_data["nomad"].get("token"),
+                                                   logger=self.logger)
 
     def run(self) -> None:
         """
@@ -48,16 +55,18 @@ class Launcher():
         - create and associate Nomad job
         """
 
+        # The Launcher is run again by the Orchestrator after each scheduling, the former input insertion is handled
+        self.new_input = False
+
         # Create waiting loop
         self.create_loop()
 
     def create_loop(self) -> None:
         """Create a loop to wait"""
 
-        nest_asyncio.apply() # Correct that : by design asyncio does not allow its event loop to be nested
-
-        # Connect to Database
-        conn, cur = HRWSIDatabaseApiManager.connect_to_database()
+        # Dedicated connection, kept open to listen to the channel
+        conn = HRWSIDatabaseApiManager.connect_to_database_outside_pool()
+        cur = conn.cursor()
 
         # Listen channel
         cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, self.LISTEN_REQUEST)
@@ -69,7 +78,9 @@ class Launcher():
         self.logger.info("Begin create_loop")
 
         # Wait for notification
-        loop = asyncio.get_event_loop()
+        # The Launcher runs in the Orchestrator scheduling thread, which has no event loop
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
         loop.add_reader(conn, self.handle_notify, conn)
 
         # Add task to execute workflow each m minutes
@@ -84,7 +95,12 @@ class Launcher():
             # Cancel task
             task.cancel()
             loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.remove_reader(conn)
             # Ended the loop
+            loop.close()
+            conn.close()
+            # The keep-alive connections to Nomad are closed, the session opens new ones at the next run
+            self.nomad_dispatcher.close()
             self.logger.info("End create_loop")
 
     def handle_notify(self, conn) -> None:
@@ -109,10 +125,12 @@ class Launcher():
 
             # Collect processing tasks ready to lauch
             self.logger.info("Collect processing tasks")
-            cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, self.PROCESSING_TASKS_READY_TO_LAUNCH_REQUEST)
+            cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, self.PROCESSING_TASKS_READY_TO_LAUNCH_REQUEST, prepared=True)
 
             # Create Nomad_job_dispatch
-            self.create_nomad_job(cur, conn)
+            failed_pt_id_list = self.create_nomad_job(cur, conn)
+            if failed_pt_id_list:
+                self.logger.warning("Processing tasks not launched, they are launched again at the next poll : %s", failed_pt_id_list)
 
             # Create processing status workflow for new Nomad job dispatch
             self.create_processing_status_workflow_for_new_nomad_job(cur, conn)
@@ -122,8 +140,13 @@ class Launcher():
         # Stop the loop
         loop.stop()
 
-    def create_nomad_job(self, cur: psycopg2.extensions.cursor, conn: psycopg2.extensions.connection) -> None:
-        """Create nomad job dispatch of processing tasks and add in Database"""
+    def create_nomad_job(self, cur: psycopg2.extensions.cursor, conn: psycopg2.extensions.connection) -> list[int]:
+        """
+        Create nomad job dispatch of processing tasks and add in Database.
+        The Nomad job dispatches of the jobs Nomad didn't register are deleted, so that they get no processing status
+        and their processing tasks are still ready to be launched at the next poll.
+        Return the ids of these processing tasks.
+        """
 
         self.logger.info("Begin create Nomad job dispatch")
         nomad_job_tuples = tuple(
@@ -139,11 +162,14 @@ class Launcher():
 
         # Add in Database
         # TODO change nomad_job_id in processing_tasks ?
-        cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, self.INSERT_NOMAD_JOB_REQUEST, nomad_job_tuples)
+        cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, self.INSERT_NOMAD_JOB_REQUEST, nomad_job_tuples, prepared=True)
         conn.commit()
 
-        # Create hcl file to nomad only new nomad job are created
+        # Create job specification to nomad only new nomad job are created
         nomad_job_pt_id = [nomad_job[0] for nomad_job in nomad_job_tuples]
+        job_spec_list = []
+        nomad_job_dispatch_id_by_job_id = {}
+        pt_id_by_job_id = {}
         # Collect worker and docker image of routine for each new nomad job dispatch
         for nomad_job_pt in nomad_job_pt_id:
             self.logger.debug("Nomad job pt id : %s", nomad_job_pt)
@@ -151,14 +177,13 @@ class Launcher():
             self.logger.debug("hcl_info_request : %s", hcl_info_request)
             cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, hcl_info_request)
 
-            for result in cur :
-                # Create hcl file for each pt
+            for result in cur.fetchall():
+                # Create job specification for each pt
                 pt_id = result["pt_id"]
-                file_path = f"nomad_job/pt_id_{pt_id}.hcl"
                 now = datetime.datetime.now()
                 (product_path, input_id, product_type_id, input_path) = Launcher.construct_product_path(cur, conn, pt_id, now)
                 # TODO change to docker_image=result["docker_image"], yaml_path
-                self.create_hcl_file(file_path=file_path, worker_name=result["name"],
+                job_spec_list.append(self.create_job_spec(worker_name=result["name"],
                                     docker_image="redacted/eea_hr-wsi/nrt_production_system/testimage",
                                     yaml_path="/home/eouser/delay/delay.yaml",
                                     processing_task_id=str(pt_id),
@@ -166,16 +191,23 @@ class Launcher():
                                     product_path = product_path,
                                     input_id = input_id,
                                     product_type_id = product_type_id,
-                                    input_path = input_path)
-                print(result["docker_image"])
-
-                # Run hcl file
-                self.execute_nomad_job(file_path)
-
-                # Delete hcl file
-                self.delete_hcl_file(file_path)
+                                    input_path = input_path))
+                job_id = job_spec_list[-1]["ID"]
+                nomad_job_dispatch_id_by_job_id[job_id] = result["nomad_id"]
+                pt_id_by_job_id[job_id] = pt_id
+                self.logger.debug("Docker image : %s", result["docker_image"])
+
+        # Submit all the jobs to Nomad
+        submission_result_by_job_id = self.nomad_dispatcher.submit_jobs(job_spec_list)
+        failed_job_id_list = [job_id for job_id, result in submission_result_by_job_id.items() if isinstance(result, NomadJobSubmissionError)]
+        if failed_job_id_list:
+            self.logger.error("Nomad jobs not submitted : %s", failed_job_id_list)
+            failed_nomad_job_dispatch_id_list = [nomad_job_dispatch_id_by_job_id[job_id] for job_id in failed_job_id_list]
+            cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, self.DELETE_NOMAD_JOB_REQUEST, parameters=(failed_nomad_job_dispatch_id_list,))
+            conn.commit()
 
         self.logger.info("End create Nomad job dispatch")
+        return [pt_id_by_job_id[job_id] for job_id in failed_job_id_list]
 
     def create_processing_status_workflow_for_new_nomad_job(self, cur: psycopg2.extensions.cursor, conn: psycopg2.extensions.connection) -> None:
         """Collect Nomad job without Processing status workflow and create them"""
@@ -183,7 +215,7 @@ class Launcher():
         self.logger.info("Begin create Processing status workflow")
 
         # Collect Nomad job without Processing status workflow
-        cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, self.NOMAD_JOB_WITHOUT_PROCESSING_STATUS_REQUEST)
+        cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, self.NOMAD_JOB_WITHOUT_PROCESSING_STATUS_REQUEST, prepared=True)
 
         # Create corresponding Processing status workflow
         status = 1 # started
@@ -199,7 +231,7 @@ class Launcher():
         self.logger.debug("Processing status workflow tuple : %s", processing_status_tuples)
 
         # Add in Database
-        cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, self.INSERT_PROCESSING_STATUS_REQUEST, processing_status_tuples)
+        cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, self.INSERT_PROCESSING_STATUS_REQUEST, processing_status_tuples, prepared=True)
         conn.commit()
 
         self.logger.info("End create Processing status workflow")
@@ -211,7 +243,7 @@ class Launcher():
         self.logger.info("Begin check_all_processing_tasks_has_not_ended")
 
         # Collect the number of processing tasks not finished
-        cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, self.NB_OF_PROCESSING_TASKS_NOT_FINISHED_REQUEST)
+        cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, self.NB_OF_PROCESSING_TASKS_NOT_FINISHED_REQUEST, prepared=True)
         nb_task_not_finished = [int(result["count"]) for result in cur]
         self.logger.debug("Nb task not finished : %s", nb_task_not_finished[0])
 
@@ -223,98 +255,59 @@ class Launcher():
         self.logger.info("End check_all_processing_tasks_has_not_ended")
         return True
 
-    def create_hcl_file(self, file_path: str, worker_name: str, docker_image: str, yaml_path: str, processing_task_id: str, nomad_job_id: str, product_path: str, input_id: str, product_type_id: str, input_path: str) -> None:
-        """Create the content of nomad job"""
-
-        self.logger.info("Begin create hcl file")
-        content = '''
-        job "processing_task_name" {
-        type = "batch"
-        group "processing_task_name" {
-            # Constraint on worker name
-            constraint {
-            attribute = "${attr.unique.hostname}"
-            value     = "name_of_worker"
-            }
-            task "processing_task_name" {
-            driver = "docker"
-            config {
-                image = "image_docker"
-                auth {
-                server_address = "redacted"
-                username = "redacted"
-                password = "redacted"
-                }
-            }
-
-        template {
-            destination = "/local/delay.yaml"
-            data        = <<EOF
-            yaml_content
-            worker: name_of_worker
-            nomad_job_id: id_nomad_job
-            processing_task_id: id_processing_task
-            product_path: output_path
-            input_id: id_of_input
-            product_type_id: id_of_product_type
-            input_path: path_of_input
-            EOF
-        }
+    def create_job_spec(self, worker_name: str, docker_image: str, yaml_path: str, processing_task_id: str, nomad_job_id: str, product_path: str, input_id: str, product_type_id: str, input_path: str) -> dict:
+        """Create the JSON specification of the nomad job, as expected by the Nomad /v1/jobs endpoint"""
 
-        template {
-            destination = "/local/s3cfg.txt"
-            data        = <<EOF
-            s3cmd_config
-            EOF
-        }
-
-            service {
-                name = "processing-routine"
-                provider = "nomad"
-            }
-            }
-        }
-        }
-        '''
-        content = content.replace("image_docker", docker_image)
-        content = content.replace("name_of_worker", worker_name)
-        content = content.replace("id_processing_task", processing_task_id)
-        content = content.replace("processing_task_name", "processing_task_" + processing_task_id)
-        content = content.replace("id_nomad_job", nomad_job_id)
-        content = content.replace("output_path", product_path)
-        content = content.replace("id_of_input", input_id)
-        content = content.replace("id_of_product_type", product_type_id)
-        content = content.replace("path_of_input", input_path)
+        self.logger.info("Begin create job spec")
+        job_name = "processing_task_" + processing_task_id
 
         # Write config file in docker container
         with open(yaml_path, 'r', encoding="utf-8") as config_file:
-            file_data = config_file.read()
-        content = content.replace("yaml_content", file_data)
+            yaml_content = config_file.read()
+        yaml_content += f"""
+worker: {worker_name}
+nomad_job_id: {nomad_job_id}
+processing_task_id: {processing_task_id}
+product_path: {product_path}
+input_id: {input_id}
+product_type_id: {product_type_id}
+input_path: {input_path}
+"""
 
         # Write s3config file in docker container
         with open(".s3cfg", 'r', encoding="utf-8") as config_file:
-            file_data = config_file.read()
-        content = content.replace("s3cmd_config", file_data)
-
-        with open(file_path, 'w', encoding="utf-8") as fichier:
-            fichier.write(content)
-
-        self.logger.info("End create hcl file")
-
-    def execute_nomad_job(self, file_name: str) -> None:
-        """Run the nomad job file"""
-
-        self.logger.info("Begin execute_nomad_job")
-        subprocess.run(["nomad", "job", "run", file_name], check=True)
-        self.logger.info("End execute_nomad_job")
-
-    def delete_hcl_file(self, file_path: str) -> None:
-        """Delete the hcl at path file_path if exist"""
+            s3cmd_config = config_file.read()
+
+        job_spec = {
+            "ID": job_name,
+            "Name": job_name,
+            "Type": "batch",
+            "TaskGroups": [{
+                "Name": job_name,
+                # Constraint on worker name
+                "Constraints": [{"LTarget": "${attr.unique.hostname}", "RTarget": worker_name, "Operand": "="}],
+                "Tasks": [{
+                    "Name": job_name,
+                    "Driver": "docker",
+                    "Config": {
+                        "image": docker_image,
+                        "auth": [{
+                            "server_address": "redacted",
+                            "username": "redacted",
+                            "password": "redacted"
+                        }]
+                    },
+                    "Templates": [
+                        {"DestPath": "/local/delay.yaml", "EmbeddedTmpl": yaml_content},
+                        {"DestPath": "/local/s3cfg.txt", "EmbeddedTmpl": s3cmd_config}
+                    ],
+                    "Services": [{"Name": "processing-routine", "Provider": "nomad"}]
+                }]
+            }]
+        }
 
-        self.logger.info("Begin delete_hcl_file")
-        if os.path.exists(file_path):
-            os.remove(file_path)
-        self.logger.info("End delete_hcl_file")
+        self.logger.info("End create job spec")
+        return job_spec
 
     @staticmethod
     def construct_product_path(cur: psycopg2.extensions.cursor, conn: psycopg2.extensions.connection, pt_id: str, now: datetime) -> tuple:
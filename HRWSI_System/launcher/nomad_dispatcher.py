@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Nomad_dispatcher module submits Nomad jobs through the Nomad HTTP API.
+Job specifications are sent as JSON to the /v1/jobs endpoint over a keep-alive session,
+several jobs being submitted at the same time by a bounded pool of threads.
+"""
+import os
+import sys
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+# Authorizing other packages absolute import
+ROOT_FOLDER = '/'.join(os.getcwd().split('nrt_production_system')[:-1])
+sys.path.append(ROOT_FOLDER+'nrt_production_system')
+
+from utils.logger import LogUtil
+
+class NomadJobSubmissionError(Exception):
+    """Error raised when a Nomad job can't be submitted"""
+
+    def __init__(self, job_id: str, message: str):
+        Exception.__init__(self)
+        self.job_id = job_id
+        self.message = message
+
+    def __str__(self):
+        return f"Nomad job {self.job_id} not submitted : {self.message}"
+
+class NomadJobDispatcher():
+    """Submit Nomad jobs to the Nomad HTTP API"""
+
+    LOGGER_LEVEL = logging.DEBUG
+    JOBS_ENDPOINT = "/v1/jobs"
+    # Status codes worth a new attempt, other errors come from the job specification
+    RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+    def __init__(self, address: str, max_concurrency: int = 8, max_retries: int = 3,
+                 retry_backoff_seconds: float = 0.5, timeout: float = 30, token: str = None,
+                 logger: logging.Logger = None):
+
+        self.url = address.rstrip("/") + self.JOBS_ENDPOINT
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.timeout = timeout
+        self.logger = logger if logger else LogUtil.get_logger('Log_nomad_dispatcher', self.LOGGER_LEVEL)
+
+        # One keep-alive connection per thread
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if token:
+            self.session.headers["X-Nomad-Token"] = token
+
+    def submit_job(self, job_spec: dict) -> dict:
+        """
+        Register a job and return the Nomad response (EvalID, JobModifyIndex, ...).
+        Connection errors and 429/5xx responses are retried with an exponential backoff,
+        NomadJobSubmissionError is raised when all the attempts fail or when Nomad rejects the job.
+        """
+
+        job_id = job_spec["ID"]
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(self.retry_backoff_seconds * 2 ** (attempt - 1))
+            try:
+                response = self.session.post(self.url, json={"Job": job_spec}, timeout=self.timeout)
+            except requests.exceptions.RequestException as error:
+                self.logger.warning("Attempt %s to submit Nomad job %s failed : %s", attempt + 1, job_id, error)
+                message = str(error)
+                continue
+            if response.status_code in self.RETRY_STATUS_CODES:
+                self.logger.warning("Attempt %s to submit Nomad job %s failed : HTTP %s", attempt + 1, job_id, response.status_code)
+                message = f"HTTP {response.status_code} {response.text}"
+                continue
+            if not response.ok:
+                raise NomadJobSubmissionError(job_id, f"HTTP {response.status_code} {response.text}")
+            return response.json()
+        raise NomadJobSubmissionError(job_id, f"{self.max_retries + 1} attempts failed, last error : {message}")
+
+    def submit_jobs(self, job_spec_list: list[dict]) -> dict:
+        """
+        Submit jobs with at most max_concurrency requests at the same time.
+        Return a dict giving for each job id the Nomad response or the NomadJobSubmissionError.
+        """
+
+        self.logger.info("Begin submit_jobs : %s jobs", len(job_spec_list))
+
+        def _submit(job_spec: dict):
+            try:
+                return self.submit_job(job_spec)
+            except NomadJobSubmissionError as error:
+                self.logger.error(str(error))
+                return error
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            result_list = list(executor.map(_submit, job_spec_list))
+
+        self.logger.info("End submit_jobs")
+        return {job_spec["ID"]: result for job_spec, result in zip(job_spec_list, result_list)}
+
+    def close(self) -> None:
+        """Close the keep-alive connections"""
+
+        self.session.close()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Nomad_stub_server module implements a local HTTP server answering like the Nomad /v1/jobs endpoint.
+It is used to test and benchmark the NomadJobDispatcher without a Nomad cluster.
+
+Benchmark usage (from the project root):
+    python3 HRWSI_System/launcher/nomad_stub_server.py --nb-jobs 2000 --latency 0.005
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+# Authorizing other packages absolute import
+ROOT_FOLDER = '/'.join(os.getcwd().split('nrt_production_system')[:-1])
+sys.path.append(ROOT_FOLDER+'nrt_production_system')
+
+class NomadStubServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server registering the jobs it receives.
+
+    latency is the time spent to answer each request, the first nb_failure requests
+    are answered with failure_status_code.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, latency: float = 0, nb_failure: int = 0, failure_status_code: int = 500):
+
+        super().__init__(("localhost", port), NomadStubRequestHandler)
+        self.latency = latency
+        self.nb_failure = nb_failure
+        self.failure_status_code = failure_status_code
+        self.lock = threading.Lock()
+        self.job_by_id = {}
+        self.nb_request = 0
+        self.nb_request_in_progress = 0
+        self.max_nb_request_in_progress = 0
+        self.connection_set = set()
+        self.thread = None
+
+    @property
+    def address(self) -> str:
+        """Return the server address to give to NomadJobDispatcher"""
+
+        return f"http://localhost:{self.server_address[1]}"
+
+    def start(self) -> "NomadStubServer":
+        """Serve in a background thread"""
+
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving and close the socket"""
+
+        self.shutdown()
+        self.server_close()
+        if self.thread:
+            self.thread.join()
+
+class NomadStubRequestHandler(BaseHTTPRequestHandler):
+    """Answer POST /v1/jobs requests like Nomad"""
+
+    # HTTP/1.1 to keep connections alive
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, don't wait for the client ACK between them
+    disable_nagle_algorithm = True
+
+    def do_POST(self) -> None:
+        """Register the job sent in the request body"""
+
+        server = self.server
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with server.lock:
+            server.nb_request += 1
+            request_rank = server.nb_request
+            server.nb_request_in_progress += 1
+            server.max_nb_request_in_progress = max(server.max_nb_request_in_progress, server.nb_request_in_progress)
+            server.connection_set.add(self.client_address)
+        try:
+            if server.latency:
+                time.sleep(server.latency)
+            if self.path != "/v1/jobs":
+                self._send_json(404, {"error": f"Unknown path {self.path}"})
+            elif request_rank <= server.nb_failure:
+                self._send_json(server.failure_status_code, {"error": "Injected failure"})
+            else:
+                try:
+                    job = json.loads(body)["Job"]
+                    job_id = job["ID"]
+                except (ValueError, KeyError, TypeError):
+                    self._send_json(400, {"error": "Job specification is missing"})
+                    return
+                with server.lock:
+                    server.job_by_id[job_id] = job
+                    job_modify_index = len(server.job_by_id)
+                self._send_json(200, {"EvalID": str(uuid.uuid4()), "EvalCreateIndex": job_modify_index,
+                                      "JobModifyIndex": job_modify_index, "Warnings": ""})
+        finally:
+            with server.lock:
+                server.nb_request_in_progress -= 1
+
+    def _send_json(self, status_code: int, content: dict) -> None:
+        """Send a JSON response with its length so that the connection can be kept alive"""
+
+        data = json.dumps(content).encode("utf-8")
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args) -> None:
+        """Don't log each request"""
+
+if __name__ == "__main__":
+
+    from HRWSI_System.launcher.nomad_dispatcher import NomadJobDispatcher
+
+    parser = argparse.ArgumentParser(description="Benchmark the Nomad job submission on a local stub server")
+    parser.add_argument("--nb-jobs", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.005, help="Stub answer time in seconds")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8, 16])
+    args = parser.parse_args()
+
+    for max_concurrency in args.concurrency:
+        stub_server = NomadStubServer(latency=args.latency).start()
+        dispatcher = NomadJobDispatcher(stub_server.address, max_concurrency=max_concurrency)
+        dispatcher.logger.setLevel("WARNING")
+        job_spec_list = [{"ID": f"processing_task_{i}", "Type": "batch"} for i in range(args.nb_jobs)]
+        start = time.perf_counter()
+        dispatcher.submit_jobs(job_spec_list)
+        elapsed = time.perf_counter() - start
+        dispatcher.close()
+        stub_server.stop()
+        print(f"concurrency {max_concurrency:>3} : {args.nb_jobs} jobs in {elapsed:.2f} s ({args.nb_jobs/elapsed:.0f} jobs/s), "
+              f"{len(stub_server.connection_set)} connections")
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Feed_database_benchmark module measures the plan-to-database latency of the Orchestrator for synthetic new inputs:
+- the former hand-off, the plan exported to a JSON file through the Encoder, read back and inserted by a prepared statement per row,
+- the in-memory hand-off, the attribution plan given as tuples and inserted by a single request per table.
+The database must be created with init_database and update_database. Synthetic inputs are added with ids from --first-id,
+they are deleted at the end with their processing tasks.
+
+Usage (from the project root):
+    python3 HRWSI_System/orchestrator/feed_database_benchmark.py --dsn "host=localhost port=5432 dbname=hrwsi_db user=postgres"
+"""
+import os
+import sys
+import json
+import time
+import logging
+import datetime
+import argparse
+import tempfile
+import psycopg2
+# Authorizing other packages absolute import
+ROOT_FOLDER = '/'.join(os.getcwd().split('nrt_production_system')[:-1])
+sys.path.append(ROOT_FOLDER+'nrt_production_system')
+
+from HRWSI_System.harvester.harvester import Harvester
+from HRWSI_System.orchestrator.orchestrator import Orchestrator
+from HRWSI_System.orchestrator.scheduler.scheduler import Scheduler
+from HRWSI_System.orchestrator.scheduler.matrix_scheduler import MatrixScheduler
+from HRWSI_System.orchestrator.processing_task.processing_task import ProcessingTask
+from HRWSI_System.orchestrator.processing_routine.processing_routine import ProcessingRoutine
+from HRWSI_System.harvester.apimanager.hrwsi_database_api_manager import HRWSIDatabaseApiManager
+
+PROCESSING_ROUTINE = ProcessingRoutine(name="foo", cpu=2, ram=1, storage_space=2, duration=5, docker_image="bar")
+VM_MAX = 10
+VM_ID_LIST = [f"00000000-0000-0000-0000-{i:08d}be4c" for i in range(VM_MAX)]
+
+class FormerOrchestrator(Orchestrator):
+    """Orchestrator feeding the database from the JSON plan, as before the in-memory hand-off"""
+
+    # The former requests insert one row by statement, the single requests of the Orchestrator are given the placeholders of a row
+    ADD_VIRTUAL_MACHINE_REQUEST = Orchestrator.ADD_VIRTUAL_MACHINE_REQUEST % "(%s, %s, %s)"
+    ADD_PROCESSING_TASKS_REQUEST = Orchestrator.ADD_PROCESSING_TASKS_REQUEST % "(%s, %s, %s, %s, %s)"
+
+    def feed_database_with_processing_task(self, planning: Scheduler) -> None:
+        """Export the plan to JSON, read it back and insert the rows one by one"""
+
+        planning.export_to_json()
+        with open(planning.json_path, "r", encoding="utf-8") as f:
+            plan_data = json.load(f)
+        vm_tuple = tuple((plan_data[worker][0], worker, plan_data[worker][1]) for worker in plan_data)
+        now = datetime.datetime.now()
+        processing_tasks_tuple = tuple(
+            (task_list["task_id"], plan_data[worker][0], now, plan_data[worker][4][i - 1]["task_id"] if i != 0 else None, False)
+            for worker in plan_data
+            for i, task_list in enumerate(plan_data[worker][4])
+        )
+
+        with HRWSIDatabaseApiManager.connection_to_database() as (_, cur):
+            new_pt_tuple = self.identify_new_processing_task_in_database(cur, processing_tasks_tuple)
+            list_new_vm_id = set(pt[1] for pt in new_pt_tuple)
+            new_vm_tuple = tuple(vm for vm in vm_tuple if vm[0] in list_new_vm_id)
+            new_vm_tuple = Harvester.identify_new_candidate(cursor=cur, request=self.VM_ALREADY_IN_DATABASE_REQUEST, candidates_tuple=new_vm_tuple, col_index_in_candidate=0)
+            cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, self.ADD_VIRTUAL_MACHINE_REQUEST, new_vm_tuple, prepared=True)
+            cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, self.ADD_PROCESSING_TASKS_REQUEST, new_pt_tuple, prepared=True)
+
+def reset_synthetic_inputs(first_id: int, nb_task: int) -> None:
+    """Add the synthetic inputs, without processing task"""
+
+    with HRWSIDatabaseApiManager.connection_to_database() as (_, cur):
+        delete_synthetic_inputs(cur, first_id, nb_task)
+        cur.execute("""
+            INSERT INTO hrwsi.input (id, processing_condition_name, date, tile, measurement_day, input_path, mission)
+            SELECT i, 'FSC_PC', now(), '33VUC', 20240109, '/benchmark_eo_' || i, 'S2' FROM generate_series(%s, %s) AS i;
+            """, (first_id, first_id + nb_task - 1))
+
+def delete_synthetic_inputs(cur: psycopg2.extensions.cursor, first_id: int, nb_task: int) -> None:
+    """Delete the synthetic inputs and their processing tasks, then the benchmark virtual machines"""
+
+    cur.execute("DELETE FROM hrwsi.input WHERE id BETWEEN %s AND %s;", (first_id, first_id + nb_task - 1))
+    cur.execute("DELETE FROM hrwsi.virtual_machine WHERE id = ANY(%s::uuid[]);", (VM_ID_LIST,))
+
+def benchmark_feed(orchestrator_class: type, first_id: int, nb_task: int, json_dir: str) -> tuple[float, float]:
+    """Plan the synthetic inputs and feed the database of the connection pool, return the plan and the hand-off times"""
+
+    reset_synthetic_inputs(first_id, nb_task)
+    planning = MatrixScheduler(t_max=-(-nb_task // VM_MAX) * PROCESSING_ROUTINE.duration, cpu_max=2*VM_MAX, ram_max=VM_MAX, storage_space_max=2*VM_MAX,
+                               vm_max=VM_MAX, task_list=[ProcessingTask(processing_routine=PROCESSING_ROUTINE, task_id=task_id, t0=None, depends_on=None)
+                                                          for task_id in range(first_id, first_id + nb_task)],
+                               json_path=os.path.join(json_dir, "plan.json"),
+                               vm_name_list=[f"benchmark-worker-{i}" for i in range(VM_MAX)], vm_id_list=VM_ID_LIST)
+    orchestrator = orchestrator_class()
+
+    start = time.perf_counter()
+    planning.plan()
+    plan_time = time.perf_counter() - start
+    orchestrator.feed_database_with_processing_task(planning)
+    feed_time = time.perf_counter() - start - plan_time
+
+    # Check the persisted rows
+    with HRWSIDatabaseApiManager.connection_to_database() as (_, cur):
+        cur.execute("SELECT count(*) FROM hrwsi.processing_tasks WHERE input_fk_id BETWEEN %s AND %s;", (first_id, first_id + nb_task - 1))
+        assert cur.fetchone()[0] == nb_task
+
+    return plan_time, feed_time
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Benchmark the plan-to-database latency of the Orchestrator")
+    parser.add_argument("--dsn", required=True, help="PostgreSQL connection string of a HRWSI database")
+    parser.add_argument("--nb-task", type=int, default=10_000)
+    parser.add_argument("--first-id", type=int, default=1_000_000_000, help="First id of the synthetic inputs")
+    args = parser.parse_args()
+
+    # Debug logs of the whole plan aren't measured
+    MatrixScheduler.LOGGER_LEVEL = logging.WARNING
+
+    database_parameters = dict.fromkeys(("dbname", "user", "password", "host", "port"))
+    database_parameters.update(psycopg2.extensions.parse_dsn(args.dsn))
+    HRWSIDatabaseApiManager.create_connection_pool(**database_parameters)
+    try:
+        try:
+            with tempfile.TemporaryDirectory() as json_dir:
+                for name, orchestrator_class in (("JSON", FormerOrchestrator), ("in-memory", Orchestrator)):
+                    plan_time, feed_time = benchmark_feed(orchestrator_class, args.first_id, args.nb_task, json_dir)
+                    print(f"{name:10}: {args.nb_task} tasks, plan {plan_time * 1e3:.0f} ms, hand-off and insert {feed_time * 1e3:.0f} ms, "
+                          f"plan-to-database {(plan_time + feed_time) * 1e3:.0f} ms")
+        finally:
+            with HRWSIDatabaseApiManager.connection_to_database() as (_, cur):
+                delete_synthetic_inputs(cur, args.first_id, args.nb_task)
+    finally:
+        HRWSIDatabaseApiManager.close_connection_pool()
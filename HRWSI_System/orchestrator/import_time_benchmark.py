@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Import_time_benchmark module measures the import time of the Orchestrator entry point with python -X importtime
+and checks it against a budget:
+- the best cumulative import time of the module over --repeat fresh interpreters must be under --budget-ms,
+- the plotting libraries (matplotlib, seaborn), only used by Scheduler.visualization, must not be imported.
+The slowest imports of the last run are printed.
+
+Usage (from the project root):
+    python3 HRWSI_System/orchestrator/import_time_benchmark.py [--module HRWSI_System.orchestrator.orchestrator] [--budget-ms 500]
+"""
+import os
+import sys
+import argparse
+import subprocess
+
+FORBIDDEN_MODULE_LIST = ["matplotlib", "seaborn"]
+
+def measure_import_time(module: str) -> list[tuple[int, str]]:
+    """Import module in a fresh interpreter, return the (cumulative import time in us, name) of all the imported modules"""
+
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [os.getcwd(), os.environ.get("PYTHONPATH")])))
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, env=env, check=True)
+
+    # Lines "import time: self [us] | cumulative | imported package"
+    import_time_list = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        import_time_list.append((int(cumulative), name.strip()))
+    return import_time_list
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Benchmark the import time of the Orchestrator entry point")
+    parser.add_argument("--module", default="HRWSI_System.orchestrator.orchestrator")
+    parser.add_argument("--budget-ms", type=float, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    import_time_by_run = []
+    for _ in range(args.repeat):
+        import_time_list = measure_import_time(args.module)
+        import_time_by_run.append(dict((name, cumulative) for cumulative, name in import_time_list)[args.module])
+
+    print("Slowest imports (cumulative):")
+    for cumulative, name in sorted(import_time_list, reverse=True)[:10]:
+        print(f"  {cumulative / 1e3:8.1f} ms  {name}")
+    best_import_time = min(import_time_by_run) / 1e3
+    print(f"{args.module}: {best_import_time:.1f} ms (best of {args.repeat}), budget {args.budget_ms:.0f} ms")
+
+    imported_module_set = set(name.split(".")[0] for _, name in import_time_list)
+    forbidden_module_list = [module for module in FORBIDDEN_MODULE_LIST if module in imported_module_set]
+    assert not forbidden_module_list, f"{args.module} imports {forbidden_module_list}"
+    assert best_import_time <= args.budget_ms, f"{args.module} import time {best_import_time:.1f} ms exceeds the budget of {args.budget_ms:.0f} ms"
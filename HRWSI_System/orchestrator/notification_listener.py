@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Notification_listener module listens to a HRWSI Database notification channel in an asyncio event loop.
+The notifications received during a debounce window are coalesced in a single call of the dispatch function,
+which runs in an executor so that the loop keeps reading the notifications while it works.
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import Executor
+from typing import Callable
+import psycopg2
+import psycopg2.sql
+# Authorizing other packages absolute import
+ROOT_FOLDER = '/'.join(os.getcwd().split('nrt_production_system')[:-1])
+sys.path.append(ROOT_FOLDER+'nrt_production_system')
+
+from utils.logger import LogUtil
+
+class NotificationListener():
+    """
+    Listen to a notification channel on a dedicated connection and dispatch the notifications by batch.
+
+    The connection socket is watched by the event loop (add_reader), the notifications are only read
+    when the server sent some. After the first notification of a batch, the listener waits debounce_seconds
+    for the next ones, then gives all their payloads to dispatch in the executor. The notifications received
+    while dispatch runs make the next batch: a burst of notifications never queues more than one dispatch.
+    """
+
+    LOGGER_LEVEL = logging.DEBUG
+
+    def __init__(self, channel: str, dispatch: Callable[[list[str]], None], debounce_seconds: float = 0,
+                 executor: Executor = None, logger: logging.Logger = None):
+
+        self.channel = channel
+        self.dispatch = dispatch
+        self.debounce_seconds = debounce_seconds
+        self.executor = executor
+        self.logger = logger if logger else LogUtil.get_logger('Log_notification_listener', self.LOGGER_LEVEL)
+
+        # (payload, reception time) of the notifications not dispatched yet
+        self.pending_notification_list = []
+        self.new_notification_event = None
+        self.is_stopped = False
+
+        # Metrics
+        self.metrics_lock = threading.Lock()
+        self.notification_count = 0
+        self.dispatch_count = 0
+        self.failed_dispatch_count = 0
+        self.total_dispatch_delay = 0.
+        self.max_dispatch_delay = 0.
+        self.total_latency = 0.
+        self.max_latency = 0.
+
+    async def listen(self, conn: psycopg2.extensions.connection) -> None:
+        """
+        Listen to the channel on conn and dispatch the notifications until stop is called.
+        conn must be dedicated to the listener, it is switched to autocommit.
+        """
+
+        loop = asyncio.get_running_loop()
+        self.new_notification_event = asyncio.Event()
+        self.is_stopped = False
+
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute(psycopg2.sql.SQL("LISTEN {}").format(psycopg2.sql.Identifier(self.channel)))
+        loop.add_reader(conn.fileno(), self.read_notifications, conn)
+        self.logger.info("Listen to %s notifications", self.channel)
+
+        try:
+            await self.dispatch_notifications()
+        finally:
+            loop.remove_reader(conn.fileno())
+            self.logger.info("Stop listening to %s notifications", self.channel)
+
+    def stop(self) -> None:
+        """Stop listening, the notifications not dispatched yet are dropped. Must be called in the loop thread."""
+
+        self.is_stopped = True
+        if self.new_notification_event is not None:
+            self.new_notification_event.set()
+
+    def read_notifications(self, conn: psycopg2.extensions.connection) -> None:
+        """Read the notifications available on the connection, called by the event loop"""
+
+        try:
+            conn.poll()
+        except psycopg2.Error as error:
+            self.logger.error("Connection listening to %s lost : %s", self.channel, error)
+            self.stop()
+            return
+        received_at = time.perf_counter()
+        payload_list = [notify.payload for notify in conn.notifies]
+        conn.notifies.clear()
+        self.add_notifications(payload_list, received_at)
+
+    def add_notifications(self, payload_list: list[str], received_at: float = None) -> None:
+        """Add notifications to the next batch. Must be called in the loop thread."""
+
+        if not payload_list:
+            return
+        if received_at is None:
+            received_at = time.perf_counter()
+        self.pending_notification_list.extend((payload, received_at) for payload in payload_list)
+        self.new_notification_event.set()
+
+    async def dispatch_notifications(self) -> None:
+        """Wait for notifications and dispatch them by batch"""
+
+        loop = asyncio.get_running_loop()
+        while True:
+            await self.new_notification_event.wait()
+            if self.is_stopped:
+                return
+
+            # Coalesce the notifications of the debounce window
+            await asyncio.sleep(self.debounce_seconds)
+            if self.is_stopped:
+                return
+            self.new_notification_event.clear()
+            notification_list, self.pending_notification_list = self.pending_notification_list, []
+            if not notification_list:
+                continue
+
+            dispatched_at = time.perf_counter()
+            self.logger.debug("Dispatch %s %s notifications", len(notification_list), self.channel)
+            try:
+                await loop.run_in_executor(self.executor, self.dispatch, [payload for payload, _ in notification_list])
+            except Exception as error:
+                self.logger.error("Dispatch of %s notifications failed : %s", len(notification_list), error)
+                with self.metrics_lock:
+                    self.failed_dispatch_count += 1
+            self.record_latencies(notification_list, dispatched_at, time.perf_counter())
+
+    def record_latencies(self, notification_list: list[tuple[str, float]], dispatched_at: float, ended_at: float) -> None:
+        """
+        Record the time from the reception of each notification to the beginning (dispatch delay)
+        and to the end (latency) of its dispatch
+        """
+
+        first_received_at = min(received_at for _, received_at in notification_list)
+        with self.metrics_lock:
+            self.notification_count += len(notification_list)
+            self.dispatch_count += 1
+            self.total_dispatch_delay += sum(dispatched_at - received_at for _, received_at in notification_list)
+            self.max_dispatch_delay = max(self.max_dispatch_delay, dispatched_at - first_received_at)
+            self.total_latency += sum(ended_at - received_at for _, received_at in notification_list)
+            self.max_latency = max(self.max_latency, ended_at - first_received_at)
+        self.logger.info("%s %s notifications dispatched in %.3f s (%.3f s after the first notification)",
+                         len(notification_list), self.channel, ended_at - dispatched_at, ended_at - first_received_at)
+
+    def get_metrics(self) -> dict:
+        """Return the dispatch and latency metrics"""
+
+        with self.metrics_lock:
+            return {
+                "notification_count": self.notification_count,
+                "dispatch_count": self.dispatch_count,
+                "failed_dispatch_count": self.failed_dispatch_count,
+                "mean_dispatch_delay": self.total_dispatch_delay / self.notification_count if self.notification_count else 0.,
+                "max_dispatch_delay": self.max_dispatch_delay,
+                "mean_latency": self.total_latency / self.notification_count if self.notification_count else 0.,
+                "max_latency": self.max_latency
+            }
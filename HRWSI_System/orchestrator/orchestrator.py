@@ -5,11 +5,9 @@ Orchestrator module is used to interact between HRWSI Database and Scheduler.
 import os
 import sys
 import datetime
-import json
 import logging
-import time
 import asyncio
-import nest_asyncio
+from concurrent.futures import ThreadPoolExecutor
 import psycopg2
 import psycopg2.extras
 # Authorizing other packages absolute import
@@ -20,6 +18,8 @@ from utils.logger import LogUtil
 from HRWSI_System.launcher.launcher import Launcher
 from HRWSI_System.harvester.harvester import Harvester
 from HRWSI_System.harvester.apimanager.api_manager import ApiManager
+from HRWSI_System.orchestrator.notification_listener import NotificationListener
+from HRWSI_System.orchestrator.scheduler.scheduler import Scheduler
 from HRWSI_System.orchestrator.scheduler.matrix_scheduler import MatrixScheduler
 from HRWSI_System.orchestrator.processing_task.processing_task import ProcessingTask
 from HRWSI_System.orchestrator.processing_routine.processing_routine import ProcessingRoutine
@@ -30,13 +30,13 @@ class Orchestrator():
 
     LOGGER_LEVEL = logging.DEBUG
     PROCESSING_ROUTINE_REQUEST = "SELECT pc.name AS pc_name, pr.name, pr.cpu, pr.ram, pr.storage_space, pr.duration, pr.docker_image FROM hrwsi.processing_routine pr INNER JOIN hrwsi.processing_condition pc ON pr.name = pc.processing_routine_name"
-    ADD_VIRTUAL_MACHINE_REQUEST = "INSERT INTO hrwsi.virtual_machine (id, name, flavour) VALUES (%s, %s, %s)"
-    ADD_PROCESSING_TASKS_REQUEST = "INSERT INTO hrwsi.processing_tasks (input_fk_id, virtual_machine_id, creation_date, preceding_input_id, has_ended) VALUES ( %s, %s, %s, %s, %s)"
+    ADD_VIRTUAL_MACHINE_REQUEST = "INSERT INTO hrwsi.virtual_machine (id, name, flavour) VALUES %s"
+    ADD_PROCESSING_TASKS_REQUEST = "INSERT INTO hrwsi.processing_tasks (input_fk_id, virtual_machine_id, creation_date, preceding_input_id, has_ended) VALUES %s"
     PT_ALREADY_IN_DATABASE_REQUEST = "SELECT input_fk_id FROM hrwsi.processing_tasks"
     VM_ALREADY_IN_DATABASE_REQUEST = "SELECT id FROM hrwsi.virtual_machine"
     UNPROCESSED_INPUT_REQUEST =  "SELECT i.id, i.processing_condition_name FROM hrwsi.input i LEFT OUTER JOIN hrwsi.products p ON i.id = p.input_fk_id WHERE i.date>'%s' AND p.id is NULL;"
     UNPROCESSED_INPUT_WITH_ALL_PT_ENDED_REQUEST = "SELECT get_id_of_unprocessed_inputs_with_all_pt_ended FROM hrwsi.get_id_of_unprocessed_inputs_with_all_pt_ended('%s');"
-    LISTEN_REQUEST = "LISTEN input_insertion"
+    LISTEN_CHANNEL = "input_insertion"
 
     def __init__(self, visualization: bool = False,
                  json_path: str = None,
@@ -55,32 +55,35 @@ class Orchestrator():
         today = datetime.date.today()
         self.furthest_date = (today - deltaday_furthest_date).strftime("%Y-%m-%d")
 
+        # The input insertion notifications received in this window are handled together
         self.seconds_before_clear_notification = config_data["orchestrator_waiting_time"]["seconds_before_clear_notification"]
+        self.notification_listener = None
+        # The Launcher run after each scheduling, created once so that its Nomad session is reused
+        self.launcher = None
+
+        # The last plan is updated with the finished and new tasks while the capacity model doesn't change
+        self.incremental_scheduling = config_data["scheduling"]["incremental"]
+        self.planning = None
+        self.capacity_model = None
 
     def extract_orchestrator_processing_task(self, processing_routine_dict: dict) -> None:
         """Collect input from HRWSI Database and create associated processing_task"""
 
         self.logger.info("Begin extract orchestrator processing task")
 
-        # Connect to Database
-        conn, cur = HRWSIDatabaseApiManager.connect_to_database()
-
-        # Convert cursor in a dict
-        cur = conn.cursor(cursor_factory = psycopg2.extras.RealDictCursor)
-
-        # Collect HRWSI Database input created in the last days who don't have product (not processed)
-        unprocessed_input_request =  self.UNPROCESSED_INPUT_REQUEST % (self.furthest_date)
-        cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, unprocessed_input_request)
+        # Connect to Database, with a cursor converted in a dict
+        with HRWSIDatabaseApiManager.connection_to_database(psycopg2.extras.RealDictCursor) as (_, cur):
 
-        # Create all processing tasks
-        self.processing_task_list = [ProcessingTask(processing_routine=processing_routine_dict[result["processing_condition_name"]],
-                                            task_id=result["id"],
-                                            t0=None,
-                                            depends_on=None)
-                                    for result in cur]
+            # Collect HRWSI Database input created in the last days who don't have product (not processed)
+            unprocessed_input_request =  self.UNPROCESSED_INPUT_REQUEST % (self.furthest_date)
+            cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, unprocessed_input_request)
 
-        # Close connection
-        HRWSIDatabaseApiManager.commit_and_close_connection_to_database(conn, cur)
+            # Create all processing tasks
+            self.processing_task_list = [ProcessingTask(processing_routine=processing_routine_dict[result["processing_condition_name"]],
+                                                task_id=result["id"],
+                                                t0=None,
+                                                depends_on=None)
+                                        for result in cur]
 
         self.logger.info("End extract orchestrator processing task")
 
@@ -89,76 +92,53 @@ class Orchestrator():
 
         self.logger.info("Begin extract orchestrator processing routine")
 
-        # Connect to Database
-        conn, cur = HRWSIDatabaseApiManager.connect_to_database()
-
-        # Convert cursor in a dict
-        cur = conn.cursor(cursor_factory = psycopg2.extras.RealDictCursor)
+        # Connect to Database, with a cursor converted in a dict
+        with HRWSIDatabaseApiManager.connection_to_database(psycopg2.extras.RealDictCursor) as (_, cur):
 
-        # Collect processing routine in the Database
-        cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, self.PROCESSING_ROUTINE_REQUEST)
+            # Collect processing routine in the Database
+            cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, self.PROCESSING_ROUTINE_REQUEST, prepared=True)
 
-        # Create all orchestrator processing_routine objects
-        self.processing_routine_dict = dict((result["pc_name"],
-                                        ProcessingRoutine(name=result["name"],
-                                                        cpu=result["cpu"],
-                                                        ram=result["ram"],
-                                                        storage_space=result["storage_space"],
-                                                        duration=result["duration"],
-                                                        docker_image=result["docker_image"])
-                                        ) for result in cur)
-
-        # Close connection
-        HRWSIDatabaseApiManager.commit_and_close_connection_to_database(conn, cur)
+            # Create all orchestrator processing_routine objects
+            self.processing_routine_dict = dict((result["pc_name"],
+                                            ProcessingRoutine(name=result["name"],
+                                                            cpu=result["cpu"],
+                                                            ram=result["ram"],
+                                                            storage_space=result["storage_space"],
+                                                            duration=result["duration"],
+                                                            docker_image=result["docker_image"])
+                                            ) for result in cur)
 
         self.logger.info("End extract orchestrator processing task")
 
-    def feed_database_with_processing_task(self) -> None:
-        """Feed database with Orchestrator's json plan"""
+    def feed_database_with_processing_task(self, planning: Scheduler) -> None:
+        """Feed database with the attribution plan of the Scheduler, handed over in memory"""
 
         self.logger.info("Begin feed database with processing task")
 
-        with open(self.json_path, "r", encoding="utf-8") as f:
-            plan_data = json.load(f)
-
-        # Create virtual_machine
-        vm_tuple = tuple((plan_data[worker][0], worker, plan_data[worker][1]) for worker in plan_data)
-
-        # Create task by virtual machine
-        now = datetime.datetime.now()
-        processing_tasks_tuple = tuple(
-            (
-                (task_list["task_id"], plan_data[worker][0], now, plan_data[worker][4][i - 1]["task_id"], False)
-                if i != 0
-                else (task_list["task_id"], plan_data[worker][0], now, None, False)
-            )
-            for worker in plan_data
-            for i, task_list in enumerate(plan_data[worker][4])
-        )
+        # Create virtual_machine and task by virtual machine
+        vm_tuple = planning.get_virtual_machine_tuple()
+        processing_tasks_tuple = planning.get_processing_task_tuple(datetime.datetime.now())
 
         # Connect to Database
-        conn, cur = HRWSIDatabaseApiManager.connect_to_database()
-
-        # Identify new processing_task
-        new_pt_tuple = self.identify_new_processing_task_in_database(cur, processing_tasks_tuple)
+        with HRWSIDatabaseApiManager.connection_to_database() as (_, cur):
 
-        # Identify new VM
-        # Keep only the vm associated to new processing_task
-        new_vm_tuple = ()
-        if new_pt_tuple:
-            list_new_vm_id = set([vm_id[1] for vm_id in new_pt_tuple])
-            new_vm_tuple = tuple((vm) for vm in vm_tuple if vm[0] in list_new_vm_id)
-        # Keep only VM not already in database
-        new_vm_tuple = Harvester.identify_new_candidate(cursor=cur, request=self.VM_ALREADY_IN_DATABASE_REQUEST, candidates_tuple=new_vm_tuple, col_index_in_candidate=0)
+            # Identify new processing_task
+            new_pt_tuple = self.identify_new_processing_task_in_database(cur, processing_tasks_tuple)
 
-        # Add vm in HRWSI Database
-        cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, self.ADD_VIRTUAL_MACHINE_REQUEST, new_vm_tuple)
+            # Identify new VM
+            # Keep only the vm associated to new processing_task
+            new_vm_tuple = ()
+            if new_pt_tuple:
+                list_new_vm_id = set([vm_id[1] for vm_id in new_pt_tuple])
+                new_vm_tuple = tuple((vm) for vm in vm_tuple if vm[0] in list_new_vm_id)
+            # Keep only VM not already in database
+            new_vm_tuple = Harvester.identify_new_candidate(cursor=cur, request=self.VM_ALREADY_IN_DATABASE_REQUEST, candidates_tuple=new_vm_tuple, col_index_in_candidate=0)
 
-        # Add processing_task in HRWSI Database
-        cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, self.ADD_PROCESSING_TASKS_REQUEST, new_pt_tuple)
+            # Add vm in HRWSI Database
+            cur = HRWSIDatabaseApiManager.insert_values_in_database(cur, self.ADD_VIRTUAL_MACHINE_REQUEST, new_vm_tuple)
 
-        # Close connection
-        HRWSIDatabaseApiManager.commit_and_close_connection_to_database(conn, cur)
+            # Add processing_task in HRWSI Database, in a single request
+            cur = HRWSIDatabaseApiManager.insert_values_in_database(cur, self.ADD_PROCESSING_TASKS_REQUEST, new_pt_tuple)
 
         self.logger.info("End feed database with processing task")
 
@@ -197,35 +177,61 @@ class Orchestrator():
 
         # Load config file
         config_data = ApiManager.read_config_file()
+        capacity_model = self.get_capacity_model(config_data["scheduling"], self.processing_routine_dict)
+
+        # Update the last plan, or plan from scratch when the capacity model drifts or when the new tasks don't fit
+        planning = None
+        if self.incremental_scheduling and self.planning is not None and capacity_model == self.capacity_model:
+            self.logger.info("Incremental re-planning")
+            if self.planning.update_plan(self.processing_task_list):
+                planning = self.planning
+            else:
+                self.logger.info("New tasks don't fit in the last plan")
+        elif self.incremental_scheduling and self.planning is not None:
+            self.logger.info("Capacity model changed")
+
+        if planning is None:
+            self.logger.info("Full re-planning")
+            self.planning = None
+
+            # Create matrix_scheduler
+            planning = MatrixScheduler(t_max=config_data["scheduling"]["t_max"],
+                                    cpu_max=config_data["scheduling"]["cpu_max"],
+                                    ram_max=config_data["scheduling"]["ram_max"],
+                                    storage_space_max=config_data["scheduling"]["storage_space_max"],
+                                    vm_max=config_data["scheduling"]["vm_max"],
+                                    task_list=self.processing_task_list,
+                                    json_path=self.json_path,
+                                    vm_name_list=config_data["scheduling"]["vm_name_list"],
+                                    vm_id_list=config_data["scheduling"]["vm_id_list"])
+
+            # Run Scheduler
+            planning.check_feasibility()
+            planning.plan()
 
-        # Create matrix_scheduler
-        planning = MatrixScheduler(t_max=config_data["scheduling"]["t_max"],
-                                cpu_max=config_data["scheduling"]["cpu_max"],
-                                ram_max=config_data["scheduling"]["ram_max"],
-                                storage_space_max=config_data["scheduling"]["storage_space_max"],
-                                vm_max=config_data["scheduling"]["vm_max"],
-                                task_list=self.processing_task_list,
-                                json_path=self.json_path,
-                                vm_name_list=config_data["scheduling"]["vm_name_list"],
-                                vm_id_list=config_data["scheduling"]["vm_id_list"])
-
-        # Run Scheduler
-        planning.check_feasibility()
-        planning.plan()
         planning.check_plan()
+        self.planning = planning
+        self.capacity_model = capacity_model
         if self.visualization:
             planning.visualization()
-        planning.export_to_json()
 
-        # Update json_path (usefull if it's None)
-        if not self.json_path:
-            self.json_path = planning.json_path
+        # The JSON plan is only a debug artifact
+        if self.json_path:
+            planning.export_to_json()
 
         # Convert plan to processing_task
-        self.feed_database_with_processing_task()
+        self.feed_database_with_processing_task(planning)
 
         self.logger.info("End run scheduling")
 
+    @staticmethod
+    def get_capacity_model(scheduling_config: dict, processing_routine_dict: dict) -> tuple:
+        """Return the resources limits, the workers and the resources of the processing routines the plan depends on"""
+
+        return (tuple((key, str(value)) for key, value in sorted(scheduling_config.items()) if key != "incremental"),
+                tuple(sorted((pc_name, routine.name, routine.cpu, routine.ram, routine.storage_space, routine.duration)
+                             for pc_name, routine in processing_routine_dict.items())))
+
     def run(self) -> None:
         """
         Run orchestrator workflow :
@@ -239,48 +245,42 @@ class Orchestrator():
     def create_loop(self) -> None:
         """Create a loop to wait and listen notifications"""
 
-        nest_asyncio.apply() # Correct that : by design asyncio does not allow its event loop to be nested
-
-        # Connect to Database
-        conn, cur = HRWSIDatabaseApiManager.connect_to_database()
-
-        # Listen channel
-        cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, self.LISTEN_REQUEST)
-        conn.commit()
+        # Dedicated connection, kept open to listen to the channel
+        conn = HRWSIDatabaseApiManager.connect_to_database_outside_pool()
 
         self.logger.info("Begin create_loop")
 
-        # Wait for notification
-        loop = asyncio.get_event_loop()
-        loop.add_reader(conn, self.handle_notify, conn)
-
-        # Run the loop
-        try:
-            loop.run_forever()
-        except KeyboardInterrupt:
-            pass
-        finally:
-            # Ended the loop
-            loop.close()
-            self.logger.info("End create_loop")
-
-    def handle_notify(self, conn) -> None:
-        """When a input insertion notification pop, 
+        # Scheduling and launching run one at a time, out of the loop
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="orchestrator_scheduling") as executor:
+            self.notification_listener = NotificationListener(channel=self.LISTEN_CHANNEL,
+                                                              dispatch=self.handle_notify,
+                                                              debounce_seconds=self.seconds_before_clear_notification,
+                                                              executor=executor,
+                                                              logger=self.logger)
+            # Run the loop
+            try:
+                asyncio.run(self.notification_listener.listen(conn))
+            except KeyboardInterrupt:
+                pass
+            finally:
+                conn.close()
+                self.logger.info("Notification metrics : %s", self.notification_listener.get_metrics())
+                self.logger.info("End create_loop")
+
+    def handle_notify(self, payload_list: list[str]) -> None:
+        """When input insertion notifications pop,
         collect inputs, create plan and processing tasks
-        and clear notification"""
+        and launch them"""
 
-        self.logger.info("Begin handle_notify : Receive input insertion notification")
+        self.logger.info("Begin handle_notify : Receive %s input insertion notifications", len(payload_list))
 
-        conn.poll()
-        for notify in conn.notifies:
-            self.logger.debug("Insertion input type : %s", notify.payload)
-        time.sleep(self.seconds_before_clear_notification)
-        conn.notifies.clear()
+        self.logger.debug("Insertion input types : %s", payload_list)
         self.run_scheduling()
 
         self.logger.info("Run Launcher after Orchestrator")
-        launcher = Launcher()
-        launcher.run()
+        if self.launcher is None:
+            self.launcher = Launcher()
+        self.launcher.run()
 
         self.logger.info("End handle_notify")
 
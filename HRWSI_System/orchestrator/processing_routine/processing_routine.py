@@ -6,6 +6,8 @@ Processing_routine module is used to represent the processing routine of the pro
 class ProcessingRoutine():
     """Define a processing routine"""
 
+    __slots__ = ("name", "cpu", "ram", "storage_space", "duration", "docker_image")
+
     def __init__(self, name: str,
                  cpu: int,
                  ram: int,
@@ -14,6 +14,8 @@ from HRWSI_System.orchestrator.processing_routine.processing_routine import Proc
 class ProcessingTask():
     """Define a processing task"""
 
+    __slots__ = ("processing_routine", "task_id", "t0", "depends_on")
+
     def __init__(self, processing_routine: ProcessingRoutine,
                  task_id: int,
                  t0: int,
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Capacity_index module keeps track of the free start times of a processing routine in the plan matrix.
+It is used by the MatrixScheduler to place processing tasks without rescanning the plan matrix.
+"""
+import numpy as np
+
+class FreeStartIndex():
+    """
+    Index of the start times at which a processing task of a given routine can be placed.
+
+    The plan matrix rows are grouped by slots of routine.cpu rows (row j with j % routine.cpu == 0).
+    For each slot, a start time i is free when the slot rows are empty on [i, i+duration) and
+    when RAM, storage space and VM limits are respected on [i, i+duration).
+    During the placement of one routine, free start times can only become busy, so each slot
+    is stored as a "next free start" union-find with path compression: finding the first free
+    start after a given time is amortized near constant time.
+    """
+
+    def __init__(self, plan_matrix: np.ndarray, cpu: int, duration: int, time_limit: int, blocked_times: np.ndarray):
+
+        self.cpu = cpu
+        self.duration = duration
+
+        # Last start time allowed is time_limit - duration, the index time_limit - duration + 1 is a sentinel
+        self.nb_start = max(time_limit - duration + 1, 0)
+        self.slot_list = list(range(0, plan_matrix.shape[0] - cpu + 1, cpu))
+        self.next_free_start_by_slot = {}
+        self.blocked_times = blocked_times.copy()
+
+        for j in self.slot_list:
+            busy_times = (plan_matrix[j:j+cpu, :time_limit] != 0).any(axis=0) | self.blocked_times[:time_limit]
+            self.next_free_start_by_slot[j] = self._create_next_free_start(busy_times)
+
+    def _create_next_free_start(self, busy_times: np.ndarray) -> list[int]:
+        """Create the union-find list of a slot: a free start time points to itself, a busy one to the next time"""
+
+        busy_cumsum = np.concatenate(([0], np.cumsum(busy_times, dtype=np.int64)))
+        busy_window = busy_cumsum[self.duration:self.duration+self.nb_start] != busy_cumsum[:self.nb_start]
+        next_free_start = np.arange(self.nb_start + 1)
+        next_free_start[:self.nb_start][busy_window] += 1
+        return next_free_start.tolist()
+
+    def _find(self, next_free_start: list[int], i: int) -> int:
+        """Return the first free start time >= i (nb_start if there is none)"""
+
+        root = i
+        while next_free_start[root] != root:
+            root = next_free_start[root]
+        while next_free_start[i] != root:
+            next_free_start[i], i = root, next_free_start[i]
+        return root
+
+    def _set_busy(self, next_free_start: list[int], first_time: int, last_time: int) -> None:
+        """Mark start times in [first_time, last_time] as busy"""
+
+        for i in range(max(first_time, 0), min(last_time, self.nb_start - 1) + 1):
+            if next_free_start[i] == i:
+                next_free_start[i] = i + 1
+
+    def find_first_free_location(self, earliest_start: int):
+        """
+        Return the (j, i) location with the smallest slot j, then the smallest start time i >= earliest_start,
+        or None if no location is free.
+        Slots without any free start time are removed from the index.
+        """
+
+        earliest_start = max(earliest_start, 0)
+        dead_slot_list = []
+        location = None
+        for j in self.slot_list:
+            next_free_start = self.next_free_start_by_slot[j]
+            if self._find(next_free_start, 0) >= self.nb_start:
+                dead_slot_list.append(j)
+                continue
+            if earliest_start >= self.nb_start:
+                continue
+            i = self._find(next_free_start, earliest_start)
+            if i < self.nb_start:
+                location = (j, i)
+                break
+        for j in dead_slot_list:
+            self.slot_list.remove(j)
+            del self.next_free_start_by_slot[j]
+        return location
+
+    def occupy(self, j: int, i: int, new_blocked_times: np.ndarray) -> None:
+        """
+        Update the index after a placement in slot j at start time i.
+        new_blocked_times are times at which the routine resources limits are now exceeded.
+        """
+
+        if j in self.next_free_start_by_slot:
+            self._set_busy(self.next_free_start_by_slot[j], i - self.duration + 1, i + self.duration - 1)
+        for time in new_blocked_times:
+            if self.blocked_times[time]:
+                continue
+            self.blocked_times[time] = True
+            for next_free_start in self.next_free_start_by_slot.values():
+                self._set_busy(next_free_start, time - self.duration + 1, time)
@@ -7,5 +7,7 @@ from json import JSONEncoder
 class Encoder(JSONEncoder):
     """Class Encoder to override JSONEncoder"""
     def default(self, o):
-        """Overrides the default method of json to serialize customize class with their __dict__"""
+        """Overrides the default method of json to serialize customize class with their __dict__ or their __slots__"""
+        if hasattr(o, "__slots__"):
+            return dict((attribute, getattr(o, attribute)) for attribute in o.__slots__)
         return o.__dict__
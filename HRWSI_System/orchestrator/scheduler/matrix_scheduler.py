@@ -5,7 +5,6 @@ The matrix is usefull to manage resources and dependencies.
 """
 import sys
 import os
-from itertools import product
 import uuid
 import numpy as np
 
@@ -14,8 +13,11 @@ ROOT_FOLDER = '/'.join(os.getcwd().split('nrt_production_system')[:-1])
 sys.path.append(ROOT_FOLDER+'nrt_production_system')
 
 from HRWSI_System.orchestrator.scheduler.scheduler import Scheduler
+from HRWSI_System.orchestrator.scheduler.capacity_index import FreeStartIndex
+from HRWSI_System.orchestrator.scheduler.task_table import TaskTable
 from HRWSI_System.orchestrator.processing_task.processing_task import ProcessingTask
 from HRWSI_System.orchestrator.processing_routine.processing_routine import ProcessingRoutine
+from HRWSI_System.orchestrator.orchestrator_exceptions.impossible_plan import ImpossiblePlan
 
 class MatrixScheduler(Scheduler):
     """Use a matrix to planify processing tasks"""
@@ -36,249 +38,166 @@ class MatrixScheduler(Scheduler):
         self.vm_id_list = vm_id_list
         self.plan_matrix = np.zeros((self.cpu_max,self.t_max), int)
 
+        # Kept to update the plan incrementally (see update_plan)
+        self.location_by_task_id = {}
+        self.routine_id_by_name = {}
+        self.ram_per_time = None
+        self.storage_space_per_time = None
+        self.vm_per_time = None
+
     def plan(self) -> None:
         """Set t0 of tasks in task_list"""
 
         self.logger.info("Begin plan")
 
-        # Creation of necessary variables to place processing_task in plan_matrix
-        task_by_routine={}
-        routine_list=[]
-        task_by_id={}
-        task_0_by_routine=[]
-        for task in self.task_list:
-            task_by_id[task.task_id]=task
-            if task.processing_routine.name not in task_by_routine:
-                task_by_routine[task.processing_routine.name]=[task]
-                routine_list.append(task.processing_routine)
-                task_0_by_routine.append(task)
-            else :
-                task_by_routine[task.processing_routine.name].append(task)
+        # Columnar view of task_list to place processing_task in plan_matrix (the one of check_feasibility if any),
+        # all the tasks are planned again
+        task_table = self.get_task_table(read_t0=False)
+        task_table.t0.fill(-1)
+        self.logger.debug("routine_list: %s", [routine.name for routine in task_table.routine_list])
 
-        self.logger.debug("routine_list: %s", [i.name for i in routine_list])
-        sorted_routine_list = self.sort_routine_list_by_dependencies(routine_list, task_0_by_routine, task_by_id)
-        self.logger.debug("sorted_routine_list: %s", [sorted_routine.name for sorted_routine in sorted_routine_list ])
+        sorted_routine_id_list = task_table.sort_routine_ids_by_dependencies()
+        if len(sorted_routine_id_list) != len(task_table.routine_list):
+            self.logger.critical("Circular dependencies between routines")
+            raise ImpossiblePlan("Circular dependencies between routines")
+        self.logger.debug("sorted_routine_list: %s", [task_table.routine_list[routine_id].name for routine_id in sorted_routine_id_list])
 
-        list_time = self.calculate_list_of_time_max_for_each_routine(task_by_routine, sorted_routine_list)
+        list_time = self.calculate_list_of_time_max_for_each_routine(task_table, sorted_routine_id_list)
         self.logger.debug("list_time= %s", list_time)
 
-        self.place_tasks(task_by_routine, task_by_id, sorted_routine_list, list_time)
+        task_index_by_routine = task_table.get_task_index_by_routine()
+        self.place_tasks(task_table, task_index_by_routine, sorted_routine_id_list, list_time)
         self.logger.debug("Matrix plan : %s", self.plan_matrix)
 
-        self.create_attribution_plan(sorted_routine_list, task_by_routine)
+        self.create_attribution_plan(task_table, task_index_by_routine, sorted_routine_id_list)
         self.logger.debug("Attribution plan : %s", self.attribution_plan)
 
         self.logger.info("End plan")
 
-    def calculate_list_of_time_max_for_each_routine(self, task_by_routine: dict, sorted_routine_list: list[ProcessingRoutine]) -> list[int]:
+    def calculate_list_of_time_max_for_each_routine(self, task_table: TaskTable, sorted_routine_id_list: list[int]) -> list[int]:
         """Calculate the maximum time given to place the tasks for each routine"""
 
         self.logger.info("Begin calculate list of time max for each routine")
 
+        nb_task = task_table.count_task_by_routine()[sorted_routine_id_list]
+        cpu = task_table.routine_cpu[sorted_routine_id_list]
+        duration = task_table.routine_duration[sorted_routine_id_list]
+
         # Check limit of time for each routine
-        list_time_min = [np.ceil((len(task_by_routine[routine.name]) /
-                                 min(self.cpu_max // routine.cpu,
-                                        self.ram_max // routine.ram,
-                                        self.storage_space_max // routine.storage_space,
-                                        self.vm_max))) * routine.duration for i, routine in enumerate(sorted_routine_list)]
+        nb_task_at_once = np.minimum.reduce([self.cpu_max // cpu,
+                                             self.ram_max // task_table.routine_ram[sorted_routine_id_list],
+                                             self.storage_space_max // task_table.routine_storage_space[sorted_routine_id_list],
+                                             np.full(len(sorted_routine_id_list), self.vm_max)])
+        list_time_min = np.ceil(nb_task / nb_task_at_once) * duration
         self.logger.debug("list_time_min= %s", list_time_min)
 
         # Calculate the percentage of total time necessary to process all processing_task of each routine
         # Distribute the extra time (compared to the minimum time required) between routines according to their size
-        time_routine = [routine.cpu * routine.duration * len(task_by_routine[routine.name]) for routine in sorted_routine_list]
-        list_time = [int(np.round((rtime / sum(time_routine))*(self.t_max-sum(list_time_min))) + list_time_min[i]) for i, rtime in enumerate(time_routine)]
+        time_routine = cpu * duration * nb_task
+        list_time = (np.round((time_routine / time_routine.sum())*(self.t_max-list_time_min.sum())) + list_time_min).astype(int).tolist()
 
         self.logger.info("End calculate list of time max for each routine")
 
         return list_time
 
-    def sort_routine_list_by_dependencies(self, routine_list: list[ProcessingRoutine], task_0_by_routine: dict, task_by_id: dict) -> list[ProcessingRoutine]:
-        """Sorts routine by its dependencies"""
-
-        self.logger.info("Begin sort routine list by dependencies")
-
-        sorted_routine_list = []
-        for id_routine, routine in enumerate(routine_list):
-            # No task in the routine
-            if task_0_by_routine[id_routine] is None:
-                continue
-            task_ids_dependency_list = task_0_by_routine[id_routine].depends_on
-
-            # No dependency
-            if task_ids_dependency_list is None and routine.name not in [sorted_routine.name for sorted_routine in sorted_routine_list]:
-                sorted_routine_list = [routine] + sorted_routine_list
-                continue
-            if task_ids_dependency_list is None:
-                continue
-            routine_dependencies = [task_by_id[task_ids_dependency].processing_routine for task_ids_dependency in task_ids_dependency_list]
-
-            # Dependencies processing
-            for routine_i_depend_on in routine_dependencies:
-                if routine_i_depend_on.name not in [sorted_routine.name for sorted_routine in sorted_routine_list]:
-
-                    # If dependency and routine not in sorted_routine_list : we add dependency at the end of sorted_routine_list
-                    if routine.name not in [sorted_routine.name for sorted_routine in sorted_routine_list]:
-                        sorted_routine_list.append(routine_i_depend_on)
-
-                    # If dependency not in sorted_routine_list but routine are in : we add dependency just before routine
-                    else:
-                        id_routine = [sorted_routine.name for sorted_routine in sorted_routine_list].index(routine.name)
-                        sorted_routine_list = sorted_routine_list[:id_routine] + [routine_i_depend_on] + sorted_routine_list[id_routine:]
-
-            # Routine processing
-            if routine.name not in [sorted_routine.name for sorted_routine in sorted_routine_list]:
-                best_id = max([[sorted_routine.name for sorted_routine in sorted_routine_list].index(routine_dependency.name)+1  for routine_dependency in routine_dependencies])
-                sorted_routine_list = sorted_routine_list[:best_id] + [routine] + sorted_routine_list[best_id:]
+    def check_routine_resources_at_time(self, routine: ProcessingRoutine, time: int, ram_per_time: list[int], storage_space_per_time: list[int], vm_per_time: list[int]) -> bool:
+        """Checks that a task of the routine running at time doesn't exceed RAM, storage space and VM limits"""
 
-        self.logger.info("End sort routine list by dependencies")
-
-        return sorted_routine_list
+        return (ram_per_time[time] + routine.ram <= self.ram_max # RAM use <= RAM max
+                and storage_space_per_time[time] + routine.storage_space <= self.storage_space_max # Storage_space use <= Storage_space max
+                and vm_per_time[time] + 1 <= self.vm_max) # VM use <= VM max
 
     #@profile
-    def check_routine_conditions_to_place_task(self, task: ProcessingTask, routine: ProcessingRoutine, time_max_for_the_routine: int, i: int, j: int, ram_per_time: list[int], storage_space_per_time: list[int], vm_per_time: list[int]) -> bool:
-        """Checks routine-dependent conditions to place processing_task in plan_matrix"""
-
-        self.logger.info("Begin check condition to place task")
-
-        # No overlap between VMs
-        if j%routine.cpu!=0:
-            self.logger.debug("j mod routine.cpu %s", j%routine.cpu)
-            return False
-        self.logger.debug("No overlap between VMs check")
-
-        # Limit time
-        if i+routine.duration>time_max_for_the_routine:
-            return False
-        self.logger.debug("Limit time check")
-
-        # Processing_task already placed or we don't have time and cpu to place it at this place
-        if not (self.plan_matrix[j:j+routine.cpu,i:i+routine.duration].shape==(routine.cpu,routine.duration)) or task.t0 is not None :
-            return False
-        self.logger.debug("Processing_task not already placed and we have time and cpu to place it at this place check")
-
-        # Free location
-        if (self.plan_matrix[j:j+routine.cpu,i:i+routine.duration]!=0).any():
-            return False
-        self.logger.debug("Free location check")
-
-        # Materials resources limit
-        test_ram = [k + routine.ram > self.ram_max for k in ram_per_time[i:i+routine.duration]] # RAM use <= RAM max
-        test_storage = [k + routine.storage_space > self.storage_space_max for k in storage_space_per_time[i:i+routine.duration]] # Storage_space use <= Storage_space max
-        test_vm = [k + 1 > self.vm_max for k in vm_per_time[i:i+routine.duration]] # VM use <= VM max
-        if any(test_ram) or any(test_storage) or any(test_vm):
-            self.logger.debug("RAM %s", test_ram)
-            self.logger.debug("Storage space %s", test_storage)
-            self.logger.debug("VM %s", test_vm)
-            return False
-        self.logger.debug("Materials resources limit check")
-
-        self.logger.info("End check condition to place task")
-        return True
+    def place_tasks(self, task_table: TaskTable, task_index_by_routine: list[np.ndarray], sorted_routine_id_list: list[int], list_time: list[int]) -> None:
+        """
+        Place all tasks in the matrix.
 
-    def check_task_dependencies(self, task: ProcessingTask, task_by_id: dict, i: int) -> bool:
-        """Check if all the dependencies of a task are respected : task-dependent condition"""
+        Each task is placed at the first free location (smallest cpu row j, then smallest time i) where
+        the routine fits before the time max of the routine and after the end of its dependencies.
+        Free locations of the routine are kept in a FreeStartIndex updated after each placement.
+        """
 
-        # Dependencies
-        if task.depends_on is not None and any([(task_by_id[task.depends_on[k]].t0 + task_by_id[task.depends_on[k]].processing_routine.duration) > i for k in range(len(task.depends_on))]):
-            return False
-        self.logger.debug("Dependencies check")
+        self.logger.info("Begin place task")
 
-        return True
+        # Creation of resources list
+        self.ram_per_time = [0 for i in range(self.t_max)]
+        self.storage_space_per_time = [0 for i in range(self.t_max)]
+        self.vm_per_time = [0 for i in range(self.t_max)]
 
-    #@profile
-    def place_tasks(self, task_by_routine: dict, task_by_id: dict, sorted_routine_list: list[ProcessingRoutine], list_time: list[int]) -> None:
-        """Place all tasks in the matrix"""
+        for id_routine, routine_id in enumerate(sorted_routine_id_list):
+            routine_to_placed = task_table.routine_list[routine_id]
+            self.logger.info("Routine : %s", routine_to_placed.name)
+            self.routine_id_by_name[routine_to_placed.name] = id_routine+1
 
-        self.logger.info("Begin place task")
+            time_max_for_the_routine = min(sum(list_time[:id_routine+1]), self.t_max)
+            free_start_index = self.create_free_start_index(routine_to_placed, time_max_for_the_routine)
 
-        # Creation of resources list
-        ram_per_time = [0 for i in range(self.t_max)]
-        storage_space_per_time = [0 for i in range(self.t_max)]
-        vm_per_time = [0 for i in range(self.t_max)]
-
-        # Add a list of candidate to only test empty emplacement to planned processing_task
-        current_routine_candidates = []
-        useless_candidates_for_this_routine = []
-        useless_candidates_for_this_task = []
-        for id_routine, routine_to_placed in enumerate(sorted_routine_list):
-            self.logger.info("Routine : %s", sorted_routine_list[id_routine].name)
-
-            time_max_for_the_routine = sum(list_time[:id_routine+1])
-            offset_previous_routines = 0
-
-            # Modify offset if it's not the first routine
-            if id_routine:
-                offset_previous_routines = sum(list_time[:id_routine])
-            leftovers_routine_candidates = []
-
-            # Add leftovers if it's not the first routine
-            if current_routine_candidates:
-                leftovers_routine_candidates = current_routine_candidates
-
-            # Create candidate for the routine
-            current_routine_candidates = [offset_previous_routines + self.t_max*(i//list_time[id_routine]) + i%list_time[id_routine] for i in range(self.cpu_max*list_time[id_routine])]
-            current_routine_candidates = useless_candidates_for_this_routine + leftovers_routine_candidates + current_routine_candidates
-            current_routine_candidates.sort()
+            # The dependencies in the routines already placed give the earliest start of the tasks at once,
+            # a dependency in the routine itself is placed just before
+            task_index = task_index_by_routine[routine_id]
+            earliest_start_list = task_table.calculate_earliest_start(task_index).tolist()
+            depends_on_same_routine = task_table.depends_on_same_routine[task_index].tolist()
 
             # Planned all processing_task for the routine_to_placed
-            useless_candidates_for_this_routine = []
-            for task in task_by_routine[routine_to_placed.name]:
-                for candidate in current_routine_candidates:
-                    j = candidate//self.t_max
-                    i = candidate%self.t_max
-
-                    # If routine-dependent conditions are false, all the tasks of the routine cannot be place here : removes the candidate from the possibilities for this routine
-                    if not self.check_routine_conditions_to_place_task(task, routine_to_placed,
-                                      time_max_for_the_routine,
-                                      i, j, ram_per_time,
-                                      storage_space_per_time,
-                                      vm_per_time) and candidate not in useless_candidates_for_this_routine:
-                        useless_candidates_for_this_task.append(candidate)
-                        continue
-
-                    # If task-dependent are false, an other task of the routine can be place here, so just continue the iteration
-                    if not self.check_task_dependencies(task, task_by_id, i):
-                        continue
-
-                    # In other case, place task
-                    self.plan_matrix[j:j+routine_to_placed.cpu, i:i+routine_to_placed.duration] = id_routine+1
-                    ram_per_time[i:i+routine_to_placed.duration] = [l + routine_to_placed.ram for l in ram_per_time[i:i+routine_to_placed.duration]]
-                    storage_space_per_time[i:i+routine_to_placed.duration] = [l + routine_to_placed.storage_space for l in storage_space_per_time[i:i+routine_to_placed.duration]]
-                    vm_per_time[i:i+routine_to_placed.duration] = [l + 1 for l in vm_per_time[i:i+routine_to_placed.duration]]
-                    task.t0 = i
-
-                    # Remove all index used to placed processing_task
-                    remove_list = [jj*self.t_max+ii for jj,ii in product(range(j,j+routine_to_placed.cpu),range(i,i+routine_to_placed.duration))]
-                    for to_remove_candidate in remove_list:
-                        current_routine_candidates.remove(to_remove_candidate)
-
-                    # Remove all index who cannot place task because of routine condition
-                    if useless_candidates_for_this_task:
-                        for useless_candidate in useless_candidates_for_this_task:
-                            current_routine_candidates.remove(useless_candidate)
-
-                    # Keep candidate not usefull for this routine in order to add these candidates in the next routine
-                    useless_candidates_for_this_routine = useless_candidates_for_this_routine + useless_candidates_for_this_task
-                    useless_candidates_for_this_task = []
-                    break
+            for index, earliest_start, same_routine in zip(task_index.tolist(), earliest_start_list, depends_on_same_routine):
+                if same_routine:
+                    earliest_start = int(task_table.calculate_earliest_start(np.array([index]))[0])
+                location = free_start_index.find_first_free_location(earliest_start)
+                if location is None:
+                    self.logger.debug("No location found for task %s", self.task_list[index].task_id)
+                    continue
+
+                # Place task
+                self.occupy_location(self.task_list[index], location, free_start_index)
+                task_table.t0[index] = location[1]
 
         self.logger.info("End place task")
 
+    def create_free_start_index(self, routine: ProcessingRoutine, time_limit: int) -> FreeStartIndex:
+        """Create the index of the free locations of the routine in the current plan_matrix and resources"""
+
+        # Same condition as check_routine_resources_at_time, at all times at once
+        blocked_times = ~((np.array(self.ram_per_time) + routine.ram <= self.ram_max)
+                          & (np.array(self.storage_space_per_time) + routine.storage_space <= self.storage_space_max)
+                          & (np.array(self.vm_per_time) + 1 <= self.vm_max))
+        return FreeStartIndex(self.plan_matrix, routine.cpu, routine.duration, time_limit, blocked_times)
+
+    def occupy_location(self, task: ProcessingTask, location: tuple[int, int], free_start_index: FreeStartIndex) -> None:
+        """Place the task at location (j, i) of plan_matrix, add its resources and update the free locations of its routine"""
+
+        routine = task.processing_routine
+        j, i = location
+        self.plan_matrix[j:j+routine.cpu, i:i+routine.duration] = self.routine_id_by_name[routine.name]
+        new_blocked_times = []
+        for time in range(i, i+routine.duration):
+            self.ram_per_time[time] += routine.ram
+            self.storage_space_per_time[time] += routine.storage_space
+            self.vm_per_time[time] += 1
+            if not self.check_routine_resources_at_time(routine, time, self.ram_per_time, self.storage_space_per_time, self.vm_per_time):
+                new_blocked_times.append(time)
+        task.t0 = i
+        self.location_by_task_id[task.task_id] = location
+
+        # Update free locations of the routine
+        free_start_index.occupy(j, i, new_blocked_times)
+
     #@profile
-    def create_attribution_plan(self, sorted_routine_list: list[ProcessingRoutine], task_by_routine: dict) -> None:
+    def create_attribution_plan(self, task_table: TaskTable, task_index_by_routine: list[np.ndarray], sorted_routine_id_list: list[int]) -> None:
         """Interpretation of plan_matrix and creation of attribution_plan"""
 
         self.logger.info("Begin creation of attribution plan")
 
         self.attribution_plan = {}
-        for nb_routine, routine in enumerate(sorted_routine_list):
-            self.logger.info("Routine : %s", sorted_routine_list[nb_routine].name)
-
-            # Sort the task in ascending order of t0
-            task_by_routine[routine.name].sort(key=lambda x: x.t0)
+        for nb_routine, routine_id in enumerate(sorted_routine_id_list):
+            routine = task_table.routine_list[routine_id]
+            self.logger.info("Routine : %s", routine.name)
+
+            # Sort the placed task in ascending order of t0
+            task_index = task_index_by_routine[routine_id]
+            task_index = task_index[task_table.t0[task_index] >= 0]
+            task_index = task_index[np.argsort(task_table.t0[task_index], kind="stable")]
             i=0
-            list_task_in_routine = list(task_by_routine[routine.name])
-            list_task_not_placed = list_task_in_routine.copy()
+            list_task_in_routine = [self.task_list[index] for index in task_index.tolist()]
 
             # Place task in VM for the routine
             while len(list_task_in_routine) != 0:
@@ -287,6 +206,7 @@ class MatrixScheduler(Scheduler):
 
                 if vm_name not in self.attribution_plan:
                     self.attribution_plan[vm_name] = [vm_id,f"flavour{nb_routine+1}",None,None,[]]
+                list_task_not_placed = []
                 for _, task in enumerate(list_task_in_routine):
 
                     # Place the first task for this VM
@@ -294,7 +214,6 @@ class MatrixScheduler(Scheduler):
                         self.attribution_plan[vm_name][4].append(task)
                         self.attribution_plan[vm_name][2] = task.t0
                         self.attribution_plan[vm_name][3] = task.t0 + task.processing_routine.duration
-                        list_task_not_placed.remove(task)
 
                     # Place the other task for this VM
                     else:
@@ -304,27 +223,188 @@ class MatrixScheduler(Scheduler):
                         if last_task.t0 + last_task.processing_routine.duration <= task.t0: # Accepts that the worker can wait and do nothing for a while (if it's not accepted, replace by : ==)
                             self.attribution_plan[vm_name][4].append(task)
                             self.attribution_plan[vm_name][3] = task.t0 + task.processing_routine.duration
-                            list_task_not_placed.remove(task)
-                list_task_in_routine = list_task_not_placed.copy()
+                        else:
+                            list_task_not_placed.append(task)
+                list_task_in_routine = list_task_not_placed
                 i+=1
 
         self.logger.info("End creation of attribution plan")
 
+    def update_plan(self, task_list: list[ProcessingTask]) -> bool:
+        """
+        Update the plan with the tasks still to process, instead of planning them from scratch:
+        - the tasks of the plan which are not in task_list are finished, their capacity is released,
+        - the tasks of task_list which are not in the plan are placed in the free locations,
+        - the other tasks keep their t0 and their worker.
+        Return False if a new task can't be placed, the plan must then be made again with plan.
+        """
+
+        self.logger.info("Begin update plan")
+
+        task_id_set = set(task.task_id for task in task_list)
+        planned_task_id_set = set(task.task_id for task in self.task_list)
+        finished_task_list = [task for task in self.task_list if task.task_id not in task_id_set]
+        new_task_list = [task for task in task_list if task.task_id not in planned_task_id_set]
+        self.logger.info("%s finished tasks, %s new tasks", len(finished_task_list), len(new_task_list))
+
+        self.release_tasks(finished_task_list)
+        self.task_list = [task for task in self.task_list if task.task_id in task_id_set] + new_task_list
+        success = self.place_new_tasks(new_task_list)
+
+        self.logger.info("End update plan")
+
+        return success
+
+    def release_tasks(self, finished_task_list: list[ProcessingTask]) -> None:
+        """Release the plan_matrix locations and the resources of the finished tasks and remove them from attribution_plan"""
+
+        self.logger.info("Begin release tasks")
+
+        for task in finished_task_list:
+            routine = task.processing_routine
+            j, i = self.location_by_task_id.pop(task.task_id)
+            self.plan_matrix[j:j+routine.cpu, i:i+routine.duration] = 0
+            for time in range(i, i+routine.duration):
+                self.ram_per_time[time] -= routine.ram
+                self.storage_space_per_time[time] -= routine.storage_space
+                self.vm_per_time[time] -= 1
+
+        # Workers without task left are removed
+        finished_task_id_set = set(task.task_id for task in finished_task_list)
+        for vm_name in list(self.attribution_plan):
+            worker_task_list = [task for task in self.attribution_plan[vm_name][4] if task.task_id not in finished_task_id_set]
+            if not worker_task_list:
+                del self.attribution_plan[vm_name]
+                continue
+            self.attribution_plan[vm_name][2] = worker_task_list[0].t0
+            self.attribution_plan[vm_name][3] = max(task.t0 + task.processing_routine.duration for task in worker_task_list)
+            self.attribution_plan[vm_name][4] = worker_task_list
+
+        self.logger.info("End release tasks")
+
+    def place_new_tasks(self, new_task_list: list[ProcessingTask]) -> bool:
+        """
+        Place the new tasks in the free locations of plan_matrix, after their dependencies, and attribute them to workers.
+        A dependency which isn't in the plan anymore is finished. Return False if a task can't be placed.
+        """
+
+        self.logger.info("Begin place new tasks")
+
+        task_by_id = dict((task.task_id, task) for task in self.task_list)
+        task_to_place_list = list(new_task_list)
+        while task_to_place_list:
+
+            # Tasks whose dependencies are all placed, by routine
+            ready_task_by_routine = {}
+            waiting_task_list = []
+            for task in task_to_place_list:
+                if all(task_by_id[task_id].t0 is not None for task_id in (task.depends_on or []) if task_id in task_by_id):
+                    ready_task_by_routine.setdefault(task.processing_routine.name, []).append(task)
+                else:
+                    waiting_task_list.append(task)
+            if not ready_task_by_routine:
+                self.logger.warning("Circular dependencies between the new tasks")
+                return False
+
+            for routine_task_list in ready_task_by_routine.values():
+                routine = routine_task_list[0].processing_routine
+                self.routine_id_by_name.setdefault(routine.name, len(self.routine_id_by_name)+1)
+                free_start_index = self.create_free_start_index(routine, self.t_max)
+                for task in routine_task_list:
+                    earliest_start = max([task_by_id[task_id].t0 + task_by_id[task_id].processing_routine.duration
+                                          for task_id in (task.depends_on or []) if task_id in task_by_id], default=0)
+                    location, vm_name = self.find_new_task_location(task, earliest_start, free_start_index)
+                    if location is None:
+                        self.logger.info("No location found for task %s", task.task_id)
+                        return False
+                    self.occupy_location(task, location, free_start_index)
+                    self.attribute_new_task(task, vm_name)
+            task_to_place_list = waiting_task_list
+
+        self.logger.info("End place new tasks")
+
+        return True
+
+    def find_new_task_location(self, task: ProcessingTask, earliest_start: int, free_start_index: FreeStartIndex) -> tuple[tuple[int, int], str]:
+        """
+        Return the first free location of the new task from earliest_start with a worker to attribute it to,
+        (None, None) if there isn't any. The tasks of the workers are already in HRWSI Database, chained by their
+        preceding input: a new task is only added after the last task of a worker, so that a worker never has two
+        tasks ready to be launched. When no worker is free at the first location, the task starts after
+        the end of the first worker of its flavour to end.
+        """
+
+        location = free_start_index.find_first_free_location(earliest_start)
+        if location is None:
+            return None, None
+        vm_name = self.find_worker_for_new_task(task, location[1])
+        if vm_name is not None:
+            return location, vm_name
+
+        flavour = f"flavour{self.routine_id_by_name[task.processing_routine.name]}"
+        worker_end = min((worker[3] for worker in self.attribution_plan.values() if worker[1] == flavour), default=None)
+        if worker_end is None or worker_end <= location[1]:
+            self.logger.info("No worker left for task %s", task.task_id)
+            return None, None
+        location = free_start_index.find_first_free_location(worker_end)
+        if location is None:
+            return None, None
+        return location, self.find_worker_for_new_task(task, location[1])
+
+    def find_worker_for_new_task(self, task: ProcessingTask, t0: int) -> str:
+        """
+        Return the first worker of the flavour of the task whose last task ends before t0,
+        or the name of a new worker, None if there is no worker name left in vm_name_list
+        """
+
+        flavour = f"flavour{self.routine_id_by_name[task.processing_routine.name]}"
+        vm_name = next((vm_name for vm_name, worker in self.attribution_plan.items()
+                        if worker[1] == flavour and worker[3] <= t0), None)
+        if vm_name is not None:
+            return vm_name
+        if self.vm_name_list:
+            return next((vm_name for vm_name in self.vm_name_list if vm_name not in self.attribution_plan), None)
+        n = 1
+        while f"{task.processing_routine.name}_worker_{n}" in self.attribution_plan:
+            n += 1
+        return f"{task.processing_routine.name}_worker_{n}"
+
+    def attribute_new_task(self, task: ProcessingTask, vm_name: str) -> None:
+        """Add the placed new task after the last task of the worker vm_name, the worker is created if it doesn't exist"""
+
+        task_end = task.t0 + task.processing_routine.duration
+        if vm_name not in self.attribution_plan:
+            flavour = f"flavour{self.routine_id_by_name[task.processing_routine.name]}"
+            if self.vm_name_list and self.vm_id_list:
+                vm_id = self.vm_id_list[self.vm_name_list.index(vm_name)]
+            else:
+                vm_id = str(uuid.uuid1())
+            self.attribution_plan[vm_name] = [vm_id, flavour, task.t0, task_end, []]
+
+        worker = self.attribution_plan[vm_name]
+        worker[4].append(task)
+        worker[2] = min(worker[2], task.t0)
+        worker[3] = max(worker[3], task_end)
+
 if __name__ == "__main__":
 
     processing_routine_a = ProcessingRoutine(name="foo", cpu=2, ram=1, storage_space=2, duration=5, docker_image="bar")
     processing_routine_b = ProcessingRoutine(name="foo2", cpu=3, ram=2, storage_space=2, duration=2, docker_image="bar")
 
-    list_of_task=[]
+    def create_benchmark_task_list(nb_image: int) -> list[ProcessingTask]:
+        """Create nb_image tasks of routine a and nb_image tasks of routine b each depending on one task of routine a"""
+
+        list_of_task=[]
+        for nb_img in range(nb_image*2):
+            if nb_img < nb_image :
+                list_of_task.append(ProcessingTask(processing_routine=processing_routine_a, task_id=nb_img, t0=None, depends_on=None))
+            else :
+                list_of_task.append(ProcessingTask(processing_routine=processing_routine_b, task_id=nb_img, t0=None, depends_on=[nb_img%nb_image]))
+        return list_of_task
+
     NB_IMAGE = 2000
-    for nb_img in range(NB_IMAGE*2):
-        if nb_img < NB_IMAGE :
-            list_of_task.append(ProcessingTask(processing_routine=processing_routine_a, task_id=nb_img, t0=None, depends_on=None))
-        else :
-            list_of_task.append(ProcessingTask(processing_routine=processing_routine_b, task_id=nb_img, t0=None, depends_on=[nb_img%NB_IMAGE]))
-
-    planning = MatrixScheduler(t_max=5750, cpu_max=10, ram_max=10, storage_space_max=10, vm_max=4, task_list=list_of_task,json_path="plan.json"
-                               ,vm_name_list=["1","2","3","4"], vm_id_list=["01","02","03","04"])
+    planning = MatrixScheduler(t_max=5750, cpu_max=10, ram_max=10, storage_space_max=10, vm_max=4, task_list=create_benchmark_task_list(NB_IMAGE),
+                               json_path="plan.json", vm_name_list=["1","2","3","4"], vm_id_list=["01","02","03","04"])
 
     planning.check_feasibility()
     planning.plan()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Placement_benchmark module compares the placement of the tasks of MatrixScheduler.plan on the same plan:
+- the former place_tasks, scanning a list of candidate locations checked one by one,
+- place_tasks with the FreeStartIndex of each routine, updated after each placement.
+Both placements are given the same routine order and time max of each routine, they must give the same plan.
+The tasks of the second routine depend on one task of the first routine, as in the MatrixScheduler benchmark.
+
+Usage (from the project root):
+    python3 HRWSI_System/orchestrator/scheduler/placement_benchmark.py [--nb-image 2000 5000]
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+from itertools import product
+import numpy as np
+# Authorizing other packages absolute import
+ROOT_FOLDER = '/'.join(os.getcwd().split('nrt_production_system')[:-1])
+sys.path.append(ROOT_FOLDER+'nrt_production_system')
+
+from HRWSI_System.orchestrator.scheduler.matrix_scheduler import MatrixScheduler
+from HRWSI_System.orchestrator.processing_task.processing_task import ProcessingTask
+from HRWSI_System.orchestrator.processing_routine.processing_routine import ProcessingRoutine
+
+PROCESSING_ROUTINE_A = ProcessingRoutine(name="foo", cpu=2, ram=1, storage_space=2, duration=5, docker_image="bar")
+PROCESSING_ROUTINE_B = ProcessingRoutine(name="foo2", cpu=3, ram=2, storage_space=2, duration=2, docker_image="bar")
+SCHEDULING_PARAMETERS = {"cpu_max": 10, "ram_max": 10, "storage_space_max": 10, "vm_max": 4}
+
+def former_place_tasks(planning: MatrixScheduler, task_by_routine: dict, task_by_id: dict, sorted_routine_list: list[ProcessingRoutine], list_time: list[int]) -> None:
+    """
+    place_tasks scanning a list of candidate locations checked one by one, as before the FreeStartIndex.
+    The check functions are inlined without their debug logs.
+    """
+
+    def check_routine_conditions_to_place_task(task, routine, time_max_for_the_routine, i, j, ram_per_time, storage_space_per_time, vm_per_time):
+        if j%routine.cpu!=0:
+            return False
+        if i+routine.duration>time_max_for_the_routine:
+            return False
+        if not (planning.plan_matrix[j:j+routine.cpu,i:i+routine.duration].shape==(routine.cpu,routine.duration)) or task.t0 is not None :
+            return False
+        if (planning.plan_matrix[j:j+routine.cpu,i:i+routine.duration]!=0).any():
+            return False
+        test_ram = [k + routine.ram > planning.ram_max for k in ram_per_time[i:i+routine.duration]]
+        test_storage = [k + routine.storage_space > planning.storage_space_max for k in storage_space_per_time[i:i+routine.duration]]
+        test_vm = [k + 1 > planning.vm_max for k in vm_per_time[i:i+routine.duration]]
+        return not (any(test_ram) or any(test_storage) or any(test_vm))
+
+    def check_task_dependencies(task, i):
+        return not (task.depends_on is not None and any([(task_by_id[task.depends_on[k]].t0 + task_by_id[task.depends_on[k]].processing_routine.duration) > i for k in range(len(task.depends_on))]))
+
+    ram_per_time = [0 for i in range(planning.t_max)]
+    storage_space_per_time = [0 for i in range(planning.t_max)]
+    vm_per_time = [0 for i in range(planning.t_max)]
+
+    current_routine_candidates = []
+    useless_candidates_for_this_routine = []
+    useless_candidates_for_this_task = []
+    for id_routine, routine_to_placed in enumerate(sorted_routine_list):
+        time_max_for_the_routine = sum(list_time[:id_routine+1])
+        offset_previous_routines = 0
+        if id_routine:
+            offset_previous_routines = sum(list_time[:id_routine])
+        leftovers_routine_candidates = []
+        if current_routine_candidates:
+            leftovers_routine_candidates = current_routine_candidates
+
+        current_routine_candidates = [offset_previous_routines + planning.t_max*(i//list_time[id_routine]) + i%list_time[id_routine] for i in range(planning.cpu_max*list_time[id_routine])]
+        current_routine_candidates = useless_candidates_for_this_routine + leftovers_routine_candidates + current_routine_candidates
+        current_routine_candidates.sort()
+
+        useless_candidates_for_this_routine = []
+        for task in task_by_routine[routine_to_placed.name]:
+            for candidate in current_routine_candidates:
+                j = candidate//planning.t_max
+                i = candidate%planning.t_max
+                if not check_routine_conditions_to_place_task(task, routine_to_placed, time_max_for_the_routine, i, j, ram_per_time,
+                                                              storage_space_per_time, vm_per_time) and candidate not in useless_candidates_for_this_routine:
+                    useless_candidates_for_this_task.append(candidate)
+                    continue
+                if not check_task_dependencies(task, i):
+                    continue
+
+                planning.plan_matrix[j:j+routine_to_placed.cpu, i:i+routine_to_placed.duration] = id_routine+1
+                ram_per_time[i:i+routine_to_placed.duration] = [l + routine_to_placed.ram for l in ram_per_time[i:i+routine_to_placed.duration]]
+                storage_space_per_time[i:i+routine_to_placed.duration] = [l + routine_to_placed.storage_space for l in storage_space_per_time[i:i+routine_to_placed.duration]]
+                vm_per_time[i:i+routine_to_placed.duration] = [l + 1 for l in vm_per_time[i:i+routine_to_placed.duration]]
+                task.t0 = i
+
+                remove_list = [jj*planning.t_max+ii for jj,ii in product(range(j,j+routine_to_placed.cpu),range(i,i+routine_to_placed.duration))]
+                for to_remove_candidate in remove_list:
+                    current_routine_candidates.remove(to_remove_candidate)
+                if useless_candidates_for_this_task:
+                    for useless_candidate in useless_candidates_for_this_task:
+                        current_routine_candidates.remove(useless_candidate)
+                useless_candidates_for_this_routine = useless_candidates_for_this_routine + useless_candidates_for_this_task
+                useless_candidates_for_this_task = []
+                break
+
+def run_former_place_tasks(planning: MatrixScheduler) -> float:
+    """Place the tasks of the planning with the former place_tasks, in the routine order and time max of plan, return the placement time"""
+
+    task_table = planning.get_task_table(read_t0=False)
+    sorted_routine_id_list = task_table.sort_routine_ids_by_dependencies()
+    list_time = planning.calculate_list_of_time_max_for_each_routine(task_table, sorted_routine_id_list)
+    sorted_routine_list = [task_table.routine_list[routine_id] for routine_id in sorted_routine_id_list]
+    task_by_routine = {}
+    for task in planning.task_list:
+        task_by_routine.setdefault(task.processing_routine.name, []).append(task)
+    task_by_id = {task.task_id: task for task in planning.task_list}
+
+    start = time.perf_counter()
+    former_place_tasks(planning, task_by_routine, task_by_id, sorted_routine_list, list_time)
+    return time.perf_counter() - start
+
+def run_place_tasks(planning: MatrixScheduler) -> float:
+    """Place the tasks of the planning with place_tasks, as in plan, return the placement time"""
+
+    task_table = planning.get_task_table(read_t0=False)
+    task_table.t0.fill(-1)
+    sorted_routine_id_list = task_table.sort_routine_ids_by_dependencies()
+    list_time = planning.calculate_list_of_time_max_for_each_routine(task_table, sorted_routine_id_list)
+    task_index_by_routine = task_table.get_task_index_by_routine()
+
+    start = time.perf_counter()
+    planning.place_tasks(task_table, task_index_by_routine, sorted_routine_id_list, list_time)
+    return time.perf_counter() - start
+
+def create_planning(nb_image: int) -> MatrixScheduler:
+    """Create nb_image tasks of routine a and nb_image tasks of routine b each depending on one task of routine a,
+    t_max grows with the number of tasks so that every plan stays feasible"""
+
+    task_list = [ProcessingTask(processing_routine=PROCESSING_ROUTINE_A, task_id=task_id, t0=None, depends_on=None)
+                 for task_id in range(nb_image)]
+    task_list += [ProcessingTask(processing_routine=PROCESSING_ROUTINE_B, task_id=task_id, t0=None, depends_on=[task_id % nb_image])
+                  for task_id in range(nb_image, 2 * nb_image)]
+    return MatrixScheduler(t_max=nb_image * 5750 // 2000, task_list=task_list, **SCHEDULING_PARAMETERS)
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Compare the former placement of the MatrixScheduler with the FreeStartIndex placement")
+    parser.add_argument("--nb-image", type=int, nargs="+", default=[2000, 5000], help="Number of tasks of each of the 2 routines")
+    args = parser.parse_args()
+
+    # Debug logs of the whole plan aren't measured
+    MatrixScheduler.LOGGER_LEVEL = logging.WARNING
+
+    for nb_image in args.nb_image:
+        former_planning = create_planning(nb_image)
+        former_time = run_former_place_tasks(former_planning)
+        planning = create_planning(nb_image)
+        new_time = run_place_tasks(planning)
+
+        # Same plan
+        assert all(task.t0 is not None for task in planning.task_list)
+        assert [task.t0 for task in planning.task_list] == [task.t0 for task in former_planning.task_list]
+        assert np.array_equal(planning.plan_matrix, former_planning.plan_matrix)
+        print(f"{2 * nb_image} tasks, t_max={planning.t_max}: former place_tasks {former_time:.3f} s, "
+              f"FreeStartIndex place_tasks {new_time:.3f} s ({former_time / new_time:.0f}x)")
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Replanning_benchmark module compares the re-planning of the Orchestrator under a stream of simulated completions:
+- the full re-planning, a new MatrixScheduler planning all the pending tasks at each scheduling,
+- the incremental re-planning, MatrixScheduler.update_plan releasing the finished tasks and placing the new ones in the last plan.
+At each event, the tasks starting first in the plan are finished and as many new tasks arrive.
+
+Usage (from the project root):
+    python3 HRWSI_System/orchestrator/scheduler/replanning_benchmark.py [--nb-task 2000] [--nb-event 50] [--nb-completion 1]
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+# Authorizing other packages absolute import
+ROOT_FOLDER = '/'.join(os.getcwd().split('nrt_production_system')[:-1])
+sys.path.append(ROOT_FOLDER+'nrt_production_system')
+
+from HRWSI_System.orchestrator.scheduler.matrix_scheduler import MatrixScheduler
+from HRWSI_System.orchestrator.processing_task.processing_task import ProcessingTask
+from HRWSI_System.orchestrator.processing_routine.processing_routine import ProcessingRoutine
+
+PROCESSING_ROUTINE_LIST = [ProcessingRoutine(name="foo", cpu=2, ram=1, storage_space=2, duration=5, docker_image="bar"),
+                           ProcessingRoutine(name="foo2", cpu=3, ram=2, storage_space=2, duration=2, docker_image="bar")]
+SCHEDULING_PARAMETERS = {"cpu_max": 10, "ram_max": 10, "storage_space_max": 10, "vm_max": 4}
+
+def create_task(task_id: int) -> ProcessingTask:
+    """Create an unplanned task, of each routine in turn"""
+
+    return ProcessingTask(processing_routine=PROCESSING_ROUTINE_LIST[task_id % len(PROCESSING_ROUTINE_LIST)], task_id=task_id, t0=None, depends_on=None)
+
+def full_planning(task_id_list: list[int], t_max: int) -> MatrixScheduler:
+    """Plan the pending tasks from scratch, as run_scheduling without the incremental mode"""
+
+    planning = MatrixScheduler(t_max=t_max, task_list=[create_task(task_id) for task_id in task_id_list], **SCHEDULING_PARAMETERS)
+    planning.check_feasibility()
+    planning.plan()
+    planning.check_plan()
+    return planning
+
+def run_stream(nb_task: int, nb_event: int, nb_completion: int, t_max: int, incremental: bool) -> tuple[list[float], int]:
+    """Return the re-planning time of each event and the number of full re-plannings of the incremental mode"""
+
+    planning = full_planning(list(range(nb_task)), t_max)
+    next_task_id = nb_task
+    event_time_list = []
+    nb_full_planning = 0
+    for _ in range(nb_event):
+        # The tasks starting first are finished, as many new tasks arrive
+        task_id_list = [task.task_id for task in sorted(planning.task_list, key=lambda task: task.t0)[nb_completion:]]
+        task_id_list += list(range(next_task_id, next_task_id + nb_completion))
+        next_task_id += nb_completion
+
+        start = time.perf_counter()
+        if incremental:
+            pending_task_by_id = dict((task.task_id, task) for task in planning.task_list)
+            if planning.update_plan([pending_task_by_id.get(task_id) or create_task(task_id) for task_id in task_id_list]):
+                planning.check_plan()
+            else:
+                nb_full_planning += 1
+                planning = full_planning(task_id_list, t_max)
+        else:
+            planning = full_planning(task_id_list, t_max)
+        event_time_list.append(time.perf_counter() - start)
+    return event_time_list, nb_full_planning
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Benchmark the full and the incremental re-planning")
+    parser.add_argument("--nb-task", type=int, default=2000, help="Number of pending tasks")
+    parser.add_argument("--nb-event", type=int, default=50)
+    parser.add_argument("--nb-completion", type=int, default=1, help="Number of tasks finished at each event")
+    args = parser.parse_args()
+
+    # Debug logs of the whole plan at each scheduling aren't measured
+    MatrixScheduler.LOGGER_LEVEL = logging.WARNING
+
+    # t_max leaves room for the new tasks, as in the MatrixScheduler benchmark
+    t_max = args.nb_task * 5750 // 4000 * 2
+    for name, incremental in (("full", False), ("incremental", True)):
+        event_time_list, nb_full_planning = run_stream(args.nb_task, args.nb_event, args.nb_completion, t_max, incremental)
+        print(f"{name:12}: {args.nb_event} events of {args.nb_completion} completions with {args.nb_task} pending tasks, "
+              f"{sum(event_time_list) / len(event_time_list) * 1e3:.1f} ms per event (max {max(event_time_list) * 1e3:.1f} ms), "
+              f"{nb_full_planning} full re-plannings")
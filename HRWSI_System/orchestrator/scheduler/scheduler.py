@@ -11,12 +11,12 @@ sys.path.append(ROOT_FOLDER+'nrt_production_system')
 
 import json
 import logging
+import datetime
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 
 from utils.logger import LogUtil
 from HRWSI_System.orchestrator.scheduler.encoder import Encoder
+from HRWSI_System.orchestrator.scheduler.task_table import TaskTable
 from HRWSI_System.orchestrator.processing_task.processing_task import ProcessingTask
 from HRWSI_System.orchestrator.orchestrator_exceptions.impossible_plan import ImpossiblePlan
 from HRWSI_System.orchestrator.orchestrator_exceptions.false_plan import FalsePlan
@@ -43,6 +43,7 @@ class Scheduler():
         self.task_list = task_list
         self.json_path = json_path
         self.attribution_plan = None
+        self.task_table = None
         self.logger = LogUtil.get_logger('Log_scheduler', self.LOGGER_LEVEL, "log_scheduler/logs.log")
 
     def plan(self) -> None:
@@ -64,66 +65,94 @@ class Scheduler():
 
         self.logger.info("End export to json")
 
-    def check_plan(self) -> bool:
-        """Calls all checking fonctions"""
+    def get_virtual_machine_tuple(self) -> tuple[tuple]:
+        """Return the (id, name, flavour) of the workers of attribution_plan"""
 
-        self.logger.info("Begin check plan")
+        return tuple((worker[0], vm_name, worker[1]) for vm_name, worker in self.attribution_plan.items())
+
+    def get_processing_task_tuple(self, creation_date: datetime.datetime) -> tuple[tuple]:
+        """
+        Return the (input_fk_id, virtual_machine_id, creation_date, preceding_input_id, has_ended) of the tasks of attribution_plan,
+        the preceding input being the one of the previous task of the worker
+        """
 
-        # Dico of {task_id : task}
-        task_by_id={}
-        for task in self.task_list:
-            task_by_id[task.task_id] = task
+        return tuple((task.task_id, worker[0], creation_date, worker[4][i-1].task_id if i != 0 else None, False)
+                     for worker in self.attribution_plan.values()
+                     for i, task in enumerate(worker[4]))
 
-        # List of resources
-        cpu_per_time=[0 for i in range(self.t_max)]
-        ram_per_time=[0 for i in range(self.t_max)]
-        storage_space_per_time=[0 for i in range(self.t_max)]
-        vm_per_time=[0 for i in range(self.t_max)]
+    def get_task_table(self, read_t0: bool = True) -> TaskTable:
+        """
+        Return the TaskTable of task_list, the one of the last plan is kept while task_list is the same list.
+        With read_t0, its t0 are the current t0 of the tasks.
+        """
 
-        for task in self.task_list:
+        if self.task_table is None or self.task_table.task_list is not self.task_list:
+            self.task_table = TaskTable(self.task_list)
+        elif read_t0:
+            self.task_table.update_t0()
+        return self.task_table
+
+    def check_plan(self) -> bool:
+        """Calls all checking fonctions"""
 
-            # Unplanned task
-            if task.t0 is None:
+        self.logger.info("Begin check plan")
+
+        task_table = self.get_task_table()
+        task_end = task_table.t0 + task_table.duration
+
+        # Dependency errors (a dependency which isn't in the plan anymore is finished, it isn't in task_table)
+        dependency_error = task_table.t0[task_table.dependency_owner] < task_end[task_table.dependency_index]
+        task_with_dependency_error = np.zeros(len(self.task_list), dtype=bool)
+        task_with_dependency_error[task_table.dependency_owner[dependency_error]] = True
+
+        # Errors of each task, the first task with an error raises its first error
+        task_error = np.stack([~task_table.planned, # Unplanned task
+                               task_table.t0 < 0, # Task begin before starting time
+                               task_end > self.t_max, # Task end after t_max
+                               task_with_dependency_error]) # No respect of dependency
+        task_with_error = task_error.any(axis=0)
+        if task_with_error.any():
+            index = int(task_with_error.argmax())
+            task = self.task_list[index]
+            error = int(task_error[:, index].argmax())
+            if error == 0:
                 self.logger.critical("Task %s is unplanned", task.task_id)
                 raise FalsePlan("Incomplete plan")
-
-            # Task begin before starting time
-            if task.t0 < 0:
+            if error == 1:
                 self.logger.critical("Task %s begin before starting time", task.task_id)
                 raise FalsePlan("Task begin before starting time")
-
-            # Task end after t_max
-            if task.t0 + task.processing_routine.duration > self.t_max:
+            if error == 2:
                 self.logger.critical("Task %s end after t_max", task.task_id)
                 raise FalsePlan("Task end after t_max")
-
-            # Verification of dependency
-            if task.depends_on is not None :
-                for task_depend_id in task.depends_on:
-                    if task.t0 < task_by_id[task_depend_id].t0 + task_by_id[task_depend_id].processing_routine.duration :
-                        self.logger.critical("Task %s begin before the end of it's dependency (task %s)", task.task_id, task_by_id[task_depend_id].task_id)
-                        raise FalsePlan("No respect of dependency")
-
-            # Add resources
-            cpu_per_time[task.t0:task.t0+task.processing_routine.duration] = [i + task.processing_routine.cpu for i in cpu_per_time[task.t0:task.t0+task.processing_routine.duration]]
-            ram_per_time[task.t0:task.t0+task.processing_routine.duration] = [i + task.processing_routine.ram for i in ram_per_time[task.t0:task.t0+task.processing_routine.duration]]
-            storage_space_per_time[task.t0:task.t0+task.processing_routine.duration] = [i + task.processing_routine.storage_space for i in storage_space_per_time[task.t0:task.t0+task.processing_routine.duration]]
-            vm_per_time[task.t0:task.t0+task.processing_routine.duration] = [i + 1 for i in vm_per_time[task.t0:task.t0+task.processing_routine.duration]]
-
-        # Check resources
-        for time in range(self.t_max):
-            if cpu_per_time[time] > self.cpu_max:
+            edge = task_table.dependency_start[index] + int(dependency_error[task_table.dependency_start[index]:task_table.dependency_start[index+1]].argmax())
+            self.logger.critical("Task %s begin before the end of it's dependency (task %s)", task.task_id, self.task_list[task_table.dependency_index[edge]].task_id)
+            raise FalsePlan("No respect of dependency")
+
+        # Resources per time as difference arrays: each task adds its resources at t0 and removes them at its end
+        # (rows CPU, RAM, Storage Space and VM)
+        resource_per_time = np.zeros((4, self.t_max + 1), dtype=np.int64)
+        time_index = np.concatenate([task_table.t0, task_end])
+        for row, task_resource in enumerate([task_table.cpu, task_table.ram, task_table.storage_space, np.ones(len(self.task_list), dtype=np.int64)]):
+            np.add.at(resource_per_time[row], time_index, np.concatenate([task_resource, -task_resource]))
+        resource_per_time = np.cumsum(resource_per_time, axis=1)[:, :self.t_max]
+
+        # Check resources, the first time with an exceeded limit raises its first resource
+        resource_error = resource_per_time > np.array([[self.cpu_max], [self.ram_max], [self.storage_space_max], [self.vm_max]])
+        time_with_error = resource_error.any(axis=0)
+        if time_with_error.any():
+            time = int(time_with_error.argmax())
+            error = int(resource_error[:, time].argmax())
+            if error == 0:
                 self.logger.critical("CPU exceed the limit at %s", time)
                 raise FalsePlan("No respect of CPU limit")
-            if ram_per_time[time] > self.ram_max:
+            if error == 1:
                 self.logger.critical("RAM exceed the limit at %s", time)
                 raise FalsePlan("No respect of RAM limit")
-            if storage_space_per_time[time] > self.storage_space_max:
+            if error == 2:
                 self.logger.critical("Storage Space exceed the limit at %s", time)
                 raise FalsePlan("No respect of Storage Space limit")
-            if vm_per_time[time] > self.vm_max:
-                self.logger.critical("VM exceed the limit at %s", time)
-                raise FalsePlan("No respect of VM limit")
+            self.logger.critical("VM exceed the limit at %s", time)
+            raise FalsePlan("No respect of VM limit")
 
         # Check attribution_plan
         if self.attribution_plan is not None:
@@ -138,13 +167,18 @@ class Scheduler():
 
             # No task overlap in attribute_plan
             for worker in self.attribution_plan:
-                self.attribution_plan[worker][4].sort(key=lambda x: x.t0)
-                for i in range(len(self.attribution_plan[worker][4])-1):
-                    task_i = self.attribution_plan[worker][4][i]
-                    task_j = self.attribution_plan[worker][4][i+1]
-                    if task_i.t0 + task_i.processing_routine.duration > task_j.t0 :
-                        self.logger.critical("There is a task overlape in worker %s in attribution plan", worker)
-                        raise FalsePlan("Task overlap")
+                worker_task_list = self.attribution_plan[worker][4]
+                worker_t0 = np.array([task.t0 for task in worker_task_list], dtype=np.int64)
+
+                # The tasks of the worker are sorted in ascending order of t0 if they aren't
+                if (np.diff(worker_t0) < 0).any():
+                    worker_order = np.argsort(worker_t0, kind="stable")
+                    worker_task_list[:] = [worker_task_list[k] for k in worker_order.tolist()]
+                    worker_t0 = worker_t0[worker_order]
+                worker_task_end = worker_t0 + np.array([task.processing_routine.duration for task in worker_task_list], dtype=np.int64)
+                if (worker_task_end[:-1] > worker_t0[1:]).any():
+                    self.logger.critical("There is a task overlape in worker %s in attribution plan", worker)
+                    raise FalsePlan("Task overlap")
 
         self.logger.info("End check plan")
         return True
@@ -154,36 +188,36 @@ class Scheduler():
 
         self.logger.info("Begin check feasibility")
 
-        nb_task_for_each_routine = {}
-        info_routine=[]
-        for task in self.task_list:
-
-            # Check limit of meterials resources
-            if task.processing_routine.name not in nb_task_for_each_routine:
-                nb_task_for_each_routine[task.processing_routine.name] = 1
-                info_routine.append((task.processing_routine))
-                if task.processing_routine.cpu > self.cpu_max:
-                    self.logger.critical("Routine %s requires more CPU than the limit", task.processing_routine.name)
-                    raise ImpossiblePlan("Not enough CPU")
-                if task.processing_routine.ram > self.ram_max:
-                    self.logger.critical("Routine %s requires more RAM than the limit", task.processing_routine.name)
-                    raise ImpossiblePlan("Not enough RAM")
-                if task.processing_routine.storage_space > self.storage_space_max :
-                    self.logger.critical("Routine %s requires more Storage space than the limit", task.processing_routine.name)
-                    raise ImpossiblePlan("Not enough Storage Space")
-                if self.vm_max == 0 :
-                    self.logger.critical("VM max is equal to 0")
-                    raise ImpossiblePlan("Not enough VM")
-            else:
-                nb_task_for_each_routine[task.processing_routine.name] += 1
+        task_table = self.get_task_table(read_t0=False)
+
+        # Check limit of meterials resources, the first routine with an error raises its first error
+        routine_error = np.stack([task_table.routine_cpu > self.cpu_max,
+                                  task_table.routine_ram > self.ram_max,
+                                  task_table.routine_storage_space > self.storage_space_max,
+                                  np.full(len(task_table.routine_list), self.vm_max == 0)])
+        routine_with_error = routine_error.any(axis=0)
+        if routine_with_error.any():
+            routine_id = int(routine_with_error.argmax())
+            routine = task_table.routine_list[routine_id]
+            error = int(routine_error[:, routine_id].argmax())
+            if error == 0:
+                self.logger.critical("Routine %s requires more CPU than the limit", routine.name)
+                raise ImpossiblePlan("Not enough CPU")
+            if error == 1:
+                self.logger.critical("Routine %s requires more RAM than the limit", routine.name)
+                raise ImpossiblePlan("Not enough RAM")
+            if error == 2:
+                self.logger.critical("Routine %s requires more Storage space than the limit", routine.name)
+                raise ImpossiblePlan("Not enough Storage Space")
+            self.logger.critical("VM max is equal to 0")
+            raise ImpossiblePlan("Not enough VM")
 
         # Check limit of time
-        list_time_min = [np.ceil((nb_task_for_each_routine[routine] /
-                                 min(self.cpu_max // info_routine[i].cpu,
-                                        self.ram_max // info_routine[i].ram,
-                                        self.storage_space_max // info_routine[i].storage_space,
-                                        self.vm_max))) * info_routine[i].duration for i, routine in enumerate(nb_task_for_each_routine)]
-        time_min = sum(list_time_min)
+        nb_task_at_once = np.minimum.reduce([self.cpu_max // task_table.routine_cpu,
+                                             self.ram_max // task_table.routine_ram,
+                                             self.storage_space_max // task_table.routine_storage_space,
+                                             np.full(len(task_table.routine_list), self.vm_max)])
+        time_min = (np.ceil(task_table.count_task_by_routine() / nb_task_at_once) * task_table.routine_duration).sum()
 
         if time_min > self.t_max:
             self.logger.critical("Time required (%s) is greater than the time limit", time_min)
@@ -192,79 +226,12 @@ class Scheduler():
         self.logger.info("End check feasibility")
         return True
 
-    def visualization(self) -> None:
-        """Prints plan"""
-
-        self.logger.info("Begin visualization")
-
-        # Initialize figures
-        plt.figure()
-        ax1 = plt.subplot2grid((8, 3), (0, 0), rowspan=4, colspan=3)
-        ax2 = plt.subplot2grid((8, 3), (4, 0), colspan=3)
-        ax3 = plt.subplot2grid((8, 3), (5, 0), colspan=3)
-        ax4 = plt.subplot2grid((8, 3), (6, 0), colspan=3)
-        ax5 = plt.subplot2grid((8, 3), (7, 0), colspan=3)
-        ax1.grid(True)
-        ax1.set_xticklabels([])
-        ax2.set_xticklabels([])
-        ax3.set_xticklabels([])
-        ax4.set_xticklabels([])
-
-        # Set information
-        ax1.set_title(f"Solution with time = {self.t_max}")
-        ax1.set_yticks(np.arange(len(self.attribution_plan)))
-        ax1.set_yticklabels([keys for keys in self.attribution_plan.keys()])
-        ax1.set_xlim(0, self.t_max)
-
-        nb_routine = len(set([task.processing_routine.name for task in self.task_list]))
-        self.logger.info("Nb of routine : %s", nb_routine)
-        colors = sns.color_palette("magma", self.vm_max)
-
-        # Create task in the figure
-        color_dico = {}
-        n = 0
-        for i, key in enumerate(self.attribution_plan):
-            for job in self.attribution_plan[key][4]:
-                if job.processing_routine.name not in color_dico:
-                    color_dico[job.processing_routine.name] = n
-                    n += 1
-                ax1.barh([i], [job.processing_routine.duration], left=[job.t0], height=0.5, align='center', color=colors[color_dico[job.processing_routine.name]])
-
-        # Creation of resources list
-        ram_per_time = [0 for i in range(self.t_max)]
-        storage_space_per_time = [0 for i in range(self.t_max)]
-        vm_per_time = [0 for i in range(self.t_max)]
-        cpu_per_time = [0 for i in range(self.t_max)]
-
-        for i, key in enumerate(self.attribution_plan):
-            for job in self.attribution_plan[key][4]:
-                ram_per_time[job.t0:job.t0+job.processing_routine.duration] = [l + job.processing_routine.ram for l in ram_per_time[job.t0:job.t0+job.processing_routine.duration]]
-                storage_space_per_time[job.t0:job.t0+job.processing_routine.duration] = [l + job.processing_routine.storage_space for l in storage_space_per_time[job.t0:job.t0+job.processing_routine.duration]]
-                vm_per_time[job.t0:job.t0+job.processing_routine.duration] = [l + 1 for l in vm_per_time[job.t0:job.t0+job.processing_routine.duration]]
-                cpu_per_time[job.t0:job.t0+job.processing_routine.duration] = [l + job.processing_routine.cpu for l in cpu_per_time[job.t0:job.t0+job.processing_routine.duration]]
-                cpu_per_time[job.t0:job.t0+job.processing_routine.duration] = [l + job.processing_routine.cpu for l in cpu_per_time[job.t0:job.t0+job.processing_routine.duration]]
-
-        # Calculate percentage of resources used
-        dict_resources={}
-        dict_resources["CPU"] = [(cpu/self.cpu_max)*100 for cpu in cpu_per_time]
-        dict_resources["RAM"] = [(ram/self.ram_max)*100 for ram in ram_per_time]
-        dict_resources["Storage"] = [(storage_space/self.storage_space_max)*100 for storage_space in storage_space_per_time]
-        dict_resources["VM"] = [(vm/self.vm_max)*100 for vm in vm_per_time]
-
-        x = np.array([t for t in range(self.t_max)])
-        width = 1
-        multiplier = 0
-        colors = sns.color_palette("mako", 4)
-        axes=[ax2,ax3,ax4,ax5]
-
-        # Plot figure of resources
-        for name_resource, measurement in dict_resources.items():
-            axes[multiplier].bar(x + width/2, measurement, width, label=name_resource, color=colors[multiplier])
-            axes[multiplier].set_ylim(0, 100)
-            axes[multiplier].set_xlim(0, self.t_max)
-            axes[multiplier].legend(loc='lower left', ncols=1)
-            axes[multiplier].grid(True)
-            multiplier += 1
-
-        plt.show()
-        self.logger.info("End visualization")
+    def visualization(self, figure_path: str = None) -> None:
+        """Prints plan, or saves it in figure_path (the plotting libraries are only imported here)"""
+
+        try:
+            from HRWSI_System.orchestrator.scheduler.visualization import plot_plan
+        except ImportError as exc:
+            self.logger.error("Visualization requires matplotlib and seaborn: %s", exc)
+            raise
+        plot_plan(self, figure_path)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Task_table module gives a columnar view of the processing tasks to be scheduled.
+The routines get integer ids, the resources, start times and dependencies of the tasks are numpy
+arrays, so the MatrixScheduler works on arrays instead of scanning the processing task objects.
+"""
+import os
+import sys
+from collections import deque
+import numpy as np
+# Authorizing other packages absolute import
+ROOT_FOLDER = '/'.join(os.getcwd().split('nrt_production_system')[:-1])
+sys.path.append(ROOT_FOLDER+'nrt_production_system')
+
+from HRWSI_System.orchestrator.processing_task.processing_task import ProcessingTask
+
+# Earliest start of a task whose dependency isn't placed, no location can be found after it
+UNPLACED_DEPENDENCY_START = np.iinfo(np.int64).max
+
+class TaskTable():
+    """
+    Structure of arrays of a list of processing tasks, the task at index k of task_list is the row k.
+
+    - routine_list gives the routine of each routine id, in order of first appearance in task_list,
+    - routine_id, cpu, ram, storage_space and duration are the columns of the tasks,
+    - t0 is the start time of the tasks, -1 for an unplanned task, planned is False for an unplanned task,
+    - depends_on is stored in compressed rows: the dependencies of row k are the rows
+      dependency_index[dependency_start[k]:dependency_start[k+1]], dependency_owner gives the row of
+      each dependency. A dependency which isn't in task_list is finished and is dropped.
+    """
+
+    def __init__(self, task_list: list[ProcessingTask]):
+
+        self.task_list = task_list
+        self.index_by_task_id = dict((task.task_id, index) for index, task in enumerate(task_list))
+
+        # Routine ids
+        self.routine_list = []
+        routine_id_by_name = {}
+        routine_id_list = []
+        for task in task_list:
+            routine_id = routine_id_by_name.get(task.processing_routine.name)
+            if routine_id is None:
+                routine_id = routine_id_by_name[task.processing_routine.name] = len(self.routine_list)
+                self.routine_list.append(task.processing_routine)
+            routine_id_list.append(routine_id)
+        self.routine_id = np.array(routine_id_list, dtype=np.int64)
+
+        # Routine columns, then task columns
+        self.routine_cpu = np.array([routine.cpu for routine in self.routine_list], dtype=np.int64)
+        self.routine_ram = np.array([routine.ram for routine in self.routine_list], dtype=np.int64)
+        self.routine_storage_space = np.array([routine.storage_space for routine in self.routine_list], dtype=np.int64)
+        self.routine_duration = np.array([routine.duration for routine in self.routine_list], dtype=np.int64)
+        self.cpu = self.routine_cpu[self.routine_id]
+        self.ram = self.routine_ram[self.routine_id]
+        self.storage_space = self.routine_storage_space[self.routine_id]
+        self.duration = self.routine_duration[self.routine_id]
+        self.t0 = None
+        self.planned = None
+        self.update_t0()
+
+        # Dependencies in compressed rows
+        dependency_count_list = []
+        dependency_index_list = []
+        for task in task_list:
+            dependency_list = [self.index_by_task_id[task_id] for task_id in (task.depends_on or []) if task_id in self.index_by_task_id]
+            dependency_count_list.append(len(dependency_list))
+            dependency_index_list.extend(dependency_list)
+        self.dependency_start = np.zeros(len(task_list) + 1, dtype=np.int64)
+        np.cumsum(dependency_count_list, out=self.dependency_start[1:])
+        self.dependency_index = np.array(dependency_index_list, dtype=np.int64)
+
+        self.dependency_owner = np.repeat(np.arange(len(task_list)), np.diff(self.dependency_start))
+
+        # Tasks depending on a task of their own routine, their earliest start is known only once the dependency is placed
+        self.depends_on_same_routine = np.zeros(len(task_list), dtype=bool)
+        self.depends_on_same_routine[self.dependency_owner[self.routine_id[self.dependency_index] == self.routine_id[self.dependency_owner]]] = True
+
+    def update_t0(self) -> None:
+        """Read the start times of the tasks of task_list again, planned is False for an unplanned task"""
+
+        t0_list = [task.t0 for task in self.task_list]
+        self.planned = np.array([t0 is not None for t0 in t0_list], dtype=bool)
+        self.t0 = np.array([-1 if t0 is None else t0 for t0 in t0_list], dtype=np.int64)
+
+    def count_task_by_routine(self) -> np.ndarray:
+        """Return the number of tasks of each routine id"""
+
+        return np.bincount(self.routine_id, minlength=len(self.routine_list))
+
+    def get_task_index_by_routine(self) -> list[np.ndarray]:
+        """Return the rows of the tasks of each routine id, in order of task_list"""
+
+        task_index = np.argsort(self.routine_id, kind="stable")
+        return np.split(task_index, np.cumsum(self.count_task_by_routine())[:-1])
+
+    def sort_routine_ids_by_dependencies(self) -> list[int]:
+        """
+        Return the routine ids sorted by their dependencies (Kahn's algorithm): a routine comes after
+        the routines of all the dependencies of its tasks, independent routines keep their order of
+        first appearance. The routines on a dependency cycle are missing from the result.
+        """
+
+        nb_routine = len(self.routine_list)
+        routine_edge = self.routine_id[self.dependency_index] * nb_routine + self.routine_id[self.dependency_owner]
+
+        successor_list = [[] for _ in range(nb_routine)]
+        in_degree = [0] * nb_routine
+        for routine_id, successor in (divmod(edge, nb_routine) for edge in np.unique(routine_edge).tolist()):
+            if routine_id != successor:
+                successor_list[routine_id].append(successor)
+                in_degree[successor] += 1
+
+        sorted_routine_id_list = []
+        routine_id_queue = deque(routine_id for routine_id in range(nb_routine) if in_degree[routine_id] == 0)
+        while routine_id_queue:
+            routine_id = routine_id_queue.popleft()
+            sorted_routine_id_list.append(routine_id)
+            for successor in successor_list[routine_id]:
+                in_degree[successor] -= 1
+                if in_degree[successor] == 0:
+                    routine_id_queue.append(successor)
+
+        return sorted_routine_id_list
+
+    def calculate_earliest_start(self, task_index: np.ndarray) -> np.ndarray:
+        """
+        Return the first time at which all the dependencies of the tasks at rows task_index are ended,
+        0 without dependency and UNPLACED_DEPENDENCY_START if a dependency isn't placed
+        """
+
+        earliest_start = np.zeros(len(task_index), dtype=np.int64)
+        dependency_start = self.dependency_start[task_index]
+        dependency_count = self.dependency_start[task_index + 1] - dependency_start
+        has_dependency = dependency_count > 0
+        if not has_dependency.any():
+            return earliest_start
+
+        # Dependencies of the tasks one after the other, each task starting a segment
+        dependency_count = dependency_count[has_dependency]
+        segment_start = np.cumsum(dependency_count) - dependency_count
+        dependency_index = self.dependency_index[np.arange(dependency_count.sum()) + np.repeat(dependency_start[has_dependency] - segment_start, dependency_count)]
+        dependency_end = np.where(self.t0[dependency_index] < 0, UNPLACED_DEPENDENCY_START, self.t0[dependency_index] + self.duration[dependency_index])
+        earliest_start[has_dependency] = np.maximum.reduceat(dependency_end, segment_start)
+        return earliest_start
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Task_table_benchmark module reports the memory and the time of the columnar task model of the MatrixScheduler:
+- the memory of the processing task objects and of the TaskTable arrays,
+- the time to build the TaskTable and to sort the routines by their dependencies,
+- the time and the peak memory of MatrixScheduler.plan,
+- the time of check_feasibility and check_plan on the plan.
+The tasks of each routine depend on one task of the previous routine, as in the MatrixScheduler benchmark.
+
+Usage (from the project root):
+    python3 HRWSI_System/orchestrator/scheduler/task_table_benchmark.py [--nb-task 100000] [--nb-routine 2]
+"""
+import os
+import sys
+import time
+import logging
+import argparse
+import tracemalloc
+# Authorizing other packages absolute import
+ROOT_FOLDER = '/'.join(os.getcwd().split('nrt_production_system')[:-1])
+sys.path.append(ROOT_FOLDER+'nrt_production_system')
+
+from HRWSI_System.orchestrator.scheduler.task_table import TaskTable
+from HRWSI_System.orchestrator.scheduler.matrix_scheduler import MatrixScheduler
+from HRWSI_System.orchestrator.processing_task.processing_task import ProcessingTask
+from HRWSI_System.orchestrator.processing_routine.processing_routine import ProcessingRoutine
+
+SCHEDULING_PARAMETERS = {"cpu_max": 10, "ram_max": 10, "storage_space_max": 10, "vm_max": 4}
+
+def create_task_list(nb_task: int, nb_routine: int) -> list[ProcessingTask]:
+    """Create nb_task tasks of nb_routine routines, each task depending on one task of the previous routine"""
+
+    routine_list = [ProcessingRoutine(name=f"foo{r}", cpu=2 + r % 2, ram=1 + r % 2, storage_space=2, duration=5 - 3 * (r % 2), docker_image="bar")
+                    for r in range(nb_routine)]
+    nb_task_by_routine = nb_task // nb_routine
+    return [ProcessingTask(processing_routine=routine_list[r], task_id=r * nb_task_by_routine + i, t0=None,
+                           depends_on=None if r == 0 else [(r - 1) * nb_task_by_routine + i])
+            for r in range(nb_routine) for i in range(nb_task_by_routine)]
+
+def create_planning(task_list: list[ProcessingTask], t_max: int) -> MatrixScheduler:
+    """Create the planning of the tasks on 4 workers"""
+
+    return MatrixScheduler(t_max=t_max, task_list=task_list, vm_name_list=["1", "2", "3", "4"], vm_id_list=["01", "02", "03", "04"],
+                           **SCHEDULING_PARAMETERS)
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Benchmark the columnar task model of the MatrixScheduler")
+    parser.add_argument("--nb-task", type=int, default=100_000)
+    parser.add_argument("--nb-routine", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=3, help="Number of plans timed, the best time is kept")
+    args = parser.parse_args()
+
+    # Debug logs of the whole plan aren't measured
+    MatrixScheduler.LOGGER_LEVEL = logging.WARNING
+
+    # t_max grows with the number of tasks so that every plan stays feasible, as in the MatrixScheduler benchmark
+    t_max = args.nb_task * 5750 // 4000
+
+    tracemalloc.start()
+    task_list = create_task_list(args.nb_task, args.nb_routine)
+    task_memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    task_table = TaskTable(task_list)
+    table_time = time.perf_counter() - start
+    table_memory = sum(array.nbytes for array in vars(task_table).values() if hasattr(array, "nbytes"))
+    start = time.perf_counter()
+    sorted_routine_id_list = task_table.sort_routine_ids_by_dependencies()
+    sort_time = time.perf_counter() - start
+    assert len(sorted_routine_id_list) == args.nb_routine
+
+    plan_time_list = []
+    for _ in range(args.repeat):
+        planning = create_planning(create_task_list(args.nb_task, args.nb_routine), t_max)
+        start = time.perf_counter()
+        planning.plan()
+        plan_time_list.append(time.perf_counter() - start)
+        assert all(task.t0 is not None for task in planning.task_list)
+    start = time.perf_counter()
+    planning.check_feasibility()
+    feasibility_time = time.perf_counter() - start
+    start = time.perf_counter()
+    planning.check_plan()
+    check_time = time.perf_counter() - start
+
+    # Peak memory is measured apart, tracemalloc slows down the plan
+    planning = create_planning(create_task_list(args.nb_task, args.nb_routine), t_max)
+    tracemalloc.start()
+    planning.plan()
+    plan_peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    print(f"{len(task_list)} tasks of {args.nb_routine} routines, t_max={t_max}")
+    print(f"task objects : {task_memory / 2**20:.1f} MiB")
+    print(f"TaskTable    : {table_memory / 2**20:.1f} MiB of arrays, built in {table_time * 1e3:.0f} ms, routines sorted in {sort_time * 1e3:.2f} ms")
+    print(f"plan         : {min(plan_time_list):.3f} s ({min(plan_time_list) / len(task_list) * 1e6:.1f} us per task), "
+          f"peak {plan_peak_memory / 2**20:.1f} MiB")
+    print(f"checks       : check_feasibility {feasibility_time * 1e3:.1f} ms, check_plan {check_time * 1e3:.1f} ms")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Visualization module prints the plan of a Scheduler with its resources use.
+It is imported by Scheduler.visualization at its first call only, so that the Orchestrator doesn't
+load matplotlib and seaborn. Without display, the Agg backend is used and the plan is saved in a file.
+"""
+import os
+import sys
+# Authorizing other packages absolute import
+ROOT_FOLDER = '/'.join(os.getcwd().split('nrt_production_system')[:-1])
+sys.path.append(ROOT_FOLDER+'nrt_production_system')
+
+import numpy as np
+import matplotlib
+# Headless backend, unless a display or a backend is given
+if not os.environ.get("DISPLAY") and "MPLBACKEND" not in os.environ:
+    matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import seaborn as sns
+
+from HRWSI_System.orchestrator.scheduler.scheduler import Scheduler
+
+def plot_plan(planning: Scheduler, figure_path: str = None) -> None:
+    """Prints plan, or saves it in figure_path"""
+
+    planning.logger.info("Begin visualization")
+
+    # Initialize figures
+    plt.figure()
+    ax1 = plt.subplot2grid((8, 3), (0, 0), rowspan=4, colspan=3)
+    ax2 = plt.subplot2grid((8, 3), (4, 0), colspan=3)
+    ax3 = plt.subplot2grid((8, 3), (5, 0), colspan=3)
+    ax4 = plt.subplot2grid((8, 3), (6, 0), colspan=3)
+    ax5 = plt.subplot2grid((8, 3), (7, 0), colspan=3)
+    ax1.grid(True)
+    ax1.set_xticklabels([])
+    ax2.set_xticklabels([])
+    ax3.set_xticklabels([])
+    ax4.set_xticklabels([])
+
+    # Set information
+    ax1.set_title(f"Solution with time = {planning.t_max}")
+    ax1.set_yticks(np.arange(len(planning.attribution_plan)))
+    ax1.set_yticklabels([keys for keys in planning.attribution_plan.keys()])
+    ax1.set_xlim(0, planning.t_max)
+
+    nb_routine = len(set([task.processing_routine.name for task in planning.task_list]))
+    planning.logger.info("Nb of routine : %s", nb_routine)
+    colors = sns.color_palette("magma", planning.vm_max)
+
+    # Create task in the figure
+    color_dico = {}
+    n = 0
+    for i, key in enumerate(planning.attribution_plan):
+        for job in planning.attribution_plan[key][4]:
+            if job.processing_routine.name not in color_dico:
+                color_dico[job.processing_routine.name] = n
+                n += 1
+            ax1.barh([i], [job.processing_routine.duration], left=[job.t0], height=0.5, align='center', color=colors[color_dico[job.processing_routine.name]])
+
+    # Creation of resources list
+    ram_per_time = [0 for i in range(planning.t_max)]
+    storage_space_per_time = [0 for i in range(planning.t_max)]
+    vm_per_time = [0 for i in range(planning.t_max)]
+    cpu_per_time = [0 for i in range(planning.t_max)]
+
+    for i, key in enumerate(planning.attribution_plan):
+        for job in planning.attribution_plan[key][4]:
+            ram_per_time[job.t0:job.t0+job.processing_routine.duration] = [l + job.processing_routine.ram for l in ram_per_time[job.t0:job.t0+job.processing_routine.duration]]
+            storage_space_per_time[job.t0:job.t0+job.processing_routine.duration] = [l + job.processing_routine.storage_space for l in storage_space_per_time[job.t0:job.t0+job.processing_routine.duration]]
+            vm_per_time[job.t0:job.t0+job.processing_routine.duration] = [l + 1 for l in vm_per_time[job.t0:job.t0+job.processing_routine.duration]]
+            cpu_per_time[job.t0:job.t0+job.processing_routine.duration] = [l + job.processing_routine.cpu for l in cpu_per_time[job.t0:job.t0+job.processing_routine.duration]]
+            cpu_per_time[job.t0:job.t0+job.processing_routine.duration] = [l + job.processing_routine.cpu for l in cpu_per_time[job.t0:job.t0+job.processing_routine.duration]]
+
+    # Calculate percentage of resources used
+    dict_resources={}
+    dict_resources["CPU"] = [(cpu/planning.cpu_max)*100 for cpu in cpu_per_time]
+    dict_resources["RAM"] = [(ram/planning.ram_max)*100 for ram in ram_per_time]
+    dict_resources["Storage"] = [(storage_space/planning.storage_space_max)*100 for storage_space in storage_space_per_time]
+    dict_resources["VM"] = [(vm/planning.vm_max)*100 for vm in vm_per_time]
+
+    x = np.array([t for t in range(planning.t_max)])
+    width = 1
+    multiplier = 0
+    colors = sns.color_palette("mako", 4)
+    axes=[ax2,ax3,ax4,ax5]
+
+    # Plot figure of resources
+    for name_resource, measurement in dict_resources.items():
+        axes[multiplier].bar(x + width/2, measurement, width, label=name_resource, color=colors[multiplier])
+        axes[multiplier].set_ylim(0, 100)
+        axes[multiplier].set_xlim(0, planning.t_max)
+        axes[multiplier].legend(loc='lower left', ncols=1)
+        axes[multiplier].grid(True)
+        multiplier += 1
+
+    if figure_path is None and matplotlib.get_backend().lower() == "agg":
+        planning.logger.warning("No display, the plan is saved in plan.png")
+        figure_path = "plan.png"
+    if figure_path is not None:
+        plt.savefig(figure_path)
+        plt.close()
+    else:
+        plt.show()
+    planning.logger.info("End visualization")
@@ -0,0 +1,81 @@
+"""Tests for the AWIC one pass zonal statistics."""
+import os
+import sys
+from collections import Counter
+import numpy as np
+import pytest
+# Authorizing other packages absolute import
+ROOT_FOLDER = '/'.join(os.getcwd().split('hrwsi_watqual_sys')[:-1])
+sys.path.append(ROOT_FOLDER+'hrwsi_watqual_sys')
+
+from HRWSI_Processing_Routines.HRWSI_Daily_Processing_Routines.awic.python.array_operations import count_classes_by_label
+
+AWIC_PYTHON_FOLDER = os.path.join(os.path.dirname(__file__), *[os.pardir]*4,
+                                  "HRWSI_Processing_Routines", "HRWSI_Daily_Processing_Routines", "awic", "python")
+CLASS_VALUES = np.array([1, 100, 205, 254, 255], dtype=np.uint8)
+
+
+@pytest.mark.parametrize("upsamp_rate", [1, 2, 3])
+def test_count_classes_by_label_is_equal_to_counter(upsamp_rate):
+    '''
+    Scenario :
+
+    - A classified raster and a label raster upsamp_rate times finer, with 20 labels and unlabelled pixels
+
+    Expected behaviour:
+
+    - The counts of each label are the ones of a Counter on the upsampled raster masked by the label
+    '''
+
+    rng = np.random.default_rng(upsamp_rate)
+    classes = rng.choice(CLASS_VALUES, size=(30, 40))
+    nb_label = 20
+    label = rng.integers(0, nb_label + 1, size=(30 * upsamp_rate, 40 * upsamp_rate)).astype(np.uint32)
+
+    actual = count_classes_by_label(label, classes, nb_label, upsamp_rate)
+
+    classes_upsampl = classes.repeat(upsamp_rate, axis=0).repeat(upsamp_rate, axis=1)
+    assert actual.shape == (nb_label + 1, 256)
+    for lbl in range(nb_label + 1):
+        expected = Counter(classes_upsampl[label == lbl].tolist())
+        assert {value: actual[lbl, value] for value in np.flatnonzero(actual[lbl])} == expected
+
+def test_compute_zonal_counts():
+    '''
+    Scenario :
+
+    - Two squares aligned on the pixels of a 10 x 10 raster, one of them crossing the raster border,
+      and a third square outside of the raster
+
+    Expected behaviour:
+
+    - Only the squares intersecting the raster are counted, with their class counts at the upsampled resolution
+      and their number of pixels, outside of the raster included
+    '''
+
+    ogr = pytest.importorskip("osgeo.ogr")
+    sys.path.append(AWIC_PYTHON_FOLDER)
+    from zonal_statistics import compute_zonal_counts
+
+    def square(minx, miny, size):
+        return ogr.CreateGeometryFromWkt(f"POLYGON(({minx} {miny},{minx} {miny+size},{minx+size} {miny+size},{minx+size} {miny},{minx} {miny}))")
+
+    geoTrans = (0, 20, 0, 200, 0, -20)
+    arr = np.full((10, 10), 254, dtype=np.uint8)
+    arr[:5] = 100
+    part_ds = ogr.GetDriverByName('Memory').CreateDataSource('parts')
+    part_lyr = part_ds.CreateLayer('parts', geom_type=ogr.wkbPolygon)
+    for geom in [square(0, 120, 40), square(180, 0, 40), square(400, 400, 20)]:
+        feat = ogr.Feature(part_lyr.GetLayerDefn())
+        feat.SetGeometry(geom)
+        part_lyr.CreateFeature(feat)
+    raster_bbox = square(0, 0, 200)
+
+    fid_array, (counts,), nb_pixel = compute_zonal_counts(part_lyr, [arr], geoTrans, raster_bbox, 2, strip_height=3)
+
+    assert fid_array.tolist() == [0, 1]
+    # Rows 2 and 3, columns 0 and 1, upsampled 2 times
+    assert counts[0, 100] == 16 and counts[0].sum() == 16
+    # Row 9, column 9 only, upsampled 2 times
+    assert counts[1, 254] == 4 and counts[1].sum() == 4
+    assert nb_pixel.tolist() == [16, 16]
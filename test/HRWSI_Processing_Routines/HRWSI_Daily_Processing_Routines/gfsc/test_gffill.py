@@ -0,0 +1,227 @@
+"""Tests for the GFSC gap filling streamed by row strips, gffill.fillTemporalGaps and gffill.fillGapsByPriority."""
+import os
+import sys
+import numpy as np
+import pytest
+# Authorizing other packages absolute import
+ROOT_FOLDER = '/'.join(os.getcwd().split('hrwsi_watqual_sys')[:-1])
+sys.path.append(ROOT_FOLDER+'hrwsi_watqual_sys')
+
+from HRWSI_Processing_Routines.HRWSI_Daily_Processing_Routines.gfsc import gffill
+
+NODATA, CLOUD, WATER = 255, 205, 210
+GAP_VALUES = [CLOUD, NODATA]
+DAY = 86400
+MIN_TIME_STAMP = 1_700_000_000
+
+
+def former_fill(stack, shape, minTimeStamp):
+    '''
+    Reference implementation reading the whole products, as previously done in gf2.main
+    '''
+    gf = NODATA*np.ones(shape=shape,dtype=np.uint8)
+    qc = NODATA*np.ones(shape=shape,dtype=np.uint8)
+    qf = np.zeros(shape=shape,dtype=np.uint8)
+    ad = np.zeros(shape=shape,dtype=np.uint32)
+    success = False
+    for gfSub, qcSub, qfSub, adSub in stack:
+        if success:
+            gap = (np.isin(gf,GAP_VALUES))*~(gfSub == NODATA)*(adSub>minTimeStamp)
+        else:
+            gap = adSub>=minTimeStamp
+        np.copyto(gf,gfSub,where=gap)
+        np.copyto(qc,qcSub,where=gap)
+        np.copyto(qf,qfSub,where=gap)
+        np.copyto(ad,adSub,where=gap)
+        success = True
+    return gf, qc, qf, ad
+
+def create_stack(rng, shape, nb_day, cloud_fraction, nodata_fraction=0.02):
+    '''
+    Return nb_day products, newest first, with clouds and no data on a fraction of the pixels,
+    the two oldest products being older than MIN_TIME_STAMP
+    '''
+    stack = []
+    for day in range(nb_day):
+        gf = rng.integers(0, 101, size=shape, dtype=np.uint8)
+        gf[rng.random(shape) < cloud_fraction] = CLOUD
+        gf[rng.random(shape) < nodata_fraction] = NODATA
+        gf[:, :2] = WATER
+        qc = rng.integers(0, 4, size=shape, dtype=np.uint8)
+        qf = rng.integers(0, 256, size=shape, dtype=np.uint8)
+        ad = (MIN_TIME_STAMP + (nb_day - 3 - day) * DAY + rng.integers(0, DAY, size=shape)).astype(np.uint32)
+        stack.append((gf, qc, qf, ad))
+    return stack
+
+def create_readers(stack):
+    '''Return the strip readers of the products and the list of the strips they read'''
+    read_strip_list = []
+    def create_reader(p):
+        def read_strip(rowStart, rowEnd):
+            read_strip_list.append((p, rowStart, rowEnd))
+            return tuple(layer[rowStart:rowEnd] for layer in stack[p])
+        return read_strip
+    return [create_reader(p) for p in range(len(stack))], read_strip_list
+
+@pytest.mark.parametrize("shape, strip_height, cloud_fraction", [
+    ((183, 97), 16, 0.3),
+    ((183, 97), 1000, 0.3),
+    ((64, 64), 7, 0.9),
+    ((50, 40), 50, 0.),
+])
+def test_fill_is_the_same_as_the_former_fill(shape, strip_height, cloud_fraction):
+    '''
+    Scenario :
+
+    - 30 daily products, newest first, with clouds and no data, are filled by strips
+
+    Expected behaviour:
+
+    - The GF, QC, QF and AT layers are the same as with the former whole product fill
+    '''
+
+    rng = np.random.default_rng(0)
+    stack = create_stack(rng, shape, 30, cloud_fraction)
+    readers, _ = create_readers(stack)
+
+    gf, qc, qf, ad, _ = gffill.fillTemporalGaps(readers, shape, MIN_TIME_STAMP, NODATA, GAP_VALUES, strip_height)
+
+    for layer, former_layer in zip((gf, qc, qf, ad), former_fill(stack, shape, MIN_TIME_STAMP)):
+        assert layer.dtype == former_layer.dtype
+        assert np.array_equal(layer, former_layer)
+
+def test_older_products_are_not_read_once_the_strip_is_filled():
+    '''
+    Scenario :
+
+    - The first strip of the newest product is fully filled, the second one has a cloud filled by the second product
+
+    Expected behaviour:
+
+    - The first strip is only read from the newest product, the second one from the two newest products
+    '''
+
+    shape = (20, 10)
+    stack = create_stack(np.random.default_rng(1), shape, 5, cloud_fraction=0., nodata_fraction=0.)
+    stack[0][0][15, 3] = CLOUD
+    readers, read_strip_list = create_readers(stack)
+
+    gf, _, _, ad, readStripCounts = gffill.fillTemporalGaps(readers, shape, MIN_TIME_STAMP, NODATA, GAP_VALUES, 10)
+
+    assert read_strip_list == [(0, 0, 10), (0, 10, 20), (1, 10, 20)]
+    assert readStripCounts == [2, 1, 0, 0, 0]
+    assert gf[15, 3] == stack[1][0][15, 3]
+    assert ad[15, 3] == stack[1][3][15, 3]
+
+FSC_LAYER_PARAMETERS = [(NODATA, NODATA, 0, 100, [CLOUD, NODATA, WATER]),
+                        (NODATA, NODATA, 0, 3, [CLOUD, NODATA, WATER]),
+                        (0, NODATA, None, None, [])]
+
+def upscale(data, scale, noData, valueMin, valueMax, classes):
+    '''gfio.upscale of a whole raster'''
+    if scale == 1:
+        return data
+    return gffill.upscaleSamples(gffill.getBlockSamples(data, scale), scale, gffill.getBlockSize(data.shape, scale),
+                                 noData, valueMin, valueMax, classes)
+
+def former_fill_by_priority(stack, time_stamps, shape, scale):
+    '''
+    Reference implementation upscaling the whole products, then filling the gaps, as previously done in gf1.main
+    '''
+    layers = [initial_value*np.ones(shape=shape, dtype=np.uint8) for initial_value, *_ in FSC_LAYER_PARAMETERS]
+    ad = np.zeros(shape=shape, dtype=np.uint32)
+    for p, product in enumerate(stack):
+        product_layers = [upscale(layer, scale, *parameters[1:]) for layer, parameters in zip(product, FSC_LAYER_PARAMETERS)]
+        if p > 0:
+            gap = np.isin(layers[0], GAP_VALUES)*~np.isin(product_layers[0], GAP_VALUES)
+        else:
+            gap = np.ones(shape=shape, dtype=np.bool_)
+        for layer, product_layer in zip(layers, product_layers):
+            np.copyto(layer, product_layer, where=gap)
+        np.copyto(ad, time_stamps[p]*np.ones(shape=shape, dtype=np.uint32), where=gap)
+    return tuple(layers) + (ad,)
+
+def create_fsc_stack(rng, shape, nb_product, cloud_fraction):
+    '''Return nb_product FSC products at the input resolution, newest first, clouds being drawn on blocks of 5x5 pixels'''
+    stack = []
+    for _ in range(nb_product):
+        fsc = rng.integers(0, 101, size=shape, dtype=np.uint8)
+        cloud = np.kron(rng.random((-(-shape[0]//5), -(-shape[1]//5))) < cloud_fraction, np.ones((5, 5), dtype=bool))
+        fsc[cloud[:shape[0], :shape[1]]] = CLOUD
+        fsc[rng.random(shape) < 0.1] = rng.choice([CLOUD, NODATA, WATER])
+        qc = rng.integers(0, 4, size=shape, dtype=np.uint8)
+        np.copyto(qc, fsc, where=fsc > 100)
+        qf = rng.integers(0, 256, size=shape, dtype=np.uint8)
+        stack.append((fsc, qc, qf))
+    return stack
+
+def create_layer_readers(stack, scale):
+    '''Return the strip readers of the products layers and the list of the strips they read'''
+    read_strip_list = []
+    def create_reader(p):
+        def read_strip(layer, rowStart, rowEnd):
+            read_strip_list.append((p, layer, rowStart, rowEnd))
+            return stack[p][layer][rowStart*scale:rowEnd*scale]
+        return read_strip
+    return [create_reader(p) for p in range(len(stack))], read_strip_list
+
+@pytest.mark.parametrize("input_shape, scale, strip_height, kernel", [
+    ((183, 99), 3, 16, None),
+    ((185, 100), 3, 7, None),
+    ((183, 99), 3, 1000, gffill._upscaleBlocks),
+    ((64, 64), 4, 5, gffill._upscaleBlocks),
+    ((40, 30), 1, 8, None),
+])
+def test_fill_by_priority_is_the_same_as_the_former_fill(input_shape, scale, strip_height, kernel):
+    '''
+    Scenario :
+
+    - 4 FSC products, newest first, with clouds, no data and water, are upscaled and filled by strips,
+      with numpy or with the pixel by pixel kernel, shapes being multiple of the scale or not
+
+    Expected behaviour:
+
+    - The GF, QC, QF and AT layers are the same as with the former whole product upscaling and fill
+    '''
+
+    rng = np.random.default_rng(2)
+    stack = create_fsc_stack(rng, input_shape, 4, cloud_fraction=0.4)
+    shape = (input_shape[0]//scale, input_shape[1]//scale)
+    time_stamps = [MIN_TIME_STAMP - day*DAY for day in range(4)]
+    readers, _ = create_layer_readers(stack, scale)
+
+    layers = gffill.fillGapsByPriority(readers, time_stamps, shape, FSC_LAYER_PARAMETERS, GAP_VALUES, scale,
+                                       gffill.getBlockSize(input_shape, scale), strip_height, kernel)
+
+    for layer, former_layer in zip(layers, former_fill_by_priority(stack, time_stamps, shape, scale)):
+        assert layer.dtype == former_layer.dtype
+        assert np.array_equal(layer, former_layer)
+
+def test_fill_by_priority_stops_once_the_strip_is_filled():
+    '''
+    Scenario :
+
+    - The first strip of the newest product is fully filled, the second one has a cloud not filled by the second product
+
+    Expected behaviour:
+
+    - The first strip is only read from the newest product, the second one from the three products,
+      the third product being read for the GF layer only as it doesn't fill the cloud
+    '''
+
+    shape = (20, 10)
+    stack = create_fsc_stack(np.random.default_rng(3), shape, 3, cloud_fraction=0.)
+    for fsc, qc, _ in stack:
+        np.place(fsc, fsc > 100, 50)
+        np.place(qc, qc > 3, 1)
+    stack[0][0][15, 3] = CLOUD
+    stack[1][0][15, 3] = NODATA
+    stack[2][0][15, 3] = NODATA
+    readers, read_strip_list = create_layer_readers(stack, 1)
+
+    gf, _, _, ad = gffill.fillGapsByPriority(readers, [3, 2, 1], shape, FSC_LAYER_PARAMETERS, GAP_VALUES, stripHeight=10)
+
+    assert read_strip_list == ([(0, layer, 0, 10) for layer in range(3)] + [(0, layer, 10, 20) for layer in range(3)]
+                               + [(1, 0, 10, 20), (2, 0, 10, 20)])
+    assert gf[15, 3] == CLOUD
+    assert ad[15, 3] == 3
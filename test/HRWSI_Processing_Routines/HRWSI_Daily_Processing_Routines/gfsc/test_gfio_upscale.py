@@ -0,0 +1,150 @@
+"""Tests for the GFSC block reduction gfio.upscale."""
+import os
+import sys
+import warnings
+import numpy as np
+import pytest
+# Authorizing other packages absolute import
+ROOT_FOLDER = '/'.join(os.getcwd().split('hrwsi_watqual_sys')[:-1])
+sys.path.append(ROOT_FOLDER+'hrwsi_watqual_sys')
+
+# gfio needs the GFSC docker image dependencies
+for module_name in ["osgeo", "alphashape", "mahotas", "shapely"]:
+    pytest.importorskip(module_name)
+
+from HRWSI_Processing_Routines.HRWSI_Daily_Processing_Routines.gfsc import gfio
+
+NODATA, CLOUD, WATER = 255, 205, 210
+
+
+def index_upscale(data,scale,noData=None,valueMin=None,valueMax=None, classes = []):
+    '''
+    Reference implementation with index arrays, as previously done in gfio.upscale
+    '''
+    if scale == 1:
+        return data
+    newShape = tuple(map(int,(data.shape[0]/scale,data.shape[1]/scale)))
+    rind = np.indices(newShape)[0]*scale
+    cind = np.indices(newShape)[1]*scale
+
+    rowi = rind
+    coli = cind
+    for j in range(1,scale):
+        rowi = np.dstack((rowi,rind))
+        coli = np.dstack((coli,cind))
+    row = rowi
+    col = coli
+
+    for i in range(1,scale):
+        rowi = rind+i
+        coli = cind+i
+        for j in range(1,scale):
+            rowi = np.dstack((rowi,rind+i))
+            coli = np.dstack((coli,cind+i))
+        row = np.dstack((row,rowi))
+        col = np.dstack((col,coli))
+    if noData is None and valueMin is None and valueMax is None and classes == []:
+        dataValue = np.copy(data).astype(np.float64)
+        newData = np.mean(dataValue[row,col],axis=2)
+        newData = newData.astype(data.dtype)
+        return newData
+    else:
+        dataClass = np.copy(data)
+        if valueMax is not None:
+            dataValue = np.copy(data).astype(np.float64)
+            valueMask = (dataValue >= valueMin)*(dataValue <= valueMax)
+            np.place(dataValue,~valueMask,np.nan)
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)
+                newDataValue = np.nanmean(dataValue[row,col],axis=2)
+            np.place(newDataValue,np.isnan(newDataValue),noData)
+            newDataValue = np.rint(newDataValue).astype(data.dtype)
+            np.place(dataClass,valueMask,valueMax)
+
+        if classes != []:
+            newDataClass = noData*np.ones(shape=newShape,dtype=data.dtype)
+            classCount = np.zeros(shape=newShape,dtype=np.int32)
+            classValues = classes
+            if valueMax is not None:
+                count = np.sum(dataClass[row,col]==valueMax,axis=2)
+                count = count >= scale*scale*0.5
+                np.place(newDataClass,count,valueMax)
+                np.place(classCount,count,scale*scale)
+            for classValue in classValues:
+                if np.sum(dataClass==classValue) == 0:
+                    continue
+                count = np.sum(dataClass[row,col]==classValue,axis=2)
+                np.place(newDataClass,count > classCount,classValue)
+                np.copyto(classCount, count, where= count > classCount)
+
+        if valueMax is not None and classes != []:
+            newValueMask = (newDataValue >= valueMin)*(newDataValue <= valueMax)
+            np.copyto(newDataValue,newDataClass,where=~newValueMask)
+            newData = newDataValue
+
+        if valueMax is not None and classes == []:
+            newData = newDataValue
+
+        if valueMax is None and classes != []:
+            newData = newDataClass
+
+        if valueMax is None and classes == []:  #bitwise
+            newData = np.zeros(shape=newShape,dtype=data.dtype)
+            for b in range(int(str(data.dtype).replace('uint','').replace('int',''))):
+                mask = np.bitwise_and(np.right_shift(data,b),1)
+                count = np.sum(mask[row,col],axis=2)
+                mask = count >= (float(np.prod(data.shape))/np.prod(newShape))/2.
+                newData = np.bitwise_or(newData,np.left_shift(mask.astype(data.dtype),b))
+    return newData
+
+
+# (noData, valueMin, valueMax, classes) as used by gf1/gf2 for FSC, QC and QF layers, and the plain mean
+LAYER_PARAMETERS = [
+    (NODATA, 0, 100, [CLOUD, NODATA, WATER]),
+    (NODATA, 0, 3, [CLOUD, NODATA, WATER]),
+    (NODATA, None, None, []),
+    (NODATA, 0, 100, []),
+    (NODATA, None, None, [CLOUD, NODATA, WATER]),
+    (None, None, None, []),
+]
+
+
+@pytest.mark.parametrize("shape", [(30, 30), (31, 29), (9, 12)])
+@pytest.mark.parametrize("scale", [2, 3])
+@pytest.mark.parametrize("parameters", LAYER_PARAMETERS)
+def test_upscale_is_equal_to_index_implementation(shape, scale, parameters):
+    '''
+    Scenario :
+
+    - Rasters mixing valid values, out of range values and classes are upscaled,
+      including shapes which aren't a multiple of the scale
+
+    Expected behaviour:
+
+    - The block reduction gives exactly the result of the index arrays implementation
+    '''
+
+    rng = np.random.default_rng(scale * 1000 + shape[0])
+    value_list = np.array([0, 1, 2, 3, 4, 50, 99, 100, 101, CLOUD, WATER, NODATA], dtype=np.uint8)
+    for _ in range(10):
+        data = rng.choice(value_list, size=shape)
+        expected = index_upscale(data.copy(), scale, *parameters)
+        actual = gfio.upscale(data.copy(), scale, *parameters)
+
+        assert expected.dtype == actual.dtype
+        assert np.array_equal(expected, actual)
+
+def test_upscale_scale_one():
+    '''
+    Scenario :
+
+    - The scale is 1
+
+    Expected behaviour:
+
+    - The raster is returned unchanged
+    '''
+
+    data = np.arange(16, dtype=np.uint8).reshape(4, 4)
+
+    assert gfio.upscale(data, 1, NODATA, 0, 100, [CLOUD]) is data
@@ -0,0 +1,205 @@
+"""Tests for bit_bandmath_graph, the single pass computation of the layers of the combine_bits_geotiff copies."""
+import os
+import sys
+import importlib
+import numpy as np
+import pytest
+
+NRT_PROCESSING_ROUTINES_FOLDER = os.path.join(os.path.dirname(__file__), *[os.pardir]*4,
+                                              "HRWSI_Processing_Routines", "HRWSI_NRT_Processing_Routines")
+ROUTINE_LIST = ["fsc", "cc", "wic_s2"]
+ROUTINE_PACKAGE_LIST = ["common", "utils", "geometry"]
+XSIZE, YSIZE = 50, 70
+
+
+@pytest.fixture(scope='function', params=ROUTINE_LIST)
+def combine_bits_geotiff(request, monkeypatch):
+    '''
+    combine_bits_geotiff Fixture function return the combine_bits_geotiff module of each processing routine copy
+
+
+    :return: the geometry.combine_bits_geotiff module
+    :rtype: module
+    '''
+    pytest.importorskip("osgeo")
+    monkeypatch.syspath_prepend(os.path.join(NRT_PROCESSING_ROUTINES_FOLDER, request.param))
+    for module_name in [name for name in sys.modules if name.split(".")[0] in ROUTINE_PACKAGE_LIST]:
+        monkeypatch.delitem(sys.modules, module_name)
+    yield importlib.import_module("geometry.combine_bits_geotiff")
+    # The packages of the routine are removed, monkeypatch gives back the former ones
+    for module_name in [name for name in sys.modules if name.split(".")[0] in ROUTINE_PACKAGE_LIST]:
+        del sys.modules[module_name]
+
+def create_raster(path, array):
+    """Write a uint8 GeoTIFF on a 20 m UTM grid"""
+
+    from osgeo import gdal, osr
+    ds = gdal.GetDriverByName('GTiff').Create(str(path), XSIZE, YSIZE, 1, gdal.GDT_Byte)
+    ds.SetGeoTransform((600000.0, 20.0, 0.0, 5000000.0, 0.0, -20.0))
+    srs = osr.SpatialReference()
+    srs.ImportFromEPSG(32631)
+    ds.SetProjection(srs.ExportToWkt())
+    ds.GetRasterBand(1).WriteArray(array)
+    ds = None
+    return str(path)
+
+def read_raster(path):
+    """Values, nodata value and colortable entries of a raster"""
+
+    from osgeo import gdal
+    ds = gdal.Open(str(path))
+    band = ds.GetRasterBand(1)
+    colortable = band.GetRasterColorTable()
+    colors = None if colortable is None else [colortable.GetColorEntry(i) for i in range(colortable.GetCount())]
+    return band.ReadAsArray(), band.GetNoDataValue(), colors
+
+def create_sources(tmp_path):
+    """Random cloud mask (bits), geophysical mask (bits), no data mask and classification"""
+
+    rng = np.random.default_rng(0)
+    return {
+        'cloud': create_raster(tmp_path / "CLM.tif", rng.integers(0, 256, size=(YSIZE, XSIZE), dtype=np.uint8)),
+        'geophysical': create_raster(tmp_path / "MG2.tif", rng.integers(0, 256, size=(YSIZE, XSIZE), dtype=np.uint8)),
+        'no_data': create_raster(tmp_path / "EDG.tif", (rng.random((YSIZE, XSIZE)) < 0.1).astype(np.uint8)),
+        'classification': create_raster(tmp_path / "WIC.tif", rng.choice(np.array([0, 1, 2, 255], dtype=np.uint8), size=(YSIZE, XSIZE)))
+    }
+
+def source(filepath, unpack_bits=False):
+    """Source of a bit_bandmath source list"""
+
+    return {'filepath': filepath, 'bandnumber': 1, 'unpack_bits': unpack_bits}
+
+def cc_source_lists(sources, folder):
+    """Source lists of the CC, QCFLAGS and QC layers, QC reading QCFLAGS, as in MajaCcPostProcessing"""
+
+    qcflags_file = os.path.join(folder, "QCFLAGS.tif")
+    return {
+        'CC.tif': [{'sources': [source(sources['cloud'], True), source(sources['no_data'])],
+                    'operation': 'A1*np.uint8(255) + (1-A1)*(B*0 + 3*np.logical_or(A0[:,:,5],A0[:,:,6])*(1-A0[:,:,7])*(1-A0[:,:,1]) + 1*A0[:,:,7] + 2*A0[:,:,1]*(1-A0[:,:,7]))'}],
+        'QCFLAGS.tif': [{'sources': [source(sources['cloud'], True)],
+                         'operation': {0: 'A0[:,:,2]', 1: 'A0[:,:,3]', 2: 'A0[:,:,4]', 3: 'A0[:,:,5]', 4: 'A0[:,:,6]'}},
+                        {'sources': [source(sources['geophysical'], True)],
+                         'operation': {5: 'A0[:,:,0]'}}],
+        'QC.tif': [{'sources': [source(qcflags_file, True), source(sources['no_data'])],
+                    'operation': 'A1*np.uint8(255) + (1-A1)*(B*0+1*A0[:,:,4]).astype(np.uint8)'}]
+    }
+
+def wic_source_lists(sources, folder):
+    """Source lists of the WIC values change followed by the cloud and no data masks, as in l2a_to_WIC_RF"""
+
+    return {
+        'WIC_nomask.tif': [{'sources': [source(sources['classification'])],
+                            'operation': 'np.uint8(255)*(A0==255) + np.uint8(254)*(A0==0)+np.uint8(100)*(A0==1) + np.uint8(1)*(A0==2)'}],
+        'WIC_cloud.tif': [{'sources': [source(sources['cloud']), source(os.path.join(folder, "WIC_nomask.tif"))],
+                           'operation': 'np.uint8(205)*(A0!=0) + A1*(A0==0)'}],
+        'WIC.tif': [{'sources': [source(sources['no_data']), source(os.path.join(folder, "WIC_cloud.tif"))],
+                     'operation': 'np.uint8(255)*(A0!=0) + A1*(A0==0)'}]
+    }
+
+def chained_bit_bandmath(combine_bits_geotiff, source_lists, no_data_values, raster_gdal_info, folder):
+    """Former implementation: one bit_bandmath call per layer, in the order of the layers"""
+
+    for name, source_list in source_lists.items():
+        output_file = os.path.join(folder, name)
+        combine_bits_geotiff.bit_bandmath(output_file, raster_gdal_info, [source_list],
+                                          no_data_values_per_band=[no_data_values.get(name)],
+                                          compress=False, add_overviews=False, use_default_cosims_config=False)
+
+@pytest.mark.parametrize("source_lists_function, no_data_values", [
+    (cc_source_lists, {'CC.tif': np.uint8(255), 'QC.tif': np.uint8(255)}),
+    (wic_source_lists, {'WIC_nomask.tif': np.uint8(255), 'WIC_cloud.tif': np.uint8(255), 'WIC.tif': np.uint8(255)})
+])
+@pytest.mark.parametrize("block_ysize", [16, 1024])
+def test_bit_bandmath_graph_is_equal_to_chained_bit_bandmath(combine_bits_geotiff, tmp_path, source_lists_function, no_data_values, block_ysize):
+    '''
+    Scenario :
+
+    - Layers made of bit operations and of band operations, some of them reading another layer,
+      given in reverse order to bit_bandmath_graph, computed in one block or in blocks of 16 lines
+
+    Expected behaviour:
+
+    - The layers have the values and nodata values of the layers computed by chained bit_bandmath calls
+    '''
+
+    from osgeo import gdal
+    sources = create_sources(tmp_path)
+    chained_folder = tmp_path / "chained"
+    graph_folder = tmp_path / "graph"
+    chained_folder.mkdir()
+    graph_folder.mkdir()
+    raster_gdal_info = gdal.Info(sources['cloud'], format='json')
+    chained_bit_bandmath(combine_bits_geotiff, source_lists_function(sources, str(chained_folder)), no_data_values,
+                         raster_gdal_info, str(chained_folder))
+
+    layer_list = [{'output_file': os.path.join(graph_folder, name), 'source_list': source_list, 'no_data_value': no_data_values.get(name)}
+                  for name, source_list in source_lists_function(sources, str(graph_folder)).items()]
+    combine_bits_geotiff.bit_bandmath_graph(layer_list[::-1], raster_gdal_info, block_ysize=block_ysize, write_cog=False)
+
+    for layer in layer_list:
+        name = os.path.basename(layer['output_file'])
+        expected, expected_no_data_value, _ = read_raster(chained_folder / name)
+        actual, actual_no_data_value, _ = read_raster(layer['output_file'])
+        np.testing.assert_array_equal(actual, expected)
+        assert actual_no_data_value == expected_no_data_value
+
+def test_bit_bandmath_graph_writes_cog_without_temporary_layers(combine_bits_geotiff, tmp_path):
+    '''
+    Scenario :
+
+    - The WIC chain with a colortable on the last layer, the first layers being temporary
+
+    Expected behaviour:
+
+    - Only the last layer is written, tiled with overviews and its colortable,
+      with the values of the chained bit_bandmath calls
+    '''
+
+    from osgeo import gdal
+    sources = create_sources(tmp_path)
+    chained_folder = tmp_path / "chained"
+    chained_folder.mkdir()
+    no_data_values = {'WIC_nomask.tif': np.uint8(255), 'WIC_cloud.tif': np.uint8(255), 'WIC.tif': np.uint8(255)}
+    raster_gdal_info = gdal.Info(sources['cloud'], format='json')
+    chained_bit_bandmath(combine_bits_geotiff, wic_source_lists(sources, str(chained_folder)), no_data_values,
+                         raster_gdal_info, str(chained_folder))
+
+    colortable = gdal.ColorTable()
+    colortable.SetColorEntry(1, (0, 0, 255, 255))
+    colortable.SetColorEntry(205, (123, 123, 123, 255))
+    layer_list = [{'output_file': str(tmp_path / name), 'source_list': source_list, 'no_data_value': np.uint8(255)}
+                  for name, source_list in wic_source_lists(sources, str(tmp_path)).items()]
+    layer_list[0]['temporary'] = True
+    layer_list[1]['temporary'] = True
+    layer_list[2]['colortable'] = colortable
+    combine_bits_geotiff.bit_bandmath_graph(layer_list, raster_gdal_info, block_ysize=16)
+
+    assert not os.path.exists(tmp_path / "WIC_nomask.tif")
+    assert not os.path.exists(tmp_path / "WIC_cloud.tif")
+    actual, actual_no_data_value, actual_colors = read_raster(tmp_path / "WIC.tif")
+    expected, _, _ = read_raster(chained_folder / "WIC.tif")
+    np.testing.assert_array_equal(actual, expected)
+    assert actual_no_data_value == 255
+    assert actual_colors[1] == (0, 0, 255, 255)
+    assert actual_colors[205] == (123, 123, 123, 255)
+    band = gdal.Open(str(tmp_path / "WIC.tif")).GetRasterBand(1)
+    assert band.GetOverviewCount() > 0
+    assert band.GetBlockSize() == [1024, 1024]
+
+def test_sort_layer_graph_rejects_a_cycle(combine_bits_geotiff, tmp_path):
+    '''
+    Scenario :
+
+    - Two layers reading each other
+
+    Expected behaviour:
+
+    - sort_layer_graph raises InnerArgError, before any source is read
+    '''
+
+    layer_a, layer_b = str(tmp_path / "A.tif"), str(tmp_path / "B.tif")
+    layer_list = [{'output_file': layer_a, 'source_list': [{'sources': [source(layer_b)], 'operation': 'A0'}]},
+                  {'output_file': layer_b, 'source_list': [{'sources': [source(layer_a)], 'operation': 'A0'}]}]
+
+    with pytest.raises(combine_bits_geotiff.InnerArgError, match="cycle"):
+        combine_bits_geotiff.sort_layer_graph(layer_list)
@@ -0,0 +1,133 @@
+"""Tests for the WDS FSC block aggregation."""
+import os
+import sys
+import numpy as np
+import pytest
+# Authorizing other packages absolute import
+ROOT_FOLDER = '/'.join(os.getcwd().split('hrwsi_watqual_sys')[:-1])
+sys.path.append(ROOT_FOLDER+'hrwsi_watqual_sys')
+
+from HRWSI_Processing_Routines.HRWSI_NRT_Processing_Routines.wds.block_aggregation import aggregate_fsc_blocks
+
+CODES = {
+    "fsc_threshold": 60,
+    "code_ssc_wet": 110,
+    "code_ssc_dry": 115,
+    "code_ssc_snowfree": 120,
+    "code_cloud": 205,
+    "code_water": 210,
+    "code_masks": 250,
+    "code_wsm_wet": 110,
+    "code_wsm_notwet": 125,
+}
+
+
+def loop_aggregate_fsc_blocks(fsc, wsm, qcwsm, ssc, qcssc, ssc_valid, fsc_threshold,
+                              code_ssc_wet, code_ssc_dry, code_ssc_snowfree, code_cloud, code_water,
+                              code_masks, code_wsm_wet, code_wsm_notwet):
+    '''
+    Per pixel reference implementation, as previously done in hrwsi_process_wds.processing_routine
+    '''
+    scale_y, scale_x = fsc.shape[0] // ssc.shape[0], fsc.shape[1] // ssc.shape[1]
+    observed_th = (scale_y * scale_x) // 2
+    for y in range(0, ssc.shape[0]):
+        fsc_y = y * scale_y
+        for x in range(0, ssc.shape[1]):
+            fsc_x = x * scale_x
+            d = fsc[fsc_y:fsc_y + scale_y, fsc_x:fsc_x + scale_x]
+            observed = ((d >= 0) & (d <= 100))
+            observed_count = np.count_nonzero(observed)
+            cloud = (d == code_cloud)
+            cloud_count = np.count_nonzero(cloud)
+            cloud_th = scale_y * scale_x - observed_count - cloud_count
+            water = (d == code_water)
+            water_count = np.count_nonzero(water)
+            water_th = scale_y * scale_x - observed_count - water_count
+            if observed_count > observed_th:
+                ssc_valid[y, x] = 1
+                if d[observed].mean() >= fsc_threshold:
+                    if wsm[y, x] == code_wsm_wet:
+                        ssc[y, x] = code_ssc_wet
+                        qcssc[y, x] = qcwsm[y, x]
+                    elif wsm[y, x] == code_wsm_notwet:
+                        ssc[y, x] = code_ssc_dry
+                        qcssc[y, x] = code_masks
+                else:
+                    ssc[y, x] = code_ssc_snowfree
+                    qcssc[y, x] = code_masks
+            elif ssc_valid[y, x] != 1 and cloud_count > cloud_th:
+                ssc_valid[y, x] = 2
+                ssc[y, x] = code_cloud
+                qcssc[y, x] = code_masks
+            elif ssc_valid[y, x] != 1 and water_count > water_th:
+                ssc_valid[y, x] = 2
+                ssc[y, x] = code_water
+                qcssc[y, x] = code_masks
+
+
+def random_fsc(rng, shape):
+    '''
+    Synthetic FSC raster mixing observed values, cloud, water and nodata
+    '''
+    observed = rng.integers(0, 101, size=shape, dtype=np.uint8)
+    codes = rng.choice(np.array([205, 210, 255], dtype=np.uint8), size=shape)
+    return np.where(rng.random(shape) < rng.random(), observed, codes).astype(np.uint8)
+
+
+@pytest.mark.parametrize("fsc_shape, out_shape", [
+    ((60, 90), (20, 30)),
+    ((64, 95), (20, 30)),
+    ((41, 31), (20, 30)),
+    ((10, 10), (20, 30)),
+])
+def test_aggregate_fsc_blocks_matches_loop(fsc_shape, out_shape):
+    '''
+    Scenario:
+
+    - Several synthetic FSC rasters, with sizes divisible or not by the output grid, are aggregated one after the other
+
+    Expected behaviour:
+
+    - ssc, qcssc and ssc_valid are bit exact with the per pixel loop
+    '''
+    rng = np.random.default_rng(seed=fsc_shape[0] * fsc_shape[1])
+    wsm = rng.choice(np.array([110, 125, 255], dtype=np.uint8), size=out_shape)
+    qcwsm = rng.integers(0, 4, size=out_shape, dtype=np.uint8)
+
+    expected = [np.full(out_shape, 255, dtype=np.uint8), np.full(out_shape, 255, dtype=np.uint8),
+                np.zeros(out_shape, dtype=np.uint8)]
+    result = [array.copy() for array in expected]
+
+    for _ in range(3):
+        fsc = random_fsc(rng, fsc_shape)
+        loop_aggregate_fsc_blocks(fsc, wsm, qcwsm, *expected, **CODES)
+        aggregate_fsc_blocks(fsc, wsm, qcwsm, *result, **CODES)
+
+    for expected_array, result_array in zip(expected, result):
+        assert result_array.dtype == expected_array.dtype
+        assert np.array_equal(result_array, expected_array)
+
+def test_aggregate_fsc_blocks_threshold_boundary():
+    '''
+    Scenario:
+
+    - Observed blocks whose FSC mean is exactly on, just below and just above the threshold
+
+    Expected behaviour:
+
+    - Snow is detected when the mean reaches the threshold, as with the per pixel loop
+    '''
+    fsc = np.array([[60, 60, 59, 60, 61, 60],
+                    [60, 60, 60, 60, 60, 60]], dtype=np.uint8)
+    wsm = np.array([[125, 125, 125]], dtype=np.uint8)
+    qcwsm = np.zeros((1, 3), dtype=np.uint8)
+    expected = [np.full((1, 3), 255, dtype=np.uint8), np.full((1, 3), 255, dtype=np.uint8),
+                np.zeros((1, 3), dtype=np.uint8)]
+    result = [array.copy() for array in expected]
+
+    loop_aggregate_fsc_blocks(fsc, wsm, qcwsm, *expected, **CODES)
+    aggregate_fsc_blocks(fsc, wsm, qcwsm, *result, **CODES)
+
+    assert np.array_equal(result[0], np.array([[115, 120, 115]], dtype=np.uint8))
+    for expected_array, result_array in zip(expected, result):
+        assert np.array_equal(result_array, expected_array)
@@ -0,0 +1,109 @@
+"""Tests for the window by window computation of the WIC S2 classifier features."""
+import os
+import sys
+import numpy as np
+import pytest
+# Authorizing other packages absolute import
+ROOT_FOLDER = '/'.join(os.getcwd().split('hrwsi_watqual_sys')[:-1])
+sys.path.append(ROOT_FOLDER+'hrwsi_watqual_sys')
+
+from HRWSI_Processing_Routines.HRWSI_NRT_Processing_Routines.wic_s2.processing.windowed_indices import compute_indices_columns, iter_windows
+
+LIST_TRAINING_INDICES = ["NDVI", "NDSI", "NDWI", "std_g_blue", "slope", "bounded_b11"]
+LIST_TRAINING_INDICES_TYPES = { "NDVI":"int16", "NDSI":"int16", "NDWI":"int16",
+                                "std_g_blue":"float32", "slope":"float32", "bounded_b11":"int16"}
+
+
+def pixel_compute_index(gen1, gen2, threshold):
+    '''
+    Per pixel reference implementation, as previously done in IndicesComputation.compute_index
+    '''
+    for x, y in zip(gen1, gen2):
+        x = np.float64(x)
+        y = np.float64(y)
+        if x + y != 0:
+            yield 1 if (x - y) / (x + y) >= threshold else 0
+        else:
+            yield -9999
+
+def pixel_matrix_of_indices(band_by_name):
+    '''
+    Per pixel reference implementation, as previously done in IndicesComputation.create_matrix_of_indices
+    and l2a_to_WIC_RF.create_dataframe
+    '''
+    index = {name: i for i, name in enumerate(LIST_TRAINING_INDICES)}
+    matrix_of_indices = [None]*len(LIST_TRAINING_INDICES)
+    matrix_of_indices[index["slope"]] = iter(band_by_name["slope"].flatten())
+    matrix_of_indices[index["std_g_blue"]] = iter(band_by_name["std_g_blue"].flatten())
+    masks = []
+    for normalised_index, b1, b2, threshold in [("NDSI", "B3", "B11", 0.4), ("NDVI", "B8", "B4", 0.1), ("NDWI", "B3", "B8", 0.3)]:
+        matrix_of_indices[index[normalised_index]] = pixel_compute_index(band_by_name[b1].flatten(), band_by_name[b2].flatten(), threshold)
+        masks.append(np.float64(x) + np.float64(y) == 0 for x, y in zip(band_by_name[b1].flatten(), band_by_name[b2].flatten()))
+    matrix_of_indices[index["bounded_b11"]] = (max(200, min(elem, 600)) for elem in band_by_name["B11"].flatten())
+    combined_mask = (x | y | z for x, y, z in zip(*masks))
+
+    column_list = [np.array(list(generator)).astype(LIST_TRAINING_INDICES_TYPES[LIST_TRAINING_INDICES[i]])
+                   for i, generator in enumerate(matrix_of_indices)]
+    return column_list, np.array(list(combined_mask))
+
+def create_band_by_name(shape, seed):
+    """Create reflectance bands with null reflectances and features rasters"""
+
+    rng = np.random.default_rng(seed)
+    band_by_name = {band_name: rng.integers(-100, 1000, size=shape).astype(np.int16) for band_name in ["B3", "B4", "B8", "B11"]}
+    for band_name in ["B3", "B8"]:
+        band_by_name[band_name][rng.random(shape) < 0.1] = 0
+    band_by_name["B11"][rng.random(shape) < 0.1] = 0
+    band_by_name["slope"] = rng.random(shape, dtype=np.float32) * 90
+    band_by_name["std_g_blue"] = rng.random(shape) * 1000
+    return band_by_name
+
+@pytest.mark.parametrize("shape, window_size", [((40, 40), 16), ((37, 53), 16), ((20, 30), 1024), ((9, 5), 1)])
+def test_compute_indices_columns_is_equal_to_pixel_implementation(shape, window_size):
+    '''
+    Scenario :
+
+    - The classifier features are computed on images with null reflectances,
+      the image shape being or not a multiple of the window size
+
+    Expected behaviour:
+
+    - The columns and the unvalid mask are exactly the ones of the per pixel implementation
+    '''
+
+    band_by_name = create_band_by_name(shape, window_size)
+    height, width = shape
+    read_band_list = []
+    def read_window(band_name, x_off, y_off, x_size, y_size):
+        read_band_list.append(band_name)
+        return band_by_name[band_name][y_off:y_off + y_size, x_off:x_off + x_size]
+
+    expected_column_list, expected_mask = pixel_matrix_of_indices(band_by_name)
+    actual_column_list, actual_mask = compute_indices_columns(read_window, width, height, LIST_TRAINING_INDICES,
+                                                              LIST_TRAINING_INDICES_TYPES, window_size)
+
+    for expected, actual in zip(expected_column_list, actual_column_list):
+        assert expected.dtype == actual.dtype
+        assert np.array_equal(expected, actual)
+    assert np.array_equal(expected_mask, actual_mask)
+    # Each band is read once per window
+    nb_window = len(list(iter_windows(width, height, window_size)))
+    assert sorted(set(read_band_list)) == sorted(["B3", "B4", "B8", "B11", "slope", "std_g_blue"])
+    assert len(read_band_list) == 6 * nb_window
+
+def test_iter_windows_cover_image_once():
+    '''
+    Scenario :
+
+    - The windows of an image whose shape isn't a multiple of the window size are iterated
+
+    Expected behaviour:
+
+    - Each pixel belongs to exactly one window
+    '''
+
+    count = np.zeros((70, 45), dtype=int)
+    for x_off, y_off, x_size, y_size in iter_windows(45, 70, 32):
+        count[y_off:y_off + y_size, x_off:x_off + x_size] += 1
+
+    assert np.all(count == 1)
@@ -0,0 +1,153 @@
+"""Tests for the QC layers of the SP S2 and SP S1S2 post processing copies."""
+import os
+import sys
+import importlib
+import numpy as np
+import pytest
+
+YEARLY_PROCESSING_ROUTINES_FOLDER = os.path.join(os.path.dirname(__file__), *[os.pardir]*4,
+                                                 "HRWSI_Processing_Routines", "HRWSI_Yearly_Processing_Routines")
+POST_PROCESSING_MODULE_LIST = [("sp_s2", "lis_sps2_post_processing"), ("sp_s1s2", "lis_sps1s2_post_processing")]
+ROUTINE_PACKAGE_LIST = ["common", "utils", "geometry"]
+
+
+@pytest.fixture(scope='function', params=POST_PROCESSING_MODULE_LIST, ids=[routine for routine, _ in POST_PROCESSING_MODULE_LIST])
+def post_processing(request, monkeypatch):
+    '''
+    post_processing Fixture function return the LisSpS2PostProcessing class of each SP copy
+
+
+    :return: the LisSpS2PostProcessing class
+    :rtype: type
+    '''
+    for module_name in ["osgeo", "rasterio"]:
+        pytest.importorskip(module_name)
+    routine, module_name = request.param
+    monkeypatch.syspath_prepend(os.path.join(YEARLY_PROCESSING_ROUTINES_FOLDER, routine))
+    for name in [name for name in sys.modules if name.split(".")[0] in ROUTINE_PACKAGE_LIST + [module_name]]:
+        monkeypatch.delitem(sys.modules, name)
+    yield importlib.import_module(module_name).LisSpS2PostProcessing
+    # The packages of the routine are removed, monkeypatch gives back the former ones
+    for name in [name for name in sys.modules if name.split(".")[0] in ROUTINE_PACKAGE_LIST + [module_name]]:
+        del sys.modules[name]
+
+def loop_qc_mean_median(qc_list):
+    '''
+    Whole raster reference implementation, as previously done in calculate_qc_files_list_stats,
+    without its restart of the counts when the QC sum is still all zeros
+    '''
+    qc_histo = np.zeros(qc_list[0].shape + (4,), dtype=np.uint8)
+    qc_sum = np.zeros(qc_list[0].shape, dtype=np.uint16)
+    valid_pixel_counter = np.zeros(qc_list[0].shape, dtype=np.uint8)
+    for qc in qc_list:
+        for value in range(4):
+            qc_histo[:,:,value] += (qc==value).astype(np.uint8)
+        valid_pixels = qc<=3
+        valid_pixel_counter = valid_pixel_counter + valid_pixels.astype(np.uint8)
+        qc_sum = (qc*valid_pixels).astype(np.uint16) + qc_sum
+    with np.errstate(divide='ignore', invalid='ignore'):
+        qc_mean = qc_sum / valid_pixel_counter.astype(float)
+    qc_mean[valid_pixel_counter==0] = 255
+
+    qc_histo_sumed = np.zeros(qc_histo.shape)
+    for i in range(4):
+        qc_histo_sumed[:,:,i] = np.sum(qc_histo[:,:,:i+1], axis=2)
+    qc_histo_sumed = np.array([value * (qc_histo_sumed[:,:,value]>= valid_pixel_counter/2) +\
+                               255 * (qc_histo_sumed[:,:,value]<valid_pixel_counter/2) for value in range(4)])
+    qc_median = np.min(qc_histo_sumed, axis=0)
+    qc_median[valid_pixel_counter==0] = 255
+    return qc_mean, qc_median
+
+def loop_qcod_qcmd(sco_ndarray, scm_ndarray, multitemp_input_snow_mask_array, date_index_list):
+    '''
+    Per pixel reference implementation, as previously done in make_lis_sps2_qcod_qcmd_layer
+    '''
+    qcod_ndarray = np.ones(sco_ndarray.shape, dtype=np.uint16)*65535
+    sco_date = np.array([sco_ndarray[i,j] if sco_ndarray[i,j]<420 else 65535
+                         for i,j in np.ndindex(sco_ndarray.shape)]).reshape(sco_ndarray.shape)
+    qcmd_ndarray = np.ones(scm_ndarray.shape, dtype=np.uint16)*65535
+    scm_date = np.array([scm_ndarray[i,j] if scm_ndarray[i,j]<420 else 65535
+                         for i,j in np.ndindex(scm_ndarray.shape)]).reshape(scm_ndarray.shape)
+
+    for i, date_index in enumerate(date_index_list):
+        qcod_ndarray = np.min([qcod_ndarray,
+                               (multitemp_input_snow_mask_array[i,:,:] != 0)*abs(sco_date-date_index) +\
+                               65535*(multitemp_input_snow_mask_array[i,:,:] == 0)], axis=0)
+        qcmd_ndarray = np.min([qcmd_ndarray,
+                               (multitemp_input_snow_mask_array[i,:,:] != 0)*abs(scm_date-date_index) +\
+                               65535*(multitemp_input_snow_mask_array[i,:,:] == 0)], axis=0)
+
+    qcod_ndarray[sco_date>=420] = 65535
+    qcmd_ndarray[scm_date>=420] = 65535
+    return qcod_ndarray, qcmd_ndarray
+
+@pytest.mark.parametrize("window_size", [7, 64])
+@pytest.mark.parametrize("nb_qc_file", [1, 5, 40])
+def test_qc_mean_median_is_equal_to_loop(post_processing, window_size, nb_qc_file):
+    '''
+    Scenario :
+
+    - QC rasters of valid values (0 to 3) and invalid values (4, 205, 255), some pixels never valid,
+      counted window by window as in calculate_qc_files_list_stats
+
+    Expected behaviour:
+
+    - The QC mean and median are the ones of the former whole raster implementation
+    '''
+
+    rng = np.random.default_rng(nb_qc_file)
+    nb_row, nb_col = 45, 30
+    qc_list = [rng.choice(np.array([0, 1, 2, 3, 4, 205, 255], dtype=np.uint8), size=(nb_row, nb_col))
+               for _ in range(nb_qc_file)]
+    # The first QC has a valid non zero value so that the former implementation doesn't restart its counts
+    qc_list[0][0, 0] = 1
+    for qc in qc_list:
+        qc[-3:, -3:] = 255
+
+    qc_mean = np.empty((nb_row, nb_col))
+    qc_median = np.empty((nb_row, nb_col), dtype=np.float32)
+    for y_off in range(0, nb_row, window_size):
+        for x_off in range(0, nb_col, window_size):
+            window = np.s_[y_off:y_off+window_size, x_off:x_off+window_size]
+            y_size, x_size = qc_list[0][window].shape
+            qc_counts = np.zeros((4, x_size*y_size), dtype=np.int64)
+            for qc in qc_list:
+                post_processing.accumulate_qc_counts(qc_counts, qc[window])
+            window_mean, window_median = post_processing.derive_qc_mean_median(qc_counts)
+            qc_mean[window] = window_mean.reshape(y_size, x_size)
+            qc_median[window] = window_median.reshape(y_size, x_size)
+
+    expected_mean, expected_median = loop_qc_mean_median(qc_list)
+    np.testing.assert_array_equal(qc_mean.astype(np.float32), expected_mean.astype(np.float32))
+    np.testing.assert_array_equal(qc_median, expected_median.astype(np.float32))
+    assert (qc_mean[-3:, -3:] == 255).all() and (qc_median[-3:, -3:] == 255).all()
+
+def test_qcod_qcmd_is_equal_to_loop(post_processing):
+    '''
+    Scenario :
+
+    - SCO and SCM rasters of valid (< 420) and invalid dates, and snow masks of input dates
+      with no data values, read one date at a time
+
+    Expected behaviour:
+
+    - QCOD and QCMD are the ones of the former per pixel implementation, as uint16
+    '''
+
+    rng = np.random.default_rng(0)
+    nb_row, nb_col, nb_date = 40, 35, 12
+    sco_ndarray = rng.integers(0, 450, size=(nb_row, nb_col)).astype(np.uint16)
+    scm_ndarray = rng.integers(0, 450, size=(nb_row, nb_col)).astype(np.uint16)
+    sco_ndarray[0, :] = 65535
+    multitemp_input_snow_mask_array = rng.choice(np.array([0, 0, 0, 1, 100, 205, 255], dtype=np.uint8), size=(nb_date, nb_row, nb_col))
+    multitemp_input_snow_mask_array[:, 1, :] = 0
+    date_index_list = sorted(rng.choice(420, size=nb_date, replace=False).tolist())
+
+    observation_iterator = ((date_index, multitemp_input_snow_mask_array[i] != 0) for i, date_index in enumerate(date_index_list))
+    qcod_ndarray, qcmd_ndarray = post_processing.compute_qcod_qcmd(sco_ndarray, scm_ndarray, observation_iterator)
+
+    expected_qcod, expected_qcmd = loop_qcod_qcmd(sco_ndarray, scm_ndarray, multitemp_input_snow_mask_array, date_index_list)
+    assert qcod_ndarray.dtype == np.uint16 and qcmd_ndarray.dtype == np.uint16
+    np.testing.assert_array_equal(qcod_ndarray, expected_qcod)
+    np.testing.assert_array_equal(qcmd_ndarray, expected_qcmd)
+    assert (qcod_ndarray[0, :] == 65535).all() and (qcmd_ndarray[1, :] == 65535).all()
@@ -0,0 +1,73 @@
+"""Tests for the SOD/SMOD computation of the let-it-snow copies used by the processing routines."""
+import os
+import itertools
+import operator
+import importlib.util
+import numpy as np
+import pytest
+
+PROCESSING_ROUTINES_FOLDER = os.path.join(os.path.dirname(__file__), os.pardir, os.pardir, os.pardir, "HRWSI_Processing_Routines")
+LET_IT_SNOW_FOLDER_LIST = ["HRWSI_NRT_Processing_Routines/fsc/let-it-snow-1.11.0",
+                           "HRWSI_Yearly_Processing_Routines/icd/let-it-snow-1.11.0",
+                           "HRWSI_Yearly_Processing_Routines/sp_s1s2/let-it-snow-1.11.0"]
+
+
+def load_compute_SOD_SMOD(let_it_snow_folder):
+    """Load the compute_SOD_SMOD module of a let-it-snow copy"""
+
+    pytest.importorskip("rasterio")
+    module_path = os.path.join(PROCESSING_ROUTINES_FOLDER, let_it_snow_folder, "python", "s2snow", "compute_SOD_SMOD.py")
+    spec = importlib.util.spec_from_file_location(f"compute_SOD_SMOD_{let_it_snow_folder.split('/')[1]}", module_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def groupby_longest_snow_run(W):
+    '''
+    Per pixel reference implementation, as previously done in compute_SOD_SMOD
+    '''
+    n = np.shape(W)[1]
+    m = np.shape(W)[2]
+    sod = np.zeros((n, m), dtype='uint16')
+    smod = np.zeros((n, m), dtype='uint16')
+    for i in range(0, n):
+        for j in range(0, m):
+            w = W[:, i, j]
+            if np.sum(w) > 10:
+                r = max((list(y) for (x, y) in itertools.groupby((enumerate(w)), operator.itemgetter(1)) if x == 1),
+                        key=len)
+                smod[i, j] = r[-1][0]
+                sod[i, j] = r[0][0]
+    return sod, smod
+
+@pytest.mark.parametrize("let_it_snow_folder", LET_IT_SNOW_FOLDER_LIST)
+def test_compute_longest_snow_run_is_equal_to_groupby(let_it_snow_folder):
+    '''
+    Scenario :
+
+    - The longest snow run is computed on random stacks of daily snow maps with different snow probabilities,
+      including pixels always snowy, never snowy and with less than 11 snow days
+
+    Expected behaviour:
+
+    - SOD and SMOD are bit exact with the per pixel itertools.groupby implementation,
+      the first run being kept when several runs have the longest length
+    '''
+
+    compute_SOD_SMOD = load_compute_SOD_SMOD(let_it_snow_folder)
+    rng = np.random.default_rng(0)
+    for snow_probability in [0.05, 0.3, 0.5, 0.7, 0.95]:
+        W = (rng.random((60, 12, 15)) < snow_probability).astype(np.uint8)
+        W[:, 0] = 1
+        W[:, 1] = 0
+        W[:12, 2] = 1
+        W[12:, 2] = 0
+        W[:10, 3] = 1
+        W[10:, 3] = 0
+
+        expected_sod, expected_smod = groupby_longest_snow_run(W)
+        actual_sod, actual_smod = compute_SOD_SMOD.compute_longest_snow_run(W)
+
+        assert actual_sod.dtype == actual_smod.dtype == np.uint16
+        assert np.array_equal(expected_sod, actual_sod)
+        assert np.array_equal(expected_smod, actual_smod)
@@ -0,0 +1,109 @@
+"""Tests for the search of the snow areas surrounded by clouds of the let-it-snow copies used by the processing routines."""
+import os
+import sys
+import filecmp
+import importlib
+import numpy as np
+import pytest
+
+PROCESSING_ROUTINES_FOLDER = os.path.join(os.path.dirname(__file__), os.pardir, os.pardir, os.pardir, "HRWSI_Processing_Routines")
+LET_IT_SNOW_FOLDER_LIST = ["HRWSI_NRT_Processing_Routines/fsc/let-it-snow-1.11.0",
+                           "HRWSI_Yearly_Processing_Routines/icd/let-it-snow-1.11.0",
+                           "HRWSI_Yearly_Processing_Routines/sp_s1s2/let-it-snow-1.11.0"]
+
+
+@pytest.fixture(scope='function')
+def snow_detector(monkeypatch):
+    '''
+    snow_detector Fixture function return the snow_detector module of the fsc let-it-snow copy
+
+
+    :return: the s2snow.snow_detector module
+    :rtype: module
+    '''
+    for module_name in ["scipy", "lxml", "osgeo", "otbApplication"]:
+        pytest.importorskip(module_name)
+    monkeypatch.syspath_prepend(os.path.join(PROCESSING_ROUTINES_FOLDER, LET_IT_SNOW_FOLDER_LIST[0], "python"))
+    for module_name in [name for name in sys.modules if name == "s2snow" or name.startswith("s2snow.")]:
+        monkeypatch.delitem(sys.modules, module_name)
+    return importlib.import_module("s2snow.snow_detector")
+
+def create_struct(radius):
+    """Disc structuring element, as built by remove_snow_inside_cloud"""
+
+    struct = np.zeros((2 * radius + 1, 2 * radius + 1))
+    y, x = np.ogrid[-radius:radius + 1, -radius:radius + 1]
+    struct[x ** 2 + y ** 2 <= radius ** 2] = 1
+    return struct
+
+def loop_snow_mask_inside_cloud(snow_mask, cloud_mask, snow_labels, nb_label, struct, cloud_threshold, min_area_size):
+    '''
+    Per label reference implementation, as previously done in remove_snow_inside_cloud
+    '''
+    import scipy.ndimage as nd
+
+    (labels, label_counts) = np.unique(snow_labels, return_counts=True)
+    labels_area = dict(list(zip(labels, label_counts)))
+    for lab in range(1, nb_label + 1):
+        if labels_area[lab] > min_area_size:
+            current_mask = np.where(snow_labels == lab, 1, 0)
+            patch_neige_dilat = nd.binary_dilation(current_mask, struct)
+            contour = np.where((snow_mask == 0) & (patch_neige_dilat == 1))
+            result = np.bincount(cloud_mask[contour])
+            cloud_percent = 0
+            if len(result) > 1:
+                cloud_percent = float(result[1]) / (result[0] + result[1])
+            if cloud_percent > cloud_threshold:
+                snow_mask = np.where(snow_labels == lab, 0, snow_mask)
+    return snow_mask
+
+@pytest.mark.parametrize("radius", [1, 2, 5])
+def test_snow_labels_inside_cloud_are_equal_to_loop(snow_detector, radius):
+    '''
+    Scenario :
+
+    - The snow areas surrounded by clouds are searched on random snow and cloud masks, with touching snow areas,
+      areas smaller than min_area_size and cloud mask values other than 0 and 1
+
+    Expected behaviour:
+
+    - The snow mask without the discarded areas is equal to the one of the per label loop, including when
+      the dilation of an area reaches an area discarded before it
+    '''
+
+    import scipy.ndimage as nd
+
+    rng = np.random.default_rng(radius)
+    for _ in range(50):
+        shape = rng.integers(5, 60, 2)
+        snow_mask = (rng.random(shape) < rng.uniform(0.2, 0.7)).astype(np.uint8)
+        cloud_mask = (rng.random(shape) < rng.uniform(0.3, 1.0)).astype(np.uint8)
+        cloud_mask[rng.random(shape) < 0.05] = 2
+        cloud_threshold = rng.uniform(0.3, 0.95)
+        min_area_size = int(rng.integers(0, 40))
+        (snow_labels, nb_label) = nd.measurements.label(snow_mask)
+        struct = create_struct(radius)
+
+        expected = loop_snow_mask_inside_cloud(snow_mask, cloud_mask, snow_labels, nb_label, struct,
+                                               cloud_threshold, min_area_size)
+        discarded_labels = snow_detector.compute_snow_labels_inside_cloud(snow_mask, cloud_mask, snow_labels,
+                                                                           nb_label, struct, cloud_threshold,
+                                                                           min_area_size)
+
+        assert np.array_equal(expected, np.where(discarded_labels[snow_labels], 0, snow_mask))
+
+def test_snow_detector_copies_are_identical():
+    '''
+    Scenario :
+
+    - The snow_detector module of every let-it-snow copy is compared to the fsc one
+
+    Expected behaviour:
+
+    - The copies are identical, the fsc copy test covers them
+    '''
+
+    module_path_list = [os.path.join(PROCESSING_ROUTINES_FOLDER, let_it_snow_folder, "python", "s2snow", "snow_detector.py")
+                        for let_it_snow_folder in LET_IT_SNOW_FOLDER_LIST]
+
+    assert all(filecmp.cmp(module_path_list[0], module_path, shallow=False) for module_path in module_path_list[1:])
@@ -0,0 +1,186 @@
+"""Tests for the HRWSI Database connection pool, run against a local PostgreSQL server."""
+import os
+import sys
+import threading
+import psycopg2
+import psycopg2.pool
+import pytest
+# Authorizing other packages absolute import
+ROOT_FOLDER = '/'.join(os.getcwd().split('hrwsi_watqual_sys')[:-1])
+sys.path.append(ROOT_FOLDER+'hrwsi_watqual_sys')
+
+from HRWSI_System.harvester.apimanager.hrwsi_database_api_manager import HRWSIDatabaseApiManager
+from HRWSI_System.harvester.apimanager.connection_pool import PreparedStatementRegistry
+
+@pytest.fixture(scope='function')
+def connection_pool(local_postgresql):
+    '''
+    connection_pool Fixture function create the process-wide connection pool on the local PostgreSQL server
+    with 2 connections at most and a health check at each use.
+
+
+    :return: the connection pool
+    :rtype: HRWSIConnectionPool
+    '''
+    pool = HRWSIDatabaseApiManager.create_connection_pool(**local_postgresql, min_connections=1, max_connections=2, health_check_interval=0)
+    yield pool
+    HRWSIDatabaseApiManager.close_connection_pool()
+
+def test_connection_is_reused(connection_pool):
+    '''
+    Scenario :
+
+    - Connect, close and connect again to the database
+
+    Expected behaviour:
+
+    - The same server session is used and the wait time is recorded for each connection
+    '''
+
+    conn, cur = HRWSIDatabaseApiManager.connect_to_database()
+    cur.execute("SELECT pg_backend_pid()")
+    first_pid = cur.fetchone()[0]
+    HRWSIDatabaseApiManager.commit_and_close_connection_to_database(conn, cur)
+
+    conn, cur = HRWSIDatabaseApiManager.connect_to_database()
+    cur.execute("SELECT pg_backend_pid()")
+    second_pid = cur.fetchone()[0]
+    HRWSIDatabaseApiManager.commit_and_close_connection_to_database(conn, cur)
+
+    metrics = HRWSIDatabaseApiManager.get_connection_pool_metrics()
+
+    assert first_pid == second_pid
+    assert metrics["checkout_count"] == 2
+    assert metrics["max_wait_time"] >= metrics["mean_wait_time"] >= 0
+
+def test_broken_connection_is_replaced(connection_pool, local_postgresql):
+    '''
+    Scenario :
+
+    - The server session of a pooled connection is terminated
+
+    Expected behaviour:
+
+    - The health check discards the broken connection and a new session is given
+    '''
+
+    conn, cur = HRWSIDatabaseApiManager.connect_to_database()
+    cur.execute("SELECT pg_backend_pid()")
+    broken_pid = cur.fetchone()[0]
+    HRWSIDatabaseApiManager.commit_and_close_connection_to_database(conn, cur)
+
+    with psycopg2.connect(**local_postgresql) as admin_conn:
+        with admin_conn.cursor() as admin_cur:
+            admin_cur.execute("SELECT pg_terminate_backend(%s)", (broken_pid,))
+
+    conn, cur = HRWSIDatabaseApiManager.connect_to_database()
+    cur.execute("SELECT pg_backend_pid()")
+    new_pid = cur.fetchone()[0]
+    HRWSIDatabaseApiManager.commit_and_close_connection_to_database(conn, cur)
+
+    assert new_pid != broken_pid
+    assert HRWSIDatabaseApiManager.get_connection_pool_metrics()["broken_connection_count"] == 1
+
+def test_exhausted_pool_waits_for_a_connection(connection_pool):
+    '''
+    Scenario :
+
+    - All the connections of the pool are used and a third one is asked
+
+    Expected behaviour:
+
+    - The third connection is given as soon as one connection comes back in the pool,
+      PoolError is raised if the wait is longer than the timeout
+    '''
+
+    conn_list = [HRWSIDatabaseApiManager.connect_to_database() for _ in range(2)]
+
+    with pytest.raises(psycopg2.pool.PoolError):
+        connection_pool.getconn(timeout=0.1)
+
+    timer = threading.Timer(0.2, HRWSIDatabaseApiManager.commit_and_close_connection_to_database, args=conn_list.pop())
+    timer.start()
+    conn, cur = HRWSIDatabaseApiManager.connect_to_database()
+    timer.join()
+    conn_list.append((conn, cur))
+
+    for conn, cur in conn_list:
+        HRWSIDatabaseApiManager.commit_and_close_connection_to_database(conn, cur)
+
+    assert HRWSIDatabaseApiManager.get_connection_pool_metrics()["max_wait_time"] >= 0.1
+
+def test_prepared_statements(connection_pool):
+    '''
+    Scenario :
+
+    - A fixed insert request and a fixed select request are executed twice with prepared=True
+
+    Expected behaviour:
+
+    - Each request is prepared once by connection and gives the same results as without prepared statement
+    '''
+
+    insert_request = "INSERT INTO pool_test (name, value) VALUES (%s, %s)"
+    select_request = "SELECT name, value FROM pool_test ORDER BY value;"
+
+    conn, cur = HRWSIDatabaseApiManager.connect_to_database()
+    cur.execute("CREATE TEMPORARY TABLE pool_test (name text, value integer)")
+    for data_tuple in ((("a", 1), ("b", 2)), (("c", 3),)):
+        cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, insert_request, data_tuple, prepared=True)
+    cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, select_request, prepared=True)
+    prepared_result = cur.fetchall()
+    cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, select_request)
+    expected = cur.fetchall()
+    cur.execute("SELECT count(*) FROM pg_prepared_statements")
+    nb_prepared_statement = cur.fetchone()[0]
+    HRWSIDatabaseApiManager.commit_and_close_connection_to_database(conn, cur)
+
+    assert prepared_result == expected == [("a", 1), ("b", 2), ("c", 3)]
+    assert nb_prepared_statement == 2
+
+def test_to_prepared_request():
+    '''
+    Scenario :
+
+    - A request with %s placeholders and a final semicolon
+
+    Expected behaviour:
+
+    - Placeholders are numbered and the semicolon removed
+    '''
+
+    expected = ("INSERT INTO t (a, b) VALUES ($1, $2)", 2)
+    actual = PreparedStatementRegistry.to_prepared_request("INSERT INTO t (a, b) VALUES (%s, %s);")
+
+    assert expected == actual
+
+def test_connection_is_given_back_when_the_request_fails(connection_pool):
+    '''
+    Scenario :
+
+    - More requests than connections in the pool fail in a connection_to_database block,
+      after an insertion
+
+    Expected behaviour:
+
+    - The insertions are rolled back and each connection is given back to the pool
+    '''
+
+    with HRWSIDatabaseApiManager.connection_to_database() as (_, cur):
+        cur.execute("CREATE TABLE pool_rollback_test (value integer)")
+
+    for value in range(connection_pool.maxconn + 1):
+        with pytest.raises(psycopg2.errors.UndefinedTable):
+            with HRWSIDatabaseApiManager.connection_to_database() as (_, cur):
+                cur.execute("INSERT INTO pool_rollback_test (value) VALUES (%s)", (value,))
+                cur.execute("SELECT * FROM missing_table")
+
+    conn_list = [connection_pool.getconn(timeout=0.1) for _ in range(connection_pool.maxconn)]
+    for conn in conn_list:
+        connection_pool.putconn(conn)
+    with HRWSIDatabaseApiManager.connection_to_database() as (_, cur):
+        cur.execute("SELECT count(*) FROM pool_rollback_test")
+        nb_value = cur.fetchone()[0]
+        cur.execute("DROP TABLE pool_rollback_test")
+
+    assert nb_value == 0
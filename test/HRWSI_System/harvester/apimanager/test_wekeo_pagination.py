@@ -0,0 +1,203 @@
+"""Tests for the WEkEO API pagination, run against a local fake OData server."""
+import os
+import sys
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+import pytest
+# Authorizing other packages absolute import
+ROOT_FOLDER = '/'.join(os.getcwd().split('hrwsi_watqual_sys')[:-1])
+sys.path.append(ROOT_FOLDER+'hrwsi_watqual_sys')
+
+from HRWSI_System.harvester.apimanager.wekeo_api_manager import WekeoApiManager
+
+TILE_LIST = ["T31UDQ", "T31UCQ", "T32TLR"]
+
+class FakeODataServer(ThreadingHTTPServer):
+    """OData server answering $top, $skip and $count queries on a list of products"""
+
+    daemon_threads = True
+
+    def __init__(self, nb_product: int, with_count: bool = True, nb_slow_request: int = 0, slow_latency: float = 0):
+
+        super().__init__(("localhost", 0), FakeODataRequestHandler)
+        self.product_list = [
+            {'Name': f"S2A_MSIL1C_20220503T105621_N0400_R094_{TILE_LIST[i % len(TILE_LIST)]}_20220503T{i:06d}.SAFE",
+             'ContentDate': {'Start': f'2022-05-03T10:56:21.{i:03d}Z'},
+             'S3Path': f'/eodata/Sentinel-2/MSI/L1C/2022/05/03/product_{i}.SAFE'}
+            for i in range(nb_product)]
+        self.with_count = with_count
+        self.nb_slow_request = nb_slow_request
+        self.slow_latency = slow_latency
+        self.lock = threading.Lock()
+        self.skip_list = []
+        self.nb_request_in_progress = 0
+        self.max_nb_request_in_progress = 0
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def url(self) -> str:
+        return f"http://localhost:{self.server_address[1]}/odata/v1/Products"
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+class FakeODataRequestHandler(BaseHTTPRequestHandler):
+    """Answer one page of products"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self) -> None:
+        server = self.server
+        query = parse_qs(urlsplit(self.path).query)
+        top = int(query["$top"][0])
+        skip = int(query.get("$skip", ["0"])[0])
+        with server.lock:
+            server.skip_list.append(skip)
+            is_slow = len(server.skip_list) <= server.nb_slow_request
+            server.nb_request_in_progress += 1
+            server.max_nb_request_in_progress = max(server.max_nb_request_in_progress, server.nb_request_in_progress)
+        # Let the concurrent requests overlap
+        time.sleep(server.slow_latency if is_slow else 0.01)
+
+        content = {'@odata.context': '$metadata#Products', 'value': server.product_list[skip:skip+top]}
+        if server.with_count and "$count" in query:
+            content['@odata.count'] = len(server.product_list)
+        if not server.with_count and skip + top < len(server.product_list):
+            content['@odata.nextLink'] = f"{server.url}?$skip={skip + top}"
+
+        data = json.dumps(content).encode("utf-8")
+        with server.lock:
+            server.nb_request_in_progress -= 1
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+@pytest.fixture(scope='function')
+def fake_odata_server():
+    '''
+    fake_odata_server Fixture function return a function starting a fake OData server
+
+
+    :return: a function creating the started server
+    :rtype: function
+    '''
+    server_list = []
+    def _start(**kwargs) -> FakeODataServer:
+        server = FakeODataServer(**kwargs)
+        server_list.append(server)
+        return server
+
+    yield _start
+
+    for server in server_list:
+        server.stop()
+
+def create_wekeo_api_manager(url: str, nb_img_per_page: int) -> WekeoApiManager:
+    """Create a WekeoApiManager sending its requests to url"""
+
+    wekeo_api_manager = WekeoApiManager(processing_condition_name="GRS_PC", input_type="MSIL1C", max_day_since_publication_date=7, max_day_since_measurement_date=30)
+    wekeo_api_manager.url = url
+    wekeo_api_manager.nb_img_per_page = nb_img_per_page
+    wekeo_api_manager.request = f"$filter=contains(Name,'MSIL1C')&$orderby=PublicationDate&$top={nb_img_per_page}"
+    return wekeo_api_manager
+
+def expected_candidate_inputs(server: FakeODataServer) -> tuple[tuple]:
+    """Return the candidate inputs of all the products of the server"""
+
+    return tuple(
+        ("GRS_PC", product['ContentDate']['Start'], product['Name'].split("_")[5], 20220503, product['S3Path'], "S2")
+        for product in server.product_list)
+
+def test_pages_are_fetched_concurrently(fake_odata_server):
+    '''
+    Scenario :
+
+    - The request result has 1050 products on pages of 100 products and the API gives the count
+
+    Expected behaviour:
+
+    - Every page is requested once, the pages after the first one are requested concurrently
+      by at most max_concurrent_pages threads and the candidates keep the API order
+    '''
+
+    server = fake_odata_server(nb_product=1050)
+    wekeo_api_manager = create_wekeo_api_manager(server.url, 100)
+    wekeo_api_manager.max_concurrent_pages = 4
+
+    actual = wekeo_api_manager.get_candidate_inputs()
+
+    assert actual == expected_candidate_inputs(server)
+    assert sorted(server.skip_list) == list(range(0, 1050, 100))
+    assert 1 < server.max_nb_request_in_progress <= 4
+
+def test_next_link_is_followed_without_count(fake_odata_server):
+    '''
+    Scenario :
+
+    - The API doesn't give the count of the request result
+
+    Expected behaviour:
+
+    - The @odata.nextLink of each page is followed and all the candidates are collected
+    '''
+
+    server = fake_odata_server(nb_product=250, with_count=False)
+    wekeo_api_manager = create_wekeo_api_manager(server.url, 100)
+
+    actual = wekeo_api_manager.get_candidate_inputs()
+
+    assert actual == expected_candidate_inputs(server)
+    assert server.skip_list == [0, 100, 200]
+
+def test_send_request_exits_on_success(fake_odata_server):
+    '''
+    Scenario :
+
+    - The first request times out, the second one succeeds
+
+    Expected behaviour:
+
+    - send_request stops retrying after the first success
+    '''
+
+    server = fake_odata_server(nb_product=10, nb_slow_request=1, slow_latency=0.5)
+    wekeo_api_manager = create_wekeo_api_manager(server.url, 100)
+    wekeo_api_manager.max_retries = 3
+    wekeo_api_manager.timeout = 0.2
+
+    actual = wekeo_api_manager.send_request(wekeo_api_manager.request)
+
+    assert len(actual['value']) == 10
+    assert len(server.skip_list) == 2
+
+def test_send_request_fails_after_max_retries(fake_odata_server):
+    '''
+    Scenario :
+
+    - All the requests time out
+
+    Expected behaviour:
+
+    - send_request stops after max_retries attempts
+    '''
+
+    server = fake_odata_server(nb_product=10, nb_slow_request=10, slow_latency=0.5)
+    wekeo_api_manager = create_wekeo_api_manager(server.url, 100)
+    wekeo_api_manager.max_retries = 2
+    wekeo_api_manager.timeout = 0.1
+
+    with pytest.raises(SystemExit):
+        wekeo_api_manager.send_request(wekeo_api_manager.request)
+
+    assert len(server.skip_list) == 2
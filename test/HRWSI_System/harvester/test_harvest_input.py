@@ -0,0 +1,93 @@
+"""Tests for the inputs harvested in HRWSI Database and their unique index, run against a local PostgreSQL server."""
+import os
+import sys
+import datetime
+import psycopg2
+# Authorizing other packages absolute import
+ROOT_FOLDER = '/'.join(os.getcwd().split('hrwsi_watqual_sys')[:-1])
+sys.path.append(ROOT_FOLDER+'hrwsi_watqual_sys')
+
+from HRWSI_System.harvester.harvester import Harvester
+from HRWSI_System.harvester.apimanager.hrwsi_database_api_manager import HRWSIDatabaseApiManager
+
+SECONDARY_INDEXES_SQL_FILE = os.path.join(os.path.dirname(__file__), *[os.pardir]*3,
+                                          "HRWSI_Database", "update_database", "7_update_database_secondary_indexes.sql")
+
+def test_harvest_input_skips_an_input_harvested_before_the_measurement_days(hrwsi_database, mocker):
+    '''
+    Scenario :
+
+    - A candidate input is already in the database with a measurement day older than the ones looked at by the Harvester,
+      so that it is found new by the anti-join, another candidate is new
+
+    Expected behaviour:
+
+    - The harvest doesn't fail on the unique index, each input is in the database once
+    '''
+
+    now = datetime.datetime.now()
+    old_input = ('FSC_PC', now, '33VUC', 20200101, '/eo_1', 'S2')
+    conn = psycopg2.connect(**hrwsi_database)
+    with conn.cursor() as cur:
+        cur.execute("INSERT INTO hrwsi.input (processing_condition_name, date, tile, measurement_day, input_path, mission) VALUES (%s, %s, %s, %s, %s, %s)", old_input)
+    conn.commit()
+
+    candidates_tuple = (old_input, ('FSC_PC', now, '33VUC', int(now.strftime("%Y%m%d")), '/eo_2', 'S2'))
+    request = mocker.Mock(get_candidate_inputs=mocker.Mock(return_value=candidates_tuple),
+                          max_day_since_measurement_date=7, max_day_since_publication_date=7)
+    HRWSIDatabaseApiManager.create_connection_pool(**hrwsi_database)
+    try:
+        Harvester(request_list=[request]).harvest_input()
+    finally:
+        HRWSIDatabaseApiManager.close_connection_pool()
+
+    with conn.cursor() as cur:
+        cur.execute("SELECT input_path, count(*) FROM hrwsi.input GROUP BY input_path ORDER BY input_path")
+        assert cur.fetchall() == [('/eo_1', 1), ('/eo_2', 1)]
+    conn.close()
+
+def test_duplicated_inputs_are_merged_before_the_unique_index(hrwsi_database):
+    '''
+    Scenario :
+
+    - Without the unique index, an input is harvested three times, with a processing task, a processing task preceded by it
+      and a product on the duplicates. Another tile of the same path and inputs without path are also in the database.
+      The secondary indexes update is run.
+
+    Expected behaviour:
+
+    - The duplicates are merged in the input with the lowest id, which gets their processing tasks and products,
+      the other inputs are kept and the unique index is created
+    '''
+
+    conn = psycopg2.connect(**hrwsi_database)
+    with conn.cursor() as cur:
+        cur.execute("DROP INDEX hrwsi.input_input_path_processing_condition_name_tile_idx")
+        cur.execute("""
+            INSERT INTO hrwsi.input (id, processing_condition_name, date, tile, measurement_day, input_path, mission) VALUES
+            (1, 'FSC_PC', now(), '33VUC', 20240109, '/eo_1', 'S2'),
+            (2, 'FSC_PC', now(), '33VUC', 20240109, '/eo_1', 'S2'),
+            (3, 'FSC_PC', now(), '33VUC', 20240109, '/eo_1', 'S2'),
+            (4, 'FSC_PC', now(), '33VUD', 20240109, '/eo_1', 'S2'),
+            (5, 'FSC_PC', now(), '33VUC', 20240109, NULL, 'S2'),
+            (6, 'FSC_PC', now(), '33VUC', 20240109, NULL, 'S2');
+            INSERT INTO hrwsi.virtual_machine (id, name, flavour) VALUES ('00000000-0000-0000-0000-000000000000', 'worker-0', 'flavour');
+            INSERT INTO hrwsi.processing_tasks (id, input_fk_id, virtual_machine_id, creation_date, preceding_input_id, has_ended) VALUES
+            (1, 2, '00000000-0000-0000-0000-000000000000', now(), NULL, false),
+            (2, 4, '00000000-0000-0000-0000-000000000000', now(), 3, false);
+            INSERT INTO hrwsi.products (input_fk_id, product_path, creation_date, catalogued_date, product_type_id) VALUES
+            (3, '/product_1', now(), now(), 2);
+            """)
+        with open(SECONDARY_INDEXES_SQL_FILE, encoding="utf-8") as file:
+            cur.execute(file.read())
+        conn.commit()
+
+        cur.execute("SELECT id FROM hrwsi.input ORDER BY id")
+        assert cur.fetchall() == [(1,), (4,), (5,), (6,)]
+        cur.execute("SELECT id, input_fk_id, preceding_input_id FROM hrwsi.processing_tasks ORDER BY id")
+        assert cur.fetchall() == [(1, 1, None), (2, 4, 1)]
+        cur.execute("SELECT input_fk_id FROM hrwsi.products")
+        assert cur.fetchall() == [(1,)]
+        cur.execute("SELECT indisunique FROM pg_index WHERE indexrelid = 'hrwsi.input_input_path_processing_condition_name_tile_idx'::regclass")
+        assert cur.fetchone() == (True,)
+    conn.close()
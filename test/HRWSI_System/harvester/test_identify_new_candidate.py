@@ -189,3 +189,62 @@ def test_identify_new_candidate_without_candidate_and_empty_database(
 
     assert expected == actual
     assert get_discriminating_column_of_candidate_in_database_mock.assert_called_once
+
+def test_identify_new_candidate_with_anti_join(
+        mocker,
+        get_input_example,
+        get_path_input_example):
+    '''
+    Scenario :
+
+    - The database only returns the path of the second candidate as new path
+
+    Expected behaviour:
+
+    - All the candidate paths are sent once to the database with the request parameters
+    - Only the second candidate is add in database
+    '''
+
+    tuple_example_one = get_input_example()
+    tuple_example_two = get_input_example()
+    path_example_two = get_path_input_example(tuple_example_two)
+
+    # Use a mocker to simulate the result of execute_request_in_database function in identify_new_candidate_with_anti_join
+    get_new_path_in_database_mock = mocker.patch.object(
+        HRWSIDatabaseApiManager,
+        'execute_request_in_database',
+        return_value = path_example_two
+    )
+
+    expected = tuple_example_two
+    candidate_tuple = tuple_example_one + tuple_example_two + tuple_example_one
+    actual = Harvester.identify_new_candidate_with_anti_join(cursor=(), request=(), candidates_tuple=candidate_tuple, col_index_in_candidate=4, parameters=(20240101,))
+
+    sent_parameters = get_new_path_in_database_mock.call_args.kwargs["parameters"]
+
+    assert expected == actual
+    assert sorted(sent_parameters[0]) == sorted({tuple_example_one[0][4], tuple_example_two[0][4]})
+    assert sent_parameters[1:] == (20240101,)
+
+def test_identify_new_candidate_with_anti_join_without_candidate(
+        mocker):
+    '''
+    Scenario :
+
+    - The candidate list is empty
+
+    Expected behaviour:
+
+    - No request is sent to the database
+    '''
+
+    get_new_path_in_database_mock = mocker.patch.object(
+        HRWSIDatabaseApiManager,
+        'execute_request_in_database',
+        return_value = ()
+    )
+
+    actual = Harvester.identify_new_candidate_with_anti_join(cursor=(), request=(), candidates_tuple=(), col_index_in_candidate=4)
+
+    assert actual == ()
+    get_new_path_in_database_mock.assert_not_called()
@@ -0,0 +1,90 @@
+"""Tests for create_nomad_job, the Nomad job dispatches of the Launcher, run against a local PostgreSQL server and the Nomad stub server."""
+import os
+import sys
+import psycopg2
+import psycopg2.extras
+# Authorizing other packages absolute import
+ROOT_FOLDER = '/'.join(os.getcwd().split('hrwsi_watqual_sys')[:-1])
+sys.path.append(ROOT_FOLDER+'hrwsi_watqual_sys')
+
+from HRWSI_System.launcher.launcher import Launcher
+from HRWSI_System.launcher.nomad_dispatcher import NomadJobDispatcher
+from HRWSI_System.launcher.nomad_stub_server import NomadStubServer
+from HRWSI_System.harvester.apimanager.hrwsi_database_api_manager import HRWSIDatabaseApiManager
+
+def test_rejected_nomad_job_is_launched_again_at_the_next_poll(hrwsi_database, mocker):
+    '''
+    Scenario :
+
+    - Two processing tasks are ready to be launched, Nomad rejects the first job submitted
+
+    Expected behaviour:
+
+    - create_nomad_job returns the processing task of the rejected job, its Nomad job dispatch is deleted
+      and it is still ready to be launched. Only the registered job gets a processing status started.
+    '''
+
+    conn = psycopg2.connect(**hrwsi_database)
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO hrwsi.input (id, processing_condition_name, date, tile, measurement_day, input_path, mission) VALUES
+            (1, 'FSC_PC', now(), '33VUC', 20240109, '/eo_1', 'S2'),
+            (2, 'FSC_PC', now(), '33VUC', 20240109, '/eo_2', 'S2');
+            INSERT INTO hrwsi.virtual_machine (id, name, flavour) VALUES ('00000000-0000-0000-0000-000000000000', 'worker-0', 'flavour');
+            INSERT INTO hrwsi.processing_tasks (id, input_fk_id, virtual_machine_id, creation_date, preceding_input_id, has_ended) VALUES
+            (1, 1, '00000000-0000-0000-0000-000000000000', now(), NULL, false),
+            (2, 2, '00000000-0000-0000-0000-000000000000', now(), NULL, false);
+            """)
+    conn.commit()
+
+    server = NomadStubServer(nb_failure=1, failure_status_code=400).start()
+    HRWSIDatabaseApiManager.create_connection_pool(**hrwsi_database)
+    try:
+        launcher = Launcher()
+        launcher.nomad_dispatcher = NomadJobDispatcher(server.address, max_concurrency=1, max_retries=0)
+        mocker.patch.object(launcher, "create_job_spec", side_effect=lambda **kwargs: {"ID": "processing_task_" + kwargs["processing_task_id"]})
+
+        with HRWSIDatabaseApiManager.connection_to_database(psycopg2.extras.RealDictCursor) as (launcher_conn, cur):
+            cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, Launcher.PROCESSING_TASKS_READY_TO_LAUNCH_REQUEST, prepared=True)
+            failed_pt_id_list = launcher.create_nomad_job(cur, launcher_conn)
+            launcher.create_processing_status_workflow_for_new_nomad_job(cur, launcher_conn)
+            cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, Launcher.PROCESSING_TASKS_READY_TO_LAUNCH_REQUEST, prepared=True)
+            ready_pt_id_list = [record["id"] for record in cur]
+        launcher.nomad_dispatcher.close()
+    finally:
+        HRWSIDatabaseApiManager.close_connection_pool()
+        server.stop()
+
+    assert len(failed_pt_id_list) == 1
+    registered_pt_id = ({1, 2} - set(failed_pt_id_list)).pop()
+    assert ready_pt_id_list == failed_pt_id_list
+    assert set(server.job_by_id) == {f"processing_task_{registered_pt_id}"}
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT njd.processing_task_fk_id, psw.processing_status_id FROM hrwsi.nomad_job_dispatch njd
+            JOIN hrwsi.processing_status_workflow psw ON psw.nomad_job_dispatch_fk_id = njd.id
+            """)
+        assert cur.fetchall() == [(registered_pt_id, 1)]
+    conn.close()
+
+def test_launcher_run_closes_the_nomad_connections(hrwsi_database, mocker):
+    '''
+    Scenario :
+
+    - The Launcher is run twice without processing task to launch
+
+    Expected behaviour:
+
+    - The keep-alive connections to Nomad are closed at the end of each run
+    '''
+
+    HRWSIDatabaseApiManager.create_connection_pool(**hrwsi_database)
+    try:
+        launcher = Launcher()
+        close_spy = mocker.spy(launcher.nomad_dispatcher, "close")
+        launcher.run()
+        launcher.run()
+    finally:
+        HRWSIDatabaseApiManager.close_connection_pool()
+
+    assert close_spy.call_count == 2
@@ -0,0 +1,46 @@
+"""Tests for the connections to HRWSI Database of the Launcher, run against a local PostgreSQL server."""
+import os
+import sys
+import threading
+# Authorizing other packages absolute import
+ROOT_FOLDER = '/'.join(os.getcwd().split('hrwsi_watqual_sys')[:-1])
+sys.path.append(ROOT_FOLDER+'hrwsi_watqual_sys')
+
+from HRWSI_System.launcher.launcher import Launcher
+from HRWSI_System.harvester.apimanager.hrwsi_database_api_manager import HRWSIDatabaseApiManager
+
+def test_launcher_runs_do_not_hold_pool_connections(hrwsi_database):
+    '''
+    Scenario :
+
+    - The Launcher is run more times than the number of connections of the pool,
+      as after each dispatch of the Orchestrator
+
+    Expected behaviour:
+
+    - Each run ends without waiting for a connection, all the connections of the pool are still available
+      and the listening sessions are closed
+    '''
+
+    pool = HRWSIDatabaseApiManager.create_connection_pool(**hrwsi_database, min_connections=1, max_connections=2)
+    try:
+        # A run waiting for a pool connection would block forever
+        def _run_launcher() -> None:
+            for _ in range(2 * pool.maxconn + 1):
+                Launcher().run()
+        launcher_thread = threading.Thread(target=_run_launcher, daemon=True)
+        launcher_thread.start()
+        launcher_thread.join(timeout=30)
+        assert not launcher_thread.is_alive(), "The Launcher runs wait for a pool connection"
+
+        conn_list = [pool.getconn(timeout=1) for _ in range(pool.maxconn)]
+        cur = conn_list[0].cursor()
+        cur.execute("SELECT count(*) FROM pg_stat_activity WHERE datname = current_database()")
+        nb_session = cur.fetchone()[0]
+        cur.close()
+        for conn in conn_list:
+            pool.putconn(conn)
+    finally:
+        HRWSIDatabaseApiManager.close_connection_pool()
+
+    assert nb_session == pool.maxconn
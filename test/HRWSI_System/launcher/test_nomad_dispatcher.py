@@ -0,0 +1,120 @@
+"""Tests for NomadJobDispatcher, run against the local Nomad stub server."""
+import os
+import sys
+import pytest
+# Authorizing other packages absolute import
+ROOT_FOLDER = '/'.join(os.getcwd().split('hrwsi_watqual_sys')[:-1])
+sys.path.append(ROOT_FOLDER+'hrwsi_watqual_sys')
+
+from HRWSI_System.launcher.nomad_dispatcher import NomadJobDispatcher, NomadJobSubmissionError
+from HRWSI_System.launcher.nomad_stub_server import NomadStubServer
+
+@pytest.fixture(scope='function')
+def nomad_stub_server():
+    '''
+    nomad_stub_server Fixture function start a Nomad stub server and return a function to configure it
+
+
+    :return: a function creating the started stub server
+    :rtype: function
+    '''
+    server_list = []
+    def _start(**kwargs) -> NomadStubServer:
+        server = NomadStubServer(**kwargs).start()
+        server_list.append(server)
+        return server
+
+    yield _start
+
+    for server in server_list:
+        server.stop()
+
+def create_job_spec_list(nb_job: int) -> list[dict]:
+    """Create minimal job specifications"""
+
+    return [{"ID": f"processing_task_{i}", "Name": f"processing_task_{i}", "Type": "batch"} for i in range(nb_job)]
+
+def test_submit_jobs(nomad_stub_server):
+    '''
+    Scenario :
+
+    - 50 jobs are submitted with at most 4 requests at the same time
+
+    Expected behaviour:
+
+    - All the jobs are registered, no more than 4 requests are in progress at the same time
+      and keep-alive connections are reused
+    '''
+
+    server = nomad_stub_server(latency=0.01)
+    dispatcher = NomadJobDispatcher(server.address, max_concurrency=4)
+
+    job_spec_list = create_job_spec_list(50)
+    actual = dispatcher.submit_jobs(job_spec_list)
+    dispatcher.close()
+
+    assert set(actual) == set(server.job_by_id) == {job_spec["ID"] for job_spec in job_spec_list}
+    assert all("EvalID" in result for result in actual.values())
+    assert server.max_nb_request_in_progress <= 4
+    assert len(server.connection_set) <= 4
+
+def test_submit_job_retries_server_errors(nomad_stub_server):
+    '''
+    Scenario :
+
+    - The two first requests are answered with a 500 error
+
+    Expected behaviour:
+
+    - The job is registered at the third attempt
+    '''
+
+    server = nomad_stub_server(nb_failure=2)
+    dispatcher = NomadJobDispatcher(server.address, max_retries=3, retry_backoff_seconds=0.01)
+
+    dispatcher.submit_job(create_job_spec_list(1)[0])
+    dispatcher.close()
+
+    assert server.nb_request == 3
+    assert list(server.job_by_id) == ["processing_task_0"]
+
+def test_submit_job_fails_after_max_retries(nomad_stub_server):
+    '''
+    Scenario :
+
+    - All the requests are answered with a 503 error
+
+    Expected behaviour:
+
+    - NomadJobSubmissionError is raised after max_retries + 1 attempts
+    '''
+
+    server = nomad_stub_server(nb_failure=10, failure_status_code=503)
+    dispatcher = NomadJobDispatcher(server.address, max_retries=2, retry_backoff_seconds=0.01)
+
+    with pytest.raises(NomadJobSubmissionError):
+        dispatcher.submit_job(create_job_spec_list(1)[0])
+    dispatcher.close()
+
+    assert server.nb_request == 3
+
+def test_submit_jobs_does_not_retry_rejected_job(nomad_stub_server):
+    '''
+    Scenario :
+
+    - The first request is answered with a 400 error (invalid job)
+
+    Expected behaviour:
+
+    - The rejected job isn't retried and is reported in the result, the other jobs are registered
+    '''
+
+    server = nomad_stub_server(nb_failure=1, failure_status_code=400)
+    dispatcher = NomadJobDispatcher(server.address, max_concurrency=1, max_retries=3, retry_backoff_seconds=0.01)
+
+    actual = dispatcher.submit_jobs(create_job_spec_list(3))
+    dispatcher.close()
+
+    assert isinstance(actual["processing_task_0"], NomadJobSubmissionError)
+    assert server.nb_request == 3
+    assert set(server.job_by_id) == {"processing_task_1", "processing_task_2"}
@@ -0,0 +1,171 @@
+"""Tests of the FreeStartIndex against a scan of the plan matrix, and of the plan against the former place_tasks."""
+import os
+import sys
+import numpy as np
+import pytest
+# Authorizing other packages absolute import
+ROOT_FOLDER = '/'.join(os.getcwd().split('hrwsi_watqual_sys')[:-1])
+sys.path.append(ROOT_FOLDER+'hrwsi_watqual_sys')
+
+from HRWSI_System.orchestrator.scheduler.capacity_index import FreeStartIndex
+from HRWSI_System.orchestrator.scheduler.matrix_scheduler import MatrixScheduler
+from HRWSI_System.orchestrator.scheduler.placement_benchmark import create_planning, run_former_place_tasks, run_place_tasks
+from HRWSI_System.orchestrator.processing_task.processing_task import ProcessingTask
+from HRWSI_System.orchestrator.processing_routine.processing_routine import ProcessingRoutine
+
+NB_INDEX = 200
+NB_PLAN = 200
+
+def scan_first_free_location(plan_matrix: np.ndarray, cpu: int, duration: int, time_limit: int, blocked_times: np.ndarray, earliest_start: int):
+    """First (j, i) location, smallest slot then smallest start time, found by scanning the plan matrix"""
+
+    for j in range(0, plan_matrix.shape[0] - cpu + 1, cpu):
+        for i in range(max(earliest_start, 0), time_limit - duration + 1):
+            if not plan_matrix[j:j+cpu, i:i+duration].any() and not blocked_times[i:i+duration].any():
+                return (j, i)
+    return None
+
+def create_random_index_case(seed: int):
+    """Random plan matrix partly filled, routine and blocked times"""
+
+    rng = np.random.default_rng(seed)
+    cpu_max, t_max = int(rng.integers(1, 9)), int(rng.integers(1, 40))
+    plan_matrix = np.zeros((cpu_max, t_max), int)
+    for _ in range(int(rng.integers(0, 10))):
+        j, i = int(rng.integers(cpu_max)), int(rng.integers(t_max))
+        plan_matrix[j:j+int(rng.integers(1, 4)), i:i+int(rng.integers(1, 6))] = int(rng.integers(1, 4))
+    cpu, duration = int(rng.integers(1, 4)), int(rng.integers(1, 6))
+    time_limit = int(rng.integers(0, t_max + 1))
+    blocked_times = rng.random(t_max) < 0.1
+    return rng, plan_matrix, cpu, duration, time_limit, blocked_times
+
+@pytest.mark.parametrize("seed", range(NB_INDEX))
+def test_find_first_free_location_is_the_scan_of_the_plan_matrix(seed):
+    '''
+    Scenario :
+
+    - Tasks of a routine are placed one by one at the location given by a FreeStartIndex, from random earliest starts,
+      some placements blocking new times (resources limits reached)
+
+    Expected behaviour:
+
+    - Each location is the first free location found by scanning the plan matrix and the blocked times,
+      a location occupied or blocked is never given again, and None is given when no location is left
+    '''
+
+    rng, plan_matrix, cpu, duration, time_limit, blocked_times = create_random_index_case(seed)
+    free_start_index = FreeStartIndex(plan_matrix, cpu, duration, time_limit, blocked_times)
+    blocked_times = blocked_times.copy()
+
+    for _ in range(plan_matrix.size + 1):
+        earliest_start = int(rng.integers(-2, max(time_limit, 1) + 1))
+        location = free_start_index.find_first_free_location(earliest_start)
+        assert location == scan_first_free_location(plan_matrix, cpu, duration, time_limit, blocked_times, earliest_start)
+        if location is None:
+            if scan_first_free_location(plan_matrix, cpu, duration, time_limit, blocked_times, 0) is None:
+                break
+            continue
+
+        j, i = location
+        plan_matrix[j:j+cpu, i:i+duration] = 9
+        new_blocked_times = [int(time) for time in rng.integers(0, plan_matrix.shape[1], int(rng.integers(0, 3)))]
+        blocked_times[new_blocked_times] = True
+        free_start_index.occupy(j, i, new_blocked_times)
+
+    assert free_start_index.find_first_free_location(0) is None
+
+def test_occupy_blocks_the_overlapping_start_times():
+    '''
+    Scenario :
+
+    - A routine of 2 CPU and duration 3 on an empty 4 x 10 plan matrix, a task is placed in the first slot at time 4,
+      then a task is placed in the second slot at time 0 and the time 8 is blocked
+
+    Expected behaviour:
+
+    - The start times 2 to 6 of the first slot are busy, then the time 8 is blocked: no task can start at 6, 7 or 8
+      in any slot, so a task starting at 2 or later goes to the second slot, after its own task
+    '''
+
+    free_start_index = FreeStartIndex(np.zeros((4, 10), int), cpu=2, duration=3, time_limit=10, blocked_times=np.zeros(10, bool))
+
+    free_start_index.occupy(0, 4, [])
+
+    assert [free_start_index.find_first_free_location(i) for i in [0, 2, 5, 7]] == [(0, 0), (0, 7), (0, 7), (0, 7)]
+    free_start_index.occupy(2, 0, [8])
+    assert [free_start_index.find_first_free_location(i) for i in [0, 2, 6]] == [(0, 0), (2, 3), None]
+
+def create_random_task_list(seed: int) -> tuple[dict, list[ProcessingTask]]:
+    """Random limits and tasks of chained routines, a task depending on a task of the previous routine or of its own routine"""
+
+    rng = np.random.default_rng(seed)
+    limits = dict(t_max=int(rng.integers(12, 40)), cpu_max=int(rng.integers(2, 9)), ram_max=int(rng.integers(4, 20)),
+                  storage_space_max=int(rng.integers(4, 20)), vm_max=int(rng.integers(1, 6)))
+    routine_list = [ProcessingRoutine(name=f"foo{r}", cpu=int(rng.integers(1, 3)), ram=int(rng.integers(1, 4)),
+                                      storage_space=int(rng.integers(1, 4)), duration=int(rng.integers(1, 4)), docker_image="bar")
+                    for r in range(int(rng.integers(1, 4)))]
+    task_list = []
+    task_id_by_routine = [[] for _ in routine_list]
+    for r, routine in enumerate(routine_list):
+        for _ in range(int(rng.integers(1, 12))):
+            depends_on = None
+            if r and rng.random() < 0.6:
+                depends_on = [int(rng.choice(task_id_by_routine[r-1]))]
+            elif task_id_by_routine[r] and rng.random() < 0.1:
+                depends_on = [task_id_by_routine[r][-1]]
+            task_id_by_routine[r].append(len(task_list))
+            task_list.append((routine, len(task_list), depends_on))
+    return limits, task_list
+
+@pytest.mark.parametrize("seed", range(NB_PLAN))
+def test_plan_is_the_plan_of_the_former_place_tasks(seed):
+    '''
+    Scenario :
+
+    - Tasks of chained routines with random resources and dependencies are planned
+
+    Expected behaviour:
+
+    - When the former place_tasks places every task, the plan matrix and the start time of each task
+      are the ones of the former place_tasks, given the same routine order and time max of each routine
+    '''
+
+    limits, task_list = create_random_task_list(seed)
+    planning = MatrixScheduler(**limits, task_list=[ProcessingTask(processing_routine=routine, task_id=task_id, t0=None, depends_on=depends_on)
+                                                    for routine, task_id, depends_on in task_list])
+    former_planning = MatrixScheduler(**limits, task_list=[ProcessingTask(processing_routine=routine, task_id=task_id, t0=None, depends_on=depends_on)
+                                                           for routine, task_id, depends_on in task_list])
+
+    planning.plan()
+
+    try:
+        run_former_place_tasks(former_planning)
+    except (TypeError, ValueError):
+        # The former implementation fails on a dependency on an unplaced task, or when it removes a candidate twice
+        pytest.skip("Former place_tasks failure")
+    if any(task.t0 is None for task in former_planning.task_list):
+        # The former implementation removed the locations rejected for an unplaced task from the next routine candidates
+        pytest.skip("Task not placed by the former place_tasks")
+
+    assert [task.t0 for task in planning.task_list] == [task.t0 for task in former_planning.task_list]
+    np.testing.assert_array_equal(planning.plan_matrix, former_planning.plan_matrix)
+
+def test_placement_benchmark_plans_are_the_same():
+    '''
+    Scenario :
+
+    - The tasks of the placement benchmark, 400 tasks of 2 routines, are placed by the former place_tasks and by place_tasks
+
+    Expected behaviour:
+
+    - Every task is placed, at the same start time and location by both placements
+    '''
+
+    former_planning = create_planning(200)
+    planning = create_planning(200)
+    assert run_former_place_tasks(former_planning) > 0
+    assert run_place_tasks(planning) > 0
+
+    assert all(task.t0 is not None for task in planning.task_list)
+    assert [task.t0 for task in planning.task_list] == [task.t0 for task in former_planning.task_list]
+    np.testing.assert_array_equal(planning.plan_matrix, former_planning.plan_matrix)
@@ -0,0 +1,179 @@
+"""Property tests of the vectorized check_plan and check_feasibility against the former loop implementations."""
+import os
+import sys
+import numpy as np
+import pytest
+# Authorizing other packages absolute import
+ROOT_FOLDER = '/'.join(os.getcwd().split('hrwsi_watqual_sys')[:-1])
+sys.path.append(ROOT_FOLDER+'hrwsi_watqual_sys')
+
+from HRWSI_System.orchestrator.scheduler.scheduler import Scheduler
+from HRWSI_System.orchestrator.processing_task.processing_task import ProcessingTask
+from HRWSI_System.orchestrator.processing_routine.processing_routine import ProcessingRoutine
+from HRWSI_System.orchestrator.orchestrator_exceptions.impossible_plan import ImpossiblePlan
+from HRWSI_System.orchestrator.orchestrator_exceptions.false_plan import FalsePlan
+
+NB_PLAN = 300
+
+def former_check_plan(planning: Scheduler) -> bool:
+    """check_plan accumulating the resources task by task in lists, as before the difference arrays"""
+
+    task_by_id={}
+    for task in planning.task_list:
+        task_by_id[task.task_id] = task
+
+    cpu_per_time=[0 for i in range(planning.t_max)]
+    ram_per_time=[0 for i in range(planning.t_max)]
+    storage_space_per_time=[0 for i in range(planning.t_max)]
+    vm_per_time=[0 for i in range(planning.t_max)]
+
+    for task in planning.task_list:
+        if task.t0 is None:
+            raise FalsePlan("Incomplete plan")
+        if task.t0 < 0:
+            raise FalsePlan("Task begin before starting time")
+        if task.t0 + task.processing_routine.duration > planning.t_max:
+            raise FalsePlan("Task end after t_max")
+        if task.depends_on is not None :
+            for task_depend_id in task.depends_on:
+                if task_depend_id in task_by_id and task.t0 < task_by_id[task_depend_id].t0 + task_by_id[task_depend_id].processing_routine.duration :
+                    raise FalsePlan("No respect of dependency")
+        cpu_per_time[task.t0:task.t0+task.processing_routine.duration] = [i + task.processing_routine.cpu for i in cpu_per_time[task.t0:task.t0+task.processing_routine.duration]]
+        ram_per_time[task.t0:task.t0+task.processing_routine.duration] = [i + task.processing_routine.ram for i in ram_per_time[task.t0:task.t0+task.processing_routine.duration]]
+        storage_space_per_time[task.t0:task.t0+task.processing_routine.duration] = [i + task.processing_routine.storage_space for i in storage_space_per_time[task.t0:task.t0+task.processing_routine.duration]]
+        vm_per_time[task.t0:task.t0+task.processing_routine.duration] = [i + 1 for i in vm_per_time[task.t0:task.t0+task.processing_routine.duration]]
+
+    for time in range(planning.t_max):
+        if cpu_per_time[time] > planning.cpu_max:
+            raise FalsePlan("No respect of CPU limit")
+        if ram_per_time[time] > planning.ram_max:
+            raise FalsePlan("No respect of RAM limit")
+        if storage_space_per_time[time] > planning.storage_space_max:
+            raise FalsePlan("No respect of Storage Space limit")
+        if vm_per_time[time] > planning.vm_max:
+            raise FalsePlan("No respect of VM limit")
+
+    if planning.attribution_plan is not None:
+        sum_task_planned = 0
+        for worker in planning.attribution_plan:
+            sum_task_planned += len(planning.attribution_plan[worker][4])
+        if sum_task_planned > len(planning.task_list):
+            raise FalsePlan("Task over planification")
+        for worker in planning.attribution_plan:
+            planning.attribution_plan[worker][4].sort(key=lambda x: x.t0)
+            for i in range(len(planning.attribution_plan[worker][4])-1):
+                task_i = planning.attribution_plan[worker][4][i]
+                task_j = planning.attribution_plan[worker][4][i+1]
+                if task_i.t0 + task_i.processing_routine.duration > task_j.t0 :
+                    raise FalsePlan("Task overlap")
+    return True
+
+def former_check_feasibility(planning: Scheduler) -> bool:
+    """check_feasibility counting the tasks of each routine in a loop, as before the TaskTable"""
+
+    nb_task_for_each_routine = {}
+    info_routine=[]
+    for task in planning.task_list:
+        if task.processing_routine.name not in nb_task_for_each_routine:
+            nb_task_for_each_routine[task.processing_routine.name] = 1
+            info_routine.append((task.processing_routine))
+            if task.processing_routine.cpu > planning.cpu_max:
+                raise ImpossiblePlan("Not enough CPU")
+            if task.processing_routine.ram > planning.ram_max:
+                raise ImpossiblePlan("Not enough RAM")
+            if task.processing_routine.storage_space > planning.storage_space_max :
+                raise ImpossiblePlan("Not enough Storage Space")
+            if planning.vm_max == 0 :
+                raise ImpossiblePlan("Not enough VM")
+        else:
+            nb_task_for_each_routine[task.processing_routine.name] += 1
+
+    list_time_min = [np.ceil((nb_task_for_each_routine[routine] /
+                             min(planning.cpu_max // info_routine[i].cpu,
+                                 planning.ram_max // info_routine[i].ram,
+                                 planning.storage_space_max // info_routine[i].storage_space,
+                                 planning.vm_max))) * info_routine[i].duration for i, routine in enumerate(nb_task_for_each_routine)]
+    time_min = sum(list_time_min)
+    if time_min > planning.t_max:
+        raise ImpossiblePlan(f"Not enough time, t_max >= {time_min}")
+    return True
+
+def create_random_planning(seed: int) -> Scheduler:
+    """
+    Create a random plan: tasks of random routines, start times and dependencies (some of them finished), tasks
+    attributed to random workers, and random limits so that every check fails in some of the plans
+    """
+
+    rng = np.random.default_rng(seed)
+    t_max = int(rng.integers(4, 16))
+    routine_list = [ProcessingRoutine(name=f"foo{r}", cpu=int(rng.integers(1, 4)), ram=int(rng.integers(1, 4)),
+                                      storage_space=int(rng.integers(1, 4)), duration=int(rng.integers(1, 4)), docker_image="bar")
+                    for r in range(int(rng.integers(1, 5)))]
+    nb_task = int(rng.integers(0, 25))
+    task_list = []
+    for task_id in range(nb_task):
+        processing_routine = routine_list[int(rng.integers(len(routine_list)))]
+        t0 = None if rng.random() < 0.01 else int(rng.integers(-1 if rng.random() < 0.01 else 0, t_max - processing_routine.duration + (2 if rng.random() < 0.02 else 1)))
+        depends_on = [int(dependency) for dependency in rng.integers(0, nb_task + 3, int(rng.integers(1, 3)))] if rng.random() < 0.05 else None
+        task_list.append(ProcessingTask(processing_routine=processing_routine, task_id=task_id, t0=t0, depends_on=depends_on))
+
+    planning = Scheduler(t_max=t_max, cpu_max=int(rng.integers(1, 20)), ram_max=int(rng.integers(1, 20)), storage_space_max=int(rng.integers(1, 20)),
+                         vm_max=int(rng.integers(0, 10)), task_list=task_list)
+    if rng.random() < 0.7:
+        nb_worker = int(rng.integers(1, 6))
+        planning.attribution_plan = dict((f"worker_{w}", [f"0{w}", "flavour1", None, None, []]) for w in range(nb_worker))
+        for task in task_list:
+            planning.attribution_plan[f"worker_{int(rng.integers(nb_worker))}"][4].append(task)
+    return planning
+
+def run_check(check) -> object:
+    """Return True or the type and the message of the error raised by the check"""
+
+    try:
+        return check()
+    except (FalsePlan, ImpossiblePlan) as exc:
+        return type(exc), str(exc)
+
+@pytest.mark.parametrize("seed", range(NB_PLAN))
+def test_check_plan_is_the_former_check_plan(seed):
+    '''
+    Scenario :
+
+    - check_plan of a random plan, valid or not
+
+    Expected behaviour:
+
+    - check_plan returns True or raises the same error as the former implementation,
+      the tasks of the workers are sorted the same way
+    '''
+
+    planning = create_random_planning(seed)
+    worker_task_list = dict((worker, list(planning.attribution_plan[worker][4])) for worker in planning.attribution_plan or {})
+    try:
+        expected = run_check(lambda: former_check_plan(planning))
+    except TypeError:
+        # The former implementation fails on the dependency of a task on an unplanned task placed after it in task_list
+        pytest.skip("Dependency on an unplanned task")
+    expected_worker_task_list = dict((worker, planning.attribution_plan[worker][4]) for worker in planning.attribution_plan or {})
+    for worker, task_list in worker_task_list.items():
+        planning.attribution_plan[worker][4] = task_list
+
+    assert run_check(planning.check_plan) == expected
+    if expected is True:
+        assert dict((worker, planning.attribution_plan[worker][4]) for worker in planning.attribution_plan or {}) == expected_worker_task_list
+
+@pytest.mark.parametrize("seed", range(NB_PLAN))
+def test_check_feasibility_is_the_former_check_feasibility(seed):
+    '''
+    Scenario :
+
+    - check_feasibility of a random set of tasks, feasible or not
+
+    Expected behaviour:
+
+    - check_feasibility returns True or raises the same error as the former implementation
+    '''
+
+    planning = create_random_planning(seed)
+
+    assert run_check(planning.check_feasibility) == run_check(lambda: former_check_feasibility(planning))
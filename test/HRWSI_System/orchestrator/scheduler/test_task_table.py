@@ -0,0 +1,133 @@
+"""Tests for TaskTable, the columnar view of the processing tasks of the MatrixScheduler."""
+import os
+import sys
+import json
+import numpy as np
+import pytest
+# Authorizing other packages absolute import
+ROOT_FOLDER = '/'.join(os.getcwd().split('hrwsi_watqual_sys')[:-1])
+sys.path.append(ROOT_FOLDER+'hrwsi_watqual_sys')
+
+from HRWSI_System.orchestrator.processing_task.processing_task import ProcessingTask
+from HRWSI_System.orchestrator.processing_routine.processing_routine import ProcessingRoutine
+from HRWSI_System.orchestrator.scheduler.encoder import Encoder
+from HRWSI_System.orchestrator.scheduler.task_table import TaskTable, UNPLACED_DEPENDENCY_START
+from HRWSI_System.orchestrator.scheduler.matrix_scheduler import MatrixScheduler
+from HRWSI_System.orchestrator.orchestrator_exceptions.impossible_plan import ImpossiblePlan
+
+PROCESSING_ROUTINE_A = ProcessingRoutine(name="foo", cpu=2, ram=1, storage_space=1, duration=2, docker_image="bar")
+PROCESSING_ROUTINE_B = ProcessingRoutine(name="foo2", cpu=1, ram=2, storage_space=3, duration=1, docker_image="bar")
+PROCESSING_ROUTINE_C = ProcessingRoutine(name="foo3", cpu=1, ram=1, storage_space=1, duration=3, docker_image="bar")
+
+def test_tasks_are_stored_in_columns():
+    '''
+    Scenario :
+
+    - Tasks of 2 routines, one of them depending on a task which isn't in the list anymore
+
+    Expected behaviour:
+
+    - The routines get ids in order of first appearance, the resources and t0 are columns,
+      the dependencies are stored in compressed rows without the finished task
+    '''
+
+    task_table = TaskTable([ProcessingTask(processing_routine=PROCESSING_ROUTINE_B, task_id=10, t0=3, depends_on=None),
+                            ProcessingTask(processing_routine=PROCESSING_ROUTINE_A, task_id=11, t0=None, depends_on=[10, 99]),
+                            ProcessingTask(processing_routine=PROCESSING_ROUTINE_B, task_id=12, t0=None, depends_on=[99])])
+
+    assert [routine.name for routine in task_table.routine_list] == ["foo2", "foo"]
+    assert task_table.routine_id.tolist() == [0, 1, 0]
+    assert task_table.cpu.tolist() == [1, 2, 1]
+    assert task_table.ram.tolist() == [2, 1, 2]
+    assert task_table.storage_space.tolist() == [3, 1, 3]
+    assert task_table.duration.tolist() == [1, 2, 1]
+    assert task_table.t0.tolist() == [3, -1, -1]
+    assert task_table.dependency_start.tolist() == [0, 0, 1, 1]
+    assert task_table.dependency_index.tolist() == [0]
+    assert task_table.count_task_by_routine().tolist() == [2, 1]
+    assert [task_index.tolist() for task_index in task_table.get_task_index_by_routine()] == [[0, 2], [1]]
+    assert task_table.calculate_earliest_start(np.arange(3)).tolist() == [0, 4, 0]
+
+def test_routines_are_sorted_by_dependencies():
+    '''
+    Scenario :
+
+    - Routine c depends on routine b, which depends on routine a, the tasks appearing in the order c, a, b,
+      then the same tasks with an independent routine
+
+    Expected behaviour:
+
+    - The routines are sorted a, b, c, the independent routine keeps its order of first appearance
+    '''
+
+    task_list = [ProcessingTask(processing_routine=PROCESSING_ROUTINE_C, task_id=3, t0=None, depends_on=[2]),
+                 ProcessingTask(processing_routine=PROCESSING_ROUTINE_A, task_id=1, t0=None, depends_on=None),
+                 ProcessingTask(processing_routine=PROCESSING_ROUTINE_B, task_id=2, t0=None, depends_on=[1])]
+    task_table = TaskTable(task_list)
+    assert [task_table.routine_list[routine_id].name for routine_id in task_table.sort_routine_ids_by_dependencies()] == ["foo", "foo2", "foo3"]
+
+    task_list[0].depends_on = None
+    task_table = TaskTable(task_list)
+    assert [task_table.routine_list[routine_id].name for routine_id in task_table.sort_routine_ids_by_dependencies()] == ["foo3", "foo", "foo2"]
+
+def test_circular_dependencies_between_routines_make_the_plan_impossible():
+    '''
+    Scenario :
+
+    - A task of routine a depends on a task of routine b, and another task of routine b on a task of routine a
+
+    Expected behaviour:
+
+    - The routines on the cycle can't be sorted, plan raises ImpossiblePlan
+    '''
+
+    task_list = [ProcessingTask(processing_routine=PROCESSING_ROUTINE_A, task_id=1, t0=None, depends_on=None),
+                 ProcessingTask(processing_routine=PROCESSING_ROUTINE_B, task_id=2, t0=None, depends_on=[1]),
+                 ProcessingTask(processing_routine=PROCESSING_ROUTINE_A, task_id=3, t0=None, depends_on=[2]),
+                 ProcessingTask(processing_routine=PROCESSING_ROUTINE_C, task_id=4, t0=None, depends_on=None)]
+
+    assert TaskTable(task_list).sort_routine_ids_by_dependencies() == [2]
+    planning = MatrixScheduler(t_max=20, cpu_max=4, ram_max=4, storage_space_max=4, vm_max=4, task_list=task_list)
+    with pytest.raises(ImpossiblePlan):
+        planning.plan()
+
+def test_earliest_start_of_a_task_whose_dependency_is_not_placed():
+    '''
+    Scenario :
+
+    - A task depends on a placed task and on a task which isn't placed
+
+    Expected behaviour:
+
+    - Its earliest start is after the end of all the time, no location can be found for it
+    '''
+
+    task_table = TaskTable([ProcessingTask(processing_routine=PROCESSING_ROUTINE_A, task_id=1, t0=4, depends_on=None),
+                            ProcessingTask(processing_routine=PROCESSING_ROUTINE_A, task_id=2, t0=None, depends_on=None),
+                            ProcessingTask(processing_routine=PROCESSING_ROUTINE_B, task_id=3, t0=None, depends_on=[1]),
+                            ProcessingTask(processing_routine=PROCESSING_ROUTINE_B, task_id=4, t0=None, depends_on=[1, 2])])
+
+    assert task_table.calculate_earliest_start(np.array([2, 3])).tolist() == [6, UNPLACED_DEPENDENCY_START]
+
+def test_plan_places_a_task_after_its_dependency_in_the_same_routine():
+    '''
+    Scenario :
+
+    - A task depends on a task of its own routine, the tasks are placed on the smallest cpu row first
+
+    Expected behaviour:
+
+    - The task starts after the end of its dependency, the plan is valid and exported to JSON
+    '''
+
+    task_list = [ProcessingTask(processing_routine=PROCESSING_ROUTINE_A, task_id=1, t0=None, depends_on=None),
+                 ProcessingTask(processing_routine=PROCESSING_ROUTINE_A, task_id=2, t0=None, depends_on=[1]),
+                 ProcessingTask(processing_routine=PROCESSING_ROUTINE_A, task_id=3, t0=None, depends_on=None)]
+    planning = MatrixScheduler(t_max=6, cpu_max=4, ram_max=4, storage_space_max=4, vm_max=4, task_list=task_list)
+
+    planning.plan()
+
+    assert planning.check_plan()
+    assert [task.t0 for task in task_list] == [0, 2, 4]
+    plan_data = json.loads(json.dumps(planning.attribution_plan, cls=Encoder))
+    assert sorted(task["task_id"] for worker in plan_data.values() for task in worker[4]) == [1, 2, 3]
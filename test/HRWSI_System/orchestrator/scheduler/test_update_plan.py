@@ -0,0 +1,215 @@
+"""Tests for update_plan, the incremental re-planning of the MatrixScheduler."""
+import os
+import sys
+import datetime
+import numpy as np
+import pytest
+# Authorizing other packages absolute import
+ROOT_FOLDER = '/'.join(os.getcwd().split('hrwsi_watqual_sys')[:-1])
+sys.path.append(ROOT_FOLDER+'hrwsi_watqual_sys')
+
+from HRWSI_System.orchestrator.processing_task.processing_task import ProcessingTask
+from HRWSI_System.orchestrator.processing_routine.processing_routine import ProcessingRoutine
+from HRWSI_System.orchestrator.scheduler.matrix_scheduler import MatrixScheduler
+
+PROCESSING_ROUTINE_A = ProcessingRoutine(name="foo", cpu=2, ram=1, storage_space=1, duration=2, docker_image="bar")
+PROCESSING_ROUTINE_B = ProcessingRoutine(name="foo2", cpu=1, ram=1, storage_space=1, duration=1, docker_image="bar")
+
+def create_planning(task_list: list[ProcessingTask], t_max: int = 6, vm_name_list: list[str] = None) -> MatrixScheduler:
+    """Plan the tasks from scratch"""
+
+    planning = MatrixScheduler(t_max=t_max, cpu_max=4, ram_max=4, storage_space_max=4, vm_max=2, task_list=task_list,
+                               vm_name_list=vm_name_list, vm_id_list=vm_name_list)
+    planning.check_feasibility()
+    planning.plan()
+    planning.check_plan()
+    return planning
+
+def create_task(task_id: int, processing_routine: ProcessingRoutine = PROCESSING_ROUTINE_A, depends_on: list[int] = None) -> ProcessingTask:
+    """Create an unplanned task"""
+
+    return ProcessingTask(processing_routine=processing_routine, task_id=task_id, t0=None, depends_on=depends_on)
+
+def get_processing_task_row_by_id(planning: MatrixScheduler) -> dict:
+    """Return the (virtual_machine_id, preceding_input_id) of the processing tasks of the plan, by id"""
+
+    return dict((row[0], (row[1], row[3])) for row in planning.get_processing_task_tuple(datetime.datetime.now()))
+
+def update_database(planning: MatrixScheduler, task_list: list[ProcessingTask], finished_task_id_set: set[int]) -> tuple[dict, dict]:
+    """
+    Update the plan with task_list, as the Orchestrator does when the finished tasks are processed.
+    Return the processing task rows of the plan before and after the update, the rows already
+    in HRWSI Database aren't inserted again.
+    """
+
+    row_by_id = get_processing_task_row_by_id(planning)
+    assert planning.update_plan(task_list)
+    assert planning.check_plan()
+    new_row_by_id = get_processing_task_row_by_id(planning)
+    database_row_by_id = dict((task_id, row) for task_id, row in row_by_id.items() if task_id not in finished_task_id_set)
+    database_row_by_id.update((task_id, row) for task_id, row in new_row_by_id.items() if task_id not in row_by_id)
+    return row_by_id, new_row_by_id, database_row_by_id
+
+def check_database_chains(row_by_id: dict, new_row_by_id: dict, database_row_by_id: dict, finished_task_id_set: set[int]) -> None:
+    """
+    Check that the tasks already in HRWSI Database keep their worker and their preceding input (None if it is finished)
+    in the updated plan, and that each worker has at most one task ready to be launched
+    """
+
+    for task_id, (vm_id, preceding_input_id) in database_row_by_id.items():
+        if task_id in row_by_id:
+            assert new_row_by_id[task_id] == (vm_id, None if preceding_input_id in finished_task_id_set else preceding_input_id)
+    ready_vm_id_list = [vm_id for vm_id, preceding_input_id in database_row_by_id.values()
+                        if preceding_input_id is None or preceding_input_id in finished_task_id_set]
+    assert len(ready_vm_id_list) == len(set(ready_vm_id_list))
+
+def test_finished_tasks_release_their_capacity():
+    '''
+    Scenario :
+
+    - 4 tasks are planned, then the 2 first ones are finished and 2 new tasks arrive
+
+    Expected behaviour:
+
+    - The new tasks take the locations of the finished ones, the other tasks keep their t0 and worker,
+      the plan is valid
+    '''
+
+    planning = create_planning([create_task(task_id) for task_id in range(4)])
+    t0_by_task_id = dict((task.task_id, task.t0) for task in planning.task_list)
+    worker_by_task_id = dict((task.task_id, vm_name) for vm_name, worker in planning.attribution_plan.items() for task in worker[4])
+    assert sorted(t0_by_task_id.values()) == [0, 0, 2, 4]
+
+    finished_task_id_list = [task_id for task_id, t0 in t0_by_task_id.items() if t0 == 0]
+    task_list = [create_task(task_id) for task_id in range(4) if task_id not in finished_task_id_list] + [create_task(4), create_task(5)]
+    assert planning.update_plan(task_list)
+
+    assert planning.check_plan()
+    assert sorted(task.task_id for task in planning.task_list) == [task_id for task_id in range(6) if task_id not in finished_task_id_list]
+    for task in planning.task_list:
+        if task.task_id in (4, 5):
+            assert task.t0 == 0
+        else:
+            assert task.t0 == t0_by_task_id[task.task_id]
+            assert task in planning.attribution_plan[worker_by_task_id[task.task_id]][4]
+    assert sum(len(worker[4]) for worker in planning.attribution_plan.values()) == 4
+    assert planning.ram_per_time == [2, 2, 1, 1, 1, 1]
+
+def test_new_tasks_are_placed_after_their_dependencies():
+    '''
+    Scenario :
+
+    - New tasks of a new routine depend on a task of the plan, on a new task and on a finished task
+
+    Expected behaviour:
+
+    - Each new task starts after the end of its planned dependencies, the finished dependency is ignored,
+      the new routine has its own value in the plan matrix
+    '''
+
+    planning = create_planning([create_task(0), create_task(1)])
+    assert planning.update_plan([create_task(1), create_task(2), create_task(3, PROCESSING_ROUTINE_B, depends_on=[1, 2]),
+                                 create_task(4, PROCESSING_ROUTINE_B, depends_on=[0])])
+
+    assert planning.check_plan()
+    t0_by_task_id = dict((task.task_id, task.t0) for task in planning.task_list)
+    assert t0_by_task_id == {1: 2, 2: 0, 3: 5, 4: 4}
+    assert t0_by_task_id[3] >= max(t0_by_task_id[1], t0_by_task_id[2]) + PROCESSING_ROUTINE_A.duration
+    assert (planning.plan_matrix == 2).sum() == 2
+
+def test_update_plan_fails_when_the_new_tasks_do_not_fit():
+    '''
+    Scenario :
+
+    - The plan is full and a new task arrives without any finished task
+
+    Expected behaviour:
+
+    - update_plan returns False, a plan from scratch is needed
+    '''
+
+    planning = create_planning([create_task(task_id) for task_id in range(4)], t_max=4)
+
+    assert not planning.update_plan([create_task(task_id) for task_id in range(5)])
+
+def test_new_tasks_are_chained_after_the_tasks_in_database():
+    '''
+    Scenario :
+
+    - 4 tasks are planned on 2 workers, the first task of each worker is finished and 2 new tasks arrive
+
+    Expected behaviour:
+
+    - The tasks already in HRWSI Database keep their worker and their preceding input,
+      the new tasks are added after the last task of a worker or on a new worker,
+      each worker has at most one task ready to be launched
+    '''
+
+    planning = create_planning([create_task(task_id) for task_id in range(4)])
+    worker_task_id_list = [[task.task_id for task in worker[4]] for worker in planning.attribution_plan.values()]
+    assert sorted(len(task_id_list) for task_id_list in worker_task_id_list) == [1, 3]
+    finished_task_id_set = set(task_id_list[0] for task_id_list in worker_task_id_list)
+
+    task_list = [create_task(task_id) for task_id in range(4) if task_id not in finished_task_id_set] + [create_task(4), create_task(5)]
+    row_by_id, new_row_by_id, database_row_by_id = update_database(planning, task_list, finished_task_id_set)
+
+    check_database_chains(row_by_id, new_row_by_id, database_row_by_id, finished_task_id_set)
+    for task_id in (4, 5):
+        vm_id, preceding_input_id = new_row_by_id[task_id]
+        worker_task_list = next(worker[4] for worker in planning.attribution_plan.values() if worker[0] == vm_id)
+        assert worker_task_list[-1].task_id == task_id or preceding_input_id in (4, 5)
+
+def test_new_tasks_wait_for_a_worker_when_there_is_no_worker_left():
+    '''
+    Scenario :
+
+    - 4 tasks are planned on the 2 workers of vm_name_list, the first task of the worker with 3 tasks is finished,
+      a new task arrives
+
+    Expected behaviour:
+
+    - The freed location is taken by no task: the new task starts after the end of a worker
+    '''
+
+    planning = create_planning([create_task(task_id) for task_id in range(4)], vm_name_list=["1", "2"])
+    worker_task_id_list = [[task.task_id for task in worker[4]] for worker in planning.attribution_plan.values()]
+    long_worker_task_id_list = max(worker_task_id_list, key=len)
+    short_worker_task_id_list = min(worker_task_id_list, key=len)
+    finished_task_id_set = {long_worker_task_id_list[0]}
+
+    task_list = [create_task(task_id) for task_id in range(4) if task_id not in finished_task_id_set] + [create_task(4)]
+    row_by_id, new_row_by_id, database_row_by_id = update_database(planning, task_list, finished_task_id_set)
+
+    check_database_chains(row_by_id, new_row_by_id, database_row_by_id, finished_task_id_set)
+    assert new_row_by_id[4][1] == short_worker_task_id_list[-1]
+    assert dict((task.task_id, task.t0) for task in planning.task_list)[4] == PROCESSING_ROUTINE_A.duration
+
+@pytest.mark.parametrize("seed", range(100))
+def test_random_updates_keep_the_database_chains(seed):
+    '''
+    Scenario :
+
+    - Tasks of 2 routines are planned, the first tasks of each worker are finished, as the Launcher launches them
+      in their order, and new tasks arrive, 3 times in a row
+
+    Expected behaviour:
+
+    - After each update the plan is valid, the tasks already in HRWSI Database keep their worker and their
+      preceding input and each worker has at most one task ready to be launched
+    '''
+
+    rng = np.random.default_rng(seed)
+    routine_list = [PROCESSING_ROUTINE_A, PROCESSING_ROUTINE_B]
+    task_list = [create_task(task_id, routine_list[int(rng.integers(2))]) for task_id in range(int(rng.integers(1, 6)))]
+    planning = create_planning(task_list, t_max=40)
+    next_task_id = len(task_list)
+    for _ in range(3):
+        finished_task_id_set = set()
+        for worker in planning.attribution_plan.values():
+            finished_task_id_set.update(task.task_id for task in worker[4][:int(rng.integers(len(worker[4]) + 1))])
+        nb_new_task = int(rng.integers(0, 4))
+        task_list = ([create_task(task.task_id, task.processing_routine) for task in planning.task_list if task.task_id not in finished_task_id_set]
+                     + [create_task(task_id, routine_list[int(rng.integers(2))]) for task_id in range(next_task_id, next_task_id + nb_new_task)])
+        next_task_id += nb_new_task
+
+        check_database_chains(*update_database(planning, task_list, finished_task_id_set), finished_task_id_set)
@@ -0,0 +1,65 @@
+"""Tests for visualization, the plotting of the plan imported only when it is used."""
+import os
+import sys
+import subprocess
+import pytest
+# Authorizing other packages absolute import
+ROOT_FOLDER = '/'.join(os.getcwd().split('hrwsi_watqual_sys')[:-1])
+sys.path.append(ROOT_FOLDER+'hrwsi_watqual_sys')
+
+from HRWSI_System.orchestrator.processing_task.processing_task import ProcessingTask
+from HRWSI_System.orchestrator.processing_routine.processing_routine import ProcessingRoutine
+from HRWSI_System.orchestrator.scheduler.matrix_scheduler import MatrixScheduler
+
+def create_planning() -> MatrixScheduler:
+    """Plan 4 tasks on 2 workers"""
+
+    processing_routine = ProcessingRoutine(name="foo", cpu=1, ram=1, storage_space=1, duration=2, docker_image="bar")
+    planning = MatrixScheduler(t_max=4, cpu_max=2, ram_max=2, storage_space_max=2, vm_max=2,
+                               task_list=[ProcessingTask(processing_routine=processing_routine, task_id=task_id, t0=None, depends_on=None)
+                                          for task_id in range(4)])
+    planning.plan()
+    return planning
+
+def test_orchestrator_does_not_import_the_plotting_libraries():
+    '''
+    Scenario :
+
+    - The Orchestrator module is imported in a new interpreter
+
+    Expected behaviour:
+
+    - matplotlib and seaborn aren't imported
+    '''
+
+    result = subprocess.run([sys.executable, "-c", "import sys; import HRWSI_System.orchestrator.orchestrator; "
+                                                   "print(sorted(set(['matplotlib', 'seaborn']) & set(sys.modules)))"],
+                            capture_output=True, text=True, check=True, env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path)))
+
+    assert result.stdout.strip() == "[]"
+
+def test_plan_is_saved_without_display(tmp_path, monkeypatch):
+    '''
+    Scenario :
+
+    - The plan is visualized without display, with and without figure path
+
+    Expected behaviour:
+
+    - The plan is saved in the figure path, or in plan.png
+    '''
+
+    pytest.importorskip("seaborn")
+    monkeypatch.delenv("DISPLAY", raising=False)
+    monkeypatch.delenv("MPLBACKEND", raising=False)
+    monkeypatch.chdir(tmp_path)
+    planning = create_planning()
+
+    planning.visualization(figure_path=str(tmp_path / "my_plan.png"))
+    import matplotlib
+    if matplotlib.get_backend().lower() != "agg":
+        pytest.skip("matplotlib was imported with a display backend")
+    planning.visualization()
+
+    assert (tmp_path / "my_plan.png").stat().st_size > 0
+    assert (tmp_path / "plan.png").stat().st_size > 0
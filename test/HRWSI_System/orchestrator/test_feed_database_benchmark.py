@@ -0,0 +1,56 @@
+"""Tests for feed_database_benchmark, the plan-to-database latency of the JSON and in-memory hand-offs."""
+import os
+import sys
+import logging
+import psycopg2
+# Authorizing other packages absolute import
+ROOT_FOLDER = '/'.join(os.getcwd().split('hrwsi_watqual_sys')[:-1])
+sys.path.append(ROOT_FOLDER+'hrwsi_watqual_sys')
+
+from HRWSI_System.orchestrator.orchestrator import Orchestrator
+from HRWSI_System.orchestrator.scheduler.matrix_scheduler import MatrixScheduler
+from HRWSI_System.harvester.apimanager.hrwsi_database_api_manager import HRWSIDatabaseApiManager
+from HRWSI_System.orchestrator.feed_database_benchmark import FormerOrchestrator, benchmark_feed, delete_synthetic_inputs
+
+def test_former_requests_insert_one_row_of_the_orchestrator_requests():
+    '''
+    Scenario :
+
+    - The requests of the former JSON hand-off
+
+    Expected behaviour:
+
+    - They are the single requests of the Orchestrator with the placeholders of one row
+    '''
+
+    assert FormerOrchestrator.ADD_VIRTUAL_MACHINE_REQUEST == Orchestrator.ADD_VIRTUAL_MACHINE_REQUEST.replace("VALUES %s", "VALUES (%s, %s, %s)")
+    assert FormerOrchestrator.ADD_PROCESSING_TASKS_REQUEST == Orchestrator.ADD_PROCESSING_TASKS_REQUEST.replace("VALUES %s", "VALUES (%s, %s, %s, %s, %s)")
+
+def test_benchmark_feeds_the_database_with_both_hand_offs(hrwsi_database, tmp_path, monkeypatch):
+    '''
+    Scenario :
+
+    - The benchmark plans 10000 synthetic inputs and feeds the database with the JSON hand-off, then with the in-memory hand-off
+
+    Expected behaviour:
+
+    - Both hand-offs insert a processing task by input, and the synthetic inputs are deleted with their processing tasks
+    '''
+
+    nb_task, first_id = 10000, 1_000_000_000
+    monkeypatch.setattr(MatrixScheduler, "LOGGER_LEVEL", logging.WARNING)
+    HRWSIDatabaseApiManager.create_connection_pool(**hrwsi_database)
+    try:
+        for orchestrator_class in (FormerOrchestrator, Orchestrator):
+            plan_time, feed_time = benchmark_feed(orchestrator_class, first_id, nb_task, str(tmp_path))
+            assert plan_time > 0 and feed_time > 0
+        with HRWSIDatabaseApiManager.connection_to_database() as (_, cur):
+            delete_synthetic_inputs(cur, first_id, nb_task)
+    finally:
+        HRWSIDatabaseApiManager.close_connection_pool()
+
+    conn = psycopg2.connect(**hrwsi_database)
+    with conn.cursor() as cur:
+        cur.execute("SELECT (SELECT count(*) FROM hrwsi.input), (SELECT count(*) FROM hrwsi.processing_tasks), (SELECT count(*) FROM hrwsi.virtual_machine)")
+        assert cur.fetchone() == (0, 0, 0)
+    conn.close()
@@ -0,0 +1,119 @@
+"""Tests for feed_database_with_processing_task, the in-memory hand-off of the plan to the HRWSI database."""
+import os
+import sys
+import datetime
+import psycopg2
+import psycopg2.extras
+# Authorizing other packages absolute import
+ROOT_FOLDER = '/'.join(os.getcwd().split('hrwsi_watqual_sys')[:-1])
+sys.path.append(ROOT_FOLDER+'hrwsi_watqual_sys')
+
+from HRWSI_System.harvester.harvester import Harvester
+from HRWSI_System.orchestrator.orchestrator import Orchestrator
+from HRWSI_System.orchestrator.scheduler.matrix_scheduler import MatrixScheduler
+from HRWSI_System.orchestrator.processing_task.processing_task import ProcessingTask
+from HRWSI_System.orchestrator.processing_routine.processing_routine import ProcessingRoutine
+from HRWSI_System.harvester.apimanager.hrwsi_database_api_manager import HRWSIDatabaseApiManager
+
+PROCESSING_ROUTINE = ProcessingRoutine(name="foo", cpu=1, ram=1, storage_space=1, duration=1, docker_image="bar")
+
+def create_planning(nb_task: int, vm_max: int = 2) -> MatrixScheduler:
+    """Plan nb_task tasks on vm_max workers"""
+
+    planning = MatrixScheduler(t_max=-(-nb_task // vm_max), cpu_max=vm_max, ram_max=vm_max, storage_space_max=vm_max, vm_max=vm_max,
+                               task_list=[ProcessingTask(processing_routine=PROCESSING_ROUTINE, task_id=task_id, t0=None, depends_on=None)
+                                          for task_id in range(1, nb_task + 1)],
+                               vm_name_list=[f"worker-{i}" for i in range(vm_max)],
+                               vm_id_list=[f"00000000-0000-0000-0000-{i:012d}" for i in range(vm_max)])
+    planning.plan()
+    planning.check_plan()
+    return planning
+
+def test_plan_is_handed_over_as_typed_tuples():
+    '''
+    Scenario :
+
+    - 4 tasks are planned on 2 workers
+
+    Expected behaviour:
+
+    - Each worker gives a virtual machine row, each task a processing task row
+      with the input of the previous task of its worker as preceding input
+    '''
+
+    planning = create_planning(4)
+    now = datetime.datetime.now()
+
+    assert planning.get_virtual_machine_tuple() == (("00000000-0000-0000-0000-000000000000", "worker-0", "flavour1"),
+                                                    ("00000000-0000-0000-0000-000000000001", "worker-1", "flavour1"))
+    processing_task_tuple = planning.get_processing_task_tuple(now)
+    assert len(processing_task_tuple) == 4
+    for vm_id in ("00000000-0000-0000-0000-000000000000", "00000000-0000-0000-0000-000000000001"):
+        worker_task_tuple = tuple(pt for pt in processing_task_tuple if pt[1] == vm_id)
+        assert worker_task_tuple[0][3] is None
+        assert worker_task_tuple[1][3] == worker_task_tuple[0][0]
+        assert all(pt[2] == now and pt[4] is False for pt in worker_task_tuple)
+
+def test_processing_tasks_are_inserted_in_a_single_request(mocker):
+    '''
+    Scenario :
+
+    - 1000 planned tasks are new in the database
+
+    Expected behaviour:
+
+    - The virtual machines and the processing tasks are inserted with one request each, no JSON file is written
+    '''
+
+    planning = create_planning(1000)
+    export_to_json_mock = mocker.patch.object(planning, "export_to_json")
+    mocker.patch.object(HRWSIDatabaseApiManager, "connect_to_database", return_value=(mocker.MagicMock(), mocker.MagicMock()))
+    mocker.patch.object(HRWSIDatabaseApiManager, "commit_and_close_connection_to_database")
+    mocker.patch.object(Orchestrator, "identify_new_processing_task_in_database", side_effect=lambda cur, candidates_tuple: candidates_tuple)
+    mocker.patch.object(Harvester, "identify_new_candidate", side_effect=lambda cursor, request, candidates_tuple, col_index_in_candidate: candidates_tuple)
+    execute_values_mock = mocker.patch.object(psycopg2.extras, "execute_values")
+
+    Orchestrator().feed_database_with_processing_task(planning)
+
+    assert [call.args[1] for call in execute_values_mock.call_args_list] == [Orchestrator.ADD_VIRTUAL_MACHINE_REQUEST,
+                                                                             Orchestrator.ADD_PROCESSING_TASKS_REQUEST]
+    assert len(execute_values_mock.call_args_list[0].args[2]) == 2
+    assert len(execute_values_mock.call_args_list[1].args[2]) == 1000
+    assert execute_values_mock.call_args_list[1].kwargs["page_size"] == 1000
+    export_to_json_mock.assert_not_called()
+
+def test_processing_tasks_are_inserted_in_database(hrwsi_database):
+    '''
+    Scenario :
+
+    - 10000 tasks are planned for new inputs, then fed to the database twice
+
+    Expected behaviour:
+
+    - The virtual machines and the processing tasks are in the database once, with the preceding input of their worker
+    '''
+
+    nb_task = 10000
+    conn = psycopg2.connect(**hrwsi_database)
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO hrwsi.input (id, processing_condition_name, date, tile, measurement_day, input_path, mission)
+            SELECT i, 'FSC_PC', now(), '33VUC', 20240109, '/eo_' || i, 'S2' FROM generate_series(1, %s) AS i;
+            """, (nb_task,))
+    conn.commit()
+
+    planning = create_planning(nb_task, vm_max=4)
+    HRWSIDatabaseApiManager.create_connection_pool(**hrwsi_database)
+    try:
+        orchestrator = Orchestrator()
+        orchestrator.feed_database_with_processing_task(planning)
+        orchestrator.feed_database_with_processing_task(planning)
+    finally:
+        HRWSIDatabaseApiManager.close_connection_pool()
+
+    with conn.cursor() as cur:
+        cur.execute("SELECT count(*), count(DISTINCT input_fk_id), count(preceding_input_id) FROM hrwsi.processing_tasks")
+        assert cur.fetchone() == (nb_task, nb_task, nb_task - 4)
+        cur.execute("SELECT count(*) FROM hrwsi.virtual_machine")
+        assert cur.fetchone()[0] == 4
+    conn.close()
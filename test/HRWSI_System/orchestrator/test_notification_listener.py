@@ -0,0 +1,184 @@
+"""Tests for the NotificationListener used by the Orchestrator to listen to the input insertion notifications."""
+import os
+import sys
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import psycopg2
+import pytest
+# Authorizing other packages absolute import
+ROOT_FOLDER = '/'.join(os.getcwd().split('hrwsi_watqual_sys')[:-1])
+sys.path.append(ROOT_FOLDER+'hrwsi_watqual_sys')
+
+from HRWSI_System.orchestrator.notification_listener import NotificationListener
+
+CHANNEL = "input_insertion"
+
+class SlowDispatch():
+    """Dispatch function recording the batches of payloads, each call lasts duration seconds"""
+
+    def __init__(self, duration: float):
+
+        self.duration = duration
+        self.batch_list = []
+        self.thread_name_set = set()
+
+    def __call__(self, payload_list: list[str]) -> None:
+
+        self.thread_name_set.add(threading.current_thread().name)
+        time.sleep(self.duration)
+        self.batch_list.append(payload_list)
+
+async def measure_max_loop_gap(stop_event: asyncio.Event, period: float = 0.005) -> float:
+    """Return the longest time the event loop didn't run this coroutine"""
+
+    max_gap = 0.
+    previous = time.perf_counter()
+    while not stop_event.is_set():
+        await asyncio.sleep(period)
+        now = time.perf_counter()
+        max_gap = max(max_gap, now - previous - period)
+        previous = now
+    return max_gap
+
+def test_notifications_are_coalesced_without_blocking_the_loop():
+    '''
+    Scenario :
+
+    - 100 notifications are added in bursts while the dispatch function takes 0.1 s
+
+    Expected behaviour:
+
+    - The notifications are dispatched once each, in order, by a few batches run in the executor,
+      the event loop is never blocked and the latencies are recorded
+    '''
+
+    dispatch = SlowDispatch(duration=0.1)
+
+    async def _run() -> tuple[NotificationListener, float]:
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="dispatch") as executor:
+            listener = NotificationListener(CHANNEL, dispatch, debounce_seconds=0.02, executor=executor)
+            listener.new_notification_event = asyncio.Event()
+            stop_event = asyncio.Event()
+            dispatch_task = asyncio.create_task(listener.dispatch_notifications())
+            gap_task = asyncio.create_task(measure_max_loop_gap(stop_event))
+
+            for burst in range(10):
+                listener.add_notifications([str(burst * 10 + i) for i in range(10)])
+                await asyncio.sleep(0.03)
+            while listener.get_metrics()["notification_count"] < 100:
+                await asyncio.sleep(0.01)
+
+            listener.stop()
+            stop_event.set()
+            await dispatch_task
+            return listener, await gap_task
+
+    listener, max_loop_gap = asyncio.run(_run())
+    metrics = listener.get_metrics()
+
+    assert [payload for batch in dispatch.batch_list for payload in batch] == [str(i) for i in range(100)]
+    assert len(dispatch.batch_list) < 10
+    assert all(name.startswith("dispatch") for name in dispatch.thread_name_set)
+    assert max_loop_gap < 0.05
+    assert metrics["dispatch_count"] == len(dispatch.batch_list)
+    assert metrics["max_latency"] >= metrics["mean_latency"] >= 0.1
+    assert metrics["max_dispatch_delay"] >= 0.02
+    assert metrics["max_dispatch_delay"] >= metrics["mean_dispatch_delay"] > 0
+
+def test_failed_dispatch_does_not_stop_the_listener():
+    '''
+    Scenario :
+
+    - The dispatch function raises an exception for the first batch
+
+    Expected behaviour:
+
+    - The failure is counted and the next notifications are still dispatched
+    '''
+
+    batch_list = []
+    def _dispatch(payload_list: list[str]) -> None:
+        batch_list.append(payload_list)
+        if len(batch_list) == 1:
+            raise RuntimeError("scheduling failed")
+
+    async def _run() -> NotificationListener:
+        listener = NotificationListener(CHANNEL, _dispatch)
+        listener.new_notification_event = asyncio.Event()
+        dispatch_task = asyncio.create_task(listener.dispatch_notifications())
+        listener.add_notifications(["S2"])
+        while listener.get_metrics()["dispatch_count"] < 1:
+            await asyncio.sleep(0.01)
+        listener.add_notifications(["S1"])
+        while listener.get_metrics()["dispatch_count"] < 2:
+            await asyncio.sleep(0.01)
+        listener.stop()
+        await dispatch_task
+        return listener
+
+    listener = asyncio.run(_run())
+
+    assert batch_list == [["S2"], ["S1"]]
+    assert listener.get_metrics()["failed_dispatch_count"] == 1
+
+def test_thousands_of_database_notifications(local_postgresql):
+    '''
+    Scenario :
+
+    - 5000 notifications are sent on the input_insertion channel of a local PostgreSQL server,
+      one transaction each, then 5000 more in a single transaction, while each dispatch takes 0.05 s
+
+    Expected behaviour:
+
+    - Every notification is dispatched once, in order, by far fewer dispatch calls than notifications,
+      and the event loop is never blocked
+    '''
+
+    nb_notification = 5000
+    dispatch = SlowDispatch(duration=0.05)
+
+    def _send_notifications() -> None:
+        conn = psycopg2.connect(**local_postgresql)
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            for i in range(nb_notification):
+                cur.execute("SELECT pg_notify(%s, %s)", (CHANNEL, str(i)))
+        conn.autocommit = False
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_notify(%s, i::text) FROM generate_series(%s, %s) AS i",
+                        (CHANNEL, nb_notification, 2 * nb_notification - 1))
+        conn.commit()
+        conn.close()
+
+    async def _run() -> tuple[NotificationListener, float]:
+        loop = asyncio.get_running_loop()
+        conn = psycopg2.connect(**local_postgresql)
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="dispatch") as executor:
+            listener = NotificationListener(CHANNEL, dispatch, debounce_seconds=0.01, executor=executor)
+            stop_event = asyncio.Event()
+            listen_task = asyncio.create_task(listener.listen(conn))
+            gap_task = asyncio.create_task(measure_max_loop_gap(stop_event))
+            # Wait for the LISTEN request
+            while listener.new_notification_event is None:
+                await asyncio.sleep(0.01)
+
+            await loop.run_in_executor(None, _send_notifications)
+            deadline = time.perf_counter() + 60
+            while listener.get_metrics()["notification_count"] < 2 * nb_notification and time.perf_counter() < deadline:
+                await asyncio.sleep(0.05)
+
+            listener.stop()
+            stop_event.set()
+            await listen_task
+        conn.close()
+        return listener, await gap_task
+
+    listener, max_loop_gap = asyncio.run(_run())
+    metrics = listener.get_metrics()
+
+    assert [payload for batch in dispatch.batch_list for payload in batch] == [str(i) for i in range(2 * nb_notification)]
+    assert metrics["dispatch_count"] == len(dispatch.batch_list) < nb_notification / 10
+    assert max_loop_gap < 0.2
+    assert metrics["max_latency"] >= metrics["mean_latency"] > 0
@@ -0,0 +1,120 @@
+"""Tests for run_scheduling, the full or incremental re-planning of the Orchestrator."""
+import os
+import sys
+import pytest
+# Authorizing other packages absolute import
+ROOT_FOLDER = '/'.join(os.getcwd().split('hrwsi_watqual_sys')[:-1])
+sys.path.append(ROOT_FOLDER+'hrwsi_watqual_sys')
+
+from HRWSI_System.harvester.apimanager.api_manager import ApiManager
+from HRWSI_System.orchestrator.orchestrator import Orchestrator
+from HRWSI_System.orchestrator.scheduler.scheduler import Scheduler
+from HRWSI_System.orchestrator.scheduler.matrix_scheduler import MatrixScheduler
+from HRWSI_System.orchestrator.processing_task.processing_task import ProcessingTask
+from HRWSI_System.orchestrator.processing_routine.processing_routine import ProcessingRoutine
+
+@pytest.fixture(name="orchestrator")
+def fixture_orchestrator(mocker):
+    '''
+    Orchestrator whose pending tasks are given by its pending_input_id_list attribute and whose
+    processing routine durations are given by its routine_duration attribute, without database
+    '''
+
+    config_data = ApiManager.read_config_file()
+    config_data["scheduling"].update({"incremental": True, "t_max": 10, "cpu_max": 4, "ram_max": 4, "storage_space_max": 4, "vm_max": 2,
+                                      "vm_name_list": None, "vm_id_list": None})
+    mocker.patch.object(ApiManager, "read_config_file", side_effect=lambda: config_data)
+    orchestrator = Orchestrator()
+    orchestrator.pending_input_id_list = []
+    orchestrator.routine_duration = 2
+
+    def _extract_orchestrator_processing_routine():
+        orchestrator.processing_routine_dict = {"FSC_PC": ProcessingRoutine(name="foo", cpu=2, ram=1, storage_space=1,
+                                                                            duration=orchestrator.routine_duration, docker_image="bar")}
+
+    def _extract_orchestrator_processing_task(processing_routine_dict: dict):
+        orchestrator.processing_task_list = [ProcessingTask(processing_routine=processing_routine_dict["FSC_PC"], task_id=input_id,
+                                                            t0=None, depends_on=None)
+                                             for input_id in orchestrator.pending_input_id_list]
+
+    mocker.patch.object(orchestrator, "extract_orchestrator_processing_routine", side_effect=_extract_orchestrator_processing_routine)
+    mocker.patch.object(orchestrator, "extract_orchestrator_processing_task", side_effect=_extract_orchestrator_processing_task)
+    mocker.patch.object(orchestrator, "feed_database_with_processing_task")
+    mocker.patch.object(Scheduler, "export_to_json")
+    return orchestrator
+
+def test_finished_and_new_tasks_update_the_last_plan(orchestrator, mocker):
+    '''
+    Scenario :
+
+    - 4 tasks are planned, then 2 of them finish and 2 new tasks arrive
+
+    Expected behaviour:
+
+    - The second scheduling updates the plan of the first one instead of planning from scratch,
+      the remaining tasks keep their t0
+    '''
+
+    plan_spy = mocker.spy(MatrixScheduler, "plan")
+    orchestrator.pending_input_id_list = [1, 2, 3, 4]
+    orchestrator.run_scheduling()
+    planning = orchestrator.planning
+    t0_by_task_id = dict((task.task_id, task.t0) for task in planning.task_list)
+
+    orchestrator.pending_input_id_list = [3, 4, 5, 6]
+    orchestrator.run_scheduling()
+
+    assert plan_spy.call_count == 1
+    assert orchestrator.planning is planning
+    assert sorted(task.task_id for task in planning.task_list) == [3, 4, 5, 6]
+    assert all(task.t0 == t0_by_task_id[task.task_id] for task in planning.task_list if task.task_id in (3, 4))
+    assert orchestrator.feed_database_with_processing_task.call_count == 2
+
+@pytest.mark.parametrize("routine_duration, new_tasks_fit", [
+    (3, True),
+    (2, False),
+])
+def test_capacity_model_drift_or_full_plan_trigger_a_full_re_planning(orchestrator, mocker, routine_duration, new_tasks_fit):
+    '''
+    Scenario :
+
+    - 4 tasks are planned, then the duration of their routine changes or the new tasks don't fit in the plan
+
+    Expected behaviour:
+
+    - The second scheduling plans all the pending tasks from scratch
+    '''
+
+    plan_spy = mocker.spy(MatrixScheduler, "plan")
+    orchestrator.pending_input_id_list = [1, 2, 3, 4]
+    orchestrator.run_scheduling()
+    planning = orchestrator.planning
+    if not new_tasks_fit:
+        mocker.patch.object(planning, "update_plan", return_value=False)
+
+    orchestrator.routine_duration = routine_duration
+    orchestrator.pending_input_id_list = [3, 4, 5, 6]
+    orchestrator.run_scheduling()
+
+    assert plan_spy.call_count == 2
+    assert orchestrator.planning is not planning
+    assert sorted(task.task_id for task in orchestrator.planning.task_list) == [3, 4, 5, 6]
+    assert all(task.processing_routine.duration == routine_duration for task in orchestrator.planning.task_list)
+
+def test_handle_notify_reuses_the_launcher(orchestrator, mocker):
+    '''
+    Scenario :
+
+    - The Orchestrator handles two batches of input insertion notifications
+
+    Expected behaviour:
+
+    - A single Launcher is created, and run after each scheduling
+    '''
+
+    launcher_class = mocker.patch("HRWSI_System.orchestrator.orchestrator.Launcher")
+    orchestrator.handle_notify(["FSC_PC"])
+    orchestrator.handle_notify(["FSC_PC"])
+
+    launcher_class.assert_called_once_with()
+    assert launcher_class.return_value.run.call_count == 2
@@ -0,0 +1,107 @@
+import os
+import shutil
+import socket
+import subprocess
+import pytest
+import psycopg2
+
+HRWSI_DATABASE_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "HRWSI_Database")
+
+def _find_postgresql_binary(binary_name: str) -> str:
+    """Look for a PostgreSQL binary in PG_BIN directory, then in PATH"""
+
+    pg_bin = os.environ.get("PG_BIN")
+    if pg_bin and os.path.isfile(os.path.join(pg_bin, binary_name)):
+        return os.path.join(pg_bin, binary_name)
+    return shutil.which(binary_name)
+
+def _get_free_port() -> int:
+    """Return a free TCP port on localhost"""
+
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("localhost", 0))
+        return sock.getsockname()[1]
+
+@pytest.fixture(scope='session')
+def local_postgresql(tmp_path_factory):
+    '''
+    local_postgresql Fixture function start a PostgreSQL server in a temporary directory.
+    The tests using it are skipped if initdb and pg_ctl can't be found (set PG_BIN to their directory).
+
+
+    :return: the connection parameters of the database
+    :rtype: dict
+    '''
+    initdb = _find_postgresql_binary("initdb")
+    pg_ctl = _find_postgresql_binary("pg_ctl")
+    if initdb is None or pg_ctl is None:
+        pytest.skip("PostgreSQL binaries not found, set PG_BIN to run the database tests")
+
+    data_dir = tmp_path_factory.mktemp("pgdata")
+    port = _get_free_port()
+    user = "hrwsi_test"
+    subprocess.run([initdb, "-D", str(data_dir), "-U", user, "--auth=trust"], check=True, capture_output=True)
+    subprocess.run([pg_ctl, "-D", str(data_dir), "-l", str(data_dir / "postgresql.log"), "-w",
+                    "-o", f"-p {port} -k {data_dir} -c listen_addresses=localhost", "start"], check=True, capture_output=True)
+
+    yield {"dbname": "postgres", "user": user, "password": "", "host": "localhost", "port": port}
+
+    subprocess.run([pg_ctl, "-D", str(data_dir), "-m", "immediate", "stop"], check=False, capture_output=True)
+
+@pytest.fixture(scope='session')
+def hrwsi_database_template(local_postgresql):
+    '''
+    hrwsi_database_template Fixture function create the HRWSI database on the local PostgreSQL server
+    with the init_database then the update_database SQL files, once for all the tests.
+    The tests using it are skipped if the database can't be created (e.g. without the uuid-ossp extension).
+
+
+    :return: the connection parameters of the database
+    :rtype: dict
+    '''
+    conn = psycopg2.connect(**local_postgresql)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute("CREATE DATABASE hrwsi_template")
+    conn.close()
+    database_parameters = dict(local_postgresql, dbname="hrwsi_template")
+
+    sql_file_list = sorted(
+        [os.path.join(HRWSI_DATABASE_FOLDER, folder, file_name)
+         for folder in ("init_database", "update_database")
+         for file_name in os.listdir(os.path.join(HRWSI_DATABASE_FOLDER, folder)) if file_name.endswith(".sql")],
+        key=lambda path: int(os.path.basename(path).split("_")[0]))
+    conn = psycopg2.connect(**database_parameters)
+    try:
+        with conn.cursor() as cur:
+            for sql_file in sql_file_list:
+                with open(sql_file, encoding="utf-8") as file:
+                    cur.execute(file.read())
+        conn.commit()
+    except psycopg2.Error as error:
+        pytest.skip(f"HRWSI database can't be created : {error}")
+    finally:
+        conn.close()
+
+    return database_parameters
+
+@pytest.fixture
+def hrwsi_database(local_postgresql, hrwsi_database_template):
+    '''
+    hrwsi_database Fixture function create a new HRWSI database for a test, copied from the template database,
+    so that the rows inserted by a test aren't seen by the others. It is dropped after the test.
+
+
+    :return: the connection parameters of the database
+    :rtype: dict
+    '''
+    conn = psycopg2.connect(**local_postgresql)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute(f"CREATE DATABASE hrwsi_db TEMPLATE {hrwsi_database_template['dbname']}")
+
+    yield dict(local_postgresql, dbname="hrwsi_db")
+
+    with conn.cursor() as cur:
+        cur.execute("DROP DATABASE hrwsi_db WITH (FORCE)")
+    conn.close()
@@ -0,0 +1,236 @@
+"""Tests for the micro-batching persistence of the RobustRPCConsumer, on the in-memory kombu transport."""
+import os
+import sys
+import json
+import threading
+import time
+import psycopg2
+import pytest
+from kombu import Connection, Exchange, Queue, Producer
+# Authorizing other packages absolute import
+ROOT_FOLDER = '/'.join(os.getcwd().split('hrwsi_watqual_sys')[:-1])
+sys.path.append(ROOT_FOLDER+'hrwsi_watqual_sys')
+
+from utils.rabbitmq.robust_rpc_consumer import RobustRPCConsumer
+from HRWSI_System.harvester.apimanager.hrwsi_database_api_manager import HRWSIDatabaseApiManager
+
+EXCHANGE = Exchange("rpc_product_exchange", type="direct")
+REPLY_QUEUE_NAME = "reply_queue"
+
+def create_message(pt_id: int) -> str:
+    """Return the message sent by a worker at the end of processing task pt_id"""
+
+    return json.dumps({"processing_task_id": pt_id, "nomad_job_id": pt_id, "input_id": pt_id,
+                       "product_type_id": 2, "product_path": f"/product_{pt_id}"})
+
+def consume_messages(body_list: list[str], queue_name: str, batch_size: int, batch_timeout_ms: float,
+                     nb_burst: int = 1) -> int:
+    """
+    Publish the messages in nb_burst bursts on an in-memory broker and consume them with a RobustRPCConsumer
+    until they are all answered or rejected, return the number of messages left in the queue afterwards
+    """
+
+    queue = Queue(queue_name, exchange=EXCHANGE, routing_key=queue_name)
+    with Connection("memory://") as conn:
+        queue.maybe_bind(conn)
+        queue.declare()
+        reply_queue = Queue(REPLY_QUEUE_NAME, channel=conn)
+        reply_queue.declare()
+        reply_queue.purge()
+
+        consumer = RobustRPCConsumer(conn, [queue], batch_size, batch_timeout_ms)
+        consumer_thread = threading.Thread(target=consumer.run)
+
+        # The first burst is published before the consumer starts, so that it isn't split by the batch timeout
+        producer = Producer(conn.channel(), exchange=EXCHANGE, routing_key=queue_name)
+        burst_size = -(-len(body_list) // nb_burst)
+        for i in range(0, len(body_list), burst_size):
+            for body in body_list[i:i+burst_size]:
+                producer.publish(body, reply_to=REPLY_QUEUE_NAME, correlation_id="id")
+            if i == 0:
+                consumer_thread.start()
+            time.sleep(0.1)
+
+        deadline = time.perf_counter() + 10
+        while time.perf_counter() < deadline and (queue.queue_declare(passive=True).message_count or consumer.pending_message_list):
+            time.sleep(0.01)
+        consumer.should_stop = True
+        consumer_thread.join()
+
+        # The unacknowledged messages are restored in the queue when the consumer channel is closed
+        return queue.queue_declare(passive=True).message_count
+
+def test_messages_are_persisted_by_batch(mocker):
+    '''
+    Scenario :
+
+    - 250 messages are consumed with a batch size of 100
+
+    Expected behaviour:
+
+    - They are persisted by 2 batches of 100 messages, the last 50 after the batch timeout,
+      each message is answered after its batch is persisted then acknowledged
+    '''
+
+    event_list = []
+    persist_batch_mock = mocker.patch.object(
+        RobustRPCConsumer, "persist_batch",
+        side_effect=lambda json_data_list: event_list.append(("persist", len(json_data_list))))
+    mocker.patch.object(
+        RobustRPCConsumer, "send_response", autospec=True,
+        side_effect=lambda self, message: event_list.append(("response", message.acknowledged)))
+
+    nb_message_left = consume_messages([create_message(i) for i in range(250)], "batch_queue",
+                                       batch_size=100, batch_timeout_ms=50)
+
+    assert [len(call.args[0]) for call in persist_batch_mock.call_args_list] == [100, 100, 50]
+    assert [call.args[0][0]["processing_task_id"] for call in persist_batch_mock.call_args_list] == [0, 100, 200]
+    assert event_list == (
+        [("persist", 100)] + [("response", False)] * 100
+        + [("persist", 100)] + [("response", False)] * 100
+        + [("persist", 50)] + [("response", False)] * 50)
+    assert nb_message_left == 0
+
+def test_incomplete_batches_are_persisted_after_the_timeout(mocker):
+    '''
+    Scenario :
+
+    - 3 bursts of 5 messages are consumed with a batch size of 100 and a batch timeout of 50 ms
+
+    Expected behaviour:
+
+    - Each burst is persisted in a batch after the timeout, without waiting for a full batch
+    '''
+
+    persist_batch_mock = mocker.patch.object(RobustRPCConsumer, "persist_batch")
+    mocker.patch.object(RobustRPCConsumer, "send_response")
+
+    nb_message_left = consume_messages([create_message(i) for i in range(15)], "timeout_queue",
+                                       batch_size=100, batch_timeout_ms=50, nb_burst=3)
+
+    assert [len(call.args[0]) for call in persist_batch_mock.call_args_list] == [5, 5, 5]
+    assert nb_message_left == 0
+
+def test_faulty_message_does_not_block_its_batch(mocker):
+    '''
+    Scenario :
+
+    - A batch of 10 messages contains a message which isn't a JSON and a message without processing task
+
+    Expected behaviour:
+
+    - The message which isn't a JSON is rejected, the batch fails because of the other one
+      and is persisted one message at a time: the faulty message is rejected, the others are answered,
+      no message is left in the queue
+    '''
+
+    def _persist_batch(json_data_list: list[dict]) -> None:
+        for json_data in json_data_list:
+            json_data["processing_task_id"]
+
+    persist_batch_mock = mocker.patch.object(RobustRPCConsumer, "persist_batch", side_effect=_persist_batch)
+    send_response_mock = mocker.patch.object(RobustRPCConsumer, "send_response")
+
+    body_list = [create_message(i) for i in range(10)]
+    body_list[3] = "not a JSON"
+    body_list[5] = json.dumps({"nomad_job_id": 5})
+    nb_message_left = consume_messages(body_list, "faulty_queue", batch_size=9, batch_timeout_ms=50)
+
+    assert len(persist_batch_mock.call_args_list) == 1 + 9
+    assert send_response_mock.call_count == 8
+    assert nb_message_left == 0
+
+def test_messages_are_persisted_in_database(hrwsi_database):
+    '''
+    Scenario :
+
+    - 1000 processing tasks end, their messages are consumed by batches of 64, one of them is sent twice
+
+    Expected behaviour:
+
+    - The processing tasks are ended, each one has a processed status and a product,
+      the message sent twice is persisted once
+    '''
+
+    nb_task = 1000
+    conn = psycopg2.connect(**hrwsi_database)
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO hrwsi.input (id, processing_condition_name, date, tile, measurement_day, input_path, mission)
+            SELECT i, 'FSC_PC', '2024-01-09 12:15:11', '33VUC', 20240109, '/eo_' || i, 'S2' FROM generate_series(1, %(nb_task)s) AS i;
+            INSERT INTO hrwsi.virtual_machine (id, name, flavour) VALUES ('84374172-c990-11ee-8bee-7c8ae199ff1c', 'worker_1', 'flavour1');
+            INSERT INTO hrwsi.processing_tasks (id, input_fk_id, virtual_machine_id, creation_date, has_ended, intermediate_files_path)
+            SELECT i, i, '84374172-c990-11ee-8bee-7c8ae199ff1c', '2024-01-09 12:16:11', false, '/intermediate_file_path_' || i
+            FROM generate_series(1, %(nb_task)s) AS i;
+            INSERT INTO hrwsi.nomad_job_dispatch (id, processing_task_fk_id, nomad_job_dispatch, dispatch_date, log_path)
+            SELECT i, i, 'dispatch-' || i, '2024-01-09 12:17:11', 'log_path_' || i FROM generate_series(1, %(nb_task)s) AS i;
+            """, {"nb_task": nb_task})
+    conn.commit()
+
+    HRWSIDatabaseApiManager.create_connection_pool(**hrwsi_database)
+    try:
+        body_list = [create_message(i) for i in range(1, nb_task + 1)] + [create_message(1)]
+        nb_message_left = consume_messages(body_list, "database_queue", batch_size=64, batch_timeout_ms=50)
+    finally:
+        HRWSIDatabaseApiManager.close_connection_pool()
+
+    with conn.cursor() as cur:
+        cur.execute("SELECT count(*) FROM hrwsi.processing_tasks WHERE has_ended")
+        assert cur.fetchone()[0] == nb_task
+        cur.execute("SELECT count(*), count(DISTINCT nomad_job_dispatch_fk_id) FROM hrwsi.processing_status_workflow WHERE processing_status_id = 2")
+        assert cur.fetchone() == (nb_task, nb_task)
+        cur.execute("SELECT count(*), count(DISTINCT input_fk_id) FROM hrwsi.products")
+        assert cur.fetchone() == (nb_task, nb_task)
+    conn.close()
+    assert nb_message_left == 0
+
+def test_broken_connection_is_given_back_to_the_pool(mocker):
+    '''
+    Scenario :
+
+    - The connection breaks during the persistence of a batch, its rollback fails too
+
+    Expected behaviour:
+
+    - The connection is closed and given back to the connection pool, the error of the request is raised
+    '''
+
+    conn = mocker.MagicMock()
+    conn.rollback.side_effect = psycopg2.InterfaceError("connection already closed")
+    cur = conn.cursor.return_value
+    cur.execute.side_effect = psycopg2.OperationalError("server closed the connection unexpectedly")
+    pool = mocker.MagicMock()
+    pool.getconn.return_value = conn
+    mocker.patch.object(HRWSIDatabaseApiManager, "get_connection_pool", return_value=pool)
+
+    consumer = RobustRPCConsumer(Connection("memory://"), [], batch_size=10, batch_timeout_ms=50)
+    with pytest.raises(psycopg2.OperationalError):
+        consumer.persist_batch([json.loads(create_message(1))])
+
+    pool.putconn.assert_called_once_with(conn, close=True)
+
+def test_faulty_batch_keeps_its_connection_in_the_pool(mocker):
+    '''
+    Scenario :
+
+    - A batch can't be persisted because of an integrity error, as when one of its messages is faulty
+
+    Expected behaviour:
+
+    - The changes are rolled back and the connection is given back to the connection pool without being closed,
+      the integrity error is raised for flush to persist the messages one at a time
+    '''
+
+    conn = mocker.MagicMock()
+    cur = conn.cursor.return_value
+    cur.execute.side_effect = psycopg2.IntegrityError("insert or update violates foreign key constraint")
+    pool = mocker.MagicMock()
+    pool.getconn.return_value = conn
+    mocker.patch.object(HRWSIDatabaseApiManager, "get_connection_pool", return_value=pool)
+
+    consumer = RobustRPCConsumer(Connection("memory://"), [], batch_size=10, batch_timeout_ms=50)
+    with pytest.raises(psycopg2.IntegrityError):
+        consumer.persist_batch([json.loads(create_message(1))])
+
+    conn.rollback.assert_called_once_with()
+    pool.putconn.assert_called_once_with(conn, close=False)
@@ -13,10 +13,20 @@ sys.path.append(ROOT_FOLDER+'hrwsi_watqual_sys')
 from utils.rabbitmq.robust_consumer import RobustConsumer
 from utils.rabbitmq.rabbitmq_manager import RabbitmqManager
 from utils.rabbitmq.robust_rpc_consumer import RobustRPCConsumer
+from HRWSI_System.harvester.apimanager.api_manager import ApiManager
 
 class RabbitmqConsumer(RabbitmqManager):
     """Read data to RabbitMQ"""
 
+    def __init__(self, rpc_mode: bool = False) -> None:
+
+        super().__init__(rpc_mode)
+
+        # Load config file
+        config_data = ApiManager.read_config_file()
+        self.batch_size = config_data["rabbitmq"].get("batch_size", RobustRPCConsumer.DEFAULT_BATCH_SIZE)
+        self.batch_timeout_ms = config_data["rabbitmq"].get("batch_timeout_ms", RobustRPCConsumer.DEFAULT_BATCH_TIMEOUT_MS)
+
     def run(self) -> None:
         """Create and run a consumer"""
 
@@ -29,7 +39,7 @@ class RabbitmqConsumer(RabbitmqManager):
 
         # Create Consumer
         queues = [self.queue]
-        consumer = RobustRPCConsumer(conn, queues) if self.rpc_mode else RobustConsumer(conn, queues)
+        consumer = RobustRPCConsumer(conn, queues, self.batch_size, self.batch_timeout_ms) if self.rpc_mode else RobustConsumer(conn, queues)
         consumer.run() # The run function loops continuously until an error occurs or the process is terminated
 
 
@@ -5,10 +5,12 @@ RobustConsumer module is used to consume message in message queue.
 import os
 import sys
 import json
+import time
 import datetime
 import logging
 import functools
 import psycopg2
+import psycopg2.extras
 import kombu.transport.pyamqp
 from kombu.mixins import ConsumerProducerMixin
 
@@ -20,77 +22,160 @@ from utils.logger import LogUtil
 from HRWSI_System.harvester.apimanager.hrwsi_database_api_manager import HRWSIDatabaseApiManager
 
 class RobustRPCConsumer(ConsumerProducerMixin):
-    """Robust consumer quickly recovers when the connection to RabbitMQ is disrupted or dies completely"""
+    """
+    Robust consumer quickly recovers when the connection to RabbitMQ is disrupted or dies completely.
+
+    The messages are persisted by batch: they are kept until batch_size messages are received or the first one
+    waited batch_timeout_ms, then the whole batch is written in one database transaction. The messages are
+    acknowledged and answered only after the commit, a message received but not persisted is redelivered.
+    """
 
     LOGGER_LEVEL = logging.INFO
-    INSERT_PROCESSING_STATUS_WORKFLOW = "INSERT INTO hrwsi.processing_status_workflow (nomad_job_dispatch_fk_id, processing_status_id, date) VALUES (%s, %s, %s);"
-    INSERT_PRODUCT = "INSERT INTO hrwsi.products (input_fk_id, product_type_id, product_path, creation_date, catalogued_date) VALUES (%s, %s, %s, %s, %s);"
+    DEFAULT_BATCH_SIZE = 100
+    DEFAULT_BATCH_TIMEOUT_MS = 200
+    # Processing status processed
+    PROCESSED_STATUS_ID = 2
+
+    SELECT_PROCESSING_TASKS_HAS_ENDED = "SELECT id, has_ended FROM hrwsi.processing_tasks WHERE id = ANY(%s) FOR UPDATE;"
+    UPDATE_PROCESSING_TASKS_HAS_ENDED = "UPDATE hrwsi.processing_tasks SET has_ended = true WHERE id = ANY(%s);"
+    INSERT_PROCESSING_STATUS_WORKFLOW = "INSERT INTO hrwsi.processing_status_workflow (nomad_job_dispatch_fk_id, processing_status_id, date) VALUES %s;"
+    INSERT_PRODUCT = "INSERT INTO hrwsi.products (input_fk_id, product_type_id, product_path, creation_date, catalogued_date) VALUES %s;"
 
     def __init__(self, connection: kombu.connection.Connection,
-                 queues: list[kombu.entity.Queue]):
+                 queues: list[kombu.entity.Queue],
+                 batch_size: int = DEFAULT_BATCH_SIZE,
+                 batch_timeout_ms: float = DEFAULT_BATCH_TIMEOUT_MS):
 
         self.connection = connection
         self.queues = queues
+        self.batch_size = batch_size
+        self.batch_timeout_seconds = batch_timeout_ms / 1000
         self.logger = LogUtil.get_logger('Log_robustrpcconsumer', self.LOGGER_LEVEL, "log_robustrpcconsumer/logs.log")
 
+        # (message data, message) waiting to be persisted and reception time of the first one
+        self.pending_message_list = []
+        self.first_pending_message_received_at = None
+
     def get_consumers(self, Consumer: functools.partial, channel: kombu.transport.pyamqp.Channel) -> list[kombu.messaging.Consumer]:
         """Returns a list of the Consumers the worker will use"""
 
+        # The broker doesn't send more unacknowledged messages than a batch
         return [Consumer(queues=self.queues,
-                         callbacks=[self.on_message])]
+                         callbacks=[self.on_message],
+                         prefetch_count=self.batch_size)]
+
+    def consume(self, *args, **kwargs):
+        """Consume the messages, waking up at least every batch timeout to persist an incomplete batch"""
+
+        kwargs["safety_interval"] = min(kwargs.get("safety_interval", 1), self.batch_timeout_seconds)
+        yield from super().consume(*args, **kwargs)
+
+    def on_iteration(self) -> None:
+        """Persist the pending messages when the first one waited batch_timeout_ms, called by consume"""
+
+        if self.pending_message_list and time.monotonic() - self.first_pending_message_received_at >= self.batch_timeout_seconds:
+            self.flush()
+
+    def on_consume_end(self, connection: kombu.connection.Connection, channel: kombu.transport.pyamqp.Channel) -> None:
+        """Persist the pending messages before the consumer stops"""
+
+        if self.pending_message_list:
+            self.flush()
 
     def on_message(self, body: str, message: kombu.transport.pyamqp.Message) -> None:
         """Function that will get called when a Consumer receives a message."""
 
         # Convert JSON into dict
-        json_data = json.loads(body)
+        try:
+            json_data = json.loads(body)
+        except (TypeError, ValueError) as error:
+            self.logger.error("Message rejected, its body isn't a JSON : %s", error)
+            message.reject()
+            return
         self.logger.info('Got message: %s', json_data)
 
+        if not self.pending_message_list:
+            self.first_pending_message_received_at = time.monotonic()
+        self.pending_message_list.append((json_data, message))
+        if len(self.pending_message_list) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Persist the pending messages in one transaction, then answer and acknowledge them"""
+
+        message_list, self.pending_message_list = self.pending_message_list, []
+        self.first_pending_message_received_at = None
+
+        try:
+            self.persist_batch([json_data for json_data, _ in message_list])
+        except (psycopg2.DataError, psycopg2.IntegrityError, KeyError, TypeError, ValueError) as error:
+            if len(message_list) == 1:
+                self.logger.error("Message rejected, it can't be persisted : %s", error)
+                message_list[0][1].reject()
+                return
+            # Find the faulty messages by persisting the batch one message at a time
+            self.logger.warning("Batch of %s messages can't be persisted, persist them one by one : %s", len(message_list), error)
+            for message_tuple in message_list:
+                self.pending_message_list = [message_tuple]
+                self.flush()
+            return
+
+        for _, message in message_list:
+            self.send_response(message)
+            message.ack() # lets the RabbitMQ server know we have dealt with the message
+        self.logger.info("End of process of %s messages", len(message_list))
+
+    def persist_batch(self, json_data_list: list[dict]) -> None:
+        """
+        Write the processed processing tasks of the messages in HRWSI Database in one transaction:
+        the processing tasks end, their processing status workflow processed and their products.
+        The messages of processing tasks already ended, in the database or earlier in the batch, are skipped.
+        """
+
         # Connect to Database
         conn, cur = HRWSIDatabaseApiManager.connect_to_database()
+        try:
+            # Check if the messages have already been processed, the processing tasks are locked until the commit
+            pt_id_list = list({int(json_data["processing_task_id"]) for json_data in json_data_list})
+            cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, self.SELECT_PROCESSING_TASKS_HAS_ENDED, parameters=(pt_id_list,))
+            has_ended_by_pt_id = dict(cur.fetchall())
 
-        # Convert cur in a dict
-        cur = conn.cursor(cursor_factory = psycopg2.extras.RealDictCursor)
-
-        # Check if the message has already been processed
-        pt_id = json_data["processing_task_id"]
-        check_processing_task_ended = f"SELECT pt.has_ended FROM hrwsi.processing_tasks pt WHERE id = {pt_id};"
-        cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, check_processing_task_ended)
-        conn.commit()
-        for result in cur :
-            task_has_ended = result["has_ended"]
-
-        if task_has_ended:
-            self.logger.info("Message has already been processed")
-        else:
-            # Update processing task has_ended to true
-            update_processing_task = f"UPDATE hrwsi.processing_tasks SET has_ended = true WHERE id = {pt_id};"
-            cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, update_processing_task)
-            conn.commit()
-
-            # Insert processing status workflow processed (2)
             now = datetime.datetime.now()
-            processing_status_workflow = tuple((int(json_data["nomad_job_id"]),2, now),)
-            cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, self.INSERT_PROCESSING_STATUS_WORKFLOW, (processing_status_workflow,))
-            conn.commit()
-
-            # Create and insert product
-            input_id = json_data["input_id"]
-            product_type_id = json_data["product_type_id"]
-            product_path = json_data["product_path"]
-            product_tuple = tuple((int(input_id),product_type_id, product_path, now, now),)
-            # TODO add kpi_file
-            cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, self.INSERT_PRODUCT, (product_tuple,))
-            conn.commit()
-
-        self.logger.info("End of process")
-
-        # Send response
+            ended_pt_id_list = []
+            processing_status_workflow_list = []
+            product_list = []
+            for json_data in json_data_list:
+                pt_id = int(json_data["processing_task_id"])
+                if pt_id not in has_ended_by_pt_id:
+                    raise ValueError(f"Processing task {pt_id} doesn't exist")
+                if has_ended_by_pt_id[pt_id]:
+                    self.logger.info("Message of processing task %s has already been processed", pt_id)
+                    continue
+                has_ended_by_pt_id[pt_id] = True
+                ended_pt_id_list.append(pt_id)
+
+                # Processing status workflow processed (2)
+                processing_status_workflow_list.append((int(json_data["nomad_job_id"]), self.PROCESSED_STATUS_ID, now))
+                # TODO add kpi_file
+                product_list.append((int(json_data["input_id"]), json_data["product_type_id"], json_data["product_path"], now, now))
+
+            if ended_pt_id_list:
+                cur = HRWSIDatabaseApiManager.execute_request_in_database(cur, self.UPDATE_PROCESSING_TASKS_HAS_ENDED, parameters=(ended_pt_id_list,))
+                psycopg2.extras.execute_values(cur, self.INSERT_PROCESSING_STATUS_WORKFLOW, processing_status_workflow_list, page_size=self.batch_size)
+                psycopg2.extras.execute_values(cur, self.INSERT_PRODUCT, product_list, page_size=self.batch_size)
+        except BaseException:
+            # The connection is given back to the pool, it is closed only if it is broken
+            HRWSIDatabaseApiManager.rollback_and_close_connection_to_database(conn, cur)
+            raise
+
+        HRWSIDatabaseApiManager.commit_and_close_connection_to_database(conn, cur)
+
+    def send_response(self, message: kombu.transport.pyamqp.Message) -> None:
+        """Answer to the worker who sent the message"""
+
         self.producer.publish(
             'Received',
             exchange='',
             routing_key=message.properties['reply_to'],
             correlation_id=message.properties['correlation_id']
         )
-
-        message.ack() # lets the RabbitMQ server know we have dealt with the message
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Robust_rpc_consumer_benchmark module compares the throughput of the RobustRPCConsumer persistence:
+- the former one, one database connection and four commits by message,
+- the micro-batching one, one transaction by batch of messages.
+The messages go through the in-memory kombu transport, the database must be created with init_database and update_database.
+Synthetic processing tasks are added with ids from --first-id, they are deleted at the end.
+
+Usage (from the project root):
+    python3 utils/rabbitmq/robust_rpc_consumer_benchmark.py --dsn "host=localhost port=5432 dbname=hrwsi_db user=postgres"
+"""
+import os
+import sys
+import json
+import time
+import datetime
+import argparse
+import threading
+import psycopg2
+import psycopg2.extras
+import kombu.transport.pyamqp
+from kombu import Connection, Exchange, Queue, Producer
+# Authorizing other packages absolute import
+ROOT_FOLDER = '/'.join(os.getcwd().split('hrwsi_watqual_sys')[:-1])
+sys.path.append(ROOT_FOLDER+'hrwsi_watqual_sys')
+
+from utils.rabbitmq.robust_rpc_consumer import RobustRPCConsumer
+from HRWSI_System.harvester.apimanager.hrwsi_database_api_manager import HRWSIDatabaseApiManager
+
+EXCHANGE = Exchange("rpc_product_exchange", type="direct")
+QUEUE = Queue("rpc_product_queue", exchange=EXCHANGE, routing_key="KEY")
+REPLY_QUEUE_NAME = "benchmark_reply_queue"
+
+class FormerRobustRPCConsumer(RobustRPCConsumer):
+    """RobustRPCConsumer persisting each message in its own connection with four commits, as before the micro-batching"""
+
+    def on_message(self, body: str, message: kombu.transport.pyamqp.Message) -> None:
+        """Function that will get called when a Consumer receives a message."""
+
+        json_data = json.loads(body)
+        conn = psycopg2.connect(**HRWSIDatabaseApiManager.get_connection_pool().connection_kwargs)
+        cur = conn.cursor(cursor_factory = psycopg2.extras.RealDictCursor)
+
+        pt_id = json_data["processing_task_id"]
+        cur.execute(f"SELECT pt.has_ended FROM hrwsi.processing_tasks pt WHERE id = {pt_id};")
+        conn.commit()
+        for result in cur :
+            task_has_ended = result["has_ended"]
+
+        if not task_has_ended:
+            cur.execute(f"UPDATE hrwsi.processing_tasks SET has_ended = true WHERE id = {pt_id};")
+            conn.commit()
+            now = datetime.datetime.now()
+            psycopg2.extras.execute_batch(cur, "INSERT INTO hrwsi.processing_status_workflow (nomad_job_dispatch_fk_id, processing_status_id, date) VALUES (%s, %s, %s);",
+                                          ((int(json_data["nomad_job_id"]), 2, now),))
+            conn.commit()
+            psycopg2.extras.execute_batch(cur, "INSERT INTO hrwsi.products (input_fk_id, product_type_id, product_path, creation_date, catalogued_date) VALUES (%s, %s, %s, %s, %s);",
+                                          ((int(json_data["input_id"]), json_data["product_type_id"], json_data["product_path"], now, now),))
+            conn.commit()
+        conn.close()
+
+        self.send_response(message)
+        message.ack()
+
+def reset_synthetic_processing_tasks(dsn: str, first_id: int, nb_message: int) -> None:
+    """Add the synthetic processing tasks, not ended, with a Nomad job dispatch and without status nor product"""
+
+    conn = psycopg2.connect(dsn)
+    with conn.cursor() as cur:
+        delete_synthetic_processing_tasks(cur, first_id, nb_message)
+        parameters = {"first_id": first_id, "last_id": first_id + nb_message - 1}
+        cur.execute("""
+            INSERT INTO hrwsi.input (id, processing_condition_name, date, tile, measurement_day, input_path, mission)
+            SELECT i, 'FSC_PC', '2024-01-09 12:15:11', '33VUC', 20240109, '/benchmark_eo_' || i, 'S2' FROM generate_series(%(first_id)s, %(last_id)s) AS i;
+            INSERT INTO hrwsi.virtual_machine (id, name, flavour) VALUES ('00000000-0000-0000-0000-00000000be4c', 'benchmark_worker', 'flavour1')
+            ON CONFLICT DO NOTHING;
+            INSERT INTO hrwsi.processing_tasks (id, input_fk_id, virtual_machine_id, creation_date, has_ended, intermediate_files_path)
+            SELECT i, i, '00000000-0000-0000-0000-00000000be4c', '2024-01-09 12:16:11', false, '/benchmark_intermediate_file_path_' || i
+            FROM generate_series(%(first_id)s, %(last_id)s) AS i;
+            INSERT INTO hrwsi.nomad_job_dispatch (id, processing_task_fk_id, nomad_job_dispatch, dispatch_date, log_path)
+            SELECT i, i, 'benchmark-dispatch-' || i, '2024-01-09 12:17:11', 'benchmark_log_path_' || i FROM generate_series(%(first_id)s, %(last_id)s) AS i;
+            """, parameters)
+    conn.commit()
+    conn.close()
+
+def delete_synthetic_processing_tasks(cur: psycopg2.extensions.cursor, first_id: int, nb_message: int) -> None:
+    """Delete the synthetic inputs, their processing tasks, statuses and products are deleted in cascade"""
+
+    cur.execute("DELETE FROM hrwsi.input WHERE id BETWEEN %s AND %s;", (first_id, first_id + nb_message - 1))
+
+def benchmark_consumer(consumer_class: type, dsn: str, first_id: int, nb_message: int,
+                       batch_size: int, batch_timeout_ms: float) -> float:
+    """Publish nb_message messages on the in-memory broker, return the time to consume them"""
+
+    reset_synthetic_processing_tasks(dsn, first_id, nb_message)
+    with Connection("memory://") as conn:
+        QUEUE.maybe_bind(conn)
+        QUEUE.declare()
+        reply_queue = Queue(REPLY_QUEUE_NAME, channel=conn)
+        reply_queue.declare()
+
+        producer = Producer(conn.channel(), exchange=EXCHANGE, routing_key=QUEUE.routing_key)
+        for pt_id in range(first_id, first_id + nb_message):
+            producer.publish(json.dumps({"processing_task_id": pt_id, "nomad_job_id": pt_id, "input_id": pt_id,
+                                         "product_type_id": 2, "product_path": f"/benchmark_product_{pt_id}"}),
+                             reply_to=REPLY_QUEUE_NAME, correlation_id=str(pt_id))
+
+        consumer = consumer_class(conn, [QUEUE], batch_size, batch_timeout_ms)
+        consumer_thread = threading.Thread(target=consumer.run)
+        start = time.perf_counter()
+        consumer_thread.start()
+        while reply_queue.queue_declare(passive=True).message_count < nb_message:
+            time.sleep(0.01)
+        consume_time = time.perf_counter() - start
+        consumer.should_stop = True
+        consumer_thread.join()
+        reply_queue.purge()
+
+    # Check the persisted rows
+    conn = psycopg2.connect(dsn)
+    with conn.cursor() as cur:
+        cur.execute("SELECT count(*) FROM hrwsi.products WHERE input_fk_id BETWEEN %s AND %s;", (first_id, first_id + nb_message - 1))
+        assert cur.fetchone()[0] == nb_message
+    conn.close()
+
+    return consume_time
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Benchmark the persistence of the RobustRPCConsumer messages")
+    parser.add_argument("--dsn", required=True, help="PostgreSQL connection string of a HRWSI database")
+    parser.add_argument("--nb-message", type=int, default=10_000)
+    parser.add_argument("--batch-size", type=int, default=RobustRPCConsumer.DEFAULT_BATCH_SIZE)
+    parser.add_argument("--batch-timeout-ms", type=float, default=RobustRPCConsumer.DEFAULT_BATCH_TIMEOUT_MS)
+    parser.add_argument("--first-id", type=int, default=1_000_000_000, help="First id of the synthetic rows")
+    args = parser.parse_args()
+
+    database_parameters = dict.fromkeys(("dbname", "user", "password", "host", "port"))
+    database_parameters.update(psycopg2.extensions.parse_dsn(args.dsn))
+    HRWSIDatabaseApiManager.create_connection_pool(**database_parameters)
+    try:
+        for name, consumer_class in (("per message", FormerRobustRPCConsumer), ("micro-batch", RobustRPCConsumer)):
+            consume_time = benchmark_consumer(consumer_class, args.dsn, args.first_id, args.nb_message,
+                                              args.batch_size, args.batch_timeout_ms)
+            print(f"{name:12}: {args.nb_message} messages in {consume_time:.2f} s ({args.nb_message / consume_time:.0f} messages/s)")
+    finally:
+        HRWSIDatabaseApiManager.close_connection_pool()
+        conn = psycopg2.connect(args.dsn)
+        with conn.cursor() as cur:
+            delete_synthetic_processing_tasks(cur, args.first_id, args.nb_message)
+            cur.execute("DELETE FROM hrwsi.virtual_machine WHERE id = '00000000-0000-0000-0000-00000000be4c';")
+        conn.commit()
+        conn.close()